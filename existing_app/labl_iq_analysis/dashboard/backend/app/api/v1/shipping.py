@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
-from typing import List, Optional
+from sqlalchemy import select, insert, func, desc
+from typing import Dict, List, Optional, Set, Tuple
+import json
 import uuid
 import os
 import pandas as pd
@@ -10,27 +11,25 @@ from datetime import datetime, timedelta
 from app.core.database import get_db
 from app.core.config import settings
 from app.models.user import User
-from app.models.analysis import Analysis
+from app.models.analysis import Analysis, AnalysisShipment
 from app.schemas.shipping import (
     UploadResponse, AnalysisResult, DashboardMetrics, RateQuote, 
-    RateQuoteRequest, MonthlyTrend, AnalysisStatus
+    RateQuoteRequest, MonthlyTrend, TrendPoint, AnalysisStatus
 )
 from app.schemas.response import APIResponse
 from app.api.v1.auth import get_current_user
 from app.services.shipping_analyzer import ShippingAnalyzer
+from app.services.analysis_accumulator import AnalysisAccumulator
 from app.services.rate_calculator import RateCalculator
+from app.services.rate_cards import get_rate_cards
 
 router = APIRouter()
 
-@router.post("/upload", response_model=APIResponse[UploadResponse])
-async def upload_shipment_data(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    carriersToAnalyze: Optional[str] = Form(None),
-    includeInternational: bool = Form(False),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+# Months of ship-date trends shown on the dashboard
+TREND_MONTHS = 12
+
+async def save_upload_file(file: UploadFile, upload_id: str) -> str:
+    """Validate an uploaded shipment file (or .zip of them) and save it to the upload directory"""
     # Validate file type
     file_extension = os.path.splitext(file.filename)[1].lower()
     if file_extension not in settings.ALLOWED_FILE_TYPES:
@@ -40,7 +39,6 @@ async def upload_shipment_data(
         )
     
     # Validate file size
-    file_size = 0
     content = await file.read()
     file_size = len(content)
     
@@ -50,10 +48,6 @@ async def upload_shipment_data(
             detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / 1024 / 1024}MB"
         )
     
-    # Generate unique IDs
-    upload_id = str(uuid.uuid4())
-    analysis_id = str(uuid.uuid4())
-    
     # Save file
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     file_path = os.path.join(settings.UPLOAD_DIR, f"{upload_id}_{file.filename}")
@@ -61,12 +55,53 @@ async def upload_shipment_data(
     with open(file_path, "wb") as buffer:
         buffer.write(content)
     
+    return file_path
+
+def parse_carriers(value: Optional[str]) -> Optional[List[str]]:
+    """Carriers from the form field, sent as a JSON list or comma-separated; unknown carriers are a 400"""
+    if not value:
+        return None
+    try:
+        carriers = json.loads(value) if value.lstrip().startswith("[") else value.split(",")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="carriersToAnalyze must be a JSON list or comma-separated")
+    carriers = [str(carrier).strip() for carrier in carriers if str(carrier).strip()]
+    try:
+        get_rate_cards().select(carriers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return carriers or None
+
+@router.post("/upload", response_model=APIResponse[UploadResponse])
+async def upload_shipment_data(
+    background_tasks: BackgroundTasks,
+    file: List[UploadFile] = File(...),
+    carriersToAnalyze: Optional[str] = Form(None),
+    includeInternational: bool = Form(False),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    carriers_to_analyze = parse_carriers(carriersToAnalyze)
+    
+    # Generate unique IDs
+    upload_id = str(uuid.uuid4())
+    analysis_id = str(uuid.uuid4())
+    
+    # Every file (repeat the "file" field) is analyzed as one dataset
+    files = []
+    try:
+        for index, upload in enumerate(file):
+            files.append((upload.filename, await save_upload_file(upload, f"{upload_id}_{index}")))
+    except HTTPException:
+        remove_files(files)
+        raise
+    
     # Create analysis record
     analysis = Analysis(
         id=analysis_id,
         user_id=current_user.id,
         upload_id=upload_id,
-        filename=file.filename,
+        filename=", ".join(upload.filename for upload in file),
         status=AnalysisStatus.PROCESSING
     )
     db.add(analysis)
@@ -76,8 +111,8 @@ async def upload_shipment_data(
     background_tasks.add_task(
         process_shipment_analysis,
         analysis_id=analysis_id,
-        file_path=file_path,
-        carriers_to_analyze=carriersToAnalyze.split(",") if carriersToAnalyze else None,
+        files=files,
+        carriers_to_analyze=carriers_to_analyze,
         include_international=includeInternational
     )
     
@@ -89,6 +124,20 @@ async def upload_shipment_data(
         success=True
     )
 
+def processed_rows(analysis: Analysis) -> int:
+    """Rows read by the running job, or every shipment once the analysis is done"""
+    progress = (analysis.results or {}).get("progress")
+    if analysis.status == AnalysisStatus.PROCESSING and progress:
+        return progress["rows"]
+    return analysis.total_shipments or 0
+
+def progress_reporter(db: AsyncSession, analysis: Analysis):
+    """Record the rows read so far on the analysis so status polls can show progress"""
+    async def report(rows: int):
+        analysis.results = {**(analysis.results or {}), "progress": {"rows": rows}}
+        await db.commit()
+    return report
+
 @router.get("/analysis/{upload_id}", response_model=APIResponse[AnalysisResult])
 async def get_analysis_status(
     upload_id: str,
@@ -117,8 +166,11 @@ async def get_analysis_status(
             topSavingsOpportunities=analysis.results.get("top_savings", []) if analysis.results else [],
             carrierBreakdown=analysis.results.get("carrier_breakdown", []) if analysis.results else [],
             zoneAnalysis=analysis.results.get("zone_analysis", []) if analysis.results else [],
+            sourceBreakdown=analysis.results.get("source_breakdown", []) if analysis.results else [],
             createdAt=analysis.created_at,
-            status=AnalysisStatus(analysis.status)
+            status=AnalysisStatus(analysis.status),
+            processedRows=processed_rows(analysis),
+            errorMessage=analysis.error_message
         ),
         success=True
     )
@@ -151,12 +203,68 @@ async def get_analysis_results(
             topSavingsOpportunities=analysis.results.get("top_savings", []) if analysis.results else [],
             carrierBreakdown=analysis.results.get("carrier_breakdown", []) if analysis.results else [],
             zoneAnalysis=analysis.results.get("zone_analysis", []) if analysis.results else [],
+            sourceBreakdown=analysis.results.get("source_breakdown", []) if analysis.results else [],
             createdAt=analysis.created_at,
-            status=AnalysisStatus(analysis.status)
+            status=AnalysisStatus(analysis.status),
+            processedRows=processed_rows(analysis),
+            errorMessage=analysis.error_message
+        ),
+        success=True
+    )
+
+@router.post("/analysis/{analysis_id}/append", response_model=APIResponse[UploadResponse])
+async def append_shipment_data(
+    analysis_id: str,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Add a new shipment file to a completed analysis, rating only its rows"""
+    result = await db.execute(
+        select(Analysis).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id
+        )
+    )
+    analysis = result.scalar_one_or_none()
+    
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    if analysis.status != AnalysisStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail="Analysis must be completed before appending data")
+    
+    file_path = await save_upload_file(file, str(uuid.uuid4()))
+    
+    analysis.status = AnalysisStatus.PROCESSING
+    await db.commit()
+    
+    background_tasks.add_task(
+        process_analysis_append,
+        analysis_id=analysis_id,
+        files=[(file.filename, file_path)]
+    )
+    
+    return APIResponse(
+        data=UploadResponse(
+            uploadId=analysis.upload_id,
+            message="File uploaded successfully. Appending to analysis."
         ),
         success=True
     )
 
+def merge_analysis_summaries(analyses: List[Analysis]) -> AnalysisAccumulator:
+    """Merge the summaries stored with each analysis"""
+    return AnalysisAccumulator.merge_all(
+        AnalysisAccumulator.from_dict(a.results["summary"]) if a.results and "summary" in a.results
+        else AnalysisAccumulator.from_dict({
+            "total_shipments": a.total_shipments,
+            "total_cost": a.total_cost,
+            "potential_savings": a.potential_savings,
+        })
+        for a in analyses
+    )
+
 @router.get("/dashboard", response_model=APIResponse[DashboardMetrics])
 async def get_dashboard_metrics(
     timeframe: str = "30d",
@@ -177,27 +285,25 @@ async def get_dashboard_metrics(
     )
     analyses = result.scalars().all()
     
-    # Calculate metrics
-    total_shipments = sum(a.total_shipments for a in analyses)
-    total_savings = sum(a.potential_savings for a in analyses)
-    avg_savings = total_savings / total_shipments if total_shipments > 0 else 0
-    
-    # Get top carrier (simplified)
-    top_carrier = "UPS"  # This would be calculated from actual data
+    # Merge the stored per-analysis summaries instead of re-summing rows
+    summary = merge_analysis_summaries(analyses)
+    total_shipments = summary.total_shipments
+    total_savings = summary.potential_savings
+    avg_savings = summary.avg_savings_per_shipment
+    top_carrier = summary.top_carrier or "UPS"
     
     # Get recent analyses
     recent_analyses = analyses[:5]
     
-    # Generate monthly trends (simplified)
-    monthly_trends = []
-    for i in range(3):
-        month_date = datetime.utcnow() - timedelta(days=30 * i)
-        monthly_trends.append(MonthlyTrend(
-            month=month_date.strftime("%b %Y"),
-            shipments=total_shipments // 3,
-            cost=50000 + (i * 5000),
-            savings=total_savings // 3
-        ))
+    # Monthly trends come from the ship-date rollups stored with each analysis
+    monthly_trends = [
+        MonthlyTrend(
+            month=datetime.strptime(trend["period"], "%Y-%m").strftime("%b %Y"),
+            shipments=trend["shipments"],
+            cost=trend["cost"],
+            savings=trend["savings"]
+        ) for trend in summary.trends("monthly")[-TREND_MONTHS:]
+    ]
     
     return APIResponse(
         data=DashboardMetrics(
@@ -225,6 +331,31 @@ async def get_dashboard_metrics(
         success=True
     )
 
+@router.get("/trends", response_model=APIResponse[List[TrendPoint]])
+async def get_shipment_trends(
+    granularity: str = "monthly",
+    analysisId: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Daily or monthly shipment, cost, savings and surcharge totals by ship date"""
+    if granularity not in ("daily", "monthly"):
+        raise HTTPException(status_code=400, detail="granularity must be 'daily' or 'monthly'")
+    
+    query = select(Analysis).where(
+        Analysis.user_id == current_user.id,
+        Analysis.status == AnalysisStatus.COMPLETED
+    )
+    if analysisId:
+        query = query.where(Analysis.id == analysisId)
+    result = await db.execute(query)
+    
+    summary = merge_analysis_summaries(result.scalars().all())
+    return APIResponse(
+        data=[TrendPoint(**trend) for trend in summary.trends(granularity)],
+        success=True
+    )
+
 @router.post("/quotes", response_model=APIResponse[List[RateQuote]])
 async def get_rate_quotes(
     quote_request: RateQuoteRequest,
@@ -244,10 +375,60 @@ async def get_rate_quotes(
         success=True
     )
 
-# Background task function
+# Background task functions
+ID_LOOKUP_BATCH_SIZE = 10000
+
+async def store_shipment_ids(db: AsyncSession, analysis_id: str, shipment_ids: List[str]):
+    """Record the shipment IDs included in an analysis"""
+    for start in range(0, len(shipment_ids), ID_LOOKUP_BATCH_SIZE):
+        batch = shipment_ids[start:start + ID_LOOKUP_BATCH_SIZE]
+        await db.execute(
+            insert(AnalysisShipment),
+            [{"analysis_id": analysis_id, "shipment_id": shipment_id} for shipment_id in batch]
+        )
+
+def existing_shipment_ids(db: AsyncSession, analysis_id: str):
+    """Lookup of shipment IDs already stored for an analysis, served by the (analysis_id, shipment_id) index"""
+    async def lookup(shipment_ids: List[str]) -> Set[str]:
+        found: Set[str] = set()
+        for start in range(0, len(shipment_ids), ID_LOOKUP_BATCH_SIZE):
+            batch = shipment_ids[start:start + ID_LOOKUP_BATCH_SIZE]
+            result = await db.execute(
+                select(AnalysisShipment.shipment_id).where(
+                    AnalysisShipment.analysis_id == analysis_id,
+                    AnalysisShipment.shipment_id.in_(batch)
+                )
+            )
+            found.update(result.scalars().all())
+        return found
+    return lookup
+
+def remove_files(files: List[Tuple[str, str]]):
+    """Delete saved uploads"""
+    for _, file_path in files:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+def file_entries(accumulator: AnalysisAccumulator, duplicates: Dict[str, int]) -> List[dict]:
+    """Shipments and skipped duplicates per source file, for results["files"]"""
+    return [
+        {"filename": source, "shipments": int(accumulator.sources.get(source, {}).get("shipments", 0)),
+         "duplicates": skipped}
+        for source, skipped in duplicates.items()
+    ]
+
+def apply_analysis_results(analysis: Analysis, results: dict):
+    """Copy analysis results onto the stored analysis record"""
+    analysis.total_shipments = results["total_shipments"]
+    analysis.total_cost = results["total_cost"]
+    analysis.potential_savings = results["potential_savings"]
+    analysis.avg_savings_per_shipment = results["avg_savings_per_shipment"]
+    analysis.results = results
+    analysis.status = AnalysisStatus.COMPLETED
+
 async def process_shipment_analysis(
     analysis_id: str,
-    file_path: str,
+    files: List[Tuple[str, str]],
     carriers_to_analyze: Optional[List[str]] = None,
     include_international: bool = False
 ):
@@ -261,20 +442,21 @@ async def process_shipment_analysis(
             analysis = result.scalar_one()
             
             # Process the file
-            analyzer = ShippingAnalyzer()
-            results = await analyzer.analyze_shipments(
-                file_path=file_path,
-                carriers_to_analyze=carriers_to_analyze,
-                include_international=include_international
+            analyzer = ShippingAnalyzer(carriers=carriers_to_analyze, include_international=include_international)
+            accumulator, shipment_ids, duplicates = await analyzer.accumulate_shipments(
+                files,
+                progress=progress_reporter(db, analysis)
             )
             
-            # Update analysis with results
-            analysis.total_shipments = results["total_shipments"]
-            analysis.total_cost = results["total_cost"]
-            analysis.potential_savings = results["potential_savings"]
-            analysis.avg_savings_per_shipment = results["avg_savings_per_shipment"]
-            analysis.results = results
-            analysis.status = AnalysisStatus.COMPLETED
+            # Update analysis with results; criteria are kept for later appends
+            results = accumulator.results()
+            results["criteria"] = {
+                "carriers_to_analyze": carriers_to_analyze,
+                "include_international": include_international
+            }
+            results["files"] = file_entries(accumulator, duplicates)
+            apply_analysis_results(analysis, results)
+            await store_shipment_ids(db, analysis_id, shipment_ids)
             
             await db.commit()
             
@@ -285,6 +467,66 @@ async def process_shipment_analysis(
             await db.commit()
         
         finally:
-            # Clean up uploaded file
-            if os.path.exists(file_path):
-                os.remove(file_path)
\ No newline at end of file
+            # Clean up uploaded files
+            remove_files(files)
+
+async def process_analysis_append(
+    analysis_id: str,
+    files: List[Tuple[str, str]]
+):
+    """Background task to rate an appended file and merge it into an analysis"""
+    from app.core.database import AsyncSessionLocal
+    
+    async with AsyncSessionLocal() as db:
+        analysis = None
+        try:
+            result = await db.execute(select(Analysis).where(Analysis.id == analysis_id))
+            analysis = result.scalar_one()
+            stored = analysis.results or {}
+            criteria = stored.get("criteria", {})
+            
+            # Rate only the new file's rows, skipping shipment IDs already in the analysis
+            analyzer = ShippingAnalyzer(
+                carriers=criteria.get("carriers_to_analyze"),
+                include_international=criteria.get("include_international", False)
+            )
+            accumulator, shipment_ids, duplicates = await analyzer.accumulate_shipments(
+                files,
+                existing_ids=existing_shipment_ids(db, analysis_id),
+                progress=progress_reporter(db, analysis)
+            )
+            
+            # Merge into the stored summary instead of re-rating the history
+            if "summary" in stored:
+                summary = AnalysisAccumulator.from_dict(stored["summary"])
+            else:
+                summary = AnalysisAccumulator.from_dict({
+                    "total_shipments": analysis.total_shipments,
+                    "total_cost": analysis.total_cost,
+                    "potential_savings": analysis.potential_savings,
+                })
+            summary.merge(accumulator)
+            
+            results = summary.results()
+            results["criteria"] = criteria
+            results["files"] = stored.get("files", []) + file_entries(accumulator, duplicates)
+            apply_analysis_results(analysis, results)
+            await store_shipment_ids(db, analysis_id, shipment_ids)
+            
+            await db.commit()
+            
+        except Exception as e:
+            # The stored analysis is still valid: keep it completed and record the failed file
+            await db.rollback()
+            if analysis is not None:
+                await db.refresh(analysis)
+                stored = {key: value for key, value in (analysis.results or {}).items() if key != "progress"}
+                stored["files"] = stored.get("files", []) + [
+                    {"filename": filename, "shipments": 0, "duplicates": 0, "error": str(e)} for filename, _ in files
+                ]
+                analysis.results = stored
+                analysis.status = AnalysisStatus.COMPLETED
+                await db.commit()
+        
+        finally:
+            remove_files(files)
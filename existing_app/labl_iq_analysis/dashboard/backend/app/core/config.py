@@ -30,7 +30,7 @@ class Settings(BaseSettings):
     # File Storage
     UPLOAD_DIR: str = "./uploads"
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
-    ALLOWED_FILE_TYPES: List[str] = [".csv", ".xlsx", ".xls"]
+    ALLOWED_FILE_TYPES: List[str] = [".csv", ".xlsx", ".xls", ".zip"]  # .zip archives of the other types
     
     # AWS S3 (for production)
     AWS_ACCESS_KEY_ID: Optional[str] = None
@@ -41,6 +41,9 @@ class Settings(BaseSettings):
     # Redis (for background tasks)
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Carrier rate cards (*.json); the built-in cards are used when empty
+    RATE_CARD_DIR: str = "./rate_cards"
+    
     # Shipping APIs
     UPS_API_KEY: Optional[str] = None
     FEDEX_API_KEY: Optional[str] = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -23,6 +23,17 @@ class Analysis(Base):
     # Relationships
     user = relationship("User", back_populates="analyses")
 
+class AnalysisShipment(Base):
+    """Shipment IDs already included in an analysis, indexed for duplicate checks on append"""
+    __tablename__ = "analysis_shipments"
+    __table_args__ = (
+        Index("ix_analysis_shipments_analysis_id_shipment_id", "analysis_id", "shipment_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    analysis_id = Column(String, ForeignKey("analyses.id", ondelete="CASCADE"), nullable=False)
+    shipment_id = Column(String, nullable=False)
+
 # Add to User model
 from app.models.user import User
 User.analyses = relationship("Analysis", back_populates="user")
\ No newline at end of file
@@ -24,8 +24,15 @@ class ZoneAnalysis(BaseModel):
     avgCost: float
     savings: float
 
+class SourceBreakdown(BaseModel):
+    sourceFile: str
+    shipments: int
+    cost: float
+    savings: float
+
 class SavingsOpportunity(BaseModel):
-    carrier: str
+    carrier: str  # current carrier
+    recommendedCarrier: str = ""  # carrier of the cheapest card; service and recommendedCost are its
     service: str
     currentCost: float
     recommendedCost: float
@@ -41,8 +48,11 @@ class AnalysisResult(BaseModel):
     topSavingsOpportunities: List[SavingsOpportunity]
     carrierBreakdown: List[CarrierBreakdown]
     zoneAnalysis: List[ZoneAnalysis]
+    sourceBreakdown: List[SourceBreakdown] = []  # per uploaded file or .zip member
     createdAt: datetime
     status: AnalysisStatus
+    processedRows: int = 0  # rows read so far while processing
+    errorMessage: Optional[str] = None
 
 class MonthlyTrend(BaseModel):
     month: str
@@ -50,6 +60,14 @@ class MonthlyTrend(BaseModel):
     cost: float
     savings: float
 
+class TrendPoint(BaseModel):
+    period: str  # YYYY-MM-DD (daily) or YYYY-MM (monthly)
+    shipments: int
+    cost: float
+    savings: float
+    surcharges: float
+    surchargeMix: Dict[str, float] = {}  # das, edas, remote
+
 class DashboardMetrics(BaseModel):
     totalShipments: int
     totalSavings: float
@@ -0,0 +1,205 @@
+import heapq
+import pandas as pd
+from typing import Dict, List, Any, Iterable
+
+GROUP_FIELDS = ("shipments", "cost", "savings")
+# Surcharge types broken out in the date rollups, read from <type>_surcharge columns
+SURCHARGE_TYPES = ("das", "edas", "remote")
+PERIOD_FIELDS = ("shipments", "cost", "savings", "surcharges") + tuple(f"{kind}_surcharges" for kind in SURCHARGE_TYPES)
+
+
+class AnalysisAccumulator:
+    """Single-pass, mergeable totals for a shipment analysis.
+
+    Each chunk of analyzed shipments is folded in with ``update``; accumulators
+    from other chunks, workers or stored analyses are combined with ``merge``.
+    """
+
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self.total_shipments = 0
+        self.total_cost = 0.0
+        self.potential_savings = 0.0
+        self.carriers: Dict[str, Dict[str, float]] = {}
+        self.zones: Dict[str, Dict[str, float]] = {}
+        self.sources: Dict[str, Dict[str, float]] = {}
+        self.top_savings: List[Dict[str, Any]] = []
+        self.daily: Dict[str, Dict[str, float]] = {}
+        self.monthly: Dict[str, Dict[str, float]] = {}
+
+    def update(self, df: pd.DataFrame) -> "AnalysisAccumulator":
+        """Add a chunk with carrier, zone, actual_cost, recommended_cost and potential_savings columns (source_file optional)"""
+        if df.empty:
+            return self
+
+        self.total_shipments += len(df)
+        self.total_cost += float(df["actual_cost"].sum())
+        self.potential_savings += float(df["potential_savings"].sum())
+
+        for column, groups in (("carrier", self.carriers), ("zone", self.zones), ("source_file", self.sources)):
+            if column not in df.columns:
+                continue
+            grouped = df.groupby(column, sort=False).agg(
+                shipments=("actual_cost", "size"),
+                cost=("actual_cost", "sum"),
+                savings=("potential_savings", "sum"),
+            )
+            self._merge_groups(groups, {
+                str(key): {field: float(row[field]) for field in GROUP_FIELDS}
+                for key, row in grouped.iterrows()
+            })
+
+        if "ship_date" in df.columns:
+            self._update_periods(df)
+
+        top = df.nlargest(self.top_n, "potential_savings")
+        self._merge_top([
+            {
+                "carrier": record["carrier"],
+                # Unpriced shipments stay with their current carrier
+                "recommendedCarrier": record["recommended_carrier"]
+                if isinstance(record.get("recommended_carrier"), str) else record["carrier"],
+                "service": record["recommended_service"] if isinstance(record.get("recommended_service"), str) else "Ground",
+                "currentCost": float(record["actual_cost"]),
+                "recommendedCost": float(record["recommended_cost"]),
+                "savings": float(record["potential_savings"]),
+            }
+            for record in top.to_dict("records")
+        ])
+        return self
+
+    def _update_periods(self, df: pd.DataFrame) -> None:
+        """Roll shipments up by ship date (daily) and ship month; rows without a date are left out"""
+        dated = df[df["ship_date"].notna()]
+        if dated.empty:
+            return
+        columns = {"cost": "actual_cost", "savings": "potential_savings", "surcharges": "surcharges"}
+        columns.update({f"{kind}_surcharges": f"{kind}_surcharge" for kind in SURCHARGE_TYPES})
+        daily = pd.DataFrame({
+            "day": dated["ship_date"].dt.normalize(),
+            **{field: dated[column] if column in dated.columns else 0.0 for field, column in columns.items()},
+        }).groupby("day", sort=False).agg(
+            shipments=("cost", "size"),
+            **{field: (field, "sum") for field in columns},
+        )
+        # Format the few distinct days once instead of every row
+        days = daily.index.strftime("%Y-%m-%d")
+        daily_groups = {
+            day: {field: float(value) for field, value in zip(PERIOD_FIELDS, values)}
+            for day, values in zip(days, daily[list(PERIOD_FIELDS)].itertuples(index=False))
+        }
+        monthly_groups: Dict[str, Dict[str, float]] = {}
+        for day, values in daily_groups.items():
+            self._merge_groups(monthly_groups, {day[:7]: values}, PERIOD_FIELDS)
+        self._merge_groups(self.daily, daily_groups, PERIOD_FIELDS)
+        self._merge_groups(self.monthly, monthly_groups, PERIOD_FIELDS)
+
+    def merge(self, other: "AnalysisAccumulator") -> "AnalysisAccumulator":
+        """Combine the totals of another accumulator into this one"""
+        self.total_shipments += other.total_shipments
+        self.total_cost += other.total_cost
+        self.potential_savings += other.potential_savings
+        self._merge_groups(self.carriers, other.carriers)
+        self._merge_groups(self.zones, other.zones)
+        self._merge_groups(self.sources, other.sources)
+        self._merge_groups(self.daily, other.daily, PERIOD_FIELDS)
+        self._merge_groups(self.monthly, other.monthly, PERIOD_FIELDS)
+        self._merge_top(other.top_savings)
+        return self
+
+    @classmethod
+    def merge_all(cls, accumulators: Iterable["AnalysisAccumulator"], top_n: int = 10) -> "AnalysisAccumulator":
+        merged = cls(top_n=top_n)
+        for accumulator in accumulators:
+            merged.merge(accumulator)
+        return merged
+
+    @staticmethod
+    def _merge_groups(target: Dict[str, Dict[str, float]], source: Dict[str, Dict[str, float]],
+                      fields: Iterable[str] = GROUP_FIELDS) -> None:
+        for key, values in source.items():
+            totals = target.setdefault(key, {field: 0.0 for field in fields})
+            for field in fields:
+                # Summaries stored before a field was added don't have it
+                totals[field] = totals.get(field, 0.0) + values.get(field, 0.0)
+
+    def _merge_top(self, records: List[Dict[str, Any]]) -> None:
+        self.top_savings = heapq.nlargest(self.top_n, self.top_savings + records, key=lambda r: r["savings"])
+
+    @property
+    def avg_savings_per_shipment(self) -> float:
+        return self.potential_savings / self.total_shipments if self.total_shipments > 0 else 0
+
+    @property
+    def top_carrier(self) -> str:
+        """Carrier with the most shipments"""
+        if not self.carriers:
+            return ""
+        return max(self.carriers.items(), key=lambda item: item[1]["shipments"])[0]
+
+    def trends(self, granularity: str = "monthly") -> List[Dict[str, Any]]:
+        """Daily or monthly rollups in date order, with the surcharge mix by type"""
+        periods = self.daily if granularity == "daily" else self.monthly
+        return [
+            {"period": period, "shipments": int(totals["shipments"]), "cost": totals["cost"],
+             "savings": totals["savings"], "surcharges": totals["surcharges"],
+             "surchargeMix": {kind: totals.get(f"{kind}_surcharges", 0.0) for kind in SURCHARGE_TYPES}}
+            for period, totals in sorted(periods.items())
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable state, stored with the analysis so it can be merged later"""
+        return {
+            "top_n": self.top_n,
+            "total_shipments": self.total_shipments,
+            "total_cost": self.total_cost,
+            "potential_savings": self.potential_savings,
+            "carriers": self.carriers,
+            "zones": self.zones,
+            "sources": self.sources,
+            "top_savings": self.top_savings,
+            "daily": self.daily,
+            "monthly": self.monthly,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "AnalysisAccumulator":
+        accumulator = cls(top_n=state.get("top_n", 10))
+        accumulator.total_shipments = state.get("total_shipments", 0)
+        accumulator.total_cost = state.get("total_cost", 0.0)
+        accumulator.potential_savings = state.get("potential_savings", 0.0)
+        accumulator.carriers = state.get("carriers", {})
+        accumulator.zones = state.get("zones", {})
+        accumulator.sources = state.get("sources", {})
+        accumulator.top_savings = state.get("top_savings", [])
+        accumulator.daily = state.get("daily", {})
+        accumulator.monthly = state.get("monthly", {})
+        return accumulator
+
+    def results(self) -> Dict[str, Any]:
+        """Analysis results in the format stored on Analysis.results"""
+        return {
+            "total_shipments": self.total_shipments,
+            "total_cost": float(self.total_cost),
+            "potential_savings": float(self.potential_savings),
+            "avg_savings_per_shipment": float(self.avg_savings_per_shipment),
+            "carrier_breakdown": [
+                {"carrier": carrier, "shipments": int(totals["shipments"]),
+                 "cost": totals["cost"], "savings": totals["savings"]}
+                for carrier, totals in self.carriers.items()
+            ],
+            "zone_analysis": [
+                {"zone": f"Zone {zone}", "shipments": int(totals["shipments"]),
+                 "avgCost": totals["cost"] / totals["shipments"] if totals["shipments"] else 0.0,
+                 "savings": totals["savings"]}
+                for zone, totals in self.zones.items()
+            ],
+            "source_breakdown": [
+                {"sourceFile": source, "shipments": int(totals["shipments"]),
+                 "cost": totals["cost"], "savings": totals["savings"]}
+                for source, totals in self.sources.items()
+            ],
+            "top_savings": self.top_savings[:5],
+            "monthly_trends": self.trends("monthly"),
+            "summary": self.to_dict(),
+        }
@@ -1,11 +1,22 @@
 import aiohttp
 import asyncio
-from typing import List, Dict, Any
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from typing import List, Dict, Any, Optional
 from app.schemas.shipping import RateQuote
+from app.services.rate_cards import RateCardSet, get_rate_cards, calculate_zones, zip5_codes
+
+# Dimensional weight divisor (cubic inches per lb)
+DIM_DIVISOR = 139.0
+
+# Transit days quoted when a card has none for the zone
+DEFAULT_TRANSIT_DAYS = 5
 
 class RateCalculator:
-    def __init__(self):
+    def __init__(self, rate_cards: Optional[RateCardSet] = None):
         self.timeout = aiohttp.ClientTimeout(total=30)
+        self.rate_cards = rate_cards or get_rate_cards()
     
     async def get_quotes(
         self,
@@ -15,35 +26,34 @@ class RateCalculator:
         dimensions: Dict[str, float],
         value: float = None
     ) -> List[RateQuote]:
-        """Get rate quotes from multiple carriers"""
+        """Get rate quotes from every loaded carrier rate card"""
+        length = dimensions.get("length", 0)
+        width = dimensions.get("width", 0)
+        height = dimensions.get("height", 0)
+        billable_weight = max(weight, length * width * height / DIM_DIVISOR)
+        
+        zone = calculate_zones(pd.Series([origin]), pd.Series([destination]))
+        costs = self.rate_cards.price(
+            np.array([billable_weight]), zone.to_numpy(), zip5_codes(pd.Series([destination]))
+        )[0]
         
-        # For demo purposes, return mock data
-        # In production, you'd integrate with actual carrier APIs
-        mock_quotes = [
-            RateQuote(
-                carrier="UPS",
-                service="Ground",
-                cost=12.45,
-                deliveryDays=3,
-                deliveryDate="2025-07-04"
-            ),
-            RateQuote(
-                carrier="FedEx",
-                service="Ground",
-                cost=13.20,
-                deliveryDays=3,
-                deliveryDate="2025-07-04"
-            ),
-            RateQuote(
-                carrier="USPS",
-                service="Priority",
-                cost=10.85,
-                deliveryDays=2,
-                deliveryDate="2025-07-03"
-            ),
-        ]
+        quotes = []
+        today = date.today()
+        for i in np.argsort(costs):
+            if np.isnan(costs[i]):
+                continue
+            card = self.rate_cards.cards[i]
+            days = card.transit_days[zone.iloc[0] - 1]
+            days = int(days) if not np.isnan(days) else DEFAULT_TRANSIT_DAYS
+            quotes.append(RateQuote(
+                carrier=card.carrier,
+                service=card.service,
+                cost=float(costs[i]),
+                deliveryDays=days,
+                deliveryDate=(today + timedelta(days=days)).isoformat()
+            ))
         
-        return mock_quotes
+        return quotes
     
     async def get_ups_rates(self, **kwargs) -> List[RateQuote]:
         """Get rates from UPS API"""
@@ -0,0 +1,222 @@
+import glob
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, NamedTuple
+
+from app.core.config import settings
+
+# Zones 1-8 are the columns of every compiled rate matrix
+ZONES = np.arange(1, 9)
+
+# Number of ZIP5 codes (00000-99999) covered by the DAS lookup table
+ZIP5_DOMAIN = 100000
+
+
+def _default_card(carrier: str, service: str, multiplier: float, transit_days: List[int]) -> Dict[str, Any]:
+    """Rate card following the analyzer's original estimate (5.00 + 0.50/lb + 1.25/zone)"""
+    weights = list(range(1, 151))
+    return {
+        "carrier": carrier,
+        "service": service,
+        "weights": weights,
+        "zones": list(range(2, 9)),
+        "rates": [[round((5.00 + w * 0.50 + z * 1.25) * multiplier, 2) for z in range(2, 9)] for w in weights],
+        "transit_days": transit_days,
+    }
+
+
+# Built-in cards used when no rate card files are configured
+DEFAULT_RATE_CARDS = [
+    _default_card("UPS", "Ground", 1.0, [1, 2, 3, 3, 4, 5, 5]),
+    _default_card("FedEx", "Ground", 1.05, [1, 2, 3, 3, 4, 5, 5]),
+    _default_card("USPS", "Priority", 0.92, [1, 2, 2, 3, 3, 3, 3]),
+    _default_card("DHL", "Ground", 1.15, [2, 3, 3, 4, 4, 5, 5]),
+]
+
+
+class RateCard:
+    """One carrier service's zone x weight rate table plus surcharges.
+
+    A card is defined by a plain dict (JSON file):
+    carrier, service, weights (ascending weight breaks in lbs), zones,
+    rates (one row per weight break, one column per zone) and optionally
+    transit_days (per zone), fuel_surcharge_percent, das_surcharge and das_zips.
+    A shipment is priced at the first weight break at or above its weight.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.carrier = config["carrier"]
+        self.service = config["service"]
+        self.weights = np.asarray(config["weights"], dtype=np.float64)
+        zones = np.asarray(config["zones"], dtype=np.intp)
+        rates = np.asarray(config["rates"], dtype=np.float64)
+        if rates.shape != (len(self.weights), len(zones)):
+            raise ValueError(f"{self.name}: rates must have one row per weight and one column per zone")
+        if np.any(np.diff(self.weights) <= 0):
+            raise ValueError(f"{self.name}: weights must be ascending")
+
+        # Spread onto the shared zone 1-8 axis; zones the card doesn't serve stay NaN
+        self.rates = np.full((len(self.weights), len(ZONES)), np.nan)
+        self.rates[:, zones - 1] = rates
+        self.transit_days = np.full(len(ZONES), np.nan)
+        if "transit_days" in config:
+            self.transit_days[zones - 1] = config["transit_days"]
+
+        self.fuel_surcharge_percent = float(config.get("fuel_surcharge_percent", 0.0))
+        self.das_surcharge = float(config.get("das_surcharge", 0.0))
+        self.das_zips = np.zeros(ZIP5_DOMAIN, dtype=bool)
+        das_zips = [int(z) for z in config.get("das_zips", []) if str(z).isdigit() and int(z) < ZIP5_DOMAIN]
+        self.das_zips[das_zips] = True
+
+    @property
+    def name(self) -> str:
+        return f"{self.carrier} {self.service}"
+
+    @classmethod
+    def from_file(cls, path: str) -> "RateCard":
+        with open(path) as f:
+            return cls(json.load(f))
+
+
+class RateShopResult(NamedTuple):
+    """Per-shipment prices from every loaded card and the cheapest option"""
+    costs: np.ndarray          # rows x cards; NaN where a card can't price the shipment
+    best_card: np.ndarray      # index into RateCardSet.cards; -1 when no card can price the row
+    best_cost: np.ndarray      # cheapest price; NaN when no card can price the row
+    margin: np.ndarray         # current cost minus the cheapest price
+
+
+class RateCardSet:
+    """Loaded rate cards compiled onto a shared weight-break grid.
+
+    Every card's rate matrix is re-indexed onto the union of all weight breaks,
+    so a single search per shipment prices it against all carriers at once.
+    """
+
+    def __init__(self, cards: List[RateCard]):
+        if not cards:
+            raise ValueError("At least one rate card is required")
+        self.cards = cards
+        self.weight_grid = np.unique(np.concatenate([card.weights for card in cards]))
+
+        # cards x weight grid x zones; a grid weight uses each card's first break at or above it
+        self.rates = np.full((len(cards), len(self.weight_grid), len(ZONES)), np.nan)
+        for i, card in enumerate(cards):
+            idx = np.searchsorted(card.weights, self.weight_grid, side="left")
+            covered = idx < len(card.weights)
+            self.rates[i, covered] = card.rates[idx[covered]]
+
+        self.fuel_multipliers = np.array([1 + card.fuel_surcharge_percent / 100 for card in cards])
+        self.das_surcharges = np.array([card.das_surcharge for card in cards])
+        self.das_zips = np.stack([card.das_zips for card in cards])
+        self.transit_days = np.stack([card.transit_days for card in cards])
+
+    @classmethod
+    def from_configs(cls, configs: List[Dict[str, Any]]) -> "RateCardSet":
+        return cls([RateCard(config) for config in configs])
+
+    @classmethod
+    def load(cls, directory: Optional[str] = None) -> "RateCardSet":
+        """Load every *.json card in directory, falling back to the built-in cards"""
+        paths = sorted(glob.glob(os.path.join(directory, "*.json"))) if directory else []
+        if not paths:
+            return cls.from_configs(DEFAULT_RATE_CARDS)
+        return cls([RateCard.from_file(path) for path in paths])
+
+    def select(self, carriers: Optional[List[str]]) -> "RateCardSet":
+        """Cards for the given carriers only (all cards when carriers is empty)
+
+        Raises:
+            ValueError: If a requested carrier has no loaded rate card
+        """
+        if not carriers:
+            return self
+        loaded = {card.carrier.lower() for card in self.cards}
+        unknown = [carrier for carrier in carriers if carrier.lower() not in loaded]
+        if unknown:
+            raise ValueError(f"No rate cards for carrier(s): {', '.join(unknown)}. "
+                             f"Available: {', '.join(sorted({card.carrier for card in self.cards}))}")
+        wanted = {carrier.lower() for carrier in carriers}
+        return RateCardSet([card for card in self.cards if card.carrier.lower() in wanted])
+
+    def price(self, weights: np.ndarray, zones: np.ndarray, dest_zip5: Optional[np.ndarray] = None) -> np.ndarray:
+        """Price every shipment with every card
+
+        Args:
+            weights: Billable weight per shipment
+            zones: Zone 1-8 per shipment (anything else can't be priced)
+            dest_zip5: Destination ZIP5 as integers (-1 when unknown) for DAS surcharges
+
+        Returns:
+            rows x cards array of prices, NaN where a card has no rate
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        zones = np.asarray(zones)
+        idx = np.searchsorted(self.weight_grid, weights, side="left")
+        valid = (weights > 0) & (idx < len(self.weight_grid)) & (zones >= 1) & (zones <= len(ZONES))
+        idx = np.where(valid, idx, 0)
+        zone_idx = np.where(valid, zones, 1).astype(np.intp) - 1
+
+        costs = self.rates[:, idx, zone_idx].T * self.fuel_multipliers
+        if dest_zip5 is not None:
+            dest_zip5 = np.asarray(dest_zip5)
+            known = (dest_zip5 >= 0) & (dest_zip5 < ZIP5_DOMAIN)
+            das = self.das_zips[:, np.where(known, dest_zip5, 0)].T & known[:, None]
+            costs = costs + das * self.das_surcharges
+        costs[~valid] = np.nan
+        return np.round(costs, 2)
+
+    def shop(self, weights: np.ndarray, zones: np.ndarray, current_costs: np.ndarray,
+             dest_zip5: Optional[np.ndarray] = None) -> RateShopResult:
+        """Find the cheapest card per shipment and its margin against the current cost"""
+        costs = self.price(weights, zones, dest_zip5)
+        priced = ~np.isnan(costs).all(axis=1)
+        best_card = np.where(priced, np.argmin(np.where(np.isnan(costs), np.inf, costs), axis=1), -1)
+        best_cost = np.where(priced, costs[np.arange(len(costs)), np.maximum(best_card, 0)], np.nan)
+        margin = np.asarray(current_costs, dtype=np.float64) - best_cost
+        return RateShopResult(costs=costs, best_card=best_card, best_cost=best_cost, margin=margin)
+
+    def labels(self, card_idx: np.ndarray, attribute: str) -> pd.Categorical:
+        """Carrier or service name per row without building a string per row"""
+        categories = pd.unique(pd.Series([getattr(card, attribute) for card in self.cards]))
+        codes = pd.Index(categories).get_indexer([getattr(card, attribute) for card in self.cards])
+        return pd.Categorical.from_codes(np.where(card_idx >= 0, codes[np.maximum(card_idx, 0)], -1),
+                                         categories=categories)
+
+
+def calculate_zones(origin_zip: pd.Series, destination_zip: pd.Series) -> pd.Series:
+    """Calculate shipping zone based on ZIP codes (simplified)"""
+    # This is a simplified zone calculation
+    # In practice, you'd use actual zone mapping tables
+    origin_int = pd.to_numeric(origin_zip.astype(str).str[:3], errors='coerce')
+    dest_int = pd.to_numeric(destination_zip.astype(str).str[:3], errors='coerce')
+
+    distance = np.abs(origin_int - dest_int)
+
+    # Simple zone mapping
+    zones = np.where(distance <= 50, 2,
+            np.where(distance <= 150, 3,
+            np.where(distance <= 300, 4,
+            np.where(distance <= 600, 5,
+            np.where(distance <= 1000, 6, 7)))))
+
+    return pd.Series(zones, index=origin_zip.index)
+
+
+def zip5_codes(zips: pd.Series) -> np.ndarray:
+    """Destination ZIP5 as integers, -1 where not a 5-digit US ZIP"""
+    zip5 = zips.astype(str).str.strip().str[:5].str.zfill(5)
+    return pd.to_numeric(zip5.where(zip5.str.isdigit()), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+
+
+_rate_cards: Optional[RateCardSet] = None
+
+
+def get_rate_cards() -> RateCardSet:
+    """Rate cards from settings.RATE_CARD_DIR, compiled once per process"""
+    global _rate_cards
+    if _rate_cards is None:
+        _rate_cards = RateCardSet.load(settings.RATE_CARD_DIR)
+    return _rate_cards
@@ -1,32 +1,171 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator, Callable, Awaitable, Set, Tuple, Union
 import asyncio
+import io
+import os
+import zipfile
+
+from app.services.analysis_accumulator import AnalysisAccumulator, SURCHARGE_TYPES
+from app.services.rate_cards import RateCardSet, get_rate_cards, calculate_zones, zip5_codes
+
+# Rows read per chunk when analyzing an uploaded file
+CHUNK_SIZE = 50000
+
+# Standardized column names accepted as the ship date, in order of preference
+SHIP_DATE_COLUMNS = ['ship_date', 'shipdate', 'shipment_date', 'date_shipped', 'date']
+
+# Destination countries rated as domestic shipments
+DOMESTIC_COUNTRIES = {'US', 'USA', 'UNITED STATES'}
+
+# Shipment file types read from uploads and from inside .zip uploads
+SHIPMENT_FILE_TYPES = ('.csv', '.xlsx', '.xls')
+
+# Column naming the file (or .zip member) each row was read from
+SOURCE_FILE_COLUMN = 'source_file'
 
 class ShippingAnalyzer:
-    def __init__(self):
-        self.carrier_rates = {
-            "UPS": {"ground": 8.50, "2day": 15.75, "overnight": 35.25},
-            "FedEx": {"ground": 9.25, "2day": 16.50, "overnight": 37.00},
-            "USPS": {"ground": 7.85, "priority": 12.30, "express": 28.95},
-        }
+    def __init__(self, rate_cards: Optional[RateCardSet] = None, carriers: Optional[List[str]] = None,
+                 include_international: bool = False):
+        self.rate_cards = (rate_cards or get_rate_cards()).select(carriers)
+        self.include_international = include_international
     
-    async def analyze_shipments(
-        self, 
-        file_path: str, 
-        carriers_to_analyze: Optional[List[str]] = None,
-        include_international: bool = False
-    ) -> Dict[str, Any]:
-        """Analyze shipment data and calculate savings opportunities"""
+    async def analyze_shipments(self, file_path: str) -> Dict[str, Any]:
+        """Analyze shipment data and calculate savings opportunities
         
-        # Read the uploaded file
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
+        Carriers and international shipments are chosen when the analyzer is created.
+        """
         
-        # Standardize column names
-        df.columns = df.columns.str.lower().str.replace(' ', '_')
+        accumulator, _, _ = await self.accumulate_shipments(file_path)
+        return accumulator.results()
+    
+    async def accumulate_shipments(
+        self,
+        files: Union[str, List[Tuple[str, str]]],
+        existing_ids: Optional[Callable[[List[str]], Awaitable[Set[str]]]] = None,
+        progress: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> Tuple[AnalysisAccumulator, List[str], Dict[str, int]]:
+        """Analyze one or more files chunk by chunk as one dataset, skipping duplicate shipment IDs.
+        
+        files is a path or a list of (file name, path); .zip files are read member by
+        member and every row is tagged with its file name in source_file.
+        existing_ids is called with each chunk's shipment IDs and returns the ones
+        already stored for the analysis. Rows without a shipment ID are always
+        analyzed and never stored. International shipments are left out unless
+        include_international is set. progress is called after each chunk with
+        the number of rows read so far. Returns the accumulator, the new shipment
+        IDs and the number of duplicate rows skipped per source file.
+        """
+        if isinstance(files, str):
+            files = [(os.path.basename(files), files)]
+        accumulator = AnalysisAccumulator()
+        new_ids: List[str] = []
+        seen: Set[str] = set()
+        duplicates: Dict[str, int] = {}
+        rows_read = 0
+        
+        for source, chunk in self._read_sources(files):
+            duplicates.setdefault(source, 0)
+            rows_read += len(chunk)
+            chunk = self._standardize_columns(chunk)
+            if not self.include_international:
+                chunk = chunk[~self._international(chunk)]
+            if 'shipment_id' in chunk.columns:
+                has_id = chunk['shipment_id'].notna()
+                ids = chunk['shipment_id'][has_id].astype(str)
+                duplicate = ids.duplicated() | ids.isin(seen)
+                if existing_ids is not None:
+                    duplicate |= ids.isin(await existing_ids(ids[~duplicate].tolist()))
+                duplicates[source] += int(duplicate.sum())
+                chunk = chunk.drop(index=ids.index[duplicate])
+                seen.update(ids[~duplicate])
+                new_ids.extend(ids[~duplicate])
+            if not chunk.empty:
+                accumulator.update(self._analyze_chunk(chunk.assign(**{SOURCE_FILE_COLUMN: source})))
+            if progress is not None:
+                await progress(rows_read)
+        
+        return accumulator, new_ids, duplicates
+    
+    def _read_sources(self, files: List[Tuple[str, str]]) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Yield (source file name, chunk) for every file, reading .zip uploads member by member"""
+        names: Dict[str, int] = {}
+        
+        def unique(name: str) -> str:
+            # The same file name can appear in several uploads or archives
+            names[name] = names.get(name, 0) + 1
+            return name if names[name] == 1 else f"{name} ({names[name]})"
+        
+        for name, path in files:
+            if not name.lower().endswith('.zip'):
+                source = unique(name)
+                for chunk in self._read_chunks(lambda path=path: path, name):
+                    yield source, chunk
+                continue
+            with zipfile.ZipFile(path) as archive:
+                members = [
+                    member for member in archive.infolist()
+                    if not member.is_dir() and not member.filename.startswith('__MACOSX/')
+                    and not os.path.basename(member.filename).startswith('.')
+                    and member.filename.lower().endswith(SHIPMENT_FILE_TYPES)
+                ]
+                if not members:
+                    raise ValueError(f"{name} contains no CSV or Excel files")
+                for member in members:
+                    member_name = os.path.basename(member.filename)
+                    source = unique(member_name)
+                    if member_name.lower().endswith('.csv'):
+                        open_member = lambda member=member: archive.open(member)
+                    else:
+                        open_member = lambda member=member: io.BytesIO(archive.read(member))
+                    for chunk in self._read_chunks(open_member, member_name):
+                        yield source, chunk
+    
+    def _read_chunks(self, open_file: Callable[[], Any], name: str) -> Iterator[pd.DataFrame]:
+        """Yield a CSV or Excel file in chunks of CHUNK_SIZE rows
+        
+        open_file returns the path or a new file object each time it is called: the
+        header is read first so shipment IDs are read as text in every chunk (chunked
+        type inference would turn a chunk with a blank ID into floats, "1001.0").
+        """
+        read = pd.read_csv if name.lower().endswith('.csv') else pd.read_excel
+        header = read(open_file(), nrows=0).columns
+        text = {column: str for column in header if self._standard_name(column) == 'shipment_id'}
+        if read is pd.read_csv:
+            yield from pd.read_csv(open_file(), chunksize=CHUNK_SIZE, dtype=text)
+        else:
+            df = pd.read_excel(open_file(), dtype=text)
+            for start in range(0, len(df), CHUNK_SIZE):
+                yield df.iloc[start:start + CHUNK_SIZE]
+    
+    @staticmethod
+    def _standard_name(column: Any) -> str:
+        return str(column).lower().replace(' ', '_')
+    
+    def _standardize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Standardize column names"""
+        df.columns = [self._standard_name(column) for column in df.columns]
+        
+        # Use the first recognized date column as ship_date
+        if 'ship_date' not in df.columns:
+            date_column = next((col for col in SHIP_DATE_COLUMNS if col in df.columns), None)
+            if date_column:
+                df = df.rename(columns={date_column: 'ship_date'})
+        return df
+    
+    def _international(self, df: pd.DataFrame) -> pd.Series:
+        """Rows shipped outside the US, by destination country or else a non-numeric destination ZIP"""
+        if 'destination_country' in df.columns:
+            country = df['destination_country'].astype(str).str.strip().str.upper()
+            return df['destination_country'].notna() & ~country.isin(DOMESTIC_COUNTRIES)
+        if 'destination_zip' not in df.columns:
+            return pd.Series(False, index=df.index)
+        zips = df['destination_zip'].astype(str).str.strip()
+        return df['destination_zip'].notna() & ~zips.str.fullmatch(r'\d{3,5}(-\d{4})?(\.0)?')
+    
+    def _analyze_chunk(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Calculate zone, recommended cost and potential savings for a chunk"""
+        df = df.copy()
         
         # Basic data validation
         required_columns = ['origin_zip', 'destination_zip', 'weight', 'actual_cost', 'carrier']
@@ -35,98 +174,31 @@ class ShippingAnalyzer:
         if missing_columns:
             raise ValueError(f"Missing required columns: {missing_columns}")
         
-        # Calculate analysis metrics
-        total_shipments = len(df)
-        total_cost = df['actual_cost'].sum()
-        
-        # Calculate potential savings (simplified logic)
-        df['zone'] = self._calculate_zone(df['origin_zip'], df['destination_zip'])
-        df['recommended_cost'] = df.apply(self._calculate_recommended_cost, axis=1)
-        df['potential_savings'] = df['actual_cost'] - df['recommended_cost']
-        df['potential_savings'] = df['potential_savings'].clip(lower=0)
-        
-        potential_savings = df['potential_savings'].sum()
-        avg_savings_per_shipment = potential_savings / total_shipments if total_shipments > 0 else 0
-        
-        # Generate carrier breakdown
-        carrier_breakdown = []
-        for carrier in df['carrier'].unique():
-            carrier_data = df[df['carrier'] == carrier]
-            carrier_breakdown.append({
-                "carrier": carrier,
-                "shipments": len(carrier_data),
-                "cost": float(carrier_data['actual_cost'].sum()),
-                "savings": float(carrier_data['potential_savings'].sum())
-            })
-        
-        # Generate zone analysis
-        zone_analysis = []
-        for zone in df['zone'].unique():
-            zone_data = df[df['zone'] == zone]
-            zone_analysis.append({
-                "zone": f"Zone {zone}",
-                "shipments": len(zone_data),
-                "avgCost": float(zone_data['actual_cost'].mean()),
-                "savings": float(zone_data['potential_savings'].sum())
-            })
-        
-        # Generate top savings opportunities
-        top_savings = df.nlargest(10, 'potential_savings').to_dict('records')
-        top_savings_opportunities = []
-        for record in top_savings:
-            top_savings_opportunities.append({
-                "carrier": record['carrier'],
-                "service": "Ground",  # Simplified
-                "currentCost": float(record['actual_cost']),
-                "recommendedCost": float(record['recommended_cost']),
-                "savings": float(record['potential_savings'])
-            })
-        
-        return {
-            "total_shipments": total_shipments,
-            "total_cost": float(total_cost),
-            "potential_savings": float(potential_savings),
-            "avg_savings_per_shipment": float(avg_savings_per_shipment),
-            "carrier_breakdown": carrier_breakdown,
-            "zone_analysis": zone_analysis,
-            "top_savings": top_savings_opportunities[:5]
-        }
-    
-    def _calculate_zone(self, origin_zip: pd.Series, destination_zip: pd.Series) -> pd.Series:
-        """Calculate shipping zone based on ZIP codes (simplified)"""
-        # This is a simplified zone calculation
-        # In practice, you'd use actual zone mapping tables
-        origin_int = pd.to_numeric(origin_zip.astype(str).str[:3], errors='coerce')
-        dest_int = pd.to_numeric(destination_zip.astype(str).str[:3], errors='coerce')
-        
-        distance = np.abs(origin_int - dest_int)
-        
-        # Simple zone mapping
-        zones = np.where(distance <= 50, 2,
-                np.where(distance <= 150, 3,
-                np.where(distance <= 300, 4,
-                np.where(distance <= 600, 5,
-                np.where(distance <= 1000, 6, 7)))))
-        
-        return pd.Series(zones)
-    
-    def _calculate_recommended_cost(self, row: pd.Series) -> float:
-        """Calculate recommended shipping cost based on optimized carrier selection"""
-        weight = row.get('weight', 1)
-        zone = row.get('zone', 3)
-        
-        # Base rate calculation (simplified)
-        base_rate = 5.00 + (weight * 0.50) + (zone * 1.25)
-        
-        # Apply carrier-specific adjustments
-        carrier_multipliers = {
-            "UPS": 1.0,
-            "FedEx": 1.05,
-            "USPS": 0.92,
-            "DHL": 1.15
-        }
-        
-        carrier = row.get('carrier', 'UPS')
-        multiplier = carrier_multipliers.get(carrier, 1.0)
-        
-        return base_rate * multiplier
\ No newline at end of file
+        # Shop every shipment against all loaded rate cards at once
+        df['zone'] = calculate_zones(df['origin_zip'], df['destination_zip'])
+        actual_cost = pd.to_numeric(df['actual_cost'], errors='coerce')
+        shop = self.rate_cards.shop(
+            pd.to_numeric(df['weight'], errors='coerce').to_numpy(),
+            df['zone'].to_numpy(),
+            actual_cost.to_numpy(),
+            zip5_codes(df['destination_zip'])
+        )
+        df['recommended_carrier'] = self.rate_cards.labels(shop.best_card, 'carrier')
+        df['recommended_service'] = self.rate_cards.labels(shop.best_card, 'service')
+        # Shipments no card can price keep their current cost
+        df['recommended_cost'] = np.where(np.isnan(shop.best_cost), actual_cost, shop.best_cost)
+        df['potential_savings'] = np.nan_to_num(np.clip(shop.margin, 0, None))
+        
+        # Parse ship dates for the daily/monthly rollups; unreadable dates are left out of trends
+        if 'ship_date' in df.columns:
+            df['ship_date'] = pd.to_datetime(df['ship_date'], errors='coerce', format='mixed')
+        # Per-type surcharges (das_surcharge, ...) make up the total when no surcharges column is given
+        typed = [f'{kind}_surcharge' for kind in SURCHARGE_TYPES if f'{kind}_surcharge' in df.columns]
+        for column in typed:
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0.0)
+        if 'surcharges' in df.columns:
+            df['surcharges'] = pd.to_numeric(df['surcharges'], errors='coerce').fillna(0.0)
+        elif typed:
+            df['surcharges'] = df[typed].sum(axis=1)
+        
+        return df
@@ -0,0 +1,77 @@
+import json
+
+import pandas as pd
+import pytest
+
+from app.services.analysis_accumulator import AnalysisAccumulator
+
+
+@pytest.fixture
+def analyzed():
+    return pd.DataFrame({
+        "carrier": ["UPS", "UPS", "FedEx", "USPS", "FedEx", "UPS"],
+        "zone": [2, 5, 5, 8, 2, 3],
+        "actual_cost": [12.0, 18.5, 20.0, 31.0, 9.5, 14.0],
+        "recommended_cost": [10.0, 18.5, 16.0, 25.0, 9.0, 13.0],
+        "potential_savings": [2.0, 0.0, 4.0, 6.0, 0.5, 1.0],
+        "recommended_service": ["Ground", "Ground", "Priority", "Priority", "Ground", "Ground"],
+    })
+
+
+def test_merged_chunks_match_single_pass(analyzed):
+    """Test merging per-chunk accumulators gives the same totals as one pass."""
+    single = AnalysisAccumulator(top_n=3).update(analyzed)
+    merged = AnalysisAccumulator.merge_all(
+        [AnalysisAccumulator(top_n=3).update(analyzed.iloc[:2]), AnalysisAccumulator(top_n=3).update(analyzed.iloc[2:])],
+        top_n=3
+    )
+
+    assert merged.total_shipments == single.total_shipments == 6
+    assert merged.total_cost == pytest.approx(single.total_cost)
+    assert merged.carriers == single.carriers
+    assert merged.zones == single.zones
+    assert [r["savings"] for r in merged.top_savings] == [6.0, 4.0, 2.0]
+    assert merged.top_carrier == "UPS"
+
+
+def test_state_round_trips_through_json(analyzed):
+    """Test a stored summary restores to an accumulator that keeps merging correctly."""
+    first = AnalysisAccumulator().update(analyzed.iloc[:3])
+    restored = AnalysisAccumulator.from_dict(json.loads(json.dumps(first.to_dict())))
+    restored.merge(AnalysisAccumulator().update(analyzed.iloc[3:]))
+
+    expected = AnalysisAccumulator().update(analyzed)
+    assert restored.results()["carrier_breakdown"] == expected.results()["carrier_breakdown"]
+    assert restored.potential_savings == pytest.approx(expected.potential_savings)
+
+    legacy = AnalysisAccumulator.from_dict({"total_shipments": 4, "total_cost": 40.0, "potential_savings": 2.0})
+    assert legacy.avg_savings_per_shipment == 0.5
+    assert legacy.top_carrier == ""
+
+
+def test_trends_bucket_by_ship_date(analyzed):
+    """Test daily and monthly rollups, the surcharge mix and that undated rows are left out."""
+    dated = analyzed.assign(
+        ship_date=pd.to_datetime(["2025-01-30 08:00:00", "2025-01-30 17:45:00", "2025-01-31 00:00:00",
+                                 "2025-02-01 00:00:00", None, "2025-02-14 00:00:00"]),
+        surcharges=[1.0, 0.0, 2.5, 4.0, 3.0, 0.0],
+        das_surcharge=[1.0, 0.0, 2.5, 0.0, 3.0, 0.0],
+        remote_surcharge=[0.0, 0.0, 0.0, 4.0, 0.0, 0.0],
+    )
+    accumulator = AnalysisAccumulator().update(dated.iloc[:3]).merge(AnalysisAccumulator().update(dated.iloc[3:]))
+
+    daily = accumulator.trends("daily")
+    assert [t["period"] for t in daily] == ["2025-01-30", "2025-01-31", "2025-02-01", "2025-02-14"]
+    assert daily[0]["shipments"] == 2
+    assert daily[0]["cost"] == pytest.approx(30.5)
+
+    monthly = accumulator.trends("monthly")
+    assert [(t["period"], t["shipments"]) for t in monthly] == [("2025-01", 3), ("2025-02", 2)]
+    assert monthly[0]["surcharges"] == pytest.approx(3.5)
+    assert monthly[1]["surchargeMix"] == {"das": 0.0, "edas": 0.0, "remote": 4.0}
+
+    # Summaries stored before the surcharge mix keep merging
+    legacy = {"2025-02": {"shipments": 1.0, "cost": 10.0, "savings": 1.0, "surcharges": 2.0}}
+    restored = AnalysisAccumulator.from_dict({"monthly": legacy}).merge(accumulator)
+    assert restored.trends("monthly")[1]["shipments"] == 3
+    assert restored.trends("monthly")[1]["surchargeMix"]["remote"] == 4.0
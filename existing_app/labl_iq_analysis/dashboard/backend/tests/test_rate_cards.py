@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from app.services.rate_cards import DEFAULT_RATE_CARDS, RateCardSet
+
+
+@pytest.fixture
+def cards():
+    return RateCardSet.from_configs(DEFAULT_RATE_CARDS)
+
+
+def test_select_keeps_requested_carriers(cards):
+    """Test selecting carriers ignores case and keeps their cards in load order."""
+    selected = cards.select(["fedex", "UPS"])
+
+    assert [card.name for card in selected.cards] == ["UPS Ground", "FedEx Ground"]
+    assert cards.select(None) is cards
+    assert cards.select([]) is cards
+    np.testing.assert_array_equal(selected.price([2.0], [3])[0], cards.price([2.0], [3])[0][:2])
+
+
+def test_select_rejects_unknown_carriers(cards):
+    """Test unknown carriers raise instead of falling back to every card."""
+    with pytest.raises(ValueError, match="OnTrac"):
+        cards.select(["OnTrac"])
+    with pytest.raises(ValueError, match="Purolator"):
+        cards.select(["UPS", "Purolator"])
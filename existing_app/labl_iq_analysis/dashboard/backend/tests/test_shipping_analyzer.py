@@ -0,0 +1,132 @@
+import asyncio
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import shipping_analyzer
+from app.services.rate_cards import DEFAULT_RATE_CARDS, RateCardSet
+from app.services.shipping_analyzer import ShippingAnalyzer
+
+
+@pytest.fixture
+def shipment_file(tmp_path):
+    path = tmp_path / "shipments.csv"
+    pd.DataFrame({
+        "Shipment ID": ["A1", "A2", None, "A1", "A3", None, "A2"],
+        "Origin Zip": ["46307"] * 7,
+        "Destination Zip": ["10001", "60601", "90210", "10001", "02134", "30301", "60601"],
+        "Weight": [2, 5, 1, 2, 10, 3, 5],
+        "Actual Cost": [12.0, 15.0, 9.0, 12.0, 25.0, 11.0, 15.0],
+        "Carrier": ["UPS"] * 7,
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def analyzer():
+    return ShippingAnalyzer(rate_cards=RateCardSet.from_configs(DEFAULT_RATE_CARDS))
+
+
+def test_duplicate_ids_skipped_across_chunks(analyzer, shipment_file, monkeypatch):
+    """Test repeated IDs are skipped across chunks while rows without an ID are kept but not stored."""
+    monkeypatch.setattr(shipping_analyzer, "CHUNK_SIZE", 2)
+    accumulator, new_ids, duplicates = asyncio.run(analyzer.accumulate_shipments(shipment_file))
+
+    assert new_ids == ["A1", "A2", "A3"]
+    assert duplicates == {"shipments.csv": 2}
+    assert accumulator.total_shipments == 5
+
+
+def test_append_skips_stored_ids(analyzer, shipment_file):
+    """Test IDs already stored for the analysis are skipped on append."""
+    async def existing_ids(ids):
+        return {"A1", "A3"} & set(ids)
+
+    accumulator, new_ids, duplicates = asyncio.run(
+        analyzer.accumulate_shipments(shipment_file, existing_ids=existing_ids)
+    )
+
+    assert new_ids == ["A2"]
+    assert duplicates == {"shipments.csv": 4}
+    assert accumulator.total_shipments == 3
+
+
+def test_international_shipments_left_out(shipment_file, tmp_path):
+    """Test international destinations are only analyzed when requested."""
+    path = tmp_path / "international.csv"
+    pd.read_csv(shipment_file).assign(**{"Destination Zip": ["10001", "E3G7P6", "90210", "10001", "M5V 2T6",
+                                                              "30301", "60601"]}).to_csv(path, index=False)
+    cards = RateCardSet.from_configs(DEFAULT_RATE_CARDS)
+
+    domestic, _, _ = asyncio.run(ShippingAnalyzer(rate_cards=cards).accumulate_shipments(str(path)))
+    everything, _, _ = asyncio.run(
+        ShippingAnalyzer(rate_cards=cards, include_international=True).accumulate_shipments(str(path))
+    )
+
+    assert domestic.total_shipments == 4
+    assert everything.total_shipments == 5
+
+
+def test_files_and_zip_members_analyzed_as_one_dataset(shipment_file, tmp_path, analyzer):
+    """Test several uploads and .zip members are read as one dataset tagged by source file."""
+    frame = pd.read_csv(shipment_file)
+    archive = tmp_path / "upload.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("march/shipments.csv", frame.iloc[3:].to_csv(index=False))
+        zf.writestr("__MACOSX/march/._shipments.csv", "junk")
+        zf.writestr("notes.txt", "not shipments")
+    files = [("shipments.csv", shipment_file), ("upload.zip", str(archive))]
+
+    accumulator, new_ids, duplicates = asyncio.run(analyzer.accumulate_shipments(files))
+
+    assert duplicates == {"shipments.csv": 2, "shipments.csv (2)": 3}
+    assert new_ids == ["A1", "A2", "A3"]
+    assert {source: int(totals["shipments"]) for source, totals in accumulator.sources.items()} == {
+        "shipments.csv": 5, "shipments.csv (2)": 1
+    }
+    assert accumulator.total_shipments == 6
+
+    empty = tmp_path / "empty.zip"
+    with zipfile.ZipFile(empty, "w") as zf:
+        zf.writestr("notes.txt", "not shipments")
+    with pytest.raises(ValueError, match="no CSV or Excel"):
+        asyncio.run(analyzer.accumulate_shipments([("empty.zip", str(empty))]))
+
+
+def test_top_savings_name_the_recommended_carrier(analyzer, shipment_file):
+    """Test opportunities pair the recommended card's carrier with its service and cost."""
+    accumulator, _, _ = asyncio.run(analyzer.accumulate_shipments(shipment_file))
+    best = accumulator.top_savings[0]
+
+    # USPS Priority is the cheapest built-in card for every shipment
+    assert (best["carrier"], best["recommendedCarrier"], best["service"]) == ("UPS", "USPS", "Priority")
+    # The 10 lb shipment saves the most; its recommended cost is a USPS card price
+    usps = [card.carrier for card in analyzer.rate_cards.cards].index("USPS")
+    assert best["recommendedCost"] in analyzer.rate_cards.price([10.0] * 7, np.arange(2, 9))[:, usps]
+    assert best["savings"] == pytest.approx(best["currentCost"] - best["recommendedCost"])
+
+
+def test_ids_read_as_text_in_every_chunk(analyzer, tmp_path, monkeypatch):
+    """Test numeric IDs match across chunks when a chunk with a blank ID would parse as float."""
+    monkeypatch.setattr(shipping_analyzer, "CHUNK_SIZE", 2)
+    path = tmp_path / "numeric_ids.csv"
+    path.write_text(
+        "Shipment ID,Origin Zip,Destination Zip,Weight,Actual Cost,Carrier\n"
+        "1001,46307,10001,2,12.0,UPS\n"
+        "1002,46307,60601,5,15.0,UPS\n"
+        "1001,46307,10001,2,12.0,UPS\n"
+        ",46307,90210,1,9.0,UPS\n"
+    )
+
+    async def existing_ids(ids):
+        return {"1002"} & set(ids)
+
+    _, new_ids, duplicates = asyncio.run(analyzer.accumulate_shipments(str(path)))
+    assert new_ids == ["1001", "1002"]
+    assert duplicates == {"numeric_ids.csv": 1}
+
+    _, new_ids, duplicates = asyncio.run(analyzer.accumulate_shipments(str(path), existing_ids=existing_ids))
+    assert new_ids == ["1001"]
+    assert duplicates == {"numeric_ids.csv": 2}
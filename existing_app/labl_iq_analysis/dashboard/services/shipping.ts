@@ -33,6 +33,7 @@ interface AnalysisResult {
   avgSavingsPerShipment: number;
   topSavingsOpportunities: {
     carrier: string;
+    recommendedCarrier: string;
     service: string;
     currentCost: number;
     recommendedCost: number;
@@ -50,6 +51,12 @@ interface AnalysisResult {
     avgCost: number;
     savings: number;
   }[];
+  sourceBreakdown: {
+    sourceFile: string;
+    shipments: number;
+    cost: number;
+    savings: number;
+  }[];
   createdAt: string;
   status: 'processing' | 'completed' | 'failed';
 }
@@ -68,6 +75,15 @@ interface DashboardMetrics {
   }[];
 }
 
+interface TrendPoint {
+  period: string;
+  shipments: number;
+  cost: number;
+  savings: number;
+  surcharges: number;
+  surchargeMix: Record<string, number>;
+}
+
 interface RateQuote {
   carrier: string;
   service: string;
@@ -127,6 +143,17 @@ class ShippingService {
     throw new Error(response.message || 'Failed to get dashboard metrics');
   }
 
+  async getTrends(granularity: 'daily' | 'monthly' = 'monthly', analysisId?: string): Promise<TrendPoint[]> {
+    const query = analysisId ? `&analysisId=${analysisId}` : '';
+    const response = await apiClient.get<TrendPoint[]>(`/shipping/trends?granularity=${granularity}${query}`);
+    
+    if (response.success) {
+      return response.data;
+    }
+    
+    throw new Error(response.message || 'Failed to get trends');
+  }
+
   async getRateQuotes(shipment: {
     origin: string;
     destination: string;
@@ -172,5 +199,6 @@ export type {
   ShipmentData, 
   AnalysisResult, 
   DashboardMetrics, 
+  TrendPoint, 
   RateQuote 
 };
\ No newline at end of file
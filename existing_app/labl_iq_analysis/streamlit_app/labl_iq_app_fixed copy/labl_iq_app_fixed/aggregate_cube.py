@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Aggregate Cube Module
+
+This module aggregates rated shipments once into a small cube of counts and
+sums, from which the result tabs and exports derive their tables and charts
+instead of re-grouping the full frame on every rerun.
+It provides functionality for:
+1. Classifying shipments by surcharge class (none, DAS, EDAS, Remote, unrated)
+2. Building the zone x weight bracket x service level x surcharge class
+   x source file cube in a single grouped aggregation
+3. Slicing the cube, or masking the rated rows, to the clean (no EDAS/Remote) shipments
+4. Deriving summary metrics, per-dimension savings and rates, rate components,
+   zone and source file metrics and surcharge summaries from the cube
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from summary_accumulator import WEIGHT_BRACKET_LABELS, weight_brackets
+
+logger = logging.getLogger('labl_iq.aggregate_cube')
+
+CUBE_DIMENSIONS = ['zone', 'weight_bracket', 'service_level', 'surcharge_class', 'source_file']
+
+# Surcharge classes; a shipment takes the first of Remote, EDAS, DAS it carries
+SURCHARGE_CLASSES = ['none', 'das', 'edas', 'remote', 'unrated']
+# Shipments without EDAS or Remote surcharges (the filtered analysis)
+CLEAN_SURCHARGE_CLASSES = ['none', 'das']
+
+# Surcharge columns by display name, in display order
+SURCHARGE_COLUMNS = {
+    'DAS': 'das_surcharge',
+    'EDAS': 'edas_surcharge',
+    'Remote': 'remote_surcharge',
+    'Fuel': 'fuel_surcharge',
+}
+
+# Columns summed (NaN skipped) and counted (non-NaN) per cube cell
+VALUE_COLUMNS = ['final_rate', 'carrier_rate', 'base_rate', 'savings', 'savings_percent'] + list(SURCHARGE_COLUMNS.values())
+
+
+def _values(results: pd.DataFrame, column: str) -> np.ndarray:
+    """Numeric values of a column, NaN when the column is missing."""
+    if column not in results.columns:
+        return np.full(len(results), np.nan)
+    return pd.to_numeric(results[column], errors='coerce').to_numpy(dtype=np.float64)
+
+
+def surcharge_classes(results: pd.DataFrame) -> pd.Categorical:
+    """
+    Classify shipments by the costliest area surcharge they carry.
+
+    Shipments whose EDAS or Remote surcharge is unknown (failed rows) are
+    'unrated', so the clean classes match the rows with zero EDAS and Remote.
+
+    Args:
+        results: Rated shipments
+
+    Returns:
+        pd.Categorical: One of SURCHARGE_CLASSES per row
+    """
+    das = _values(results, 'das_surcharge')
+    edas = _values(results, 'edas_surcharge')
+    remote = _values(results, 'remote_surcharge')
+    codes = np.select(
+        [np.nan_to_num(remote) != 0, np.nan_to_num(edas) != 0, np.isnan(edas) | np.isnan(remote), das > 0],
+        [3, 2, 4, 1],
+        default=0
+    )
+    return pd.Categorical.from_codes(codes, categories=SURCHARGE_CLASSES)
+
+
+def clean_mask(results: pd.DataFrame) -> np.ndarray:
+    """
+    Boolean mask of the shipments without EDAS or Remote surcharges.
+
+    Storing the mask instead of a filtered copy keeps one rated frame per
+    session; index the frame with it when the clean rows are needed.
+
+    Args:
+        results: Rated shipments
+
+    Returns:
+        np.ndarray: True for the clean rows
+    """
+    return np.asarray(surcharge_classes(results).isin(CLEAN_SURCHARGE_CLASSES))
+
+
+def build_aggregate_cube(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate rated shipments into the analysis cube.
+
+    Each cell holds the shipment count, the sum and non-NaN count of every
+    VALUE_COLUMNS column and, per surcharge, how many shipments it applied to.
+
+    Args:
+        results: Rated shipments
+
+    Returns:
+        pd.DataFrame: CUBE_DIMENSIONS columns followed by the measures, one row per non-empty cell
+    """
+    weights = results['billable_weight'] if 'billable_weight' in results.columns else results['weight']
+    frame = pd.DataFrame({
+        'zone': results['zone'] if 'zone' in results.columns else np.nan,
+        'weight_bracket': weight_brackets(pd.to_numeric(weights, errors='coerce')),
+        'service_level': results['service_level'] if 'service_level' in results.columns else 'standard',
+        'surcharge_class': surcharge_classes(results),
+        'source_file': results['source_file'] if 'source_file' in results.columns else np.nan,
+        'shipments': np.ones(len(results), dtype=np.int64),
+    }, index=results.index)
+    for column in VALUE_COLUMNS:
+        values = _values(results, column)
+        known = ~np.isnan(values)
+        frame[f'{column}_sum'] = np.where(known, values, 0.0)
+        frame[f'{column}_count'] = known.astype(np.int64)
+    for column in SURCHARGE_COLUMNS.values():
+        frame[f'{column}_applied'] = (_values(results, column) > 0).astype(np.int64)
+
+    cube = frame.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False).sum().reset_index()
+    logger.info(f"Aggregated {len(results)} shipments into {len(cube)} cube cells")
+    return cube
+
+
+def clean_slice(cube: pd.DataFrame) -> pd.DataFrame:
+    """Cube cells of the shipments without EDAS or Remote surcharges."""
+    return cube[cube['surcharge_class'].isin(CLEAN_SURCHARGE_CLASSES)]
+
+
+def rollup(cube: pd.DataFrame, dimension: str) -> pd.DataFrame:
+    """
+    Sum the cube measures over every dimension but one.
+
+    Args:
+        cube: Output of build_aggregate_cube (or a slice of it)
+        dimension: One of CUBE_DIMENSIONS
+
+    Returns:
+        pd.DataFrame: Measures indexed by the dimension's values (missing values dropped)
+    """
+    measures = cube.drop(columns=[d for d in CUBE_DIMENSIONS if d != dimension])
+    return measures.groupby(dimension, observed=True).sum()
+
+
+def _totals(cube: pd.DataFrame) -> pd.Series:
+    """Measures summed over the whole cube."""
+    return cube.drop(columns=CUBE_DIMENSIONS).sum()
+
+
+def _mean(measures: Any, column: str, fill_missing: bool = False) -> Any:
+    """Mean of a column from sums and counts; fill_missing counts NaN rows as 0."""
+    sums = measures[f'{column}_sum']
+    counts = measures['shipments'] if fill_missing else measures[f'{column}_count']
+    if np.ndim(counts) == 0:
+        return sums / counts if counts else np.nan
+    return sums / counts.where(counts > 0)
+
+
+def summary_metrics(cube: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Headline metrics of the shipments in a cube.
+
+    Returns:
+        Dict with total_shipments, total_savings and avg_savings_percent (0 when unknown)
+    """
+    totals = _totals(cube)
+    avg_savings_percent = _mean(totals, 'savings_percent')
+    return {
+        'total_shipments': int(totals['shipments']),
+        'total_savings': float(totals['savings_sum']),
+        'avg_savings_percent': 0.0 if pd.isna(avg_savings_percent) else float(avg_savings_percent),
+    }
+
+
+def shipments_by(cube: pd.DataFrame, dimension: str) -> pd.Series:
+    """Shipment count per value of a dimension."""
+    counts = rollup(cube, dimension)['shipments']
+    if dimension == 'weight_bracket':
+        counts = counts.reindex(WEIGHT_BRACKET_LABELS, fill_value=0)
+    return counts
+
+
+def savings_percent_by(cube: pd.DataFrame, dimension: str) -> pd.Series:
+    """Average savings % per value of a dimension, counting unknown savings as 0."""
+    means = _mean(rollup(cube, dimension), 'savings_percent', fill_missing=True)
+    if dimension == 'weight_bracket':
+        means = means.reindex(WEIGHT_BRACKET_LABELS)
+    return means.rename('savings_percent')
+
+
+def rates_by(cube: pd.DataFrame, dimension: str) -> pd.DataFrame:
+    """Average Labl IQ and carrier rate per value of a dimension."""
+    rolled = rollup(cube, dimension)
+    rates = pd.DataFrame({
+        'Labl IQ Rate': _mean(rolled, 'final_rate'),
+        'Carrier Rate': _mean(rolled, 'carrier_rate'),
+    })
+    if dimension == 'weight_bracket':
+        rates = rates.reindex(WEIGHT_BRACKET_LABELS)
+    return rates
+
+
+def rate_components(cube: pd.DataFrame) -> pd.DataFrame:
+    """Average base rate and surcharges, one row per component."""
+    totals = _totals(cube)
+    return pd.DataFrame({
+        'Base Rate': _mean(totals, 'base_rate'),
+        'Fuel Surcharge': _mean(totals, 'fuel_surcharge'),
+        'DAS': _mean(totals, 'das_surcharge'),
+        'EDAS': _mean(totals, 'edas_surcharge'),
+        'Remote': _mean(totals, 'remote_surcharge'),
+    }, index=[0]).T
+
+
+def dimension_metrics(cube: pd.DataFrame, dimension: str) -> pd.DataFrame:
+    """
+    Shipments, rates and savings per value of a dimension.
+
+    Returns:
+        pd.DataFrame: Shipments, Avg Labl IQ Rate, Avg Carrier Rate, Total Savings
+        and Avg Savings % per value, rounded to cents
+    """
+    rolled = rollup(cube, dimension)
+    return pd.DataFrame({
+        'Shipments': rolled['shipments'],
+        'Avg Labl IQ Rate': _mean(rolled, 'final_rate'),
+        'Avg Carrier Rate': _mean(rolled, 'carrier_rate'),
+        'Total Savings': rolled['savings_sum'],
+        'Avg Savings %': _mean(rolled, 'savings_percent', fill_missing=True),
+    }).round(2)
+
+
+def zone_metrics(cube: pd.DataFrame) -> pd.DataFrame:
+    """Zone Analysis table (see dimension_metrics)."""
+    return dimension_metrics(cube, 'zone')
+
+
+def source_file_metrics(cube: pd.DataFrame) -> pd.DataFrame:
+    """Per-file table for multi-file uploads, in upload order (see dimension_metrics)."""
+    return dimension_metrics(cube, 'source_file')
+
+
+def zone_export(cube: pd.DataFrame) -> pd.DataFrame:
+    """
+    Zone analysis export with counts, means and sums per zone.
+
+    Returns:
+        pd.DataFrame: (column, statistic) columns per zone, rounded to cents
+    """
+    zones = rollup(cube, 'zone')
+    columns: List[tuple] = [('shipment_id', 'count')]
+    data = [zones['shipments']]
+    for column in ['final_rate', 'carrier_rate', 'savings']:
+        columns += [(column, 'mean'), (column, 'sum')]
+        data += [_mean(zones, column, fill_missing=column == 'savings'), zones[f'{column}_sum']]
+    columns.append(('savings_percent', 'mean'))
+    data.append(_mean(zones, 'savings_percent', fill_missing=True))
+    export = pd.concat(data, axis=1)
+    export.columns = pd.MultiIndex.from_tuples(columns)
+    return export.round(2)
+
+
+def surcharge_summary(cube: pd.DataFrame, surcharges: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Surcharge frequency and amounts.
+
+    Args:
+        cube: Output of build_aggregate_cube
+        surcharges: Display names from SURCHARGE_COLUMNS (all by default)
+
+    Returns:
+        pd.DataFrame: Frequency (% of shipments), Total Amount and Average Amount per surcharge
+    """
+    totals = _totals(cube)
+    shipments = totals['shipments']
+    rows = {}
+    for name in surcharges or SURCHARGE_COLUMNS:
+        column = SURCHARGE_COLUMNS[name]
+        rows[name] = {
+            'Frequency': totals[f'{column}_applied'] / shipments * 100 if shipments else 0.0,
+            'Total Amount': totals[f'{column}_sum'],
+            'Average Amount': _mean(totals, column),
+        }
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['Frequency', 'Total Amount', 'Average Amount'])
@@ -6,8 +6,47 @@ import json
 import os
 import logging
 from calc_engine import AmazonRateCalculator
+from batch_engine import build_shipment_frame, summarize_by_origin, summarize_errors
+from summary_accumulator import RateSummaryAccumulator
+from sample_preview import PREVIEW_THRESHOLD, preview_rates
+from markup_optimizer import TARGET_MARGIN_PER_PACKAGE, TARGET_SAVINGS_PERCENT, solution_criteria
+from recommendation_rules import add_recommendations, default_rules, with_recommendation_reasons
+from aggregate_cube import (
+    SURCHARGE_COLUMNS,
+    build_aggregate_cube,
+    clean_mask,
+    clean_slice,
+    rate_components,
+    rates_by,
+    savings_percent_by,
+    shipments_by,
+    source_file_metrics,
+    summary_metrics,
+    surcharge_summary,
+    zone_export,
+    zone_metrics,
+)
+from breakdown_view import (
+    PAGE_SIZES,
+    BreakdownFilters,
+    breakdown_page,
+    filter_mask,
+    format_breakdown,
+    page_count,
+    sort_positions,
+)
+from chart_specs import cached_chart_spec
+from export_cache import EXPORT_FORMATS, ExportCache, dataset_key, write_export
+from upload_reader import expand_uploads, read_mapped_sources, sniff_upload
+from backend_client import BackendClient, BackendError, backend_upload, result_tables
+from published_rates import (
+    PACKAGE_TYPES,
+    SERVICE_LEVELS,
+    published_rate_card,
+    rate_card_table,
+    rate_card_workbook,
+)
 import base64
-import matplotlib.pyplot as plt
 
 # Set page config
 st.set_page_config(
@@ -996,6 +1035,51 @@ OPTIONAL_FIELDS = [
     'package_type'
 ]
 
+# Origin ZIP mapping choice that keeps the single client origin ZIP
+CLIENT_ORIGIN_OPTION = "(Use client origin ZIP)"
+
+# Job backend that can rate uploads instead of this process (disabled when unset)
+BACKEND_URL = os.environ.get('LABL_IQ_BACKEND_URL', '')
+
+# Weight units converted to pounds by dividing
+WEIGHT_UNIT_DIVISORS = {"Ounces (oz)": 16.0, "Grams (g)": 453.592}
+
+# Shown while uploads are rated on the job backend, whose settings inputs are disabled
+BACKEND_IGNORED_SETTINGS_NOTE = (
+    "Rating on the job backend: shipments are priced against the backend's carrier rate cards. "
+    "Only the origin ZIP and weight unit are used; markup, service level and package defaults, "
+    "fuel, dimensional divisor, surcharge and recommendation settings don't apply and are disabled."
+)
+
+# Session keys holding one upload and its results, cleared on Start Over
+UPLOAD_SESSION_KEYS = [
+    'uploaded_df', 'uploaded_sources', 'mapped_df', 'processed_data', 'mapping', 'save_mapping_checkbox',
+    'clean_mask', 'rate_table', 'rate_table_config', 'rate_card', 'markup_solution', 'aggregate_cube',
+    'breakdown_positions', 'export_cache', 'dataset_key', 'backend_upload_id', 'backend_result',
+]
+
+# Summary columns for display and export
+SUMMARY_COLUMNS = [
+    'shipment_id',
+    'destination_zip',
+    'weight',
+    'dim_weight',
+    'billable_weight',
+    'zone',
+    'service_level',
+    'base_rate',
+    'fuel_surcharge',
+    'das_surcharge',
+    'edas_surcharge',
+    'remote_surcharge',
+    'total_surcharges',
+    'markup_amount',
+    'final_rate',
+    'carrier_rate',
+    'savings',
+    'savings_percent'
+]
+
 def load_saved_mapping():
     """Load saved column mapping from a JSON file."""
     mapping_file = Path("column_mapping.json")
@@ -1023,6 +1107,7 @@ def suggest_column_mapping(df):
     
     # Mapping rules
     mapping_rules = {
+        'origin_zip': ['origin', 'ship from', 'warehouse'],
         'destination_zip': ['zip', 'postal', 'destination'],
         'weight': ['weight', 'mass', 'lbs', 'pounds'],
         'length': ['length', 'long'],
@@ -1036,6 +1121,8 @@ def suggest_column_mapping(df):
     
     for field, keywords in mapping_rules.items():
         for col in headers:
+            if field == 'destination_zip' and any(keyword in col for keyword in mapping_rules['origin_zip']):
+                continue
             if any(keyword in col for keyword in keywords):
                 # Get the first matching column using integer indexing
                 matching_cols = df.columns[headers == col]
@@ -1098,803 +1185,1372 @@ def ensure_string_columns(dataframe):
                 dataframe[col] = dataframe[col].astype(str)
     return dataframe
 
-def generate_rate_table(df, markup_pct=10.0, min_margin=0.5):
-    """
-    Generate a rate table with markup and minimum margin logic.
-    Args:
-        df: DataFrame with processed shipment data
-        markup_pct: Markup percentage to apply
-        min_margin: Minimum dollar margin per cell
-    Returns:
-        DataFrame: Rate table with zones as columns and weight tiers as rows
-    """
-    try:
-        if df is None or len(df) == 0:
-            raise ValueError("No data available for rate table generation.")
-        
-        # Only use zones 2-8
-        zone_list = list(range(2, 9))
-        
-        # Build weight tiers: <= 1oz ... <= 15oz, then <= 1lb ... <= 150lb
-        weight_labels = [f"<= {oz}oz" for oz in range(1, 16)] + [f"<= {lb}lb" for lb in range(1, 151)]
-        weight_edges = [oz/16 for oz in range(1, 16)] + list(range(1, 151))
+def clean_view(df):
+    """Clean shipments (no EDAS/Remote) of the rated data; all rows when no mask is stored"""
+    mask = st.session_state.get('clean_mask')
+    if mask is None or len(mask) != len(df):
+        return df
+    return df[mask]
+
+def display_chart(kind, table, **options):
+    """Chart an aggregated table; the spec is cached by the table's values and the chart options"""
+    st.vega_lite_chart(cached_chart_spec(kind, table, **options), use_container_width=True)
+
+def processed_data_key(df):
+    """Fingerprint of the rated data, computed once per dataset; exports of earlier datasets are dropped"""
+    cached = st.session_state.get('dataset_key')
+    if cached is None or cached[0] != id(df):
+        cached = st.session_state.dataset_key = (id(df), dataset_key(df))
+        if 'export_cache' in st.session_state:
+            st.session_state.export_cache.retain(cached[1])
+    return cached[1]
+
+def display_lazy_download(label, dataset, export_name, write, export_format, file_name, key):
+    """Download button whose payload is built only on request and cached per dataset, export and format"""
+    if 'export_cache' not in st.session_state:
+        st.session_state.export_cache = ExportCache()
+    cache = st.session_state.export_cache
+    cache_key = (dataset, export_name, export_format)
+    if cache_key not in cache:
+        if not st.button(f"Prepare {label}", key=f"prepare-{key}"):
+            return
+        with st.spinner(f"Preparing {label}..."):
+            cache.build(cache_key, write)
+    # Streamlit reads the payload whenever the button renders; the cache only spares rebuilds and session state
+    with cache.open(cache_key) as payload:
+        st.download_button(f"Download {label}", payload, file_name, EXPORT_FORMATS[export_format][0], key=key)
+
+def frame_export(build_frame, export_format, sheet_name='Sheet1', index=False):
+    """Writer for display_lazy_download that builds the frame only when the export is requested"""
+    return lambda path: write_export(build_frame(), export_format, path, sheet_name=sheet_name, index=index)
+
+@st.fragment
+def display_detailed_breakdown(df):
+    """Paginated breakdown; filtering and sorting run on the numeric data and only the visible page is formatted"""
+    filter_cols = st.columns(4)
+    with filter_cols[0]:
+        zones = st.multiselect(
+            "Zones",
+            options=sorted(df['zone'].dropna().unique().tolist()) if 'zone' in df.columns else [],
+            key='breakdown_zones'
+        )
+    with filter_cols[1]:
+        service_levels = st.multiselect(
+            "Service Levels",
+            options=sorted(df['service_level'].dropna().astype(str).unique().tolist()) if 'service_level' in df.columns else [],
+            key='breakdown_service_levels'
+        )
+    with filter_cols[2]:
+        recommendations = st.multiselect(
+            "Recommendation",
+            options=sorted(df['carrier_recommendation'].dropna().astype(str).unique().tolist()) if 'carrier_recommendation' in df.columns else [],
+            key='breakdown_recommendations'
+        )
+    with filter_cols[3]:
+        search = st.text_input("Shipment ID / ZIP", key='breakdown_search', help="Starts with")
+
+    sort_cols = st.columns(5)
+    with sort_cols[0]:
+        min_savings = st.number_input("Min Savings ($)", value=None, step=1.0, key='breakdown_min_savings')
+    with sort_cols[1]:
+        max_savings = st.number_input("Max Savings ($)", value=None, step=1.0, key='breakdown_max_savings')
+    with sort_cols[2]:
+        sort_by = st.selectbox("Sort By", options=['(file order)'] + list(df.columns), key='breakdown_sort_by')
+    with sort_cols[3]:
+        descending = st.checkbox("Descending", key='breakdown_descending')
+    with sort_cols[4]:
+        page_size = st.selectbox("Rows per Page", options=PAGE_SIZES, key='breakdown_page_size')
+
+    filters = BreakdownFilters(
+        zones=tuple(zones) or None,
+        service_levels=tuple(service_levels) or None,
+        recommendations=tuple(recommendations) or None,
+        min_savings=min_savings,
+        max_savings=max_savings,
+        search=search
+    )
+    sort_column = None if sort_by == '(file order)' else sort_by
+
+    # Filter and sort once per setting; paging reuses the row positions
+    view_key = (id(df), len(df), filters, sort_column, descending)
+    cached = st.session_state.get('breakdown_positions')
+    if cached is None or cached[0] != view_key:
+        positions = sort_positions(df, filter_mask(df, filters), sort_column, ascending=not descending)
+        st.session_state.breakdown_positions = (view_key, positions)
+    else:
+        positions = cached[1]
+
+    pages = page_count(len(positions), page_size)
+    # The page lives in session state (clamped when filters shrink the view); the input starts at min_value
+    if st.session_state.get('breakdown_page', 1) > pages:
+        st.session_state.breakdown_page = pages
+    page = st.number_input("Page", min_value=1, max_value=pages, step=1, key='breakdown_page')
+
+    if len(positions) == 0:
+        st.info("No shipments match the selected filters.")
+        return
+    first = (page - 1) * page_size
+    st.caption(f"Showing {first + 1:,}-{min(first + page_size, len(positions)):,} of {len(positions):,} shipments (page {page} of {pages})")
+    st.dataframe(format_breakdown(breakdown_page(df, positions, page, page_size)), use_container_width=True)
+
+def display_origin_rollup(df):
+    """Show per-origin totals when shipments come from more than one origin ZIP."""
+    if df is None or 'origin_zip' not in df.columns or df['origin_zip'].nunique() < 2:
+        return
+    rollup = summarize_by_origin(df).rename(columns={
+        'origin_zip': 'Origin ZIP',
+        'shipments': 'Shipments',
+        'errors': 'Errors',
+        'carrier_cost': 'Current Cost',
+        'amazon_cost': 'Amazon Cost',
+        'savings': 'Savings',
+        'savings_percent': 'Savings %'
+    })
+    for col in ['Current Cost', 'Amazon Cost', 'Savings']:
+        rollup[col] = rollup[col].apply(format_currency)
+    rollup['Savings %'] = rollup['Savings %'].apply(format_percentage)
+    st.markdown("### 🏭 Results by Origin")
+    st.dataframe(rollup, use_container_width=True)
+
+def display_source_rollup(aggregate_cube):
+    """Show per-file totals when the upload combined more than one file."""
+    by_file = source_file_metrics(aggregate_cube)
+    if len(by_file) < 2:
+        return
+    for col in ['Avg Labl IQ Rate', 'Avg Carrier Rate', 'Total Savings']:
+        by_file[col] = by_file[col].apply(format_currency)
+    by_file['Avg Savings %'] = by_file['Avg Savings %'].apply(format_percentage)
+    st.markdown("### 📁 Results by Source File")
+    st.dataframe(by_file.rename_axis('Source File'), use_container_width=True)
+
+def display_preview_projection(projection, sample_rows, total_rows):
+    """Show totals projected from a rated sample while the full upload is processed."""
+    st.info(f"Preview: projected from a stratified sample of {sample_rows:,} of {total_rows:,} shipments. "
+            "Full results follow below when processing completes.")
+    preview = projection.set_index('metric')
+    preview_cols = st.columns(3)
+    for col, metric in zip(preview_cols, ['Total Current Cost', 'Total Labl IQ Cost', 'Total Savings']):
+        row = preview.loc[metric]
+        col.metric(f"Projected {metric.replace('Total ', '')}", format_currency(row['estimate']),
+                   help=f"95% interval: {format_currency(row['lower'])} - {format_currency(row['upper'])}")
+    row = preview.loc['Savings %']
+    st.caption(f"Projected savings: {format_percentage(row['estimate'])} "
+               f"(95% interval {format_percentage(row['lower'])} - {format_percentage(row['upper'])})")
+
+def display_rate_percentiles(rate_summary):
+    """Show median/p90 of savings, final rate and surcharge burden per group from the rate summary sketches."""
+    if rate_summary is None:
+        return
+    st.markdown("### Rate Distribution")
+    group_labels = {'Zone': 'zone', 'Weight Bracket': 'weight_bracket', 'Service Level': 'service_level'}
+    metric_labels = {'Savings ($)': 'savings', 'Savings (%)': 'savings_percent',
+                     'Labl IQ Rate ($)': 'final_rate', 'Surcharge Burden (% of rate)': 'surcharge_burden'}
+    dist_cols = st.columns(2)
+    with dist_cols[0]:
+        group_label = st.selectbox("Group by", list(group_labels), key="rate_percentile_group")
+    with dist_cols[1]:
+        metric_label = st.selectbox("Metric", list(metric_labels), key="rate_percentile_metric")
+    table = rate_summary.percentiles(metric_labels[metric_label], group_labels[group_label], (0.1, 0.5, 0.9))
+    if table.empty:
+        st.caption("No rated shipments for this metric.")
+        return
+    table = table.rename(columns={'count': 'Shipments', 'p10': 'P10', 'p50': 'Median', 'p90': 'P90'})
+    table['Shipments'] = table['Shipments'].astype(int)
+    st.dataframe(table.round(2), use_container_width=True)
+    st.caption(f"{metric_label} percentiles by {group_label.lower()} (estimated from streaming sketches)")
+
+def apply_markup_solution():
+    """Use the optimizer's markup as the global markup or its service level's markup"""
+    solution = st.session_state.markup_solution
+    st.session_state.criteria.update(solution_criteria(solution, st.session_state.criteria))
+    if solution.service_level is None:
+        st.session_state['rate_markup_percentage'] = solution.markup_percentage
+    else:
+        # Let the Advanced Settings input pick the new value up from criteria
+        st.session_state.pop(f'adv_{solution.service_level}_markup', None)
+    save_settings_to_calculator()
+
+def display_markup_optimizer():
+    """Display the markup optimizer for the processed shipments"""
+    with st.expander("🎯 Solve Markup for a Target"):
+        target = st.radio(
+            "Target",
+            options=[TARGET_SAVINGS_PERCENT, TARGET_MARGIN_PER_PACKAGE],
+            format_func=lambda x: {
+                TARGET_SAVINGS_PERCENT: "Merchant savings (%)",
+                TARGET_MARGIN_PER_PACKAGE: "Average margin per package ($)"
+            }[x],
+            key="markup_target"
+        )
+        target_value = st.number_input(
+            "Target Value",
+            min_value=0.0,
+            value=12.0 if target == TARGET_SAVINGS_PERCENT else 1.0,
+            step=0.5 if target == TARGET_SAVINGS_PERCENT else 0.05,
+            key="markup_target_value"
+        )
+        processed = st.session_state.processed_data
+        # The global markup takes precedence over service level markups in the rate engines
+        rated_levels = processed.loc[processed['final_rate'].notna(), 'service_level'].unique() \
+            if 'service_level' in processed.columns \
+            and st.session_state.criteria.get('markup_percentage') is None else []
+        service_level = st.selectbox(
+            "Markup to Solve",
+            options=[None] + [level for level in SERVICE_LEVELS if level in set(rated_levels)],
+            format_func=lambda x: "Global markup (all service levels)" if x is None
+                                  else f"{x.replace('_', ' ').title()} markup (other service levels keep theirs)",
+            key="markup_service_level"
+        )
         
-        # Prepare output
-        rate_table = pd.DataFrame(index=weight_labels, columns=zone_list)
+        if st.button("Solve Markup", key="solve_markup"):
+            st.session_state.markup_solution = st.session_state.calculator.optimize_markup(
+                processed, target, target_value, service_level
+            )
         
-        # Track empty cells for debugging
-        empty_cells = []
-        total_cells = 0
+        solution = st.session_state.get('markup_solution')
+        if solution is None:
+            return
         
-        for i, label in enumerate(weight_labels):
-            if i < 15:
-                min_wt = i/16
-                max_wt = (i+1)/16
+        scope = "Global" if solution.service_level is None else solution.service_level.replace('_', ' ').title()
+        if solution.feasible:
+            st.success(f"{scope} markup {solution.markup_percentage:.2f}% meets the target")
+        else:
+            st.warning(f"Target not reachable; closest {scope.lower()} markup is {solution.markup_percentage:.2f}%")
+        summary = solution.summary
+        st.metric("Merchant Savings", format_percentage(summary['savings_percent']))
+        st.metric("Avg Margin / Package", format_currency(summary['avg_margin_per_package']))
+        st.metric("Total Margin", format_currency(summary['total_margin']))
+        # A service level solution can't take effect once a global markup is set again
+        st.button("Apply Markup", key="apply_markup_solution", on_click=apply_markup_solution,
+                  disabled=solution.service_level is not None
+                  and st.session_state.criteria.get('markup_percentage') is not None,
+                  help="Set the solved markup; reprocess the file to update the analysis")
+
+@st.fragment
+def display_published_rate_card():
+    """Display controls, preview and downloads for the published rate card"""
+    st.markdown("---")
+    st.markdown("**📊 Rate Table Export**")
+    st.markdown("Generate the published rate table from the loaded rate template for use in customer pricing.")
+
+    card_cols = st.columns(2)
+    with card_cols[0]:
+        rate_service_level = st.selectbox(
+            "Service Level",
+            options=SERVICE_LEVELS,
+            format_func=lambda x: x.replace('_', ' ').title(),
+            key='rate_table_service_level'
+        )
+    with card_cols[1]:
+        rate_package_type = st.selectbox(
+            "Package Type",
+            options=PACKAGE_TYPES,
+            format_func=lambda x: x.title(),
+            key='rate_table_package_type'
+        )
+
+    # Rate table pricing controls
+    st.markdown("**💰 Rate Table Pricing**")
+    markup_col, min_margin_col = st.columns(2)
+
+    with markup_col:
+        export_markup_pct = st.number_input(
+            "Markup Percentage (%)",
+            min_value=0.0, max_value=100.0, value=10.0, step=0.5,
+            help="Percent markup to apply to each cell in the rate table."
+        )
+
+    with min_margin_col:
+        export_min_margin = st.number_input(
+            "Minimum Margin ($)",
+            min_value=0.0, max_value=100.0, value=0.50, step=0.05,
+            help="Minimum dollar profit per shipment."
+        )
+
+    # Generate rate table button
+    if st.button("Generate Rate Table Preview", key="generate_rate_table"):
+        if st.session_state.get('calculator') is None:
+            st.error("No rate template loaded. Please process your shipment data first.")
+            return
+
+        with st.spinner("Generating rate table..."):
+            try:
+                card = published_rate_card(
+                    st.session_state.calculator.batch_engine,
+                    markup_pct=export_markup_pct,
+                    min_margin=export_min_margin
+                )
+                st.session_state.rate_table = ensure_string_columns(
+                    rate_card_table(card, rate_service_level, rate_package_type)
+                )
+                st.session_state.rate_table_config = {
+                    'service_level': rate_service_level,
+                    'package_type': rate_package_type
+                }
+                # Every service level and package type, for the complete workbook
+                st.session_state.rate_card = card
+                st.success("Rate table generated successfully!")
+            except Exception as e:
+                st.error(f"Error generating rate table: {str(e)}")
+                st.exception(e)  # Show full error details for debugging
+
+    # Show rate table preview if available
+    if 'rate_table' not in st.session_state:
+        return
+
+    st.markdown("**📋 Rate Table Preview**")
+    config = st.session_state.rate_table_config
+    st.info(f"**Configuration:** {config['service_level'].replace('_', ' ').title()} | {config['package_type'].title()}")
+
+    rate_table = st.session_state.rate_table
+    st.dataframe(rate_table, use_container_width=True)
+
+    # Export options for rate table
+    file_stem = f"labl_iq_rate_table_{config['service_level']}_{config['package_type']}"
+    rate_table_key = dataset_key(rate_table)
+    rate_export_cols = st.columns(3)
+
+    with rate_export_cols[0]:
+        display_lazy_download("Rate Table (CSV)", rate_table_key, 'rate_table',
+                              frame_export(lambda: rate_table, 'csv'),
+                              'csv', f"{file_stem}.csv", 'download-rate-table-csv')
+
+    with rate_export_cols[1]:
+        display_lazy_download("Rate Table (Excel)", rate_table_key, 'rate_table',
+                              frame_export(lambda: rate_table, 'xlsx', sheet_name='Rate Table'),
+                              'xlsx', f"{file_stem}.xlsx", 'download-rate-table-excel')
+
+    with rate_export_cols[2]:
+        if 'rate_card' in st.session_state:
+            card = st.session_state.rate_card
+            results = st.session_state.get('processed_data')
+
+            def write_workbook(path):
+                with open(path, 'wb') as f:
+                    f.write(rate_card_workbook(card, results))
+
+            workbook_key = dataset_key(card) + (processed_data_key(results) if results is not None else '')
+            display_lazy_download("All Rate Tables (Excel)", workbook_key, 'rate_card_workbook', write_workbook,
+                                  'xlsx', "labl_iq_rate_card.xlsx", 'download-rate-card-workbook')
+
+    # Rate table statistics
+    st.markdown("**📊 Rate Table Statistics**")
+    stats_cols = st.columns(4)
+
+    with stats_cols[0]:
+        st.metric("Zones", len(rate_table.columns) - 1)  # Exclude weight column
+
+    with stats_cols[1]:
+        st.metric("Weight Tiers", len(rate_table))
+
+    with stats_cols[2]:
+        st.metric("Min Rate", format_currency(rate_table.iloc[:, 1:].min().min()))
+
+    with stats_cols[3]:
+        st.metric("Max Rate", format_currency(rate_table.iloc[:, 1:].max().max()))
+
+@st.fragment
+def display_rate_analysis(processed_df, aggregate_cube):
+    """Rate Analysis tab: rate comparison, rate components and percentiles"""
+    st.subheader("Rate Analysis")
+
+    # Rate comparison
+    rate_cols = st.columns(2)
+
+    with rate_cols[0]:
+        display_chart('line', rates_by(aggregate_cube, 'weight_bracket'), y_title="Average Rate ($)")
+        st.caption("Labl IQ Rate vs Carrier Rate Comparison by Weight Range")
+
+    with rate_cols[1]:
+        display_chart('bar', rate_components(aggregate_cube)[0].rename('Average'), y_title="Average ($)")
+        st.caption("Average Rate Components")
+
+    display_rate_percentiles(st.session_state.get('rate_summary'))
+
+@st.fragment
+def display_zone_analysis(processed_df, aggregate_cube):
+    """Zone Analysis tab from the aggregate cube"""
+    st.subheader("Zone Analysis")
+
+    # Zone metrics table
+    if 'zone' in processed_df.columns:
+        st.dataframe(zone_metrics(aggregate_cube))
+    else:
+        st.warning("Zone column not found or empty, cannot display zone metrics.")
+
+@st.fragment
+def display_surcharge_analysis(processed_df, aggregate_cube):
+    """Surcharge Analysis tab from the aggregate cube"""
+    st.subheader("Surcharge Analysis")
+
+    # Check if required surcharge columns exist
+    surcharge_cols_needed = ['das_surcharge', 'edas_surcharge', 'remote_surcharge', 'fuel_surcharge']
+    missing_cols = [col for col in surcharge_cols_needed if col not in processed_df.columns]
+
+    if missing_cols:
+        st.warning(f"Some surcharge columns are missing: {', '.join(missing_cols)}")
+        st.info("Surcharge analysis may be incomplete.")
+
+    # Frequency, totals and averages of the available surcharges, from the cube
+    available_surcharges = [name for name, column in SURCHARGE_COLUMNS.items()
+                            if column in processed_df.columns]
+    surcharge_table = surcharge_summary(aggregate_cube, available_surcharges)
+
+    # Surcharge frequency
+    surcharge_cols = st.columns(2)
+
+    with surcharge_cols[0]:
+        if available_surcharges:
+            display_chart('bar', surcharge_table['Frequency'], y_title="Frequency (%)")
+            st.caption("Surcharge Application Frequency (%)")
+        else:
+            st.info("No surcharge data available for frequency analysis")
+
+    with surcharge_cols[1]:
+        if available_surcharges:
+            display_chart('bar', surcharge_table['Total Amount'], y_title="Total ($)")
+            st.caption("Total Surcharge Impact ($)")
+        else:
+            st.info("No surcharge data available for impact analysis")
+
+    # Surcharge summary table
+    if available_surcharges:
+        surcharge_table = surcharge_table.copy()
+        surcharge_table['Frequency'] = surcharge_table['Frequency'].apply(format_percentage)
+        surcharge_table['Total Amount'] = surcharge_table['Total Amount'].apply(format_currency)
+        surcharge_table['Average Amount'] = surcharge_table['Average Amount'].apply(format_currency)
+
+        st.dataframe(surcharge_table)
+    else:
+        st.info("No surcharge columns found in the data")
+
+@st.fragment
+def display_carrier_recommendations(processed_df):
+    """Carrier Recommendations tab"""
+    st.subheader("Carrier Recommendations")
+
+    if st.session_state.criteria.get('enable_carrier_recommendations', True):
+        # Show carrier recommendation analysis
+        if 'carrier_recommendation' in processed_df.columns:
+            # Recommendation summary
+            rec_summary = processed_df['carrier_recommendation'].value_counts()
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.markdown("**📊 Carrier Recommendation Distribution**")
+                display_chart('bar', rec_summary, y_title="Shipments")
+                st.caption("Shipments by Recommended Carrier")
+
+            with col2:
+                st.markdown("**📈 Recommendation Impact**")
+
+                # Calculate impact metrics
+                current_carrier_savings = processed_df[
+                    processed_df['carrier_recommendation'] == 'Current Carrier'
+                ]['savings'].fillna(0).sum()
+
+                alternative_carrier_savings = processed_df[
+                    processed_df['carrier_recommendation'] == 'Alternative Carrier'
+                ]['savings'].fillna(0).sum()
+
+                st.metric("Current Carrier Savings", format_currency(current_carrier_savings))
+                st.metric("Alternative Carrier Shipments", len(processed_df[processed_df['carrier_recommendation'] == 'Alternative Carrier']))
+
+            # Detailed recommendation table
+            st.markdown("**📋 Detailed Recommendations**")
+
+            # Filter for alternative carrier recommendations
+            alt_carrier_df = with_recommendation_reasons(
+                processed_df[processed_df['carrier_recommendation'] == 'Alternative Carrier'],
+                st.session_state.recommendation_rules
+            )
+
+            if not alt_carrier_df.empty:
+                # Format the recommendation table
+                display_cols = ['shipment_id', 'destination_zip', 'weight', 'service_level', 
+                               'edas_surcharge', 'remote_surcharge', 'recommendation_reason', 'savings']
+
+                # Only include columns that exist
+                available_cols = [col for col in display_cols if col in alt_carrier_df.columns]
+                rec_table = alt_carrier_df[available_cols].copy()
+
+                # Format currency columns
+                for col in ['edas_surcharge', 'remote_surcharge', 'savings']:
+                    if col in rec_table.columns:
+                        rec_table[col] = rec_table[col].apply(format_currency)
+
+                st.dataframe(rec_table, use_container_width=True)
+
+                # Summary statistics
+                st.markdown("**📊 Alternative Carrier Summary**")
+                summary_cols = st.columns(3)
+
+                with summary_cols[0]:
+                    st.metric("Total Alternative Shipments", len(alt_carrier_df))
+
+                with summary_cols[1]:
+                    avg_edas = alt_carrier_df['edas_surcharge'].mean() if 'edas_surcharge' in alt_carrier_df.columns else 0
+                    st.metric("Average EDAS Surcharge", format_currency(avg_edas))
+
+                with summary_cols[2]:
+                    avg_remote = alt_carrier_df['remote_surcharge'].mean() if 'remote_surcharge' in alt_carrier_df.columns else 0
+                    st.metric("Average Remote Surcharge", format_currency(avg_remote))
+
             else:
-                min_wt = i-14
-                max_wt = i-13
-                
-            for zone in zone_list:
-                total_cells += 1
-                
-                # Filter data for this zone and weight range
-                cell_data = df[(df['zone'].astype(str)==str(zone)) & 
-                              (df['billable_weight']>=min_wt) & 
-                              (df['billable_weight']<max_wt)]
-                
-                if len(cell_data) == 0:
-                    # No data for this combination - try to find a reasonable default
-                    # First, try to find any data for this zone
-                    zone_data = df[df['zone'].astype(str)==str(zone)]
-                    if len(zone_data) > 0:
-                        # Use average rate for this zone as baseline
-                        base_rate = zone_data['final_rate'].mean()
-                        # Apply markup and minimum margin
-                        marked_up = base_rate * (1 + markup_pct/100)
-                        min_allowed = base_rate + min_margin
-                        final_rate = max(marked_up, min_allowed)
-                        # Round to nearest $0.05
-                        final_rate = round(final_rate * 20) / 20
-                        rate = f"{final_rate:.2f}"
-                        # Mark as interpolated
-                        rate_table.at[label, zone] = f"{rate}*"
-                    else:
-                        # No data for this zone at all - use a reasonable default
-                        # Base rate increases with zone and weight
-                        base_rate = 3.50 + (zone * 0.50) + (min_wt * 0.25)
-                        marked_up = base_rate * (1 + markup_pct/100)
-                        min_allowed = base_rate + min_margin
-                        final_rate = max(marked_up, min_allowed)
-                        final_rate = round(final_rate * 20) / 20
-                        rate = f"{final_rate:.2f}"
-                        rate_table.at[label, zone] = f"{rate}**"
-                    
-                    empty_cells.append(f"Zone {zone}, {label}: No data, using default")
-                else:
-                    # We have data for this combination
-                    cost = cell_data['final_rate'].mean()
-                    # Apply markup
-                    marked_up = cost * (1 + markup_pct/100)
-                    # Enforce minimum margin
-                    min_allowed = cost + min_margin
-                    final_rate = max(marked_up, min_allowed)
-                    # Round to nearest $0.05
-                    final_rate = round(final_rate * 20) / 20
-                    rate = f"{final_rate:.2f}"
-                    rate_table.at[label, zone] = rate
-        
-        rate_table.index.name = "Billable Weight"
-        
-        # Add debug information
-        if empty_cells:
-            st.warning(f"**Rate Table Issue:** {len(empty_cells)} out of {total_cells} cells had no data and used defaults ({len(empty_cells)/total_cells*100:.1f}%).\n"
-                      f"* = Interpolated from zone average\n"
-                      f"** = Used reasonable default")
-            
-            # Show detailed analysis
-            with st.expander("🔍 Click to see detailed data analysis"):
-                st.write("### Data Distribution Analysis")
-                
-                # Zone analysis
-                zone_counts = df['zone'].value_counts().sort_index()
-                st.write(f"**Zones found:** {sorted(df['zone'].unique())}")
-                st.write(f"**Zone distribution:**")
-                zone_data = []
-                for zone, count in zone_counts.items():
-                    zone_data.append([f"Zone {zone}", count, f"{count/len(df)*100:.1f}%"])
-                st.table(pd.DataFrame(zone_data, columns=["Zone", "Records", "Percentage"]))
-                
-                # Weight analysis
-                st.write(f"**Weight range:** {df['billable_weight'].min():.3f} to {df['billable_weight'].max():.3f} lbs")
-                
-                # Check weight distribution in rate table ranges
-                weight_ranges_with_data = []
-                for i in range(1, 16):  # 1oz to 15oz
-                    min_wt = i/16
-                    max_wt = (i+1)/16
-                    count = len(df[(df['billable_weight'] >= min_wt) & (df['billable_weight'] < max_wt)])
-                    if count > 0:
-                        weight_ranges_with_data.append([f"<= {i}oz", f"{min_wt:.3f}-{max_wt:.3f} lbs", count])
-                
-                for i in range(1, 151):  # 1lb to 150lb
-                    min_wt = i
-                    max_wt = i+1
-                    count = len(df[(df['billable_weight'] >= min_wt) & (df['billable_weight'] < max_wt)])
-                    if count > 0:
-                        weight_ranges_with_data.append([f"<= {i}lb", f"{min_wt:.3f}-{max_wt:.3f} lbs", count])
-                
-                st.write(f"**Weight ranges with data:** {len(weight_ranges_with_data)} out of 165 total ranges")
-                
-                # Show top weight ranges
-                if weight_ranges_with_data:
-                    top_ranges = sorted(weight_ranges_with_data, key=lambda x: x[2], reverse=True)[:10]
-                    st.write("**Top 10 weight ranges with data:**")
-                    st.table(pd.DataFrame(top_ranges, columns=["Weight Tier", "Range (lbs)", "Records"]))
-                
-                # Data quality checks
-                st.write("### Data Quality Issues")
-                issues = []
-                
-                # Check for NaN zones
-                nan_zones = df['zone'].isna().sum()
-                if nan_zones > 0:
-                    issues.append(f"❌ {nan_zones} records have NaN zones")
-                
-                # Check for invalid zones
-                valid_zones = set(range(1, 10))  # Zones 1-9
-                invalid_zones = set(df['zone'].dropna().unique()) - valid_zones
-                if invalid_zones:
-                    issues.append(f"❌ Invalid zones found: {invalid_zones}")
-                
-                # Check for extreme weights
-                extreme_weights = df[df['billable_weight'] > 150]
-                if len(extreme_weights) > 0:
-                    issues.append(f"⚠️ {len(extreme_weights)} records have weights > 150 lbs")
-                
-                if issues:
-                    for issue in issues:
-                        st.write(issue)
-                else:
-                    st.write("✅ No obvious data quality issues found")
-                
-                st.write("### Recommendations")
-                if len(empty_cells)/total_cells > 0.9:
-                    st.error("🔴 **CRITICAL:** Over 90% of rate table cells are empty!")
-                    st.write("This suggests:")
-                    st.write("1. **Zone calculation issues** - Check if zones are being calculated correctly")
-                    st.write("2. **Weight distribution problems** - Your data may not cover the expected weight ranges")
-                    st.write("3. **Template issues** - The rate template may not have data for all zones")
-                    st.write("4. **Data filtering** - Some records may be getting filtered out")
-                
-                if len(zone_counts) < 7:
-                    st.warning(f"⚠️ Only {len(zone_counts)} zones found, expected 7+ zones for a complete rate table")
-        
-        return rate_table
-        
-    except Exception as e:
-        st.error(f"Error generating rate table: {e}")
-        return pd.DataFrame()
+                st.success("🎉 No shipments require alternative carriers! All shipments are optimized for your current carrier.")
 
-def main():
-    # Sidebar for navigation and settings
-    with st.sidebar:
-        # Logo and header
+        else:
+            st.info("Carrier recommendations not available. Please enable carrier recommendations in settings.")
+
+    else:
+        st.info("Carrier recommendations are disabled. Enable them in the Carrier Recommendations settings to see this analysis.")
+
+@st.fragment
+def display_export_options(processed_df, aggregate_cube):
+    """Export tab: full report, summary, alternative carrier and clean shipment downloads"""
+    st.subheader("Export Options")
+
+    dataset = processed_data_key(processed_df)
+    recommendations_enabled = st.session_state.criteria.get('enable_carrier_recommendations', True)
+    include_recommendations = recommendations_enabled and st.session_state.criteria.get('include_recommendations_in_export', True)
+    rules = st.session_state.get('recommendation_rules', [])
+
+    def full_report():
+        # Include carrier recommendations if enabled
+        if not include_recommendations:
+            return processed_df
+        if 'carrier_recommendation' not in processed_df.columns:
+            # Add carrier recommendation columns if they don't exist
+            return processed_df.assign(carrier_recommendation='Current Carrier', recommendation_reason='')
+        return with_recommendation_reasons(processed_df, rules)
+
+    def summary_report():
+        # Only include summary columns that exist in processed_df
+        available_summary_columns = [col for col in SUMMARY_COLUMNS if col in processed_df.columns]
+        if include_recommendations and 'carrier_recommendation' in processed_df.columns:
+            available_summary_columns.extend(['carrier_recommendation', 'recommendation_reason'])
+        return with_recommendation_reasons(processed_df, rules)[available_summary_columns]
+
+    def recommended(carrier):
+        return processed_df[processed_df['carrier_recommendation'] == carrier]
+
+    export_cols = st.columns(3)
+
+    with export_cols[0]:
+        # Full detailed export
+        display_lazy_download("Full Report (CSV)", dataset, ('full', include_recommendations),
+                              frame_export(full_report, 'csv'), 'csv', "labl_iq_results.csv", 'download-csv')
+
+    with export_cols[1]:
+        # Summary export
+        display_lazy_download("Summary (CSV)", dataset, ('summary', include_recommendations),
+                              frame_export(summary_report, 'csv'), 'csv', "labl_iq_summary.csv", 'download-csv-summary')
+
+    with export_cols[2]:
+        # Alternative carrier export (if recommendations enabled)
+        if recommendations_enabled and 'carrier_recommendation' in processed_df.columns:
+            if (processed_df['carrier_recommendation'] == 'Alternative Carrier').any():
+                display_lazy_download(
+                    "Alternative Carrier Shipments (CSV)", dataset, 'alternative_carrier',
+                    frame_export(lambda: with_recommendation_reasons(recommended('Alternative Carrier'), rules), 'csv'),
+                    'csv', "labl_iq_alternative_carrier_shipments.csv", 'download-csv-alt-carrier'
+                )
+            else:
+                st.info("No alternative carrier shipments to export")
+        else:
+            # Zone analysis export (fallback)
+            if 'zone' in processed_df.columns:
+                display_lazy_download("Zone Analysis (CSV)", dataset, 'zone_analysis',
+                                      frame_export(lambda: zone_export(aggregate_cube), 'csv', index=True),
+                                      'csv', "labl_iq_zone_analysis.csv", 'download-csv-zone')
+
+    # Additional export options
+    if recommendations_enabled:
+        st.markdown("---")
+        st.markdown("**Additional Export Options**")
+
+        additional_cols = st.columns(2)
+
+        with additional_cols[0]:
+            # Filtered data export (clean shipments only)
+            if st.session_state.get('clean_mask') is not None:
+                display_lazy_download("Clean Shipments Only (CSV)", dataset, 'clean',
+                                      frame_export(lambda: clean_view(processed_df), 'csv'),
+                                      'csv', "labl_iq_clean_shipments.csv", 'download-csv-clean')
+
+        with additional_cols[1]:
+            # Current carrier shipments only
+            if 'carrier_recommendation' in processed_df.columns:
+                display_lazy_download("Current Carrier Shipments (CSV)", dataset, 'current_carrier',
+                                      frame_export(lambda: recommended('Current Carrier'), 'csv'),
+                                      'csv', "labl_iq_current_carrier_shipments.csv", 'download-csv-current')
+
+@st.fragment
+def display_analysis_export(processed_df):
+    """Export tab of a stored analysis: results for the current analysis mode as CSV or Excel"""
+    st.subheader("Export Options")
+
+    # Determine which dataset to use for export
+    analysis_mode = st.session_state.criteria.get('analysis_mode', 'dual_analysis')
+    if analysis_mode == 'dual_analysis':
+        export_df = clean_view(processed_df)
+    elif analysis_mode == 'filtered_analysis':
+        export_df = clean_view(processed_df)
+    else:  # flag_only
+        export_df = processed_df
+
+    if len(export_df) > 0:
+        # Export options
+        st.markdown("### Export Analysis Results")
+        dataset = processed_data_key(processed_df)
+
+        # CSV Export
+        display_lazy_download("CSV", dataset, ('analysis', analysis_mode), frame_export(lambda: export_df, 'csv'),
+                              'csv', "labl_iq_analysis_results.csv", 'download-csv')
+
+        # Excel Export
+        display_lazy_download("Excel", dataset, ('analysis', analysis_mode),
+                              frame_export(lambda: export_df, 'xlsx', sheet_name='Analysis Results'),
+                              'xlsx', "labl_iq_analysis_results.xlsx", 'download-excel')
+    else:
+        st.warning("No data available for export.")
+
+def start_over():
+    """Drop the current upload and its results and return to the upload step."""
+    if 'export_cache' in st.session_state:
+        st.session_state.export_cache.clear()
+    for key in UPLOAD_SESSION_KEYS:
+        if key in st.session_state:
+            del st.session_state[key]
+    st.session_state['app_step'] = 'upload'
+    st.rerun()
+
+def run_backend_job():
+    """Submit the mapped upload to the job backend and wait for its results."""
+    client = BackendClient(BACKEND_URL, token=st.session_state.get('backend_token'))
+    if client.token is None:
+        st.session_state.backend_token = client.login(
+            os.environ.get('LABL_IQ_BACKEND_EMAIL', ''), os.environ.get('LABL_IQ_BACKEND_PASSWORD', '')
+        )
+    mapped_df = st.session_state['mapped_df']
+    if 'backend_upload_id' not in st.session_state:
+        if st.session_state.get('save_mapping_checkbox'):
+            save_mapping(st.session_state['mapping'])
+        divisor = WEIGHT_UNIT_DIVISORS.get(st.session_state.criteria.get('weight_unit', ""), 1.0)
+        content = backend_upload(mapped_df, st.session_state.criteria.get('origin_zip', ''), divisor)
+        st.session_state.backend_upload_id = client.submit('shipments.csv', content)
+    total = len(mapped_df)
+    progress = st.progress(0.0, text="Rating shipments on the backend...")
+
+    def show_progress(rows):
+        progress.progress(min(rows / total, 1.0) if total else 1.0, text=f"Rated {rows:,} of {total:,} shipments")
+
+    st.session_state.backend_result = client.wait(st.session_state.backend_upload_id, on_progress=show_progress)
+    progress.empty()
+
+def display_backend_analysis():
+    """Results step when rating runs on the job backend: progress, then the stored aggregates."""
+    if 'backend_result' not in st.session_state:
+        try:
+            run_backend_job()
+        except BackendError as e:
+            st.error(str(e))
+            if st.button("Retry", key="backend_retry"):
+                st.session_state.pop('backend_upload_id', None)
+                st.session_state.pop('backend_token', None)
+                st.rerun()
+            return
+    result = st.session_state.backend_result
+    tables = result_tables(result)
+
+    st.subheader("Executive Summary")
+    st.caption(BACKEND_IGNORED_SETTINGS_NOTE)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Shipments", f"{result['totalShipments']:,}")
+    col2.metric("Current Cost", format_currency(result['totalCost']))
+    col3.metric("Potential Savings", format_currency(result['potentialSavings']))
+    col4.metric("Avg Savings / Shipment", format_currency(result['avgSavingsPerShipment']))
+
+    zone_tab, carrier_tab, savings_tab = st.tabs(["Zone Analysis", "Carrier Breakdown", "Top Savings"])
+    with zone_tab:
+        if not tables['zones'].empty:
+            display_chart('bar', tables['zones']['savings'], x_title='Zone', y_title='Potential Savings ($)')
+        st.dataframe(tables['zones'], use_container_width=True)
+    with carrier_tab:
+        st.dataframe(tables['carriers'], use_container_width=True)
+    with savings_tab:
+        st.dataframe(tables['opportunities'], use_container_width=True, hide_index=True)
+
+    if st.button("Start Over", key="backend_start_over"):
+        start_over()
+
+@st.fragment
+def display_criteria_settings():
+    """Sidebar navigation and quote criteria; reruns on its own when a setting changes"""
+    # Custom navigation menu
+    st.markdown('<div class="nav-container">', unsafe_allow_html=True)
+
+    nav_options = [
+        "Basic Settings", 
+        "Rate Settings", 
+        "Surcharge Settings", 
+        "Advanced Settings", 
+        "Carrier Recommendations",
+        "Debug Options"
+    ]
+
+    # Primary navigation rerun
+    for option in nav_options:
+        active_class = "nav-active" if st.session_state.active_section == option else ""
+        button_key = f"nav_{option}"
+
+        # Create the button with proper functionality - removed help parameter
+        if st.button(option, key=button_key, 
+                    use_container_width=True):
+            st.session_state.active_section = option
+            st.rerun(scope="fragment")
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Header for criteria
+    st.header("Quote Criteria")
+
+    # Backend jobs rate with the backend's carrier rate cards and only receive the mapped shipments
+    backend_mode = st.session_state.criteria.get('processing') == 'backend'
+    if backend_mode:
+        st.info(BACKEND_IGNORED_SETTINGS_NOTE)
+
+    # Basic Settings
+    if st.session_state.active_section == "Basic Settings":
+        st.markdown('<div class="remove-panel-styling"><div class="settings-header">Basic Settings</div>', unsafe_allow_html=True)
+
+        # Origin ZIP
+        st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Origin ZIP Code</div>", unsafe_allow_html=True)
+        origin_zip = st.text_input(
+            label="Origin ZIP",
+            label_visibility="collapsed",
+            value=st.session_state.criteria.get('origin_zip', '46307'),
+            key="basic_origin_zip"
+        )
+        # Update session state immediately when value changes
+        if origin_zip != st.session_state.criteria.get('origin_zip'):
+            st.session_state.criteria['origin_zip'] = origin_zip
+            save_settings_to_calculator()
+
+        # Service Level
+        st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Default Service Level</div>", unsafe_allow_html=True)
+        service_level = st.selectbox(
+            label="Service Level",
+            label_visibility="collapsed",
+            options=['standard', 'expedited', 'priority', 'next_day'],
+            format_func=lambda x: x.replace('_', ' ').title(),
+            index=['standard', 'expedited', 'priority', 'next_day'].index(
+                st.session_state.criteria.get('service_level', 'standard')
+            ),
+            key="basic_service_level",
+            disabled=backend_mode
+        )
+        # Update session state immediately when value changes
+        if service_level != st.session_state.criteria.get('service_level'):
+            st.session_state.criteria['service_level'] = service_level
+            save_settings_to_calculator()
+
+        # Package Type
+        st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Default Package Type</div>", unsafe_allow_html=True)
+        package_type = st.selectbox(
+            label="Package Type",
+            label_visibility="collapsed",
+            options=['box', 'envelope', 'pak'],
+            format_func=lambda x: x.title(),
+            index=['box', 'envelope', 'pak'].index(
+                st.session_state.criteria.get('package_type', 'box')
+            ),
+            key="basic_package_type",
+            disabled=backend_mode
+        )
+        # Update session state immediately when value changes
+        if package_type != st.session_state.criteria.get('package_type'):
+            st.session_state.criteria['package_type'] = package_type
+            save_settings_to_calculator()
+
+        # Weight Unit
+        st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Weight Unit in Uploaded File</div>", unsafe_allow_html=True)
+        weight_unit = st.selectbox(
+            label="Weight Unit",
+            label_visibility="collapsed",
+            options=["", "Ounces (oz)", "Grams (g)"],
+            format_func=lambda x: x if x else "(No conversion, already lbs)",
+            index=["", "Ounces (oz)", "Grams (g)"].index(
+                st.session_state.criteria.get('weight_unit', "")
+            ),
+            key="basic_weight_unit"
+        )
+        # Update session state immediately when value changes
+        if weight_unit != st.session_state.criteria.get('weight_unit'):
+            st.session_state.criteria['weight_unit'] = weight_unit
+            save_settings_to_calculator()
+
+        # Add explanation for settings
         st.markdown("""
-        <div class="sidebar-logo" style="margin-top:20px;">
-            <img src="data:image/png;base64,{}"/>
-            <span>IQ</span>
+        <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
+        <p style="color:black; font-weight:500; margin:0;">Settings are automatically saved as you change them. Use the lock (🔒) to prevent values from being overridden by uploaded data.</p>
         </div>
-        """.format(
-            base64.b64encode(open(os.path.join(os.path.dirname(__file__), "static/labl_logo_large.png"), "rb").read()).decode()
-        ), unsafe_allow_html=True)
-        
-        # Custom navigation menu
-        st.markdown('<div class="nav-container">', unsafe_allow_html=True)
-        
-        nav_options = [
-            "Basic Settings", 
-            "Rate Settings", 
-            "Surcharge Settings", 
-            "Advanced Settings", 
-            "Carrier Recommendations",
-            "Debug Options"
-        ]
-        
-        # Find all occurrences of experimental_rerun in the app and replace them
-        st.experimental_rerun = st.rerun  # For backward compatibility
-        
-        # Primary navigation rerun
-        for option in nav_options:
-            active_class = "nav-active" if st.session_state.active_section == option else ""
-            button_key = f"nav_{option}"
-            
-            # Create the button with proper functionality - removed help parameter
-            if st.button(option, key=button_key, 
-                        use_container_width=True):
-                st.session_state.active_section = option
-                st.rerun()
-        
+        """, unsafe_allow_html=True)
+
         st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Header for criteria
-        st.header("Quote Criteria")
-        
-        # Basic Settings
-        if st.session_state.active_section == "Basic Settings":
-            st.markdown('<div class="remove-panel-styling"><div class="settings-header">Basic Settings</div>', unsafe_allow_html=True)
-            
-            # Origin ZIP
-            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Origin ZIP Code</div>", unsafe_allow_html=True)
-            origin_zip = st.text_input(
-                label="Origin ZIP",
+
+    # Rate Settings
+    if st.session_state.active_section == "Rate Settings":
+        st.markdown('<div class="remove-panel-styling"><div class="settings-header">Rate Settings</div>', unsafe_allow_html=True)
+
+        # Markup Percentage
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            # Add explicit label with markdown
+            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Markup Percentage (%)</div>", unsafe_allow_html=True)
+            markup = st.number_input(
+                label="Markup Percentage",
                 label_visibility="collapsed",
-                value=st.session_state.criteria.get('origin_zip', '46307'),
-                key="basic_origin_zip"
+                min_value=0.0,
+                max_value=50.0,
+                value=st.session_state.criteria.get('markup_percentage', 10.0),
+                step=0.5,
+                key="rate_markup_percentage",
+                disabled=backend_mode
             )
-            # Update session state immediately when value changes
-            if origin_zip != st.session_state.criteria.get('origin_zip'):
-                st.session_state.criteria['origin_zip'] = origin_zip
-                save_settings_to_calculator()
-            
-            # Service Level
-            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Default Service Level</div>", unsafe_allow_html=True)
-            service_level = st.selectbox(
-                label="Service Level",
+        with col2:
+            # Replace toggle with a standard button that shows locked/unlocked state
+            is_locked = st.session_state.criteria.get('locked_settings', {}).get('markup_percentage', False)
+            button_text = "🔒" if is_locked else "🔓"
+            button_help = "Unlock value" if is_locked else "Lock value"
+
+            # Add spacing to align with input
+            st.write("&nbsp;")
+            if st.button(button_text, key='lock_markup', help=button_help):
+                # Toggle the lock state
+                if is_locked:
+                    st.session_state.criteria['locked_settings']['markup_percentage'] = False
+                else:
+                    if 'locked_settings' not in st.session_state.criteria:
+                        st.session_state.criteria['locked_settings'] = {}
+                    st.session_state.criteria['locked_settings']['markup_percentage'] = True
+                # Force refresh to update the UI
+                st.rerun(scope="fragment")
+
+        # Update session state immediately when value changes
+        if markup != st.session_state.criteria.get('markup_percentage'):
+            st.session_state.criteria['markup_percentage'] = markup
+            save_settings_to_calculator()
+
+        # Solve the markup for a savings or margin target on the processed file
+        if st.session_state.get('processed_data') is not None and st.session_state.get('calculator') is not None:
+            display_markup_optimizer()
+
+        # Fuel Surcharge
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            # Add explicit label with markdown
+            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Fuel Surcharge Percentage (%)</div>", unsafe_allow_html=True)
+            fuel = st.number_input(
+                label="Fuel Surcharge",
                 label_visibility="collapsed",
-                options=['standard', 'expedited', 'priority', 'next_day'],
-                format_func=lambda x: x.replace('_', ' ').title(),
-                index=['standard', 'expedited', 'priority', 'next_day'].index(
-                    st.session_state.criteria.get('service_level', 'standard')
-                ),
-                key="basic_service_level"
+                min_value=0.0,
+                max_value=30.0,
+                value=st.session_state.criteria.get('fuel_surcharge_percentage', 16.0),
+                step=0.5,
+                key="rate_fuel_surcharge",
+                disabled=backend_mode
             )
-            # Update session state immediately when value changes
-            if service_level != st.session_state.criteria.get('service_level'):
-                st.session_state.criteria['service_level'] = service_level
-                save_settings_to_calculator()
-            
-            # Package Type
-            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Default Package Type</div>", unsafe_allow_html=True)
-            package_type = st.selectbox(
-                label="Package Type",
+        with col2:
+            # Replace toggle with a standard button that shows locked/unlocked state
+            is_locked = st.session_state.criteria.get('locked_settings', {}).get('fuel_surcharge_percentage', False)
+            button_text = "🔒" if is_locked else "🔓"
+            button_help = "Unlock value" if is_locked else "Lock value"
+
+            # Add spacing to align with input
+            st.write("&nbsp;")
+            if st.button(button_text, key='lock_fuel', help=button_help):
+                # Toggle the lock state
+                if is_locked:
+                    st.session_state.criteria['locked_settings']['fuel_surcharge_percentage'] = False
+                else:
+                    if 'locked_settings' not in st.session_state.criteria:
+                        st.session_state.criteria['locked_settings'] = {}
+                    st.session_state.criteria['locked_settings']['fuel_surcharge_percentage'] = True
+                # Force refresh to update the UI
+                st.rerun(scope="fragment")
+
+        # Update session state immediately when value changes
+        if fuel != st.session_state.criteria.get('fuel_surcharge_percentage'):
+            st.session_state.criteria['fuel_surcharge_percentage'] = fuel
+            save_settings_to_calculator()
+
+        # Dimensional Weight Divisor
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            # Add explicit label with markdown
+            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Dimensional Weight Divisor</div>", unsafe_allow_html=True)
+            dim = st.number_input(
+                label="Dimensional Weight Divisor",
                 label_visibility="collapsed",
-                options=['box', 'envelope', 'pak'],
-                format_func=lambda x: x.title(),
-                index=['box', 'envelope', 'pak'].index(
-                    st.session_state.criteria.get('package_type', 'box')
-                ),
-                key="basic_package_type"
+                min_value=100,
+                max_value=200,
+                value=st.session_state.criteria.get('dim_divisor', 139),
+                key="rate_dim_divisor",
+                disabled=backend_mode
             )
-            # Update session state immediately when value changes
-            if package_type != st.session_state.criteria.get('package_type'):
-                st.session_state.criteria['package_type'] = package_type
-                save_settings_to_calculator()
-            
-            # Weight Unit
-            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Weight Unit in Uploaded File</div>", unsafe_allow_html=True)
-            weight_unit = st.selectbox(
-                label="Weight Unit",
+        with col2:
+            # Replace toggle with a standard button that shows locked/unlocked state
+            is_locked = st.session_state.criteria.get('locked_settings', {}).get('dim_divisor', False)
+            button_text = "🔒" if is_locked else "🔓"
+            button_help = "Unlock value" if is_locked else "Lock value"
+
+            # Add spacing to align with input
+            st.write("&nbsp;")
+            if st.button(button_text, key='lock_dim', help=button_help):
+                # Toggle the lock state
+                if is_locked:
+                    st.session_state.criteria['locked_settings']['dim_divisor'] = False
+                else:
+                    if 'locked_settings' not in st.session_state.criteria:
+                        st.session_state.criteria['locked_settings'] = {}
+                    st.session_state.criteria['locked_settings']['dim_divisor'] = True
+                # Force refresh to update the UI
+                st.rerun(scope="fragment")
+
+        # Update session state immediately when value changes
+        if dim != st.session_state.criteria.get('dim_divisor'):
+            st.session_state.criteria['dim_divisor'] = dim
+            save_settings_to_calculator()
+
+        # Add explanation for settings
+        st.markdown("""
+        <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
+        <p style="color:black; font-weight:500; margin:0;">Settings are automatically saved as you change them. Use the lock (🔒) to prevent values from being overridden by uploaded data.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Surcharge Settings
+    if st.session_state.active_section == "Surcharge Settings":
+        st.markdown('<div class="remove-panel-styling"><div class="settings-header">Surcharge Settings</div>', unsafe_allow_html=True)
+
+        # DAS Surcharge
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Delivery Area Surcharge (DAS) ($)</div>", unsafe_allow_html=True)
+            das = st.number_input(
+                label="DAS Surcharge",
                 label_visibility="collapsed",
-                options=["", "Ounces (oz)", "Grams (g)"],
-                format_func=lambda x: x if x else "(No conversion, already lbs)",
-                index=["", "Ounces (oz)", "Grams (g)"].index(
-                    st.session_state.criteria.get('weight_unit', "")
-                ),
-                key="basic_weight_unit"
+                min_value=0.0,
+                max_value=20.0,
+                value=st.session_state.criteria.get('das_surcharge', 1.98),
+                step=0.25,
+                key="surcharge_das",
+                disabled=backend_mode
             )
-            # Update session state immediately when value changes
-            if weight_unit != st.session_state.criteria.get('weight_unit'):
-                st.session_state.criteria['weight_unit'] = weight_unit
-                save_settings_to_calculator()
-            
-            # Add explanation for settings
-            st.markdown("""
-            <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
-            <p style="color:black; font-weight:500; margin:0;">Settings are automatically saved as you change them. Use the lock (🔒) to prevent values from being overridden by uploaded data.</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Rate Settings
-        if st.session_state.active_section == "Rate Settings":
-            st.markdown('<div class="remove-panel-styling"><div class="settings-header">Rate Settings</div>', unsafe_allow_html=True)
-                
-            # Markup Percentage
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                # Add explicit label with markdown
-                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Markup Percentage (%)</div>", unsafe_allow_html=True)
-                markup = st.number_input(
-                    label="Markup Percentage",
-                    label_visibility="collapsed",
-                    min_value=0.0,
-                    max_value=50.0,
-                    value=st.session_state.criteria.get('markup_percentage', 10.0),
-                    step=0.5,
-                    key="rate_markup_percentage"
-                )
-            with col2:
-                # Replace toggle with a standard button that shows locked/unlocked state
-                is_locked = st.session_state.criteria.get('locked_settings', {}).get('markup_percentage', False)
-                button_text = "🔒" if is_locked else "🔓"
-                button_help = "Unlock value" if is_locked else "Lock value"
-                
-                # Add spacing to align with input
-                st.write("&nbsp;")
-                if st.button(button_text, key='lock_markup', help=button_help):
-                    # Toggle the lock state
-                    if is_locked:
-                        st.session_state.criteria['locked_settings']['markup_percentage'] = False
-                    else:
-                        if 'locked_settings' not in st.session_state.criteria:
-                            st.session_state.criteria['locked_settings'] = {}
-                        st.session_state.criteria['locked_settings']['markup_percentage'] = True
-                    # Force refresh to update the UI
-                    st.rerun()
-            
-            # Update session state immediately when value changes
-            if markup != st.session_state.criteria.get('markup_percentage'):
-                st.session_state.criteria['markup_percentage'] = markup
-                save_settings_to_calculator()
-                
-            # Fuel Surcharge
-            col1, col2 = st.columns([4, 1])
+        with col2:
+            # Replace toggle with a standard button that shows locked/unlocked state
+            is_locked = st.session_state.criteria.get('locked_settings', {}).get('das_surcharge', False)
+            button_text = "🔒" if is_locked else "🔓"
+            button_help = "Unlock value" if is_locked else "Lock value"
+
+            # Add spacing to align with input
+            st.write("&nbsp;")
+            if st.button(button_text, key='lock_das', help=button_help):
+                # Toggle the lock state
+                if is_locked:
+                    st.session_state.criteria['locked_settings']['das_surcharge'] = False
+                else:
+                    if 'locked_settings' not in st.session_state.criteria:
+                        st.session_state.criteria['locked_settings'] = {}
+                    st.session_state.criteria['locked_settings']['das_surcharge'] = True
+                # Force refresh to update the UI
+                st.rerun(scope="fragment")
+
+        # Update session state immediately when value changes
+        if das != st.session_state.criteria.get('das_surcharge'):
+            st.session_state.criteria['das_surcharge'] = das
+            save_settings_to_calculator()
+
+        # EDAS Surcharge
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Extended Delivery Area Surcharge (EDAS) ($)</div>", unsafe_allow_html=True)
+            edas = st.number_input(
+                label="EDAS Surcharge",
+                label_visibility="collapsed",
+                min_value=0.0,
+                max_value=40.0,
+                value=st.session_state.criteria.get('edas_surcharge', 3.92),
+                step=0.25,
+                key="surcharge_edas",
+                disabled=backend_mode
+            )
+        with col2:
+            # Replace toggle with a standard button that shows locked/unlocked state
+            is_locked = st.session_state.criteria.get('locked_settings', {}).get('edas_surcharge', False)
+            button_text = "🔒" if is_locked else "🔓"
+            button_help = "Unlock value" if is_locked else "Lock value"
+
+            # Add spacing to align with input
+            st.write("&nbsp;")
+            if st.button(button_text, key='lock_edas', help=button_help):
+                # Toggle the lock state
+                if is_locked:
+                    st.session_state.criteria['locked_settings']['edas_surcharge'] = False
+                else:
+                    if 'locked_settings' not in st.session_state.criteria:
+                        st.session_state.criteria['locked_settings'] = {}
+                    st.session_state.criteria['locked_settings']['edas_surcharge'] = True
+                # Force refresh to update the UI
+                st.rerun(scope="fragment")
+
+        # Update session state immediately when value changes
+        if edas != st.session_state.criteria.get('edas_surcharge'):
+            st.session_state.criteria['edas_surcharge'] = edas
+            save_settings_to_calculator()
+
+        # Remote Surcharge
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Remote Area Surcharge ($)</div>", unsafe_allow_html=True)
+            remote = st.number_input(
+                label="Remote Surcharge",
+                label_visibility="collapsed",
+                min_value=0.0,
+                max_value=40.0,
+                value=st.session_state.criteria.get('remote_surcharge', 14.15),
+                step=0.25,
+                key="surcharge_remote",
+                disabled=backend_mode
+            )
+        with col2:
+            # Replace toggle with a standard button that shows locked/unlocked state
+            is_locked = st.session_state.criteria.get('locked_settings', {}).get('remote_surcharge', False)
+            button_text = "🔒" if is_locked else "🔓"
+            button_help = "Unlock value" if is_locked else "Lock value"
+
+            # Add spacing to align with input
+            st.write("&nbsp;")
+            if st.button(button_text, key='lock_remote', help=button_help):
+                # Toggle the lock state
+                if is_locked:
+                    st.session_state.criteria['locked_settings']['remote_surcharge'] = False
+                else:
+                    if 'locked_settings' not in st.session_state.criteria:
+                        st.session_state.criteria['locked_settings'] = {}
+                    st.session_state.criteria['locked_settings']['remote_surcharge'] = True
+                # Force refresh to update the UI
+                st.rerun(scope="fragment")
+
+        # Update session state immediately when value changes
+        if remote != st.session_state.criteria.get('remote_surcharge'):
+            st.session_state.criteria['remote_surcharge'] = remote
+            save_settings_to_calculator()
+
+        # Add explanation for settings
+        st.markdown("""
+        <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
+        <p style="color:black; font-weight:500; margin:0;">Settings are automatically saved as you change them. Use the lock (🔒) to prevent values from being overridden by uploaded data.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Advanced Settings
+    if st.session_state.active_section == "Advanced Settings":
+        st.markdown('<div class="remove-panel-styling"><div class="settings-header">Advanced Settings</div>', unsafe_allow_html=True)
+
+        with st.form("service_markups_form"):
+            st.subheader("Service Level Markups")
+
+            col1, col2 = st.columns(2)
             with col1:
                 # Add explicit label with markdown
-                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Fuel Surcharge Percentage (%)</div>", unsafe_allow_html=True)
-                fuel = st.number_input(
-                    label="Fuel Surcharge",
+                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Standard (%)</div>", unsafe_allow_html=True)
+                standard_markup = st.number_input(
+                    label="Standard",
                     label_visibility="collapsed",
                     min_value=0.0,
-                    max_value=30.0,
-                    value=st.session_state.criteria.get('fuel_surcharge_percentage', 16.0),
-                    step=0.5,
-                    key="rate_fuel_surcharge"
+                    max_value=100.0,
+                    value=st.session_state.criteria.get('standard_markup', 0.0),
+                    step=1.0,
+                    key="adv_standard_markup",
+                    disabled=backend_mode
                 )
             with col2:
-                # Replace toggle with a standard button that shows locked/unlocked state
-                is_locked = st.session_state.criteria.get('locked_settings', {}).get('fuel_surcharge_percentage', False)
-                button_text = "🔒" if is_locked else "🔓"
-                button_help = "Unlock value" if is_locked else "Lock value"
-                
-                # Add spacing to align with input
-                st.write("&nbsp;")
-                if st.button(button_text, key='lock_fuel', help=button_help):
-                    # Toggle the lock state
-                    if is_locked:
-                        st.session_state.criteria['locked_settings']['fuel_surcharge_percentage'] = False
-                    else:
-                        if 'locked_settings' not in st.session_state.criteria:
-                            st.session_state.criteria['locked_settings'] = {}
-                        st.session_state.criteria['locked_settings']['fuel_surcharge_percentage'] = True
-                    # Force refresh to update the UI
-                    st.rerun()
-            
-            # Update session state immediately when value changes
-            if fuel != st.session_state.criteria.get('fuel_surcharge_percentage'):
-                st.session_state.criteria['fuel_surcharge_percentage'] = fuel
-                save_settings_to_calculator()
-                
-            # Dimensional Weight Divisor
-            col1, col2 = st.columns([4, 1])
-            with col1:
                 # Add explicit label with markdown
-                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Dimensional Weight Divisor</div>", unsafe_allow_html=True)
-                dim = st.number_input(
-                    label="Dimensional Weight Divisor",
-                    label_visibility="collapsed",
-                    min_value=100,
-                    max_value=200,
-                    value=st.session_state.criteria.get('dim_divisor', 139),
-                    key="rate_dim_divisor"
-                )
-            with col2:
-                # Replace toggle with a standard button that shows locked/unlocked state
-                is_locked = st.session_state.criteria.get('locked_settings', {}).get('dim_divisor', False)
-                button_text = "🔒" if is_locked else "🔓"
-                button_help = "Unlock value" if is_locked else "Lock value"
-                
-                # Add spacing to align with input
-                st.write("&nbsp;")
-                if st.button(button_text, key='lock_dim', help=button_help):
-                    # Toggle the lock state
-                    if is_locked:
-                        st.session_state.criteria['locked_settings']['dim_divisor'] = False
-                    else:
-                        if 'locked_settings' not in st.session_state.criteria:
-                            st.session_state.criteria['locked_settings'] = {}
-                        st.session_state.criteria['locked_settings']['dim_divisor'] = True
-                    # Force refresh to update the UI
-                    st.rerun()
-            
-            # Update session state immediately when value changes
-            if dim != st.session_state.criteria.get('dim_divisor'):
-                st.session_state.criteria['dim_divisor'] = dim
-                save_settings_to_calculator()
-                
-            # Add explanation for settings
-            st.markdown("""
-            <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
-            <p style="color:black; font-weight:500; margin:0;">Settings are automatically saved as you change them. Use the lock (🔒) to prevent values from being overridden by uploaded data.</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Surcharge Settings
-        if st.session_state.active_section == "Surcharge Settings":
-            st.markdown('<div class="remove-panel-styling"><div class="settings-header">Surcharge Settings</div>', unsafe_allow_html=True)
-            
-            # DAS Surcharge
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Delivery Area Surcharge (DAS) ($)</div>", unsafe_allow_html=True)
-                das = st.number_input(
-                    label="DAS Surcharge",
+                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Expedited (%)</div>", unsafe_allow_html=True)
+                expedited_markup = st.number_input(
+                    label="Expedited",
                     label_visibility="collapsed",
                     min_value=0.0,
-                    max_value=20.0,
-                    value=st.session_state.criteria.get('das_surcharge', 1.98),
-                    step=0.25,
-                    key="surcharge_das"
+                    max_value=100.0,
+                    value=st.session_state.criteria.get('expedited_markup', 10.0),
+                    step=1.0,
+                    key="adv_expedited_markup",
+                    disabled=backend_mode
                 )
-            with col2:
-                # Replace toggle with a standard button that shows locked/unlocked state
-                is_locked = st.session_state.criteria.get('locked_settings', {}).get('das_surcharge', False)
-                button_text = "🔒" if is_locked else "🔓"
-                button_help = "Unlock value" if is_locked else "Lock value"
-                
-                # Add spacing to align with input
-                st.write("&nbsp;")
-                if st.button(button_text, key='lock_das', help=button_help):
-                    # Toggle the lock state
-                    if is_locked:
-                        st.session_state.criteria['locked_settings']['das_surcharge'] = False
-                    else:
-                        if 'locked_settings' not in st.session_state.criteria:
-                            st.session_state.criteria['locked_settings'] = {}
-                        st.session_state.criteria['locked_settings']['das_surcharge'] = True
-                    # Force refresh to update the UI
-                    st.rerun()
-            
-            # Update session state immediately when value changes
-            if das != st.session_state.criteria.get('das_surcharge'):
-                st.session_state.criteria['das_surcharge'] = das
-                save_settings_to_calculator()
-            
-            # EDAS Surcharge
-            col1, col2 = st.columns([4, 1])
+
+            col1, col2 = st.columns(2)
             with col1:
-                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Extended Delivery Area Surcharge (EDAS) ($)</div>", unsafe_allow_html=True)
-                edas = st.number_input(
-                    label="EDAS Surcharge",
+                # Add explicit label with markdown
+                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Priority (%)</div>", unsafe_allow_html=True)
+                priority_markup = st.number_input(
+                    label="Priority",
                     label_visibility="collapsed",
                     min_value=0.0,
-                    max_value=40.0,
-                    value=st.session_state.criteria.get('edas_surcharge', 3.92),
-                    step=0.25,
-                    key="surcharge_edas"
+                    max_value=100.0,
+                    value=st.session_state.criteria.get('priority_markup', 15.0),
+                    step=1.0,
+                    key="adv_priority_markup",
+                    disabled=backend_mode
                 )
             with col2:
-                # Replace toggle with a standard button that shows locked/unlocked state
-                is_locked = st.session_state.criteria.get('locked_settings', {}).get('edas_surcharge', False)
-                button_text = "🔒" if is_locked else "🔓"
-                button_help = "Unlock value" if is_locked else "Lock value"
-                
-                # Add spacing to align with input
-                st.write("&nbsp;")
-                if st.button(button_text, key='lock_edas', help=button_help):
-                    # Toggle the lock state
-                    if is_locked:
-                        st.session_state.criteria['locked_settings']['edas_surcharge'] = False
-                    else:
-                        if 'locked_settings' not in st.session_state.criteria:
-                            st.session_state.criteria['locked_settings'] = {}
-                        st.session_state.criteria['locked_settings']['edas_surcharge'] = True
-                    # Force refresh to update the UI
-                    st.rerun()
-            
-            # Update session state immediately when value changes
-            if edas != st.session_state.criteria.get('edas_surcharge'):
-                st.session_state.criteria['edas_surcharge'] = edas
-                save_settings_to_calculator()
-            
-            # Remote Surcharge
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Remote Area Surcharge ($)</div>", unsafe_allow_html=True)
-                remote = st.number_input(
-                    label="Remote Surcharge",
+                # Add explicit label with markdown
+                st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Next Day (%)</div>", unsafe_allow_html=True)
+                next_day_markup = st.number_input(
+                    label="Next Day",
                     label_visibility="collapsed",
                     min_value=0.0,
-                    max_value=40.0,
-                    value=st.session_state.criteria.get('remote_surcharge', 14.15),
-                    step=0.25,
-                    key="surcharge_remote"
+                    max_value=100.0,
+                    value=st.session_state.criteria.get('next_day_markup', 25.0),
+                    step=1.0,
+                    key="adv_next_day_markup",
+                    disabled=backend_mode
                 )
-            with col2:
-                # Replace toggle with a standard button that shows locked/unlocked state
-                is_locked = st.session_state.criteria.get('locked_settings', {}).get('remote_surcharge', False)
-                button_text = "🔒" if is_locked else "🔓"
-                button_help = "Unlock value" if is_locked else "Lock value"
-                
-                # Add spacing to align with input
-                st.write("&nbsp;")
-                if st.button(button_text, key='lock_remote', help=button_help):
-                    # Toggle the lock state
-                    if is_locked:
-                        st.session_state.criteria['locked_settings']['remote_surcharge'] = False
-                    else:
-                        if 'locked_settings' not in st.session_state.criteria:
-                            st.session_state.criteria['locked_settings'] = {}
-                        st.session_state.criteria['locked_settings']['remote_surcharge'] = True
-                    # Force refresh to update the UI
-                    st.rerun()
-                
-            # Update session state immediately when value changes
-            if remote != st.session_state.criteria.get('remote_surcharge'):
-                st.session_state.criteria['remote_surcharge'] = remote
+
+            submit = st.form_submit_button("Apply Service Level Markups", disabled=backend_mode)
+            if submit:
+                st.session_state.criteria['service_level_markups'] = {
+                    'standard': standard_markup,
+                    'expedited': expedited_markup,
+                    'priority': priority_markup,
+                    'next_day': next_day_markup
+                }
+                st.session_state.criteria['standard_markup'] = standard_markup
+                st.session_state.criteria['expedited_markup'] = expedited_markup
+                st.session_state.criteria['priority_markup'] = priority_markup
+                st.session_state.criteria['next_day_markup'] = next_day_markup
+                # Update calculator if initialized
                 save_settings_to_calculator()
-            
-            # Add explanation for settings
-            st.markdown("""
-            <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
-            <p style="color:black; font-weight:500; margin:0;">Settings are automatically saved as you change them. Use the lock (🔒) to prevent values from being overridden by uploaded data.</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Advanced Settings
-        if st.session_state.active_section == "Advanced Settings":
-            st.markdown('<div class="remove-panel-styling"><div class="settings-header">Advanced Settings</div>', unsafe_allow_html=True)
-            
-            with st.form("service_markups_form"):
-                st.subheader("Service Level Markups")
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    # Add explicit label with markdown
-                    st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Standard (%)</div>", unsafe_allow_html=True)
-                    standard_markup = st.number_input(
-                        label="Standard",
-                        label_visibility="collapsed",
-                        min_value=0.0,
-                        max_value=100.0,
-                        value=st.session_state.criteria.get('standard_markup', 0.0),
-                        step=1.0,
-                        key="adv_standard_markup"
-                    )
-                with col2:
-                    # Add explicit label with markdown
-                    st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Expedited (%)</div>", unsafe_allow_html=True)
-                    expedited_markup = st.number_input(
-                        label="Expedited",
-                        label_visibility="collapsed",
-                        min_value=0.0,
-                        max_value=100.0,
-                        value=st.session_state.criteria.get('expedited_markup', 10.0),
-                        step=1.0,
-                        key="adv_expedited_markup"
-                    )
-                    
-                col1, col2 = st.columns(2)
-                with col1:
-                    # Add explicit label with markdown
-                    st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Priority (%)</div>", unsafe_allow_html=True)
-                    priority_markup = st.number_input(
-                        label="Priority",
-                        label_visibility="collapsed",
-                        min_value=0.0,
-                        max_value=100.0,
-                        value=st.session_state.criteria.get('priority_markup', 15.0),
-                        step=1.0,
-                        key="adv_priority_markup"
-                    )
-                with col2:
-                    # Add explicit label with markdown
-                    st.markdown("<div style='color:black; font-weight:600; margin-bottom:5px; padding:3px;'>Next Day (%)</div>", unsafe_allow_html=True)
-                    next_day_markup = st.number_input(
-                        label="Next Day",
-                        label_visibility="collapsed",
-                        min_value=0.0,
-                        max_value=100.0,
-                        value=st.session_state.criteria.get('next_day_markup', 25.0),
-                        step=1.0,
-                        key="adv_next_day_markup"
-                    )
-                    
-                submit = st.form_submit_button("Apply Service Level Markups")
-                if submit:
-                    st.session_state.criteria['service_level_markups'] = {
-                        'standard': standard_markup,
-                        'expedited': expedited_markup,
-                        'priority': priority_markup,
-                        'next_day': next_day_markup
-                    }
-                    st.session_state.criteria['standard_markup'] = standard_markup
-                    st.session_state.criteria['expedited_markup'] = expedited_markup
-                    st.session_state.criteria['priority_markup'] = priority_markup
-                    st.session_state.criteria['next_day_markup'] = next_day_markup
-                    # Update calculator if initialized
-                    save_settings_to_calculator()
-                    st.success("Service level markups applied and saved!")
-            
-            # Additional Advanced Settings section
-            st.subheader("Additional Advanced Settings")
-            
-            # Add explanation for settings in forms
-            st.markdown("""
-            <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
-            <p style="color:black; font-weight:500; margin:0;">Settings in the form above need to be applied with the button. All settings persist between navigation tabs.</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Carrier Recommendations
-        if st.session_state.active_section == "Carrier Recommendations":
-            st.markdown('<div class="remove-panel-styling"><div class="settings-header">Carrier Recommendations</div>', unsafe_allow_html=True)
-            
-            st.markdown("""
-            <div style="background-color:#fff3cd; border:1px solid #ffeaa7; padding:10px; border-radius:5px; margin-bottom:15px;">
-            <p style="color:black; font-weight:500; margin:0;">💡 <strong>Smart Analysis:</strong> Shipments with EDAS or Remote surcharges are often better handled by other carriers. Use these settings to optimize your analysis.</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Enable carrier recommendations
-            enable_recommendations = st.checkbox(
-                "Enable Smart Carrier Recommendations",
-                value=st.session_state.criteria.get('enable_carrier_recommendations', True),
-                help="Flag shipments that should be sent via alternative carriers"
+                st.success("Service level markups applied and saved!")
+
+        # Additional Advanced Settings section
+        st.subheader("Additional Advanced Settings")
+
+        # Where uploads are rated; the backend option needs LABL_IQ_BACKEND_URL
+        if BACKEND_URL:
+            processing = st.selectbox(
+                "Processing",
+                options=['local', 'backend'],
+                format_func=lambda x: {'local': 'Rate in this app', 'backend': 'Rate on the job backend'}[x],
+                index=['local', 'backend'].index(st.session_state.criteria.get('processing', 'local')),
+                help=f"Backend jobs run on separate workers at {BACKEND_URL}"
             )
-            
+            if processing != st.session_state.criteria.get('processing', 'local'):
+                st.session_state.criteria['processing'] = processing
+                # The results step depends on this setting, so rerun the whole app
+                st.rerun()
+
+        # Add explanation for settings in forms
+        st.markdown("""
+        <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
+        <p style="color:black; font-weight:500; margin:0;">Settings in the form above need to be applied with the button. All settings persist between navigation tabs.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Carrier Recommendations
+    if st.session_state.active_section == "Carrier Recommendations":
+        st.markdown('<div class="remove-panel-styling"><div class="settings-header">Carrier Recommendations</div>', unsafe_allow_html=True)
+
+        st.markdown("""
+        <div style="background-color:#fff3cd; border:1px solid #ffeaa7; padding:10px; border-radius:5px; margin-bottom:15px;">
+        <p style="color:black; font-weight:500; margin:0;">💡 <strong>Smart Analysis:</strong> Shipments with EDAS or Remote surcharges are often better handled by other carriers. Use these settings to optimize your analysis.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Enable carrier recommendations
+        enable_recommendations = st.checkbox(
+            "Enable Smart Carrier Recommendations",
+            value=st.session_state.criteria.get('enable_carrier_recommendations', True),
+            help="Flag shipments that should be sent via alternative carriers",
+            disabled=backend_mode
+        )
+
+        # Update session state
+        if enable_recommendations != st.session_state.criteria.get('enable_carrier_recommendations'):
+            st.session_state.criteria['enable_carrier_recommendations'] = enable_recommendations
+            save_settings_to_calculator()
+            # The results view depends on this setting, so rerun the whole app
+            st.rerun()
+
+        if enable_recommendations:
+            # Analysis mode selection
+            analysis_mode = st.selectbox(
+                "Analysis Mode",
+                options=['dual_analysis', 'filtered_analysis', 'flag_only'],
+                format_func=lambda x: {
+                    'dual_analysis': 'Dual Analysis (Show both with/without EDAS/Remote)',
+                    'filtered_analysis': 'Filtered Analysis (Exclude EDAS/Remote shipments)',
+                    'flag_only': 'Flag Only (Show all shipments, mark recommendations)'
+                }[x],
+                index=['dual_analysis', 'filtered_analysis', 'flag_only'].index(
+                    st.session_state.criteria.get('analysis_mode', 'dual_analysis')
+                ),
+                help="Choose how to handle EDAS and Remote shipments in the analysis"
+            )
+
             # Update session state
-            if enable_recommendations != st.session_state.criteria.get('enable_carrier_recommendations'):
-                st.session_state.criteria['enable_carrier_recommendations'] = enable_recommendations
+            if analysis_mode != st.session_state.criteria.get('analysis_mode'):
+                st.session_state.criteria['analysis_mode'] = analysis_mode
                 save_settings_to_calculator()
-            
-            if enable_recommendations:
-                # Analysis mode selection
-                analysis_mode = st.selectbox(
-                    "Analysis Mode",
-                    options=['dual_analysis', 'filtered_analysis', 'flag_only'],
-                    format_func=lambda x: {
-                        'dual_analysis': 'Dual Analysis (Show both with/without EDAS/Remote)',
-                        'filtered_analysis': 'Filtered Analysis (Exclude EDAS/Remote shipments)',
-                        'flag_only': 'Flag Only (Show all shipments, mark recommendations)'
-                    }[x],
-                    index=['dual_analysis', 'filtered_analysis', 'flag_only'].index(
-                        st.session_state.criteria.get('analysis_mode', 'dual_analysis')
-                    ),
-                    help="Choose how to handle EDAS and Remote shipments in the analysis"
-                )
-                
-                # Update session state
-                if analysis_mode != st.session_state.criteria.get('analysis_mode'):
-                    st.session_state.criteria['analysis_mode'] = analysis_mode
-                    save_settings_to_calculator()
-                
-                # Surcharge thresholds for recommendations
-                st.subheader("Recommendation Thresholds")
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    edas_threshold = st.number_input(
-                        "EDAS Threshold ($)",
-                        min_value=0.0,
-                        max_value=10.0,
-                        value=st.session_state.criteria.get('edas_threshold', 3.92),
-                        step=0.01,
-                        help="Shipments with EDAS surcharge above this amount will be flagged"
-                    )
-                    
-                    # Update session state
-                    if edas_threshold != st.session_state.criteria.get('edas_threshold'):
-                        st.session_state.criteria['edas_threshold'] = edas_threshold
-                        save_settings_to_calculator()
-                
-                with col2:
-                    remote_threshold = st.number_input(
-                        "Remote Threshold ($)",
-                        min_value=0.0,
-                        max_value=20.0,
-                        value=st.session_state.criteria.get('remote_threshold', 14.15),
-                        step=0.01,
-                        help="Shipments with Remote surcharge above this amount will be flagged"
-                    )
-                    
-                    # Update session state
-                    if remote_threshold != st.session_state.criteria.get('remote_threshold'):
-                        st.session_state.criteria['remote_threshold'] = remote_threshold
-                        save_settings_to_calculator()
-                
-                # Additional options
-                st.subheader("Additional Options")
-                
-                show_excluded_summary = st.checkbox(
-                    "Show Excluded Shipments Summary",
-                    value=st.session_state.criteria.get('show_excluded_summary', True),
-                    help="Display summary of shipments excluded from analysis due to EDAS or Remote surcharges"
+                # The results view depends on this setting, so rerun the whole app
+                st.rerun()
+
+            # Surcharge thresholds for recommendations
+            st.subheader("Recommendation Thresholds")
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                edas_threshold = st.number_input(
+                    "EDAS Threshold ($)",
+                    min_value=0.0,
+                    max_value=10.0,
+                    value=st.session_state.criteria.get('edas_threshold', 3.92),
+                    step=0.01,
+                    help="Shipments with EDAS surcharge above this amount will be flagged"
                 )
-                
+
                 # Update session state
-                if show_excluded_summary != st.session_state.criteria.get('show_excluded_summary'):
-                    st.session_state.criteria['show_excluded_summary'] = show_excluded_summary
+                if edas_threshold != st.session_state.criteria.get('edas_threshold'):
+                    st.session_state.criteria['edas_threshold'] = edas_threshold
                     save_settings_to_calculator()
-                
-                include_recommendations_in_export = st.checkbox(
-                    "Include Recommendations in Export",
-                    value=st.session_state.criteria.get('include_recommendations_in_export', True),
-                    help="Add carrier recommendation column to exported data"
+
+            with col2:
+                remote_threshold = st.number_input(
+                    "Remote Threshold ($)",
+                    min_value=0.0,
+                    max_value=20.0,
+                    value=st.session_state.criteria.get('remote_threshold', 14.15),
+                    step=0.01,
+                    help="Shipments with Remote surcharge above this amount will be flagged"
                 )
-                
+
                 # Update session state
-                if include_recommendations_in_export != st.session_state.criteria.get('include_recommendations_in_export'):
-                    st.session_state.criteria['include_recommendations_in_export'] = include_recommendations_in_export
+                if remote_threshold != st.session_state.criteria.get('remote_threshold'):
+                    st.session_state.criteria['remote_threshold'] = remote_threshold
                     save_settings_to_calculator()
-                
-                # Explanation of modes
-                st.markdown("""
-                <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
-                <p style="color:black; font-weight:500; margin:0 0 10px 0;"><strong>Analysis Modes:</strong></p>
-                <ul style="color:black; margin:0; padding-left:20px;">
-                <li><strong>Dual Analysis:</strong> Shows savings both with and without EDAS/Remote shipments</li>
-                <li><strong>Filtered Analysis:</strong> Excludes EDAS/Remote shipments to show "clean" savings</li>
-                <li><strong>Flag Only:</strong> Shows all shipments but marks which ones should use alternative carriers</li>
-                </ul>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Debug Options
-        if st.session_state.active_section == "Debug Options":
-            st.markdown('<div class="remove-panel-styling"><div class="settings-header">Debug Options</div>', unsafe_allow_html=True)
-            
-            # Replace toggle with a button-based approach for better visibility
-            is_debug_enabled = st.session_state.criteria.get('debug_mode', False)
-            debug_button_text = "Disable Debug Mode" if is_debug_enabled else "Enable Debug Mode"
-            debug_button_help = "Turn off detailed logging" if is_debug_enabled else "Turn on detailed logging for troubleshooting"
-            
-            if st.button(debug_button_text, help=debug_button_help, key="debug_mode_button"):
-                # Toggle the debug mode
-                st.session_state.criteria['debug_mode'] = not is_debug_enabled
-                # Set appropriate logging level
-                if not is_debug_enabled:  # Toggling from False to True
-                    logging.getLogger('labl_iq.calc_engine').setLevel(logging.DEBUG)
-                    st.info("Debug logging enabled")
-                else:  # Toggling from True to False
-                    logging.getLogger('labl_iq.calc_engine').setLevel(logging.INFO)
-                # Save setting
+
+            # Additional options
+            st.subheader("Additional Options")
+
+            show_excluded_summary = st.checkbox(
+                "Show Excluded Shipments Summary",
+                value=st.session_state.criteria.get('show_excluded_summary', True),
+                help="Display summary of shipments excluded from analysis due to EDAS or Remote surcharges"
+            )
+
+            # Update session state
+            if show_excluded_summary != st.session_state.criteria.get('show_excluded_summary'):
+                st.session_state.criteria['show_excluded_summary'] = show_excluded_summary
                 save_settings_to_calculator()
-                # Force refresh to update the UI
-                st.rerun()
-            
-            # Show current debug status
-            if is_debug_enabled:
-                st.info("Debug mode is currently enabled")
-            else:
-                st.info("Debug mode is currently disabled")
-            
-            # Display current settings for debugging
-            if is_debug_enabled:
-                st.subheader("Current Settings")
-                st.json(st.session_state.criteria)
-                
-                st.subheader("Locked Settings")
-                st.json(st.session_state.criteria.get('locked_settings', {}))
-            
-            # Add explanation for automatic saving
+
+            include_recommendations_in_export = st.checkbox(
+                "Include Recommendations in Export",
+                value=st.session_state.criteria.get('include_recommendations_in_export', True),
+                help="Add carrier recommendation column to exported data"
+            )
+
+            # Update session state
+            if include_recommendations_in_export != st.session_state.criteria.get('include_recommendations_in_export'):
+                st.session_state.criteria['include_recommendations_in_export'] = include_recommendations_in_export
+                save_settings_to_calculator()
+
+            # Explanation of modes
             st.markdown("""
             <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
-            <p style="color:black; font-weight:500; margin:0;">Debug settings are automatically saved as you change them.</p>
+            <p style="color:black; font-weight:500; margin:0 0 10px 0;"><strong>Analysis Modes:</strong></p>
+            <ul style="color:black; margin:0; padding-left:20px;">
+            <li><strong>Dual Analysis:</strong> Shows savings both with and without EDAS/Remote shipments</li>
+            <li><strong>Filtered Analysis:</strong> Excludes EDAS/Remote shipments to show "clean" savings</li>
+            <li><strong>Flag Only:</strong> Shows all shipments but marks which ones should use alternative carriers</li>
+            </ul>
             </div>
             """, unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Debug Options
+    if st.session_state.active_section == "Debug Options":
+        st.markdown('<div class="remove-panel-styling"><div class="settings-header">Debug Options</div>', unsafe_allow_html=True)
+
+        # Replace toggle with a button-based approach for better visibility
+        is_debug_enabled = st.session_state.criteria.get('debug_mode', False)
+        debug_button_text = "Disable Debug Mode" if is_debug_enabled else "Enable Debug Mode"
+        debug_button_help = "Turn off detailed logging" if is_debug_enabled else "Turn on detailed logging for troubleshooting"
+
+        if st.button(debug_button_text, help=debug_button_help, key="debug_mode_button"):
+            # Toggle the debug mode
+            st.session_state.criteria['debug_mode'] = not is_debug_enabled
+            # Set appropriate logging level
+            if not is_debug_enabled:  # Toggling from False to True
+                logging.getLogger('labl_iq.calc_engine').setLevel(logging.DEBUG)
+                st.info("Debug logging enabled")
+            else:  # Toggling from True to False
+                logging.getLogger('labl_iq.calc_engine').setLevel(logging.INFO)
+            # Save setting
+            save_settings_to_calculator()
+            # Force refresh to update the UI
+            st.rerun(scope="fragment")
+
+        # Show current debug status
+        if is_debug_enabled:
+            st.info("Debug mode is currently enabled")
+        else:
+            st.info("Debug mode is currently disabled")
+
+        # Display current settings for debugging
+        if is_debug_enabled:
+            st.subheader("Current Settings")
+            st.json(st.session_state.criteria)
+
+            st.subheader("Locked Settings")
+            st.json(st.session_state.criteria.get('locked_settings', {}))
+
+        # Add explanation for automatic saving
+        st.markdown("""
+        <div style="background-color:#f0f7ff; border:1px solid #c5d5eb; padding:10px; border-radius:5px; margin-top:15px;">
+        <p style="color:black; font-weight:500; margin:0;">Debug settings are automatically saved as you change them.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+def main():
+    # Sidebar for navigation and settings
+    with st.sidebar:
+        # Logo and header
+        st.markdown("""
+        <div class="sidebar-logo" style="margin-top:20px;">
+            <img src="data:image/png;base64,{}"/>
+            <span>IQ</span>
+        </div>
+        """.format(
+            base64.b64encode(open(os.path.join(os.path.dirname(__file__), "static/labl_logo_large.png"), "rb").read()).decode()
+        ), unsafe_allow_html=True)
+        
+        # Find all occurrences of experimental_rerun in the app and replace them
+        st.experimental_rerun = st.rerun  # For backward compatibility
+        
+        # Navigation and criteria rerun as a fragment, without re-rendering the results
+        display_criteria_settings()
     
     # Main content area
     # Navigation logic based on app_step
@@ -1903,11 +2559,19 @@ def main():
     if app_step == 'upload':
         st.write("Upload your shipment data to begin")
         if 'uploaded_df' not in st.session_state:
-            uploaded_file = st.file_uploader("Choose a CSV file", type="csv", key="persistent_file_uploader")
-            if uploaded_file is not None:
+            uploaded_files = st.file_uploader(
+                "Choose CSV files (or .zip archives of CSVs)",
+                type=["csv", "zip"],
+                accept_multiple_files=True,
+                key="persistent_file_uploader",
+                help="Files are analyzed together as one dataset; they must share the same columns"
+            )
+            if uploaded_files and st.button(f"Continue with {len(uploaded_files)} file(s)", key="upload_continue"):
                 try:
-                    df = pd.read_csv(uploaded_file)
-                    st.session_state['uploaded_df'] = df
+                    # Only a sample of the first file is parsed for mapping; the mapped columns are re-read on processing
+                    sources = expand_uploads([(f.name, f.getvalue()) for f in uploaded_files])
+                    st.session_state['uploaded_sources'] = sources
+                    st.session_state['uploaded_df'] = sniff_upload(sources[0][1])
                     st.session_state['app_step'] = 'mapping'
                     st.experimental_rerun()
                 except Exception as e:
@@ -1921,6 +2585,10 @@ def main():
     if app_step == 'mapping':
         df = st.session_state['uploaded_df']
         try:
+            sources = st.session_state['uploaded_sources']
+            if len(sources) > 1:
+                st.info(f"{len(sources)} files will be analyzed together with one column mapping: "
+                        + ", ".join(name for name, _ in sources))
             st.subheader("Data Preview")
             st.dataframe(df.head())
             st.subheader("Map Your CSV Columns")
@@ -1953,8 +2621,25 @@ def main():
                         index=list(df.columns).index(suggested_mapping.get(field, df.columns[0]))
                         if field in suggested_mapping else 0
                     )
+                # Origin ZIP per row for multi-warehouse files; unmapped uses the client origin ZIP
+                origin_options = [CLIENT_ORIGIN_OPTION] + list(df.columns)
+                suggested_origin = suggested_mapping.get('origin_zip')
+                origin_col = st.selectbox(
+                    "Origin Zip",
+                    options=origin_options,
+                    index=origin_options.index(suggested_origin) if suggested_origin in origin_options else 0
+                )
+                if origin_col != CLIENT_ORIGIN_OPTION:
+                    mapping['origin_zip'] = origin_col
             save_mapping_checkbox = st.checkbox("Save this mapping for future use")
             if st.button("Process Data"):
+                try:
+                    st.session_state['mapped_df'] = read_mapped_sources(st.session_state['uploaded_sources'], mapping)
+                except Exception as e:
+                    st.error(f"Error reading mapped columns: {str(e)}")
+                    st.stop()
+                # Only the mapped columns are needed from here on
+                st.session_state.pop('uploaded_sources', None)
                 st.session_state['mapping'] = mapping
                 st.session_state['save_mapping_checkbox'] = save_mapping_checkbox
                 st.session_state['app_step'] = 'results'
@@ -1963,272 +2648,170 @@ def main():
             st.error(f"Error in mapping step: {str(e)}")
         return
 
+    if app_step == 'results' and st.session_state.criteria.get('processing') == 'backend':
+        display_backend_analysis()
+        return
+
     if app_step == 'results':
-        df = st.session_state['uploaded_df']
         mapping = st.session_state.get('mapping', {})
         save_mapping_checkbox = st.session_state.get('save_mapping_checkbox', False)
         try:
             with st.spinner("Processing data..."):
                 try:
-                    # Save mapping if requested
-                    if save_mapping_checkbox:
-                        save_mapping(mapping)
-                    
-                    if 'debug_mode' in locals() and debug_mode:
-                        st.write("Starting data processing...")
-                    
-                    # Define summary columns for display and export
-                    summary_columns = [
-                        'shipment_id',
-                        'destination_zip',
-                        'weight',
-                        'dim_weight',
-                        'billable_weight',
-                        'zone',
-                        'service_level',
-                        'base_rate',
-                        'fuel_surcharge',
-                        'das_surcharge',
-                        'edas_surcharge',
-                        'remote_surcharge',
-                        'total_surcharges',
-                        'markup_amount',
-                        'final_rate',
-                        'carrier_rate',
-                        'savings',
-                        'savings_percent'
-                    ]
-                    
-                    # Create processed dataframe
-                    processed_df = pd.DataFrame()
+                    if 'mapped_df' not in st.session_state:
+                        # Rated on an earlier run; the mapped upload has been released
+                        processed_df = st.session_state.processed_data
+                    else:
+                        # Save mapping if requested
+                        if save_mapping_checkbox:
+                            save_mapping(mapping)
                     
-                    # Copy mapped columns and ensure all column names are strings
-                    for field, col in mapping.items():
-                        processed_df[field] = df[col]
+                        if 'debug_mode' in locals() and debug_mode:
+                            st.write("Starting data processing...")
                     
-                    # Ensure all column names are strings to prevent mixed type warnings
-                    processed_df.columns = processed_df.columns.astype(str)
+                        # Mapped columns only, already named by field and typed on read
+                        processed_df = st.session_state['mapped_df'].copy()
                     
-                    # Also ensure the original DataFrame columns are strings
-                    df.columns = df.columns.astype(str)
+                        if 'debug_mode' in locals() and debug_mode:
+                            st.write(f"Initial mapped data shape: {processed_df.shape}")
+                            st.write(processed_df.head())
                     
-                    # Ensure all DataFrames have string column names to prevent mixed type warnings
+                        # Convert weight to lbs if needed
+                        weight_unit = st.session_state.criteria.get('weight_unit', "")
+                        if weight_unit in WEIGHT_UNIT_DIVISORS:
+                            processed_df['weight'] = processed_df['weight'].astype(float) / WEIGHT_UNIT_DIVISORS[weight_unit]
                     
-                    # Apply to all DataFrames
-                    df = ensure_string_columns(df)
-                    processed_df = ensure_string_columns(processed_df)
+                        # Build the shipment frame (billable weight, service level, origin) in one pass
+                        shipments = build_shipment_frame(processed_df, st.session_state.criteria)
                     
-                    if 'debug_mode' in locals() and debug_mode:
-                        st.write(f"Initial mapped data shape: {processed_df.shape}")
-                        st.write(processed_df.head())
+                        if 'debug_mode' in locals() and debug_mode:
+                            st.write(f"Prepared {len(shipments)} shipments for rating")
+                            st.write(shipments.head())
                     
-                    # Convert weight to lbs if needed
-                    weight_unit = st.session_state.criteria.get('weight_unit', "")
-                    if weight_unit == "Ounces (oz)":
-                        processed_df['weight'] = processed_df['weight'].astype(float) / 16.0
-                    elif weight_unit == "Grams (g)":
-                        processed_df['weight'] = processed_df['weight'].astype(float) / 453.592
+                        if shipments.empty:
+                            st.error("No valid shipments to process. Check your data and mapping.")
+                            return
                     
-                    # Convert DataFrame to list of shipment dictionaries
-                    shipments = []
-                    for idx, row in processed_df.iterrows():
-                        # Standardize service level
-                        service_level = str(row.get('service_level', 'standard')).lower()
-                        if 'ground' in service_level:
-                            service_level = 'standard'
-                        elif 'express' in service_level:
-                            service_level = 'expedited'
-                        elif 'priority' in service_level:
-                            service_level = 'priority'
-                        elif 'next day' in service_level or 'next-day' in service_level:
-                            service_level = 'next_day'
-                        else:
-                            service_level = st.session_state.criteria.get('service_level', 'standard')
-                        
-                        try:
-                            # Calculate dimensional weight
-                            dim_weight = 0.0
+                        # Initialize calculator if not already done
+                        if st.session_state.calculator is None:
                             try:
-                                dim_weight = (float(row['length']) * float(row['width']) * float(row['height'])) / st.session_state.criteria.get('dim_divisor', 139.0)
-                            except (ValueError, KeyError, TypeError):
-                                dim_weight = float(row.get('weight', 0))
-                            
-                            # Store carrier rate as-is for reference
-                            carrier_rate = float(row['carrier_rate'])
-                            
-                            # Determine billable weight (greater of actual weight and dimensional weight)
-                            weight = float(row['weight'])
-                            billable_weight = max(weight, dim_weight)
-                            
-                            shipment = {
-                                'shipment_id': str(row.get('shipment_id', '')),
-                                'origin_zip': st.session_state.criteria['origin_zip'],
-                                'destination_zip': str(row['destination_zip']),
-                                'weight': weight,
-                                'billable_weight': billable_weight,
-                                'dim_weight': dim_weight,
-                                'length': float(row['length']),
-                                'width': float(row['width']),
-                                'height': float(row['height']),
-                                'package_type': row.get('package_type', st.session_state.criteria.get('package_type', 'box')),
-                                'service_level': service_level,
-                                'carrier_rate': carrier_rate
-                            }
-                            shipments.append(shipment)
-                        except Exception as e:
-                            if 'debug_mode' in locals() and debug_mode:
-                                st.error(f"Error processing row {idx}: {str(e)}")
-                            st.write(row)
-                    
-                    if 'debug_mode' in locals() and debug_mode:
-                        st.write(f"Converted {len(shipments)} shipments to dictionaries")
-                        st.write("First shipment:", shipments[0] if shipments else "No shipments")
-                    
-                    if not shipments:
-                        st.error("No valid shipments to process. Check your data and mapping.")
-                        return
-                    
-                    # Initialize calculator if not already done
-                    if st.session_state.calculator is None:
-                        try:
-                            # Build configuration from session state
-                            config = {
-                                'dim_divisor': st.session_state.criteria.get('dim_divisor', 139),
-                                'min_billable_weight': st.session_state.criteria.get('min_billable_weight', 1.0),
-                                'enable_das': st.session_state.criteria.get('enable_das', True),
-                                'das_amount': st.session_state.criteria.get('das_amount', 1.98),
-                                'edas_amount': st.session_state.criteria.get('edas_amount', 3.92),
-                                'remote_amount': st.session_state.criteria.get('remote_amount', 14.15),
-                                'fuel_surcharge_percentage': st.session_state.criteria.get('fuel_surcharge_percentage', 16.0),
-                                'service_level_markups': {
-                                    'standard': st.session_state.criteria.get('standard_markup', 10.0),
-                                    'expedited': st.session_state.criteria.get('expedited_markup', 10.0),
-                                    'priority': st.session_state.criteria.get('priority_markup', 10.0),
-                                    'next_day': st.session_state.criteria.get('next_day_markup', 10.0)
+                                # Build configuration from session state
+                                config = {
+                                    'dim_divisor': st.session_state.criteria.get('dim_divisor', 139),
+                                    'min_billable_weight': st.session_state.criteria.get('min_billable_weight', 1.0),
+                                    'enable_das': st.session_state.criteria.get('enable_das', True),
+                                    'das_amount': st.session_state.criteria.get('das_amount', 1.98),
+                                    'edas_amount': st.session_state.criteria.get('edas_amount', 3.92),
+                                    'remote_amount': st.session_state.criteria.get('remote_amount', 14.15),
+                                    'fuel_surcharge_percentage': st.session_state.criteria.get('fuel_surcharge_percentage', 16.0),
+                                    'service_level_markups': {
+                                        'standard': st.session_state.criteria.get('standard_markup', 10.0),
+                                        'expedited': st.session_state.criteria.get('expedited_markup', 10.0),
+                                        'priority': st.session_state.criteria.get('priority_markup', 10.0),
+                                        'next_day': st.session_state.criteria.get('next_day_markup', 10.0)
+                                    }
                                 }
-                            }
                             
-                            # Try to find the template file in various locations
-                            template_path = "2025 Amazon Quote Tool Template.xlsx"
-                            template_found = False
+                                # Try to find the template file in various locations
+                                template_path = "2025 Amazon Quote Tool Template.xlsx"
+                                template_found = False
                             
-                            # Define the absolute path to the current directory
-                            current_dir = os.path.abspath(os.path.dirname(__file__))
+                                # Define the absolute path to the current directory
+                                current_dir = os.path.abspath(os.path.dirname(__file__))
                             
-                            # Define possible paths to search for the template file
-                            possible_paths = [
-                                os.path.join(current_dir, "data", "templates", template_path),  # data/templates subdirectory
-                                os.path.join(current_dir, "data", template_path),  # data subdirectory
-                                os.path.join(current_dir, template_path),  # Same directory as this file
-                                os.path.join(os.path.dirname(current_dir), "data", "templates", template_path),  # Parent data/templates directory
-                                os.path.join(os.path.dirname(current_dir), "data", template_path),  # Parent data directory
-                                os.path.join(os.path.dirname(current_dir), template_path),  # Parent directory
-                                os.path.join("/mount/src/labl-iq-rate-analyzer/data/templates", template_path),  # Streamlit Cloud data/templates directory
-                                os.path.join("/mount/src/labl-iq-rate-analyzer/data", template_path),  # Streamlit Cloud data directory
-                                os.path.join("/mount/src/labl-iq-rate-analyzer", template_path),  # Streamlit Cloud root
-                                os.path.join("/mount/src", template_path),  # Streamlit Cloud mount point
-                                template_path  # Current directory
-                            ]
+                                # Define possible paths to search for the template file
+                                possible_paths = [
+                                    os.path.join(current_dir, "data", "templates", template_path),  # data/templates subdirectory
+                                    os.path.join(current_dir, "data", template_path),  # data subdirectory
+                                    os.path.join(current_dir, template_path),  # Same directory as this file
+                                    os.path.join(os.path.dirname(current_dir), "data", "templates", template_path),  # Parent data/templates directory
+                                    os.path.join(os.path.dirname(current_dir), "data", template_path),  # Parent data directory
+                                    os.path.join(os.path.dirname(current_dir), template_path),  # Parent directory
+                                    os.path.join("/mount/src/labl-iq-rate-analyzer/data/templates", template_path),  # Streamlit Cloud data/templates directory
+                                    os.path.join("/mount/src/labl-iq-rate-analyzer/data", template_path),  # Streamlit Cloud data directory
+                                    os.path.join("/mount/src/labl-iq-rate-analyzer", template_path),  # Streamlit Cloud root
+                                    os.path.join("/mount/src", template_path),  # Streamlit Cloud mount point
+                                    template_path  # Current directory
+                                ]
                             
-                            # Log the search paths for debugging
-                            if st.session_state.criteria.get('debug_mode', False):
-                                st.write("Searching for template file in:")
-                                for path in possible_paths:
-                                    st.write(f"- {path}")
+                                # Log the search paths for debugging
+                                if st.session_state.criteria.get('debug_mode', False):
+                                    st.write("Searching for template file in:")
+                                    for path in possible_paths:
+                                        st.write(f"- {path}")
                             
-                            # Try each path
-                            for path in possible_paths:
-                                if os.path.isfile(path):
-                                    template_path = path
-                                    template_found = True
-                                    if st.session_state.criteria.get('debug_mode', False):
-                                        st.success(f"Template file found at: {template_path}")
-                                    break
+                                # Try each path
+                                for path in possible_paths:
+                                    if os.path.isfile(path):
+                                        template_path = path
+                                        template_found = True
+                                        if st.session_state.criteria.get('debug_mode', False):
+                                            st.success(f"Template file found at: {template_path}")
+                                        break
                             
-                            if not template_found:
-                                st.error(f"Template file not found. Searched in: {', '.join(possible_paths)}")
-                                return
+                                if not template_found:
+                                    st.error(f"Template file not found. Searched in: {', '.join(possible_paths)}")
+                                    return
                                 
-                            st.session_state.calculator = AmazonRateCalculator(template_path)
+                                st.session_state.calculator = AmazonRateCalculator(template_path)
                             
-                            # Update the calculator with our configuration
-                            st.session_state.calculator.update_criteria(config)
-                            st.success("Rate calculator initialized successfully!")
+                                # Update the calculator with our configuration
+                                st.session_state.calculator.update_criteria(config)
+                                st.success("Rate calculator initialized successfully!")
                             
-                        except Exception as e:
-                            st.error(f"Error initializing rate calculator: {str(e)}")
-                            st.exception(e)  # Show full stack trace
-                            return
+                            except Exception as e:
+                                st.error(f"Error initializing rate calculator: {str(e)}")
+                                st.exception(e)  # Show full stack trace
+                                return
                     
-                    # Update calculator criteria with current session state settings
-                    if 'debug_mode' in locals() and debug_mode:
-                        st.write("Updating calculator criteria...")
-                    st.session_state.calculator.update_criteria(st.session_state.criteria)
+                        # Update calculator criteria with current session state settings
+                        if 'debug_mode' in locals() and debug_mode:
+                            st.write("Updating calculator criteria...")
+                        st.session_state.calculator.update_criteria(st.session_state.criteria)
                     
-                    # Calculate rates using the calculator
-                    if 'debug_mode' in locals() and debug_mode:
-                        st.write("Calculating rates...")
-                    results = st.session_state.calculator.calculate_rates(shipments)
+                        # Large uploads: show projected results from a stratified sample before the full run
+                        if len(shipments) > PREVIEW_THRESHOLD:
+                            rated_sample, projection = preview_rates(st.session_state.calculator, shipments)
+                            display_preview_projection(projection, len(rated_sample), len(shipments))
                     
-                    if 'debug_mode' in locals() and debug_mode:
-                        st.write(f"Got {len(results)} results")
-                        st.write("First result:", results[0] if results else "No results")
+                        # Calculate rates using the calculator
+                        if 'debug_mode' in locals() and debug_mode:
+                            st.write("Calculating rates...")
+                        processed_df = st.session_state.calculator.calculate_rates_frame(shipments)
                     
-                    # Convert results back to DataFrame
-                    processed_df = pd.DataFrame(results)
+                        # Report shipments that could not be rated, grouped by error code
+                        error_summary = summarize_errors(processed_df)
+                        if not error_summary.empty:
+                            st.warning(f"{int(error_summary['shipments'].sum())} shipments could not be rated:")
+                            for _, error_row in error_summary.iterrows():
+                                st.write(f"• {error_row['message']}: {error_row['shipments']}")
                     
-                    if 'debug_mode' in locals() and debug_mode:
-                        st.write("Processed data shape:", processed_df.shape)
-                        st.write(processed_df.head())
+                        if 'debug_mode' in locals() and debug_mode:
+                            st.write("Processed data shape:", processed_df.shape)
+                            st.write(processed_df.head())
                     
-                    # Store processed data in session state
-                    st.session_state.processed_data = processed_df
+                        # Store processed data and its single-pass summary (incl. percentile sketches)
+                        st.session_state.processed_data = processed_df
+                        st.session_state.rate_summary = RateSummaryAccumulator().update(processed_df)
+                        # Aggregate once; the result tabs and exports derive their tables from the cube
+                        st.session_state.aggregate_cube = build_aggregate_cube(processed_df)
                     
-                    # Apply carrier recommendation logic
-                    if st.session_state.criteria.get('enable_carrier_recommendations', True):
-                        # Add carrier recommendation columns
-                        processed_df['carrier_recommendation'] = 'Current Carrier'
-                        processed_df['recommendation_reason'] = ''
-                        
-                        # Identify shipments that should use alternative carriers
-                        edas_threshold = st.session_state.criteria.get('edas_threshold', 3.92)
-                        remote_threshold = st.session_state.criteria.get('remote_threshold', 14.15)
-                        
-                        # Flag EDAS shipments
-                        edas_mask = (processed_df['edas_surcharge'] > 0) & (processed_df['edas_surcharge'] >= edas_threshold)
-                        processed_df.loc[edas_mask, 'carrier_recommendation'] = 'Alternative Carrier'
-                        processed_df.loc[edas_mask, 'recommendation_reason'] = processed_df.loc[edas_mask, 'edas_surcharge'].apply(lambda x: f'EDAS surcharge: ${x:.2f}')
-                        
-                        # Flag Remote shipments
-                        remote_mask = (processed_df['remote_surcharge'] > 0) & (processed_df['remote_surcharge'] >= remote_threshold)
-                        processed_df.loc[remote_mask, 'carrier_recommendation'] = 'Alternative Carrier'
-                        processed_df.loc[remote_mask, 'recommendation_reason'] = processed_df.loc[remote_mask, 'remote_surcharge'].apply(lambda x: f'Remote surcharge: ${x:.2f}')
+                        # Clean shipments (no EDAS/Remote) are kept as a mask over processed_data, not a copy
+                        st.session_state.clean_mask = None
+                    
+                        # Apply carrier recommendation logic
+                        if st.session_state.criteria.get('enable_carrier_recommendations', True):
+                            # Evaluate the recommendation rules (EDAS/Remote thresholds by default) in one pass
+                            st.session_state.recommendation_rules = default_rules(st.session_state.criteria)
+                            add_recommendations(processed_df, st.session_state.recommendation_rules)
                         
-                        # Create filtered datasets based on analysis mode
-                        analysis_mode = st.session_state.criteria.get('analysis_mode', 'dual_analysis')
+                            # Filtered and dual analysis exclude EDAS and Remote shipments; flag_only keeps all rows
+                            analysis_mode = st.session_state.criteria.get('analysis_mode', 'dual_analysis')
+                            if analysis_mode in ('filtered_analysis', 'dual_analysis'):
+                                st.session_state.clean_mask = clean_mask(processed_df)
                         
-                        if analysis_mode == 'filtered_analysis':
-                            # Exclude EDAS and Remote shipments
-                            filtered_df = processed_df[
-                                (processed_df['edas_surcharge'] == 0) & 
-                                (processed_df['remote_surcharge'] == 0)
-                            ].copy()
-                            st.session_state.filtered_data = filtered_df
-                            st.session_state.original_data = processed_df.copy()
-                            
-                        elif analysis_mode == 'dual_analysis':
-                            # Keep both datasets
-                            st.session_state.original_data = processed_df.copy()
-                            filtered_df = processed_df[
-                                (processed_df['edas_surcharge'] == 0) & 
-                                (processed_df['remote_surcharge'] == 0)
-                            ].copy()
-                            st.session_state.filtered_data = filtered_df
-                            
-                        else:  # flag_only
-                            # Keep all data, just flag recommendations
-                            st.session_state.original_data = processed_df.copy()
-                            st.session_state.filtered_data = processed_df.copy()
+                        # The rated frame replaces the mapped upload
+                        st.session_state.pop('mapped_df', None)
                     
                     # Show results
                     st.success("Data processed successfully!")
@@ -2236,8 +2819,12 @@ def main():
                     # Display results tabs
                     tabs = st.tabs(["Executive Summary", "Rate Analysis", "Zone Analysis", "Surcharge Analysis", "Carrier Recommendations", "Detailed Breakdown", "Export"])
                     
+                    aggregate_cube = st.session_state.aggregate_cube
+                    
                     with tabs[0]:
                         st.subheader("Executive Summary")
+                        display_origin_rollup(processed_df)
+                        display_source_rollup(aggregate_cube)
                         
                         # Carrier Recommendation Analysis (if enabled)
                         if st.session_state.criteria.get('enable_carrier_recommendations', True):
@@ -2253,14 +2840,13 @@ def main():
                                 
                                 with comp_col1:
                                     st.markdown("**📈 All Shipments (Including EDAS/Remote)**")
-                                    original_df = st.session_state.get('original_data', processed_df)
+                                    original_df = processed_df
                                     
                                     # Key metrics for original data
-                                    total_shipments_orig = len(original_df)
-                                    total_savings_orig = original_df['savings'].fillna(0).sum() if 'savings' in original_df else 0
-                                    avg_savings_pct_orig = original_df['savings_percent'].mean() if 'savings_percent' in original_df else 0
-                                    if pd.isna(avg_savings_pct_orig):
-                                        avg_savings_pct_orig = 0
+                                    metrics_orig = summary_metrics(aggregate_cube)
+                                    total_shipments_orig = metrics_orig['total_shipments']
+                                    total_savings_orig = metrics_orig['total_savings']
+                                    avg_savings_pct_orig = metrics_orig['avg_savings_percent']
                                     
                                     st.metric("Total Shipments", total_shipments_orig)
                                     st.metric("Total Savings", format_currency(total_savings_orig))
@@ -2276,14 +2862,13 @@ def main():
                                 
                                 with comp_col2:
                                     st.markdown("**🎯 Clean Shipments (Excluding EDAS/Remote)**")
-                                    filtered_df = st.session_state.get('filtered_data', processed_df)
+                                    filtered_df = clean_view(processed_df)
                                     
                                     # Key metrics for filtered data
-                                    total_shipments_filt = len(filtered_df)
-                                    total_savings_filt = filtered_df['savings'].fillna(0).sum() if 'savings' in filtered_df else 0
-                                    avg_savings_pct_filt = filtered_df['savings_percent'].mean() if 'savings_percent' in filtered_df else 0
-                                    if pd.isna(avg_savings_pct_filt):
-                                        avg_savings_pct_filt = 0
+                                    metrics_filt = summary_metrics(clean_slice(aggregate_cube))
+                                    total_shipments_filt = metrics_filt['total_shipments']
+                                    total_savings_filt = metrics_filt['total_savings']
+                                    avg_savings_pct_filt = metrics_filt['avg_savings_percent']
                                     
                                     st.metric("Total Shipments", total_shipments_filt)
                                     st.metric("Total Savings", format_currency(total_savings_filt))
@@ -2303,17 +2888,19 @@ def main():
                                 
                                 # Use filtered data for the rest of the analysis
                                 analysis_df = filtered_df
+                                analysis_cube = clean_slice(aggregate_cube)
                                 
                             elif analysis_mode == 'filtered_analysis':
                                 # Show only filtered analysis
                                 st.markdown("### 🎯 Filtered Analysis Results")
                                 st.info("Analysis excludes shipments with EDAS or Remote surcharges for optimal savings.")
                                 
-                                analysis_df = st.session_state.get('filtered_data', processed_df)
+                                analysis_df = clean_view(processed_df)
+                                analysis_cube = clean_slice(aggregate_cube)
                                 
                                 # Show excluded summary
                                 if st.session_state.criteria.get('show_excluded_summary', True):
-                                    original_df = st.session_state.get('original_data', processed_df)
+                                    original_df = processed_df
                                     excluded_count = len(original_df) - len(analysis_df)
                                     if excluded_count > 0:
                                         st.markdown(f"**📋 Excluded:** {excluded_count} shipments ({excluded_count/len(original_df)*100:.1f}%) were excluded due to EDAS or Remote surcharges.")
@@ -2324,6 +2911,7 @@ def main():
                                 st.info("All shipments are included. Alternative carrier recommendations are flagged.")
                                 
                                 analysis_df = processed_df
+                                analysis_cube = aggregate_cube
                                 
                                 # Show recommendation summary
                                 if 'carrier_recommendation' in analysis_df.columns:
@@ -2335,20 +2923,21 @@ def main():
                         else:
                             # Carrier recommendations disabled - use original data
                             analysis_df = processed_df
+                            analysis_cube = aggregate_cube
                         
                         # Key Metrics (using the appropriate dataset)
+                        metrics = summary_metrics(analysis_cube)
                         col1, col2, col3, col4 = st.columns(4)
                         
                         with col1:
                             st.metric(
                                 "Total Shipments",
-                                len(analysis_df),
+                                metrics['total_shipments'],
                                 help="Total number of shipments in analysis"
                             )
                         
                         with col2:
-                            # Ensure 'savings' column exists and fill NaNs before summing
-                            total_savings = analysis_df['savings'].fillna(0).sum() if 'savings' in analysis_df else 0
+                            total_savings = metrics['total_savings']
                             st.metric(
                                 "Total Savings",
                                 format_currency(total_savings),
@@ -2356,10 +2945,7 @@ def main():
                             )
                         
                         with col3:
-                            # Ensure 'savings_percent' column exists and fill NaNs before averaging
-                            avg_savings_pct = analysis_df['savings_percent'].mean() if 'savings_percent' in analysis_df else 0
-                            if pd.isna(avg_savings_pct):
-                                avg_savings_pct = 0
+                            avg_savings_pct = metrics['avg_savings_percent']
                             st.metric(
                                 "Average Savings",
                                 format_percentage(avg_savings_pct),
@@ -2380,622 +2966,60 @@ def main():
                     
                     with service_cols[0]:
                         # Service level distribution
-                        if 'service_level' in analysis_df.columns:
-                            service_dist = analysis_df['service_level'].value_counts()
-                            st.bar_chart(service_dist)
+                        service_dist = shipments_by(analysis_cube, 'service_level')
+                        if not service_dist.empty:
+                            display_chart('bar', service_dist, y_title="Shipments")
                             st.caption("Shipment Distribution by Service Level")
                     
                     with service_cols[1]:
-                        # Average savings by service level
-                        if 'service_level' in analysis_df.columns:
-                            # Fix pandas FutureWarning: fill NaNs first, then group
-                            if 'savings_percent' in analysis_df:
-                                analysis_df_filled = analysis_df.copy()
-                                analysis_df_filled['savings_percent'] = analysis_df_filled['savings_percent'].fillna(0)
-                                service_savings_mean = analysis_df_filled.groupby('service_level', observed=False)['savings_percent'].mean()
-                            else:
-                                service_savings_mean = None
-                            # Check if result is valid (not None, and if Series, not empty)
-                            if service_savings_mean is not None and not (isinstance(service_savings_mean, pd.Series) and service_savings_mean.empty):
-                                # Ensure input to st.bar_chart is DataFrame or Series
-                                if not isinstance(service_savings_mean, (pd.Series, pd.DataFrame)):
-                                    # Convert scalar to a simple Series/DataFrame for charting
-                                    chart_data = pd.Series([float(service_savings_mean)], index=["Average"])
-                                else:
-                                    chart_data = service_savings_mean
-                                st.bar_chart(chart_data)
-                                st.caption("Average Savings % by Service Level")
-                            else:
-                                st.caption("Could not calculate average savings % by service level.")
+                        # Average savings by service level (unknown savings count as 0%)
+                        service_savings_mean = savings_percent_by(analysis_cube, 'service_level')
+                        if not service_savings_mean.empty:
+                            display_chart('bar', service_savings_mean, y_title="Average Savings (%)")
+                            st.caption("Average Savings % by Service Level")
+                        else:
+                            st.caption("Could not calculate average savings % by service level.")
                     
                     # Weight Analysis
                     st.subheader("Weight Analysis")
                     weight_cols = st.columns(2)
                     
                     with weight_cols[0]:
-                        # Create weight brackets - use billable weight for analysis
-                        if 'billable_weight' in analysis_df.columns:
-                            analysis_df['weight_bracket'] = pd.cut(
-                                analysis_df['billable_weight'],
-                                bins=[0, 1, 5, 10, 20, 50, 100, float('inf')],
-                                labels=['0-1 lbs', '1-5 lbs', '5-10 lbs', '10-20 lbs', '20-50 lbs', '50-100 lbs', '100+ lbs']
-                            )
-                        else:
-                            # Fallback to actual weight if billable isn't available
-                            analysis_df['weight_bracket'] = pd.cut(
-                                analysis_df['weight'],
-                                bins=[0, 1, 5, 10, 20, 50, 100, float('inf')],
-                                labels=['0-1 lbs', '1-5 lbs', '5-10 lbs', '10-20 lbs', '20-50 lbs', '50-100 lbs', '100+ lbs']
-                            )
-                        weight_dist = analysis_df['weight_bracket'].value_counts()
-                        st.bar_chart(weight_dist)
+                        # Weight brackets use billable weight (actual weight when billable isn't available)
+                        display_chart('bar', shipments_by(analysis_cube, 'weight_bracket'), y_title="Shipments")
                         st.caption("Shipment Distribution by Weight Range")
                     
                     with weight_cols[1]:
-                        # Fix pandas FutureWarning: fill NaNs first, then group
-                        if 'savings_percent' in analysis_df:
-                            analysis_df_filled_weight = analysis_df.copy()
-                            analysis_df_filled_weight['savings_percent'] = analysis_df_filled_weight['savings_percent'].fillna(0)
-                            weight_savings_mean = analysis_df_filled_weight.groupby('weight_bracket', observed=False)['savings_percent'].mean()
-                        else:
-                            weight_savings_mean = None
-                        # Check if result is valid (not None, and if Series, not empty)
-                        if weight_savings_mean is not None and not (isinstance(weight_savings_mean, pd.Series) and weight_savings_mean.empty):
-                            # Ensure input to st.bar_chart is DataFrame or Series
-                            if not isinstance(weight_savings_mean, (pd.Series, pd.DataFrame)):
-                                # Convert scalar to a simple Series/DataFrame for charting
-                                chart_data_weight = pd.Series([float(weight_savings_mean)], index=["Average"])
-                            else:
-                                chart_data_weight = weight_savings_mean
-                            st.bar_chart(chart_data_weight)
+                        weight_savings_mean = savings_percent_by(analysis_cube, 'weight_bracket')
+                        if weight_savings_mean.notna().any():
+                            display_chart('bar', weight_savings_mean, y_title="Average Savings (%)")
                             st.caption("Average Savings % by Weight Range")
                         else:
                             st.caption("Could not calculate average savings % by weight range.")
                     
                     with tabs[1]:
-                        st.subheader("Rate Analysis")
-                        
-                        # Rate comparison
-                        rate_cols = st.columns(2)
-                        
-                        with rate_cols[0]:
-                            rate_comparison = pd.DataFrame({
-                                'Labl IQ Rate': processed_df['final_rate'],
-                                'Carrier Rate': processed_df['carrier_rate']
-                            })
-                            st.line_chart(rate_comparison)
-                            st.caption("Labl IQ Rate vs Carrier Rate Comparison")
-                        
-                        with rate_cols[1]:
-                            # Calculate rate components
-                            rate_components = pd.DataFrame({
-                                'Base Rate': processed_df['base_rate'].mean(),
-                                'Fuel Surcharge': processed_df['fuel_surcharge'].mean(),
-                                'DAS': processed_df['das_surcharge'].mean(),
-                                'EDAS': processed_df['edas_surcharge'].mean(),
-                                'Remote': processed_df['remote_surcharge'].mean()
-                            }, index=[0]).T
-                            st.bar_chart(rate_components)
-                            st.caption("Average Rate Components")
+                        display_rate_analysis(processed_df, aggregate_cube)
                     
                     with tabs[2]:
-                        st.subheader("Zone Analysis")
-                        
-                        # Zone metrics table
-                        if 'zone' in processed_df.columns:
-                            # Define base aggregation dictionary
-                            agg_dict = {
-                                'shipment_id': 'count',
-                                'final_rate': 'mean',
-                                'carrier_rate': 'mean'
-                                # Removed savings_percent - will add conditionally
-                            }
-                            
-                            # Prepare DataFrame for aggregation, filling NaNs if columns exist
-                            columns_ordered = ['Shipments', 'Avg Labl IQ Rate', 'Avg Carrier Rate']
-                            processed_df_filled = processed_df.copy() # Start with a copy
-
-                            if 'savings' in processed_df:
-                                agg_dict['savings'] = 'sum' # Add savings aggregation
-                                processed_df_filled['savings'] = processed_df_filled['savings'].fillna(0)
-                                columns_ordered.append('Total Savings')
-                                
-                            if 'savings_percent' in processed_df:
-                                agg_dict['savings_percent'] = 'mean' # Add savings percent aggregation
-                                processed_df_filled['savings_percent'] = processed_df_filled['savings_percent'].fillna(0)
-                                columns_ordered.append('Avg Savings %')
-
-                            # Perform aggregation
-                            if 'zone' in processed_df_filled.columns:
-                                zone_metrics = processed_df_filled.groupby('zone', observed=False).agg(agg_dict).round(2)
-                                
-                                # Set and reorder columns
-                                zone_metrics.columns = columns_ordered
-                                zone_metrics = zone_metrics[columns_ordered] # Ensure order
-                                
-                                st.dataframe(zone_metrics)
-                            else:
-                                st.warning("Zone column not found or empty, cannot display zone metrics.")
+                        display_zone_analysis(processed_df, aggregate_cube)
                     
                     with tabs[3]:
-                        st.subheader("Surcharge Analysis")
-                        
-                        # Check if required surcharge columns exist
-                        surcharge_cols_needed = ['das_surcharge', 'edas_surcharge', 'remote_surcharge', 'fuel_surcharge']
-                        missing_cols = [col for col in surcharge_cols_needed if col not in processed_df.columns]
-                        
-                        if missing_cols:
-                            st.warning(f"Some surcharge columns are missing: {', '.join(missing_cols)}")
-                            st.info("Surcharge analysis may be incomplete.")
-                        
-                        # Surcharge frequency
-                        surcharge_cols = st.columns(2)
-                        
-                        with surcharge_cols[0]:
-                            # Create dictionary with only available columns
-                            freq_data = {}
-                            if 'das_surcharge' in processed_df.columns:
-                                freq_data['DAS'] = (processed_df['das_surcharge'] > 0).mean() * 100
-                            if 'edas_surcharge' in processed_df.columns:
-                                freq_data['EDAS'] = (processed_df['edas_surcharge'] > 0).mean() * 100
-                            if 'remote_surcharge' in processed_df.columns:
-                                freq_data['Remote'] = (processed_df['remote_surcharge'] > 0).mean() * 100
-                            if 'fuel_surcharge' in processed_df.columns:
-                                freq_data['Fuel'] = (processed_df['fuel_surcharge'] > 0).mean() * 100
-                            
-                            if freq_data:
-                                surcharge_freq = pd.DataFrame(freq_data, index=[0]).T
-                                st.bar_chart(surcharge_freq)
-                                st.caption("Surcharge Application Frequency (%)")
-                            else:
-                                st.info("No surcharge data available for frequency analysis")
-                        
-                        with surcharge_cols[1]:
-                            # Create dictionary with only available columns
-                            impact_data = {}
-                            if 'das_surcharge' in processed_df.columns:
-                                impact_data['DAS'] = processed_df['das_surcharge'].sum()
-                            if 'edas_surcharge' in processed_df.columns:
-                                impact_data['EDAS'] = processed_df['edas_surcharge'].sum()
-                            if 'remote_surcharge' in processed_df.columns:
-                                impact_data['Remote'] = processed_df['remote_surcharge'].sum()
-                            if 'fuel_surcharge' in processed_df.columns:
-                                impact_data['Fuel'] = processed_df['fuel_surcharge'].sum()
-                            
-                            if impact_data:
-                                surcharge_impact = pd.DataFrame(impact_data, index=[0]).T
-                                st.bar_chart(surcharge_impact)
-                                st.caption("Total Surcharge Impact ($)")
-                            else:
-                                st.info("No surcharge data available for impact analysis")
-                        
-                        # Surcharge summary table
-                        if any(col in processed_df.columns for col in surcharge_cols_needed):
-                            # Create dictionaries for each metric with only available columns
-                            frequency_data = {}
-                            total_amount_data = {}
-                            avg_amount_data = {}
-                            
-                            for surcharge, display_name in zip(
-                                ['das_surcharge', 'edas_surcharge', 'remote_surcharge', 'fuel_surcharge'],
-                                ['DAS', 'EDAS', 'Remote', 'Fuel']
-                            ):
-                                if surcharge in processed_df.columns:
-                                    frequency_data[display_name] = (processed_df[surcharge] > 0).mean() * 100
-                                    total_amount_data[display_name] = processed_df[surcharge].sum()
-                                    avg_amount_data[display_name] = processed_df[surcharge].mean()
-                            
-                            surcharge_summary = pd.DataFrame({
-                                'Frequency': frequency_data,
-                                'Total Amount': total_amount_data,
-                                'Average Amount': avg_amount_data
-                            })
-                            
-                            if not surcharge_summary.empty:
-                                surcharge_summary['Frequency'] = surcharge_summary['Frequency'].apply(format_percentage)
-                                surcharge_summary['Total Amount'] = surcharge_summary['Total Amount'].apply(format_currency)
-                                surcharge_summary['Average Amount'] = surcharge_summary['Average Amount'].apply(format_currency)
-                                
-                                st.dataframe(surcharge_summary)
-                            else:
-                                st.info("No surcharge data available for summary table")
-                        else:
-                            st.info("No surcharge columns found in the data")
+                        display_surcharge_analysis(processed_df, aggregate_cube)
                     
                     with tabs[4]:
-                        st.subheader("Carrier Recommendations")
-                        
-                        if st.session_state.criteria.get('enable_carrier_recommendations', True):
-                            # Show carrier recommendation analysis
-                            if 'carrier_recommendation' in processed_df.columns:
-                                # Recommendation summary
-                                rec_summary = processed_df['carrier_recommendation'].value_counts()
-                                
-                                col1, col2 = st.columns(2)
-                                
-                                with col1:
-                                    st.markdown("**📊 Carrier Recommendation Distribution**")
-                                    st.bar_chart(rec_summary)
-                                    st.caption("Shipments by Recommended Carrier")
-                                
-                                with col2:
-                                    st.markdown("**📈 Recommendation Impact**")
-                                    
-                                    # Calculate impact metrics
-                                    current_carrier_savings = processed_df[
-                                        processed_df['carrier_recommendation'] == 'Current Carrier'
-                                    ]['savings'].fillna(0).sum()
-                                    
-                                    alternative_carrier_savings = processed_df[
-                                        processed_df['carrier_recommendation'] == 'Alternative Carrier'
-                                    ]['savings'].fillna(0).sum()
-                                    
-                                    st.metric("Current Carrier Savings", format_currency(current_carrier_savings))
-                                    st.metric("Alternative Carrier Shipments", len(processed_df[processed_df['carrier_recommendation'] == 'Alternative Carrier']))
-                                
-                                # Detailed recommendation table
-                                st.markdown("**📋 Detailed Recommendations**")
-                                
-                                # Filter for alternative carrier recommendations
-                                alt_carrier_df = processed_df[
-                                    processed_df['carrier_recommendation'] == 'Alternative Carrier'
-                                ].copy()
-                                
-                                if not alt_carrier_df.empty:
-                                    # Format the recommendation table
-                                    display_cols = ['shipment_id', 'destination_zip', 'weight', 'service_level', 
-                                                   'edas_surcharge', 'remote_surcharge', 'recommendation_reason', 'savings']
-                                    
-                                    # Only include columns that exist
-                                    available_cols = [col for col in display_cols if col in alt_carrier_df.columns]
-                                    rec_table = alt_carrier_df[available_cols].copy()
-                                    
-                                    # Format currency columns
-                                    for col in ['edas_surcharge', 'remote_surcharge', 'savings']:
-                                        if col in rec_table.columns:
-                                            rec_table[col] = rec_table[col].apply(format_currency)
-                                    
-                                    st.dataframe(rec_table, use_container_width=True)
-                                    
-                                    # Summary statistics
-                                    st.markdown("**📊 Alternative Carrier Summary**")
-                                    summary_cols = st.columns(3)
-                                    
-                                    with summary_cols[0]:
-                                        st.metric("Total Alternative Shipments", len(alt_carrier_df))
-                                    
-                                    with summary_cols[1]:
-                                        avg_edas = alt_carrier_df['edas_surcharge'].mean() if 'edas_surcharge' in alt_carrier_df.columns else 0
-                                        st.metric("Average EDAS Surcharge", format_currency(avg_edas))
-                                    
-                                    with summary_cols[2]:
-                                        avg_remote = alt_carrier_df['remote_surcharge'].mean() if 'remote_surcharge' in alt_carrier_df.columns else 0
-                                        st.metric("Average Remote Surcharge", format_currency(avg_remote))
-                                
-                                else:
-                                    st.success("🎉 No shipments require alternative carriers! All shipments are optimized for your current carrier.")
-                            
-                            else:
-                                st.info("Carrier recommendations not available. Please enable carrier recommendations in settings.")
-                        
-                        else:
-                            st.info("Carrier recommendations are disabled. Enable them in the Carrier Recommendations settings to see this analysis.")
-                        
+                        display_carrier_recommendations(processed_df)
+                    
                     with tabs[5]:
                         st.subheader("Detailed Breakdown")
                         
-                        # Format the detailed dataframe
-                        detailed_df = processed_df.copy()
-                        
-                        # Format currency columns
-                        currency_columns = [
-                            'base_rate', 
-                            'fuel_surcharge', 
-                            'das_surcharge',
-                            'edas_surcharge',
-                            'remote_surcharge',
-                            'total_surcharges',
-                            'final_rate', 
-                            'carrier_rate', 
-                            'savings'
-                        ]
-                        for col in currency_columns:
-                            if col in detailed_df.columns:
-                                detailed_df[col] = detailed_df[col].apply(format_currency)
-                        
-                        # Format weight columns
-                        weight_columns = ['weight', 'billable_weight', 'dim_weight']
-                        for col in weight_columns:
-                            if col in detailed_df.columns:
-                                detailed_df[col] = detailed_df[col].apply(format_weight)
-                        
-                        # Format percentage column
-                        if 'savings_percent' in detailed_df.columns:
-                            detailed_df['savings_percent'] = detailed_df['savings_percent'].apply(format_percentage)
-                        
-                        st.dataframe(detailed_df)
+                        display_detailed_breakdown(processed_df)
                     
                     with tabs[6]:
-                        st.subheader("Export Options")
-                        
-                        export_cols = st.columns(3)
-                        
-                        with export_cols[0]:
-                            # Full detailed export
-                            export_df = processed_df.copy()
-                            
-                            # Include carrier recommendations if enabled
-                            if st.session_state.criteria.get('enable_carrier_recommendations', True) and st.session_state.criteria.get('include_recommendations_in_export', True):
-                                if 'carrier_recommendation' not in export_df.columns:
-                                    # Add carrier recommendation columns if they don't exist
-                                    export_df['carrier_recommendation'] = 'Current Carrier'
-                                    export_df['recommendation_reason'] = ''
-                            
-                            csv = export_df.to_csv(index=False)
-                            st.download_button(
-                                "Download Full Report (CSV)",
-                                csv,
-                                "labl_iq_results.csv",
-                                "text/csv",
-                                key='download-csv'
-                            )
-                        
-                        with export_cols[1]:
-                            # Summary export
-                            # Filter summary_columns to only include columns that exist in processed_df
-                            available_summary_columns = [col for col in summary_columns if col in processed_df.columns]
-                            
-                            # Add carrier recommendation columns if enabled
-                            if st.session_state.criteria.get('enable_carrier_recommendations', True) and st.session_state.criteria.get('include_recommendations_in_export', True):
-                                if 'carrier_recommendation' in processed_df.columns:
-                                    available_summary_columns.extend(['carrier_recommendation', 'recommendation_reason'])
-                            
-                            summary_df = processed_df[available_summary_columns]
-                            csv_summary = summary_df.to_csv(index=False)
-                            st.download_button(
-                                "Download Summary (CSV)",
-                                csv_summary,
-                                "labl_iq_summary.csv",
-                                "text/csv",
-                                key='download-csv-summary'
-                            )
-                        
-                        with export_cols[2]:
-                            # Alternative carrier export (if recommendations enabled)
-                            if st.session_state.criteria.get('enable_carrier_recommendations', True) and 'carrier_recommendation' in processed_df.columns:
-                                alt_carrier_df = processed_df[
-                                    processed_df['carrier_recommendation'] == 'Alternative Carrier'
-                                ].copy()
-                                
-                                if not alt_carrier_df.empty:
-                                    csv_alt_carrier = alt_carrier_df.to_csv(index=False)
-                                    st.download_button(
-                                        "Download Alternative Carrier Shipments (CSV)",
-                                        csv_alt_carrier,
-                                        "labl_iq_alternative_carrier_shipments.csv",
-                                        "text/csv",
-                                        key='download-csv-alt-carrier'
-                                    )
-                                else:
-                                    st.info("No alternative carrier shipments to export")
-                            else:
-                                # Zone analysis export (fallback)
-                                if 'zone' in processed_df.columns:
-                                    # Ensure columns exist and fill NaNs before aggregating for export
-                                    agg_dict_export = {
-                                        'shipment_id': 'count',
-                                        'final_rate': ['mean', 'sum'],
-                                        'carrier_rate': ['mean', 'sum']
-                                    }
-                                    processed_df_filled_export = processed_df.copy()
-
-                                    if 'savings' in processed_df:
-                                        agg_dict_export['savings'] = ['mean', 'sum']
-                                        processed_df_filled_export['savings'] = processed_df_filled_export['savings'].fillna(0)
-                                    
-                                    if 'savings_percent' in processed_df:
-                                        agg_dict_export['savings_percent'] = 'mean'
-                                        processed_df_filled_export['savings_percent'] = processed_df_filled_export['savings_percent'].fillna(0)
-
-                                    zone_analysis = processed_df_filled_export.groupby('zone', observed=False).agg(agg_dict_export).round(2)
-                                    
-                                    csv_zone = zone_analysis.to_csv()
-                                    st.download_button(
-                                        "Download Zone Analysis (CSV)",
-                                        csv_zone,
-                                        "labl_iq_zone_analysis.csv",
-                                        "text/csv",
-                                        key='download-csv-zone'
-                                    )
-                        
-                        # Additional export options
-                        if st.session_state.criteria.get('enable_carrier_recommendations', True):
-                            st.markdown("---")
-                            st.markdown("**Additional Export Options**")
-                            
-                            additional_cols = st.columns(2)
-                            
-                            with additional_cols[0]:
-                                # Filtered data export (clean shipments only)
-                                if 'filtered_data' in st.session_state:
-                                    filtered_csv = st.session_state.filtered_data.to_csv(index=False)
-                                    st.download_button(
-                                        "Download Clean Shipments Only (CSV)",
-                                        filtered_csv,
-                                        "labl_iq_clean_shipments.csv",
-                                        "text/csv",
-                                        key='download-csv-clean'
-                                    )
-                            
-                            with additional_cols[1]:
-                                # Current carrier shipments only
-                                if 'carrier_recommendation' in processed_df.columns:
-                                    current_carrier_df = processed_df[
-                                        processed_df['carrier_recommendation'] == 'Current Carrier'
-                                    ].copy()
-                                    
-                                    current_csv = current_carrier_df.to_csv(index=False)
-                                    st.download_button(
-                                        "Download Current Carrier Shipments (CSV)",
-                                        current_csv,
-                                        "labl_iq_current_carrier_shipments.csv",
-                                        "text/csv",
-                                        key='download-csv-current'
-                                    )
+                        display_export_options(processed_df, aggregate_cube)
                         
                         # Rate Table Export
-                        st.markdown("---")
-                        st.markdown("**📊 Rate Table Export**")
-                        st.markdown("Generate a rate table based on your analysis data for use in customer pricing.")
-                        
-                        # Rate table configuration
-                        rate_data_source = st.selectbox(
-                            "Rate Table Data Source",
-                            options=['all_shipments', 'clean_shipments', 'current_carrier_only'],
-                            format_func=lambda x: {
-                                'all_shipments': 'All Shipments',
-                                'clean_shipments': 'Clean Shipments (No EDAS/Remote)',
-                                'current_carrier_only': 'Current Carrier Only'
-                            }[x],
-                            help="Choose which shipments to use for calculating rates"
-                        )
-                        
-                        # Generate rate table button
-                        if st.button("Generate Rate Table Preview", key="generate_rate_table"):
-                            with st.spinner("Generating rate table..."):
-                                try:
-                                    # Check if processed data exists
-                                    if 'processed_data' not in st.session_state:
-                                        st.error("No processed data available. Please process your shipment data first.")
-                                        return
-                                    
-                                    processed_df = st.session_state.processed_data
-                                    
-                                    # Select the appropriate dataset based on data source
-                                    if rate_data_source == 'all_shipments':
-                                        rate_df = processed_df.copy()
-                                    elif rate_data_source == 'clean_shipments':
-                                        rate_df = st.session_state.get('filtered_data', processed_df).copy()
-                                    else:  # current_carrier_only
-                                        if 'carrier_recommendation' in processed_df.columns:
-                                            rate_df = processed_df[
-                                                processed_df['carrier_recommendation'] == 'Current Carrier'
-                                            ].copy()
-                                        else:
-                                            rate_df = processed_df.copy()
-                                    
-                                    # Add debugging information
-                                    st.write(f"**Debug Info:** Available columns: {list(rate_df.columns)}")
-                                    st.write(f"**Debug Info:** Data source: {rate_data_source}")
-                                    st.write(f"**Debug Info:** Dataset has {len(rate_df)} rows for rate table generation")
-                                    
-                                    # Ensure required columns exist for rate table generation
-                                    required_columns = ['billable_weight', 'final_rate']
-                                    missing_columns = [col for col in required_columns if col not in rate_df.columns]
-                                    
-                                    if missing_columns:
-                                        st.warning(f"Missing required columns for rate table: {missing_columns}")
-                                        st.write(f"**Debug Info:** Available columns: {list(rate_df.columns)}")
-                                        
-                                        # Try to create missing columns if possible
-                                        if 'billable_weight' not in rate_df.columns and 'weight' in rate_df.columns:
-                                            rate_df['billable_weight'] = rate_df['weight']
-                                            st.info("Using 'weight' column as 'billable_weight'")
-                                        
-                                        if 'final_rate' not in rate_df.columns:
-                                            # Try to calculate final rate from components
-                                            if all(col in rate_df.columns for col in ['base_rate', 'total_surcharges', 'markup_amount']):
-                                                rate_df['final_rate'] = rate_df['base_rate'] + rate_df['total_surcharges'] + rate_df['markup_amount']
-                                                st.info("Calculated 'final_rate' from components")
-                                            else:
-                                                st.error("Cannot generate rate table without rate information")
-                                                return
-                                    
-                                    # Ensure rate table DataFrame has string columns
-                                    rate_df = ensure_string_columns(rate_df)
-                                    
-                                    # Generate rate table (simplified - no service level or package type filtering)
-                                    rate_table = generate_rate_table(rate_df, 'standard', 'box')
-                                    
-                                    # Ensure the generated rate table also has string columns
-                                    rate_table = ensure_string_columns(rate_table)
-                                    
-                                    # Store in session state for export
-                                    st.session_state.rate_table = rate_table
-                                    st.session_state.rate_table_config = {
-                                        'data_source': rate_data_source,
-                                        'service_level': 'standard',
-                                        'package_type': 'box'
-                                    }
-                                    
-                                    st.success("Rate table generated successfully!")
-                                    
-                                except Exception as e:
-                                    st.error(f"Error generating rate table: {str(e)}")
-                                    st.exception(e)  # Show full error details for debugging
-                        
-                        # Show rate table preview if available
-                        if 'rate_table' in st.session_state:
-                            st.markdown("**📋 Rate Table Preview**")
-                            
-                            # Show configuration
-                            config = st.session_state.rate_table_config
-                            st.info(f"**Configuration:** {config['data_source'].replace('_', ' ').title()} | {config['service_level'].replace('_', ' ').title()} | {config['package_type'].title()}")
-                            
-                            # Display rate table
-                            rate_table = st.session_state.rate_table
-                            st.dataframe(rate_table, use_container_width=True)
-                            
-                            # Export options for rate table
-                            rate_export_cols = st.columns(2)
-                            
-                            with rate_export_cols[0]:
-                                # CSV export
-                                rate_csv = rate_table.to_csv(index=False)
-                                st.download_button(
-                                    "Download Rate Table (CSV)",
-                                    rate_csv,
-                                    f"labl_iq_rate_table_{config['service_level']}_{config['package_type']}.csv",
-                                    "text/csv",
-                                    key='download-rate-table-csv'
-                                )
-                            
-                            with rate_export_cols[1]:
-                                # Excel export (if available)
-                                try:
-                                    import io
-                                    buffer = io.BytesIO()
-                                    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                                        rate_table.to_excel(writer, sheet_name='Rate Table', index=False)
-                                    buffer.seek(0)
-                                    st.download_button(
-                                        "Download Rate Table (Excel)",
-                                        buffer.getvalue(),
-                                        f"labl_iq_rate_table_{config['service_level']}_{config['package_type']}.xlsx",
-                                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                        key='download-rate-table-excel'
-                                    )
-                                except ImportError:
-                                    st.info("Excel export requires openpyxl package")
-                            
-                            # Rate table statistics
-                            st.markdown("**📊 Rate Table Statistics**")
-                            stats_cols = st.columns(4)
-                            
-                            with stats_cols[0]:
-                                st.metric("Zones", len(rate_table.columns) - 1)  # Exclude weight column
-                            
-                            with stats_cols[1]:
-                                st.metric("Weight Tiers", len(rate_table))
-                            
-                            with stats_cols[2]:
-                                min_rate = rate_table.iloc[:, 1:].min().min()
-                                st.metric("Min Rate", format_currency(min_rate))
-                            
-                            with stats_cols[3]:
-                                max_rate = rate_table.iloc[:, 1:].max().max()
-                                st.metric("Max Rate", format_currency(max_rate))
-                
+                        display_published_rate_card()
+
                 except Exception as e:
                     st.error(f"Error processing data: {str(e)}")
             
@@ -3010,20 +3034,21 @@ def main():
 
     if app_step == 'export':
         if st.button("Start Over", key="start_over"):
-            for key in ['uploaded_df', 'processed_data', 'mapping', 'save_mapping_checkbox', 'filtered_data', 'original_data', 'rate_table', 'rate_table_config']:
-                if key in st.session_state:
-                    del st.session_state[key]
-            st.session_state['app_step'] = 'upload'
-            st.experimental_rerun()
+            start_over()
         
         # --- BEGIN: Results and Export UI ---
         processed_df = st.session_state.get('processed_data')
         if processed_df is not None:
             # Display results tabs
             tabs = st.tabs(["Executive Summary", "Rate Analysis", "Zone Analysis", "Surcharge Analysis", "Carrier Recommendations", "Detailed Breakdown", "Export"])
+            aggregate_cube = st.session_state.get('aggregate_cube')
+            if aggregate_cube is None:
+                aggregate_cube = st.session_state.aggregate_cube = build_aggregate_cube(processed_df)
             
             with tabs[0]:
                 st.subheader("Executive Summary")
+                display_origin_rollup(processed_df)
+                display_source_rollup(aggregate_cube)
                 
                 # Carrier Recommendation Analysis (if enabled)
                 if st.session_state.criteria.get('enable_carrier_recommendations', True):
@@ -3039,14 +3064,13 @@ def main():
                         
                         with comp_col1:
                             st.markdown("**📈 All Shipments (Including EDAS/Remote)**")
-                            original_df = st.session_state.get('original_data', processed_df)
+                            original_df = processed_df
                             
                             # Key metrics for original data
-                            total_shipments_orig = len(original_df)
-                            total_savings_orig = original_df['savings'].fillna(0).sum() if 'savings' in original_df else 0
-                            avg_savings_pct_orig = original_df['savings_percent'].mean() if 'savings_percent' in original_df else 0
-                            if pd.isna(avg_savings_pct_orig):
-                                avg_savings_pct_orig = 0
+                            metrics_orig = summary_metrics(aggregate_cube)
+                            total_shipments_orig = metrics_orig['total_shipments']
+                            total_savings_orig = metrics_orig['total_savings']
+                            avg_savings_pct_orig = metrics_orig['avg_savings_percent']
                             
                             st.metric("Total Shipments", total_shipments_orig)
                             st.metric("Total Savings", format_currency(total_savings_orig))
@@ -3062,14 +3086,13 @@ def main():
                         
                         with comp_col2:
                             st.markdown("**🎯 Clean Shipments (Excluding EDAS/Remote)**")
-                            filtered_df = st.session_state.get('filtered_data', processed_df)
+                            filtered_df = clean_view(processed_df)
                             
                             # Key metrics for filtered data
-                            total_shipments_filt = len(filtered_df)
-                            total_savings_filt = filtered_df['savings'].fillna(0).sum() if 'savings' in filtered_df else 0
-                            avg_savings_pct_filt = filtered_df['savings_percent'].mean() if 'savings_percent' in filtered_df else 0
-                            if pd.isna(avg_savings_pct_filt):
-                                avg_savings_pct_filt = 0
+                            metrics_filt = summary_metrics(clean_slice(aggregate_cube))
+                            total_shipments_filt = metrics_filt['total_shipments']
+                            total_savings_filt = metrics_filt['total_savings']
+                            avg_savings_pct_filt = metrics_filt['avg_savings_percent']
                             
                             st.metric("Total Shipments", total_shipments_filt)
                             st.metric("Total Savings", format_currency(total_savings_filt))
@@ -3089,17 +3112,19 @@ def main():
                         
                         # Use filtered data for the rest of the analysis
                         analysis_df = filtered_df
+                        analysis_cube = clean_slice(aggregate_cube)
                         
                     elif analysis_mode == 'filtered_analysis':
                         # Show only filtered analysis
                         st.markdown("### 🎯 Filtered Analysis Results")
                         st.info("Analysis excludes shipments with EDAS or Remote surcharges for optimal savings.")
                         
-                        analysis_df = st.session_state.get('filtered_data', processed_df)
+                        analysis_df = clean_view(processed_df)
+                        analysis_cube = clean_slice(aggregate_cube)
                         
                         # Show excluded summary
                         if st.session_state.criteria.get('show_excluded_summary', True):
-                            original_df = st.session_state.get('original_data', processed_df)
+                            original_df = processed_df
                             excluded_count = len(original_df) - len(analysis_df)
                             if excluded_count > 0:
                                 st.markdown(f"**📋 Excluded:** {excluded_count} shipments ({excluded_count/len(original_df)*100:.1f}%) were excluded due to EDAS or Remote surcharges.")
@@ -3110,13 +3135,13 @@ def main():
                         st.info("All shipments are included. Alternative carrier recommendations are flagged.")
                         
                         analysis_df = processed_df
+                        analysis_cube = aggregate_cube
                         
                         # Key metrics
-                        total_shipments = len(analysis_df)
-                        total_savings = analysis_df['savings'].fillna(0).sum() if 'savings' in analysis_df else 0
-                        avg_savings_pct = analysis_df['savings_percent'].mean() if 'savings_percent' in analysis_df else 0
-                        if pd.isna(avg_savings_pct):
-                            avg_savings_pct = 0
+                        metrics = summary_metrics(analysis_cube)
+                        total_shipments = metrics['total_shipments']
+                        total_savings = metrics['total_savings']
+                        avg_savings_pct = metrics['avg_savings_percent']
                         
                         st.metric("Total Shipments", total_shipments)
                         st.metric("Total Savings", format_currency(total_savings))
@@ -3132,13 +3157,13 @@ def main():
                 else:
                     # No carrier recommendations - use all data
                     analysis_df = processed_df
+                    analysis_cube = aggregate_cube
                     
                     # Key metrics
-                    total_shipments = len(analysis_df)
-                    total_savings = analysis_df['savings'].fillna(0).sum() if 'savings' in analysis_df else 0
-                    avg_savings_pct = analysis_df['savings_percent'].mean() if 'savings_percent' in analysis_df else 0
-                    if pd.isna(avg_savings_pct):
-                        avg_savings_pct = 0
+                    metrics = summary_metrics(analysis_cube)
+                    total_shipments = metrics['total_shipments']
+                    total_savings = metrics['total_savings']
+                    avg_savings_pct = metrics['avg_savings_percent']
                     
                     st.metric("Total Shipments", total_shipments)
                     st.metric("Total Savings", format_currency(total_savings))
@@ -3155,226 +3180,33 @@ def main():
                     
                     # Zone distribution
                     if 'zone' in analysis_df.columns:
-                        zone_dist = analysis_df['zone'].value_counts().sort_index()
+                        zone_dist = shipments_by(analysis_cube, 'zone')
                         st.markdown("**Zone Distribution:**")
                         for zone, count in zone_dist.items():
                             pct = (count / len(analysis_df)) * 100
                             st.write(f"• Zone {zone}: {count} shipments ({pct:.1f}%)")
             
-            # Add other tabs here (Rate Analysis, Zone Analysis, etc.)
             with tabs[1]:
-                st.subheader("Rate Analysis")
-                st.info("Rate analysis details will be shown here.")
+                display_rate_analysis(processed_df, aggregate_cube)
             
             with tabs[2]:
-                st.subheader("Zone Analysis")
-                st.info("Zone analysis details will be shown here.")
+                display_zone_analysis(processed_df, aggregate_cube)
             
             with tabs[3]:
-                st.subheader("Surcharge Analysis")
-                st.info("Surcharge analysis details will be shown here.")
+                display_surcharge_analysis(processed_df, aggregate_cube)
             
             with tabs[4]:
-                st.subheader("Carrier Recommendations")
-                st.info("Carrier recommendations will be shown here.")
+                display_carrier_recommendations(processed_df)
             
             with tabs[5]:
                 st.subheader("Detailed Breakdown")
-                st.info("Detailed breakdown will be shown here.")
+                display_detailed_breakdown(processed_df)
             
             with tabs[6]:
-                st.subheader("Export Options")
+                display_analysis_export(processed_df)
                 
-                # Determine which dataset to use for export
-                analysis_mode = st.session_state.criteria.get('analysis_mode', 'dual_analysis')
-                if analysis_mode == 'dual_analysis':
-                    export_df = st.session_state.get('filtered_data', processed_df)
-                elif analysis_mode == 'filtered_analysis':
-                    export_df = st.session_state.get('filtered_data', processed_df)
-                else:  # flag_only
-                    export_df = processed_df
-                
-                if len(export_df) > 0:
-                    # Export options
-                    st.markdown("### Export Analysis Results")
-                    
-                    # CSV Export
-                    csv = export_df.to_csv(index=False)
-                    st.download_button(
-                        "Download CSV",
-                        csv,
-                        "labl_iq_analysis_results.csv",
-                        "text/csv",
-                        key='download-csv'
-                    )
-                    
-                    # Excel Export (if available)
-                    try:
-                        import io
-                        buffer = io.BytesIO()
-                        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                            export_df.to_excel(writer, sheet_name='Analysis Results', index=False)
-                        buffer.seek(0)
-                        st.download_button(
-                            "Download Excel",
-                            buffer.getvalue(),
-                            "labl_iq_analysis_results.xlsx",
-                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            key='download-excel'
-                        )
-                    except ImportError:
-                        st.info("Excel export requires openpyxl package")
-                    
-                    # Rate Table Export
-                    st.markdown("---")
-                    st.markdown("**📊 Rate Table Export**")
-                    st.markdown("Generate a rate table based on your analysis data for use in customer pricing.")
-                    
-                    # Choose data source for rate table
-                    rate_data_source = st.selectbox(
-                        "Rate Table Data Source",
-                        options=['all_shipments', 'clean_shipments', 'current_carrier_only'],
-                        format_func=lambda x: {
-                            'all_shipments': 'All Shipments',
-                            'clean_shipments': 'Clean Shipments (No EDAS/Remote)',
-                            'current_carrier_only': 'Current Carrier Only'
-                        }[x],
-                        help="Choose which shipments to use for calculating rates"
-                    )
-                    
-                    # Rate table pricing controls
-                    st.markdown("**💰 Rate Table Pricing**")
-                    markup_col, min_margin_col = st.columns(2)
-                    
-                    with markup_col:
-                        export_markup_pct = st.number_input(
-                            "Markup Percentage (%)",
-                            min_value=0.0, max_value=100.0, value=10.0, step=0.5,
-                            help="Percent markup to apply to each cell in the rate table."
-                        )
-                    
-                    with min_margin_col:
-                        export_min_margin = st.number_input(
-                            "Minimum Margin ($)",
-                            min_value=0.0, max_value=100.0, value=0.50, step=0.05,
-                            help="Minimum dollar profit per shipment."
-                        )
-                    
-                    # Generate rate table button
-                    if st.button("Generate Rate Table Preview", key="generate_rate_table"):
-                        with st.spinner("Generating rate table..."):
-                            try:
-                                # Check if processed data exists
-                                if 'processed_data' not in st.session_state:
-                                    st.error("No processed data available. Please process your shipment data first.")
-                                    return
-                                
-                                processed_df = st.session_state.processed_data
-                                
-                                # Select the appropriate dataset
-                                if rate_data_source == 'all_shipments':
-                                    rate_df = processed_df.copy()
-                                elif rate_data_source == 'clean_shipments':
-                                    rate_df = st.session_state.get('filtered_data', processed_df).copy()
-                                else:  # current_carrier_only
-                                    if 'carrier_recommendation' in processed_df.columns:
-                                        rate_df = processed_df[
-                                            processed_df['carrier_recommendation'] == 'Current Carrier'
-                                        ].copy()
-                                    else:
-                                        rate_df = processed_df.copy()
-                                
-                                # Check if we have data after filtering
-                                if len(rate_df) == 0:
-                                    st.error(f"No data available for rate table generation. Try a different data source.")
-                                    return
-                                
-                                # Ensure rate table DataFrame has string columns
-                                rate_df = ensure_string_columns(rate_df)
-                                
-                                # Generate rate table with markup and minimum margin
-                                rate_table = generate_rate_table(rate_df, markup_pct=export_markup_pct, min_margin=export_min_margin)
-                                
-                                # Ensure the generated rate table also has string columns
-                                rate_table = ensure_string_columns(rate_table)
-                                
-                                # Store in session state for export
-                                st.session_state.rate_table = rate_table
-                                st.session_state.rate_table_config = {
-                                    'data_source': rate_data_source
-                                }
-                                
-                                st.success("Rate table generated successfully!")
-                                
-                            except Exception as e:
-                                st.error(f"Error generating rate table: {str(e)}")
-                                st.exception(e)  # Show full error details for debugging
-                    
-                    # Show rate table preview if available
-                    if 'rate_table' in st.session_state:
-                        st.markdown("**📋 Rate Table Preview**")
-                        
-                        # Show configuration
-                        config = st.session_state.rate_table_config
-                        st.info(f"**Configuration:** {config['data_source'].replace('_', ' ').title()}")
-                        
-                        # Display rate table
-                        rate_table = st.session_state.rate_table
-                        # Ensure rate table has string columns before display
-                        rate_table = ensure_string_columns(rate_table)
-                        st.dataframe(rate_table, use_container_width=True)
-                        
-                        # Export options for rate table
-                        rate_export_cols = st.columns(2)
-                        
-                        with rate_export_cols[0]:
-                            # CSV export
-                            rate_csv = rate_table.to_csv(index=False)
-                            st.download_button(
-                                "Download Rate Table (CSV)",
-                                rate_csv,
-                                f"labl_iq_rate_table_{config['data_source']}.csv",
-                                "text/csv",
-                                key='download-rate-table-csv'
-                            )
-                        
-                        with rate_export_cols[1]:
-                            # Excel export (if available)
-                            try:
-                                import io
-                                buffer = io.BytesIO()
-                                with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                                    rate_table.to_excel(writer, sheet_name='Rate Table', index=False)
-                                buffer.seek(0)
-                                st.download_button(
-                                    "Download Rate Table (Excel)",
-                                    buffer.getvalue(),
-                                    f"labl_iq_rate_table_{config['data_source']}.xlsx",
-                                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                    key='download-rate-table-excel'
-                                )
-                            except ImportError:
-                                st.info("Excel export requires openpyxl package")
-                        
-                        # Rate table statistics
-                        st.markdown("**📊 Rate Table Statistics**")
-                        stats_cols = st.columns(4)
-                        
-                        with stats_cols[0]:
-                            st.metric("Zones", len(rate_table.columns) - 1)  # Exclude weight column
-                        
-                        with stats_cols[1]:
-                            st.metric("Weight Tiers", len(rate_table))
-                        
-                        with stats_cols[2]:
-                            min_rate = rate_table.iloc[:, 1:].min().min()
-                            st.metric("Min Rate", format_currency(min_rate))
-                        
-                        with stats_cols[3]:
-                            max_rate = rate_table.iloc[:, 1:].max().max()
-                            st.metric("Max Rate", format_currency(max_rate))
-                else:
-                    st.warning("No data available for export.")
+                # Rate Table Export
+                display_published_rate_card()
         else:
             st.warning("No processed data found. Please start over and process your data.")
         # --- END: Results and Export UI ---
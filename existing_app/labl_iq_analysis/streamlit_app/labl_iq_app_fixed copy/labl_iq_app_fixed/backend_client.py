@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Backend Client Module
+
+This module lets the Streamlit app hand an analysis to the FastAPI job
+backend instead of rating it in the Streamlit process, so the app only holds
+the mapped upload and the stored aggregates.
+It provides functionality for:
+1. Shaping mapped shipments into the columns the backend analyzer reads
+2. Logging in, uploading a file and submitting it as an analysis job
+3. Polling the job until it completes, reporting the rows processed so far
+4. Turning the stored aggregates into tables for display
+"""
+
+import io
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger('labl_iq.backend_client')
+
+# Prefix of the backend's API router (auth and shipping routes are mounted below it)
+API_PREFIX = '/api'
+
+# Seconds between job status polls
+POLL_INTERVAL = 2.0
+
+# Seconds to wait for a job before giving up
+JOB_TIMEOUT = 60 * 60
+
+# Carrier recorded for uploaded shipments (the carrier the client ships with today)
+CURRENT_CARRIER = 'Current Carrier'
+
+# Mapped field -> backend column
+BACKEND_COLUMNS = {
+    'shipment_id': 'shipment_id',
+    'origin_zip': 'origin_zip',
+    'destination_zip': 'destination_zip',
+    'weight': 'weight',
+    'length': 'length',
+    'width': 'width',
+    'height': 'height',
+    'carrier_rate': 'actual_cost',
+    'service_level': 'service',
+}
+
+
+class BackendError(Exception):
+    """Raised when the backend rejects a request or an analysis job fails."""
+
+
+def backend_upload(mapped: pd.DataFrame, origin_zip: str, weight_divisor: float = 1.0) -> bytes:
+    """
+    CSV upload for the backend built from the mapped shipment columns.
+
+    Args:
+        mapped: Mapped shipments (one column per field)
+        origin_zip: Client origin ZIP, used when origin_zip is not mapped
+        weight_divisor: Divides weights to convert them to pounds
+
+    Returns:
+        bytes: CSV with the backend's column names
+    """
+    upload = mapped[mapped.columns.intersection(list(BACKEND_COLUMNS))].rename(columns=BACKEND_COLUMNS)
+    if 'origin_zip' not in upload.columns:
+        upload.insert(0, 'origin_zip', origin_zip)
+    upload['weight'] = upload['weight'] / weight_divisor
+    upload['carrier'] = CURRENT_CARRIER
+    buffer = io.BytesIO()
+    upload.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def multipart_body(field: str, file_name: str, content: bytes) -> Tuple[bytes, str]:
+    """
+    Encode one file as a multipart/form-data body.
+
+    Args:
+        field: Form field name
+        file_name: File name sent with the file
+        content: File contents
+
+    Returns:
+        Tuple[bytes, str]: Body and its Content-Type header
+    """
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        f'--{boundary}\r\n'.encode(),
+        f'Content-Disposition: form-data; name="{field}"; filename="{file_name}"\r\n'.encode(),
+        b'Content-Type: text/csv\r\n\r\n',
+        content,
+        f'\r\n--{boundary}--\r\n'.encode(),
+    ])
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def result_tables(result: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+    """
+    Tables for the aggregates stored with a completed analysis.
+
+    Args:
+        result: Analysis result returned by the backend
+
+    Returns:
+        Dict[str, pd.DataFrame]: 'carriers', 'zones' and 'opportunities' tables
+    """
+    carriers = pd.DataFrame(result.get('carrierBreakdown', []), columns=['carrier', 'shipments', 'cost', 'savings'])
+    zones = pd.DataFrame(result.get('zoneAnalysis', []), columns=['zone', 'shipments', 'avgCost', 'savings'])
+    opportunities = pd.DataFrame(result.get('topSavingsOpportunities', []),
+                                 columns=['carrier', 'recommendedCarrier', 'service', 'currentCost',
+                                          'recommendedCost', 'savings'])
+    return {
+        'carriers': carriers.set_index('carrier'),
+        'zones': zones.sort_values('zone', key=lambda z: z.str.extract(r'(\d+)', expand=False).astype(float))
+                      .set_index('zone'),
+        'opportunities': opportunities,
+    }
+
+
+class BackendClient:
+    """
+    Client for the analysis job endpoints of the FastAPI backend.
+    """
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 60.0):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Backend URL, e.g. http://localhost:8000
+            token: Bearer token from a previous login
+            timeout: Seconds to wait for each request
+        """
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None,
+                 content_type: str = 'application/json') -> Any:
+        request = urllib.request.Request(f"{self.base_url}{API_PREFIX}{path}", data=body, method=method)
+        if body is not None:
+            request.add_header('Content-Type', content_type)
+        if self.token:
+            request.add_header('Authorization', f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.load(e).get('detail', e.reason)
+            except ValueError:
+                detail = e.reason
+            raise BackendError(f"{method} {path} failed ({e.code}): {detail}") from e
+        except urllib.error.URLError as e:
+            raise BackendError(f"Backend not reachable at {self.base_url}: {e.reason}") from e
+        except ValueError as e:
+            raise BackendError(f"{method} {path} returned a response that is not JSON") from e
+        if not isinstance(payload, dict) or not payload.get('success') or payload.get('data') is None:
+            detail = payload.get('message') or payload.get('errors') if isinstance(payload, dict) else None
+            raise BackendError(f"{method} {path} was not successful: {detail or 'no data in response'}")
+        return payload['data']
+
+    def login(self, email: str, password: str) -> str:
+        """Log in and keep the bearer token for later requests."""
+        body = json.dumps({'email': email, 'password': password}).encode()
+        self.token = self._request('POST', '/auth/login', body)['token']
+        return self.token
+
+    def submit(self, file_name: str, content: bytes) -> str:
+        """
+        Upload a shipment file and start its analysis job.
+
+        Args:
+            file_name: Name of the uploaded file (its extension selects the reader)
+            content: File contents
+
+        Returns:
+            str: Upload ID used to poll the job
+        """
+        body, content_type = multipart_body('file', file_name, content)
+        upload_id = self._request('POST', '/shipping/upload', body, content_type)['uploadId']
+        logger.info(f"Submitted {file_name} ({len(content)} bytes) as upload {upload_id}")
+        return upload_id
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """Current status, progress and (once completed) results of a job."""
+        return self._request('GET', f"/shipping/analysis/{upload_id}")
+
+    def wait(self, upload_id: str, on_progress: Optional[Callable[[int], None]] = None,
+             interval: float = POLL_INTERVAL, timeout: float = JOB_TIMEOUT,
+             sleep: Callable[[float], None] = time.sleep) -> Dict[str, Any]:
+        """
+        Poll a job until it completes.
+
+        Args:
+            upload_id: Upload ID returned by submit
+            on_progress: Called with the rows processed so far after each poll
+            interval: Seconds between polls
+            timeout: Seconds to wait before giving up
+            sleep: Sleep function between polls
+
+        Returns:
+            Dict[str, Any]: Completed analysis result
+        """
+        waited = 0.0
+        while True:
+            result = self.status(upload_id)
+            if on_progress is not None:
+                on_progress(result.get('processedRows', 0))
+            if result['status'] == 'completed':
+                return result
+            if result['status'] == 'failed':
+                raise BackendError(f"Analysis failed: {result.get('errorMessage') or 'unknown error'}")
+            if waited >= timeout:
+                raise BackendError(f"Analysis still running after {timeout:.0f} seconds")
+            sleep(interval)
+            waited += interval
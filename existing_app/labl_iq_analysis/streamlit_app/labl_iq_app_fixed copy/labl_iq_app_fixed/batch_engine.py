@@ -0,0 +1,621 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Batch Calculation Engine Module
+
+This module rates a whole DataFrame of shipments at once using the reference
+data loaded by AmazonRateCalculator. It follows the same rules as
+AmazonRateCalculator.calculate_shipment_rate but works on columns:
+1. Building the shipment frame (billable weight, service level) from mapped uploads
+2. Normalizing origin and destination ZIP codes once (see zip_normalization)
+3. Determining zones from the normalized ZIP prefixes
+4. Looking up base rates with a vectorized weight-break search
+5. Applying fuel and DAS/EDAS/Remote surcharges from a ZIP5 lookup table
+6. Applying markups and calculating savings against the carrier rate
+7. Rolling up results per origin ZIP for multi-warehouse uploads
+8. Rating one batch against several rate templates with per-template deltas
+"""
+
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from simple_zone_calculator import zone_calculator
+from zip_normalization import (
+    ZIP_DOMESTIC,
+    ZIP_INTERNATIONAL,
+    SURCHARGE_DAS,
+    SURCHARGE_EDAS,
+    SURCHARGE_REMOTE,
+    NormalizedZips,
+    build_surcharge_table,
+    lookup_surcharge_flags,
+    normalize_zips,
+)
+
+logger = logging.getLogger('labl_iq.batch_engine')
+
+# Zone columns of the Amazon Rates sheet
+RATE_ZONES = [str(zone) for zone in range(1, 9)]
+
+# Rate table sections ('Cntr' column) by package class
+LETTER_SECTION = 'Letters'
+PACKAGE_SECTION = 'Pkg'
+
+# Error codes stored in the 'error_code' column of rated shipments
+ERROR_NONE = 0
+ERROR_MISSING_DESTINATION = 1
+ERROR_INVALID_ORIGIN = 2
+ERROR_INVALID_WEIGHT = 3
+ERROR_INVALID_RATE = 4
+
+ERROR_MESSAGES = {
+    ERROR_NONE: '',
+    ERROR_MISSING_DESTINATION: "Calculation error: Missing or invalid destination ZIP",
+    ERROR_INVALID_ORIGIN: "Calculation error: Missing or invalid origin ZIP",
+    ERROR_INVALID_WEIGHT: "Calculation error: Missing or invalid weight",
+    ERROR_INVALID_RATE: "Base rate error: Invalid rate for weight, zone and package type",
+}
+
+# Service level keywords in uploaded data, checked in order
+SERVICE_LEVEL_KEYWORDS = [
+    ('ground', 'standard'),
+    ('express', 'expedited'),
+    ('priority', 'priority'),
+    ('next day', 'next_day'),
+    ('next-day', 'next_day'),
+]
+
+
+def _standardize_service_levels(values: pd.Series, default: str) -> pd.Series:
+    """Map free-text service levels to calculator service levels."""
+    codes, uniques = pd.factorize(values.astype(str).str.lower())
+    mapped = []
+    for level in uniques:
+        for keyword, service_level in SERVICE_LEVEL_KEYWORDS:
+            if keyword in level:
+                mapped.append(service_level)
+                break
+        else:
+            mapped.append(default)
+    return pd.Series(np.asarray(mapped, dtype=object)[codes], index=values.index)
+
+
+def build_shipment_frame(mapped_df: pd.DataFrame, criteria: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Build the shipment DataFrame for rating from mapped upload columns.
+
+    Calculates dimensional and billable weight, standardizes service levels and
+    assigns the origin ZIP (a mapped origin_zip column, falling back to the
+    client origin ZIP from the criteria). Rows whose weight, dimensions or carrier
+    rate cannot be read as numbers are dropped.
+
+    Args:
+        mapped_df: Upload data with columns renamed to the calculator fields
+        criteria: Calculation criteria (origin_zip, dim_divisor, service_level, package_type)
+
+    Returns:
+        pd.DataFrame: One row per shipment, ready for BatchRateEngine.rate_frame
+    """
+    index = mapped_df.index
+
+    def numeric(column: str) -> Tuple[pd.Series, pd.Series]:
+        raw = mapped_df[column] if column in mapped_df.columns else pd.Series(np.nan, index=index)
+        values = pd.to_numeric(raw, errors='coerce')
+        return values, values.isna() & raw.notna()
+
+    weight, bad_weight = numeric('weight')
+    carrier_rate, bad_rate = numeric('carrier_rate')
+    length, bad_length = numeric('length')
+    width, bad_width = numeric('width')
+    height, bad_height = numeric('height')
+    unreadable = (bad_weight | bad_rate | bad_length | bad_width | bad_height).to_numpy()
+
+    dim_weight = (length * width * height) / criteria.get('dim_divisor', 139.0)
+    dim_weight = dim_weight.fillna(weight)
+    billable_weight = weight.where(~(dim_weight > weight), dim_weight)
+
+    service_levels = mapped_df['service_level'] if 'service_level' in mapped_df.columns \
+        else pd.Series('standard', index=index)
+
+    # Per-row origin (multi-warehouse uploads); blanks use the client origin ZIP
+    origin = pd.Series(criteria['origin_zip'], index=index, dtype=object)
+    if 'origin_zip' in mapped_df.columns:
+        mapped_origin = mapped_df['origin_zip'].astype(str).str.strip()
+        has_origin = mapped_df['origin_zip'].notna() & ~mapped_origin.isin(['', 'nan', 'None'])
+        origin = origin.where(~has_origin, mapped_origin)
+
+    destination = mapped_df['destination_zip']
+    shipments = pd.DataFrame({
+        'shipment_id': mapped_df['shipment_id'].astype(str) if 'shipment_id' in mapped_df.columns else '',
+        'origin_zip': origin,
+        'destination_zip': destination.astype(str).where(destination.notna(), None),
+        'weight': weight,
+        'billable_weight': billable_weight,
+        'dim_weight': dim_weight,
+        'package_type': mapped_df['package_type'] if 'package_type' in mapped_df.columns
+        else criteria.get('package_type', 'box'),
+        'service_level': _standardize_service_levels(
+            service_levels, criteria.get('service_level', 'standard')
+        ),
+        'carrier_rate': carrier_rate,
+    }, index=index)
+    # Multi-file uploads keep each shipment's file for per-source rollups
+    if 'source_file' in mapped_df.columns:
+        shipments['source_file'] = mapped_df['source_file']
+
+    if unreadable.any():
+        logger.warning(f"Skipping {int(unreadable.sum())} shipments with non-numeric weight, dimensions or carrier rate")
+        shipments = shipments[~unreadable]
+    return shipments.reset_index(drop=True)
+
+
+def error_messages(error_codes: np.ndarray) -> pd.Categorical:
+    """
+    Translate error codes into messages without building a string per row.
+
+    Args:
+        error_codes: Values of the 'error_code' column
+
+    Returns:
+        pd.Categorical: Message per row backed by the ERROR_MESSAGES table
+    """
+    return pd.Categorical.from_codes(
+        np.asarray(error_codes, dtype=np.int8),
+        categories=[ERROR_MESSAGES[code] for code in sorted(ERROR_MESSAGES)]
+    )
+
+
+def summarize_errors(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count failed shipments per error code.
+
+    Args:
+        results: Output of BatchRateEngine.rate_frame
+
+    Returns:
+        pd.DataFrame: error_code, message and shipments for each code that occurred
+    """
+    counts = np.bincount(results['error_code'].to_numpy(dtype=np.intp), minlength=len(ERROR_MESSAGES))
+    codes = np.flatnonzero(counts[1:]) + 1
+    return pd.DataFrame({
+        'error_code': codes,
+        'message': [ERROR_MESSAGES[code] for code in codes],
+        'shipments': counts[codes],
+    })
+
+
+def summarize_by_origin(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Roll up rated shipments per origin ZIP.
+
+    Args:
+        results: Output of BatchRateEngine.rate_frame
+
+    Returns:
+        pd.DataFrame: One row per origin with shipment count, error count,
+        carrier cost, Amazon cost, savings and savings percentage
+    """
+    rated = results['error_code'] == ERROR_NONE
+    rollup = pd.DataFrame({
+        'origin_zip': results['origin_zip'].astype(str),
+        'shipments': 1,
+        'errors': (~rated).astype(int),
+        'carrier_cost': results['carrier_rate'].where(rated, 0.0).fillna(0.0),
+        'amazon_cost': results['final_rate'].fillna(0.0),
+        'savings': results['savings'].fillna(0.0),
+    }).groupby('origin_zip', sort=True).sum()
+
+    carrier_cost = rollup['carrier_cost'].to_numpy()
+    rollup['savings_percent'] = np.divide(
+        rollup['savings'].to_numpy() * 100, carrier_cost,
+        out=np.zeros(len(rollup)), where=carrier_cost > 0
+    )
+    return rollup.reset_index()
+
+
+class PreparedShipments(NamedTuple):
+    """Template-independent arrays for a batch of shipments (see BatchRateEngine.prepare)."""
+    dest: NormalizedZips             # normalized destination ZIPs
+    weights: np.ndarray              # billable weight
+    zones: np.ndarray                # zone 1-8 per row
+    is_letter: np.ndarray            # rated from the Letters section
+    markup_percentages: np.ndarray   # markup percentage per row
+    error_codes: np.ndarray          # input errors (before the rate lookup)
+    carrier_rates: Optional[np.ndarray]  # current carrier rate, if provided
+
+
+class BatchRateEngine:
+    """
+    Vectorized rating engine built on top of an AmazonRateCalculator.
+
+    The calculator's reference data is compiled once into NumPy arrays
+    (rate matrices per package class and a ZIP5 surcharge table); criteria are
+    read from the calculator on every call so update_criteria keeps working.
+    """
+
+    def __init__(self, calculator: Any):
+        """Compile the calculator's reference data for batch lookups."""
+        self.calculator = calculator
+        self.surcharge_table = build_surcharge_table(
+            calculator.das_zips_dict,
+            calculator.edas_zips_dict,
+            calculator.remote_zips_dict
+        )
+        self.rate_tables = self._compile_rate_table(calculator.rate_table)
+
+    @property
+    def criteria_values(self) -> Dict[str, Any]:
+        """Current calculation criteria of the underlying calculator."""
+        return self.calculator.criteria_values
+
+    def _compile_rate_table(self, rate_table: pd.DataFrame) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Split the Amazon Rates sheet into weight-break and rate arrays.
+
+        Returns:
+            Dict mapping the rate table section to (weight_breaks, rates) where
+            rates has one column per zone 1-8.
+        """
+        compiled = {}
+        for section in (LETTER_SECTION, PACKAGE_SECTION):
+            rows = rate_table[(rate_table['Cntr'] == section) & rate_table['lbs'].notna()]
+            compiled[section] = (
+                rows['lbs'].to_numpy(dtype=np.float64),
+                rows[RATE_ZONES].to_numpy(dtype=np.float64)
+            )
+        return compiled
+
+    def _is_letter(self, package_types: pd.Series) -> np.ndarray:
+        """Flag rows rated from the 'Letters' section (package type 'envelope')."""
+        codes, uniques = pd.factorize(package_types, use_na_sentinel=True)
+        unique_is_letter = np.array(
+            [isinstance(value, str) and value.lower().strip() == 'envelope' for value in uniques] + [False],
+            dtype=bool
+        )
+        return unique_is_letter[codes]
+
+    def _zones(self, origin: NormalizedZips, dest: NormalizedZips) -> np.ndarray:
+        """Determine zones for each row from the normalized ZIP prefixes."""
+        zones = np.full(len(dest.flag), 8, dtype=np.int8)
+        domestic = (dest.flag == ZIP_DOMESTIC) & (origin.flag == ZIP_DOMESTIC)
+        if domestic.any():
+            # Resolve one zone row per distinct origin prefix, then index it by destination
+            origin_codes, origin_prefixes = pd.factorize(origin.prefix[domestic])
+            zone_rows = zone_calculator.get_zones(
+                np.asarray(origin_prefixes)[:, None], np.arange(1000)[None, :]
+            )
+            zones[domestic] = zone_rows[origin_codes, dest.prefix[domestic]]
+        return zones
+
+    def _base_rates(self, weights: np.ndarray, zones: np.ndarray, is_letter: np.ndarray) -> np.ndarray:
+        """
+        Look up base rates the same way AmazonRateCalculator.get_base_rate does.
+
+        Zone 1 is rated as zone 2 and the weight break is found with a
+        right-bisect clamped to the table, matching the per-shipment logic.
+        """
+        base_rates = np.full(len(weights), np.nan)
+        rate_zone_idx = np.where(zones == 1, 2, zones).astype(np.intp) - 1
+        for section, rows in ((LETTER_SECTION, is_letter), (PACKAGE_SECTION, ~is_letter)):
+            breaks, rates = self.rate_tables[section]
+            if not rows.any() or len(breaks) == 0:
+                continue
+            idx = np.searchsorted(breaks, weights[rows], side='right')
+            idx = np.where(idx == 0, 1, idx)
+            idx = np.minimum(idx, len(breaks) - 1)
+            base_rates[rows] = rates[idx - 1, rate_zone_idx[rows]]
+        return base_rates
+
+    def _surcharges(self, base_rates: np.ndarray, dest: NormalizedZips) -> Dict[str, np.ndarray]:
+        """Apply fuel plus one of Remote > EDAS > DAS to each row."""
+        criteria = self.criteria_values
+        fuel_decimal = float(criteria.get('fuel_surcharge_percentage', 16.0)) / 100.0
+        das_amount = float(criteria.get('das_surcharge', 1.98))
+        edas_amount = float(criteria.get('edas_surcharge', 3.92))
+        remote_amount = float(criteria.get('remote_surcharge', 14.15))
+
+        flags = lookup_surcharge_flags(self.surcharge_table, dest)
+        remote = (dest.flag == ZIP_INTERNATIONAL) | ((flags & SURCHARGE_REMOTE) > 0)
+        edas = ~remote & ((flags & SURCHARGE_EDAS) > 0) & (edas_amount != 0)
+        das = ~remote & ~edas & ((flags & SURCHARGE_DAS) > 0)
+
+        surcharges = {
+            'fuel_surcharge': np.round(base_rates * fuel_decimal, 2),
+            'das_surcharge': np.where(das, das_amount, 0.0),
+            'edas_surcharge': np.where(edas, edas_amount, 0.0),
+            'remote_surcharge': np.where(remote, remote_amount, 0.0),
+        }
+        surcharges['total_surcharges'] = np.round(
+            surcharges['fuel_surcharge'] + surcharges['das_surcharge'] +
+            surcharges['edas_surcharge'] + surcharges['remote_surcharge'],
+            2
+        )
+        return surcharges
+
+    def _markup_percentages(self, service_levels: pd.Series) -> np.ndarray:
+        """Resolve the markup percentage per row (global markup first, then per service level)."""
+        criteria = self.criteria_values
+        if criteria.get('markup_percentage') is not None:
+            return np.full(len(service_levels), float(criteria['markup_percentage']))
+
+        codes, uniques = pd.factorize(service_levels, use_na_sentinel=True)
+        unique_markups = np.array(
+            [float(criteria.get(f"{level}_markup") or 0.0) for level in uniques] + [0.0]
+        )
+        return unique_markups[codes]
+
+    def rate_grid(self, weights: np.ndarray, zones: np.ndarray,
+                  package_types: List[str], service_levels: List[str]) -> np.ndarray:
+        """
+        Rate every combination of weight, zone, package type and service level.
+
+        Rates include fuel and the criteria markup but no DAS/EDAS/Remote
+        surcharges, i.e. the rate of a shipment to a standard destination.
+        Weights above the last weight break of a package class are NaN.
+
+        Args:
+            weights: Billable weights
+            zones: Zones 1-8
+            package_types: Package types ('envelope' rates from the Letters section)
+            service_levels: Service levels (for the per-service markup)
+
+        Returns:
+            np.ndarray: Rates shaped (service levels, package types, weights, zones)
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        zones = np.asarray(zones)
+        is_letter = self._is_letter(pd.Series(package_types))
+
+        # Flatten package type x weight x zone into rows for the base rate lookup
+        grid_letter, grid_weight, grid_zone = (
+            axis.ravel() for axis in np.meshgrid(is_letter, weights, zones, indexing='ij')
+        )
+        base_rates = self._base_rates(grid_weight, grid_zone, grid_letter)
+        max_weight = np.array([
+            self.rate_tables[LETTER_SECTION if letter else PACKAGE_SECTION][0][-1:].max(initial=0.0)
+            for letter in is_letter
+        ])
+        base_rates[grid_weight > np.repeat(max_weight, len(weights) * len(zones))] = np.nan
+        base_rates[~(base_rates > 0)] = np.nan
+
+        fuel_decimal = float(self.criteria_values.get('fuel_surcharge_percentage', 16.0)) / 100.0
+        rate_with_fuel = (base_rates + np.round(base_rates * fuel_decimal, 2)).reshape(
+            1, len(package_types), len(weights), len(zones)
+        )
+        markup_pct = self._markup_percentages(pd.Series(service_levels)).reshape(-1, 1, 1, 1)
+        return np.round(rate_with_fuel + rate_with_fuel * (markup_pct / 100.0), 2)
+
+    def prepare(self, shipments: pd.DataFrame) -> PreparedShipments:
+        """
+        Do the template-independent work for a batch of shipments.
+
+        ZIP normalization, zoning, billable weight, package class, markup and
+        input validation do not depend on the rate card, so a prepared batch
+        can be rated against several templates (see compare_templates).
+
+        Args:
+            shipments: DataFrame with one row per shipment (see rate_frame)
+
+        Returns:
+            PreparedShipments: Arrays shared by every template
+        """
+        criteria = self.criteria_values
+        index = shipments.index
+
+        if 'origin_zip' in shipments.columns:
+            origin_values = shipments['origin_zip']
+        else:
+            origin_values = pd.Series(criteria.get('origin_zip'), index=index, dtype=object)
+
+        # Normalize ZIP codes once for all downstream lookups
+        origin = normalize_zips(origin_values)
+        dest = normalize_zips(shipments['destination_zip'])
+
+        weights = pd.to_numeric(shipments['weight'], errors='coerce')
+        if 'billable_weight' in shipments.columns:
+            weights = pd.to_numeric(shipments['billable_weight'], errors='coerce').fillna(weights)
+        weights = weights.to_numpy(dtype=np.float64)
+
+        package_types = shipments['package_type'] if 'package_type' in shipments.columns \
+            else pd.Series('box', index=index)
+        service_levels = shipments['service_level'] if 'service_level' in shipments.columns \
+            else pd.Series('standard', index=index)
+
+        # Failures are recorded as error codes; failed rows get NaN outputs
+        error_codes = np.select(
+            [
+                (dest.flag != ZIP_DOMESTIC) & (dest.flag != ZIP_INTERNATIONAL),
+                origin.flag != ZIP_DOMESTIC,
+                ~(weights > 0),
+            ],
+            [ERROR_MISSING_DESTINATION, ERROR_INVALID_ORIGIN, ERROR_INVALID_WEIGHT],
+            default=ERROR_NONE
+        ).astype(np.uint8)
+
+        if 'carrier_rate' in shipments.columns:
+            carrier_rates = pd.to_numeric(shipments['carrier_rate'], errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            carrier_rates = None
+
+        return PreparedShipments(
+            dest=dest,
+            weights=weights,
+            zones=self._zones(origin, dest),
+            is_letter=self._is_letter(package_types),
+            markup_percentages=self._markup_percentages(service_levels),
+            error_codes=error_codes,
+            carrier_rates=carrier_rates,
+        )
+
+    def rate_prepared(self, prepared: PreparedShipments) -> Dict[str, np.ndarray]:
+        """
+        Rate a prepared batch against this engine's rate card and surcharge lists.
+
+        Args:
+            prepared: Output of prepare (from this or another engine)
+
+        Returns:
+            Dict of rate column name to array, including 'error_code'
+        """
+        missing = prepared.error_codes != ERROR_NONE
+        base_rates = self._base_rates(np.where(missing, 0.0, prepared.weights), prepared.zones, prepared.is_letter)
+        error_codes = prepared.error_codes.copy()
+        error_codes[~missing & ~(base_rates > 0)] = ERROR_INVALID_RATE
+        failed = error_codes != ERROR_NONE
+        base_rates = np.where(failed, np.nan, base_rates)
+
+        surcharges = self._surcharges(base_rates, prepared.dest)
+        for name, values in surcharges.items():
+            surcharges[name] = np.where(failed, np.nan, values)
+
+        markup_pct = prepared.markup_percentages
+        rate_with_surcharges = base_rates + surcharges['total_surcharges']
+        markup_raw = rate_with_surcharges * (markup_pct / 100.0)
+        final_rates = np.round(rate_with_surcharges + markup_raw, 2)
+
+        columns = {'base_rate': base_rates, **surcharges}
+        columns['discount_amount'] = np.full(len(base_rates), np.nan)
+        columns['markup_percentage'] = np.where(failed, np.nan, markup_pct)
+        columns['markup_amount'] = np.round(markup_raw, 2)
+        columns['final_rate'] = final_rates
+
+        if prepared.carrier_rates is not None:
+            carrier_rates = prepared.carrier_rates
+            positive = carrier_rates > 0
+            savings = np.where(positive, carrier_rates - final_rates, 0.0)
+            savings_percent = np.where(positive, savings / np.where(positive, carrier_rates, 1.0) * 100, 0.0)
+            columns['savings'] = np.where(failed, np.nan, savings)
+            columns['savings_percent'] = np.where(failed, np.nan, savings_percent)
+        else:
+            columns['carrier_rate'] = np.full(len(base_rates), np.nan)
+            columns['savings'] = np.full(len(base_rates), np.nan)
+            columns['savings_percent'] = np.full(len(base_rates), np.nan)
+
+        columns['error_code'] = error_codes
+        return columns
+
+    def rate_frame(self, shipments: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate rates for every shipment in a DataFrame.
+
+        Expects the columns produced for AmazonRateCalculator.calculate_rates
+        (destination_zip, weight and optionally origin_zip, billable_weight,
+        package_type, service_level, carrier_rate). A missing origin_zip column
+        falls back to the client origin ZIP from the criteria.
+
+        Args:
+            shipments: DataFrame with one row per shipment
+
+        Returns:
+            pd.DataFrame: The input columns plus the calculated rate columns
+        """
+        prepared = self.prepare(shipments)
+        columns = self.rate_prepared(prepared)
+        missing = prepared.error_codes != ERROR_NONE
+        error_codes = columns.pop('error_code')
+
+        result = shipments.copy()
+        result['zone'] = pd.array(np.where(missing, 0, prepared.zones), dtype='Int8')
+        result.loc[missing, 'zone'] = pd.NA
+        for name, values in columns.items():
+            result[name] = values
+        result['error_code'] = error_codes
+        result['errors'] = error_messages(error_codes)
+
+        _log_errors(error_codes)
+        return result
+
+
+def _log_errors(error_codes: np.ndarray, label: str = '') -> None:
+    """Log the number of rated shipments and a warning per error code."""
+    failed = error_codes != ERROR_NONE
+    logger.info(f"Batch rated {len(error_codes)} shipments{label} ({int(failed.sum())} with errors)")
+    if failed.any():
+        counts = np.bincount(error_codes, minlength=len(ERROR_MESSAGES))
+        for code in np.flatnonzero(counts[1:]) + 1:
+            logger.warning(f"{counts[code]} shipments{label}: {ERROR_MESSAGES[code]}")
+
+
+def compare_templates(engines: Dict[str, BatchRateEngine], shipments: pd.DataFrame,
+                      baseline: Optional[str] = None) -> pd.DataFrame:
+    """
+    Rate shipments against several rate templates in one pass.
+
+    ZIP normalization, zoning, billable weight and markups are computed once
+    with the baseline engine; only the base rate and surcharge lookups run per
+    template. Criteria (markup, fuel and surcharge amounts) come from each
+    engine's calculator, so keep them in sync to isolate the rate card impact.
+
+    Args:
+        engines: Template name (e.g. '2024', '2025') to BatchRateEngine
+        shipments: DataFrame with one row per shipment (see BatchRateEngine.rate_frame)
+        baseline: Template the deltas are measured against (defaults to the first)
+
+    Returns:
+        pd.DataFrame: The input columns plus zone, and per template
+        final_rate_<name> and error_code_<name>; for every template except the
+        baseline also delta_<name> and delta_percent_<name> against the baseline
+    """
+    if not engines:
+        raise ValueError("At least one rate template is required")
+    baseline = baseline if baseline is not None else next(iter(engines))
+    if baseline not in engines:
+        raise ValueError(f"Unknown baseline template: {baseline}")
+
+    prepared = engines[baseline].prepare(shipments)
+    missing = prepared.error_codes != ERROR_NONE
+
+    result = shipments.copy()
+    result['zone'] = pd.array(np.where(missing, 0, prepared.zones), dtype='Int8')
+    result.loc[missing, 'zone'] = pd.NA
+
+    final_rates = {}
+    for name, engine in engines.items():
+        columns = engine.rate_prepared(prepared)
+        final_rates[name] = columns['final_rate']
+        result[f'final_rate_{name}'] = columns['final_rate']
+        result[f'error_code_{name}'] = columns['error_code']
+        _log_errors(columns['error_code'], f" with template {name}")
+
+    base = final_rates[baseline]
+    for name, rates in final_rates.items():
+        if name == baseline:
+            continue
+        delta = np.round(rates - base, 2)
+        result[f'delta_{name}'] = delta
+        result[f'delta_percent_{name}'] = np.divide(
+            delta * 100, base, out=np.full(len(base), np.nan), where=base > 0
+        )
+    return result
+
+
+def summarize_template_deltas(comparison: pd.DataFrame, templates: List[str]) -> pd.DataFrame:
+    """
+    Total the rates of a template comparison per template.
+
+    Only shipments rated by every template are included so the totals are
+    comparable.
+
+    Args:
+        comparison: Output of compare_templates
+        templates: Template names in the comparison, baseline first
+
+    Returns:
+        pd.DataFrame: template, shipments, total_rate, average_rate, delta and delta_percent
+    """
+    rates = comparison[[f'final_rate_{name}' for name in templates]].to_numpy(dtype=np.float64)
+    rated = rates[~np.isnan(rates).any(axis=1)]
+    totals = rated.sum(axis=0)
+    shipments = len(rated)
+
+    delta = totals - totals[0]
+    return pd.DataFrame({
+        'template': templates,
+        'shipments': shipments,
+        'total_rate': totals,
+        'average_rate': totals / shipments if shipments else np.nan,
+        'delta': delta,
+        'delta_percent': np.divide(delta * 100, totals[0], out=np.zeros(len(totals)), where=totals[0] > 0),
+    })
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Breakdown View Module
+
+This module backs the Detailed Breakdown tab: shipments are filtered and
+sorted on the numeric results frame, and only the page being shown is
+turned into display strings.
+It provides functionality for:
+1. Filtering by zone, service level, carrier recommendation, savings range
+   and shipment ID / destination ZIP search
+2. Sorting the filtered rows by any column (missing values last)
+3. Slicing one page of rows
+4. Formatting currency, weight and percentage columns with vectorized string operations
+"""
+
+import logging
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('labl_iq.breakdown_view')
+
+# Display formats by column
+CURRENCY_COLUMNS = [
+    'base_rate', 'fuel_surcharge', 'das_surcharge', 'edas_surcharge', 'remote_surcharge',
+    'total_surcharges', 'final_rate', 'carrier_rate', 'savings'
+]
+WEIGHT_COLUMNS = ['weight', 'billable_weight', 'dim_weight']
+PERCENT_COLUMNS = ['savings_percent']
+
+PAGE_SIZES = [50, 100, 250, 500]
+
+
+class BreakdownFilters(NamedTuple):
+    """Breakdown filters; unset filters keep every row."""
+    zones: Optional[Tuple[int, ...]] = None
+    service_levels: Optional[Tuple[str, ...]] = None
+    recommendations: Optional[Tuple[str, ...]] = None
+    min_savings: Optional[float] = None
+    max_savings: Optional[float] = None
+    search: str = ''                         # shipment ID or destination ZIP prefix
+
+
+def filter_mask(results: pd.DataFrame, filters: BreakdownFilters) -> np.ndarray:
+    """
+    Boolean mask of the rows matching every set filter.
+
+    Args:
+        results: Rated shipments
+        filters: Breakdown filters
+
+    Returns:
+        np.ndarray: True for the matching rows
+    """
+    mask = np.ones(len(results), dtype=bool)
+    for column, values in (('zone', filters.zones),
+                           ('service_level', filters.service_levels),
+                           ('carrier_recommendation', filters.recommendations)):
+        if values and column in results.columns:
+            mask &= results[column].isin(values).to_numpy(dtype=bool, na_value=False)
+    if 'savings' in results.columns and (filters.min_savings is not None or filters.max_savings is not None):
+        savings = pd.to_numeric(results['savings'], errors='coerce').to_numpy(dtype=np.float64)
+        if filters.min_savings is not None:
+            mask &= savings >= filters.min_savings
+        if filters.max_savings is not None:
+            mask &= savings <= filters.max_savings
+    search = filters.search.strip()
+    if search:
+        found = np.zeros(len(results), dtype=bool)
+        for column in ('shipment_id', 'destination_zip'):
+            if column in results.columns:
+                found |= results[column].astype(str).str.startswith(search).to_numpy(dtype=bool, na_value=False)
+        mask &= found
+    return mask
+
+
+def sort_positions(results: pd.DataFrame, mask: np.ndarray,
+                   sort_by: Optional[str] = None, ascending: bool = True) -> np.ndarray:
+    """
+    Row positions of the masked rows in display order.
+
+    Args:
+        results: Rated shipments
+        mask: Output of filter_mask
+        sort_by: Column to sort by (file order when None)
+        ascending: Sort direction; missing values always go last
+
+    Returns:
+        np.ndarray: Positions into results
+    """
+    positions = np.flatnonzero(mask)
+    if sort_by is None or sort_by not in results.columns:
+        return positions
+    values = results[sort_by].iloc[positions].reset_index(drop=True)
+    try:
+        order = values.sort_values(ascending=ascending, na_position='last', kind='stable').index.to_numpy()
+    except TypeError:
+        # Mixed types (e.g. numeric and text IDs) sort as text
+        order = values.astype(str).sort_values(ascending=ascending, kind='stable').index.to_numpy()
+    return positions[order]
+
+
+def page_count(rows: int, page_size: int) -> int:
+    """Number of pages for rows (at least one)."""
+    return max(1, -(-rows // page_size))
+
+
+def breakdown_page(results: pd.DataFrame, positions: np.ndarray, page: int, page_size: int) -> pd.DataFrame:
+    """Rows of one page (pages start at 1)."""
+    start = (page - 1) * page_size
+    return results.iloc[positions[start:start + page_size]]
+
+
+def _format_numbers(values: pd.Series, template: str, prefix: str = '', suffix: str = '') -> np.ndarray:
+    """Format a column with one vectorized printf; text that isn't numeric shows as 0."""
+    numbers = pd.to_numeric(values, errors='coerce')
+    numbers = numbers.mask(numbers.isna() & values.notna(), 0.0).to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.char.add(np.char.add(prefix, np.char.mod(template, numbers)), suffix)
+
+
+def format_breakdown(page: pd.DataFrame) -> pd.DataFrame:
+    """
+    Display strings for one page of the breakdown.
+
+    Currency columns are shown as $0.00, weights as 0.00 and percentages as 0.0%.
+
+    Args:
+        page: Output of breakdown_page
+
+    Returns:
+        pd.DataFrame: A formatted copy of the page
+    """
+    formats = [(CURRENCY_COLUMNS, '%.2f', '$', ''), (WEIGHT_COLUMNS, '%.2f', '', ''), (PERCENT_COLUMNS, '%.1f', '', '%')]
+    formatted = {
+        column: _format_numbers(page[column], template, prefix, suffix)
+        for columns, template, prefix, suffix in formats
+        for column in columns if column in page.columns
+    }
+    return page.assign(**formatted)
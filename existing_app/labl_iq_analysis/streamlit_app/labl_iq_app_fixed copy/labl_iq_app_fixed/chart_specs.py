@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Chart Specs Module
+
+This module turns the small aggregated tables behind the result tabs into
+Vega-Lite chart specs and caches them, so a rerun reuses the spec instead
+of rebuilding the chart and its cost doesn't grow with the number of
+shipments.
+It provides functionality for:
+1. Building bar and line chart specs from a Series or DataFrame (one series per column)
+2. Caching specs by a hash of the table and the chart options (least recently used first out),
+   shared by every session and guarded by a lock
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from export_cache import dataset_key
+
+logger = logging.getLogger('labl_iq.chart_specs')
+
+CHART_KINDS = ('bar', 'line')
+
+# Number of specs kept by cached_chart_spec
+SPEC_CACHE_SIZE = 128
+
+# Shared by the script threads of every session
+_spec_cache: 'OrderedDict[Tuple[Any, ...], Dict[str, Any]]' = OrderedDict()
+_spec_cache_lock = threading.Lock()
+
+
+def chart_spec(kind: str, table: Union[pd.Series, pd.DataFrame],
+               x_title: str = '', y_title: str = '') -> Dict[str, Any]:
+    """
+    Build a Vega-Lite spec for an aggregated table.
+
+    The index becomes the x axis (kept in table order) and each column a
+    series; missing values are left out of the chart.
+
+    Args:
+        kind: 'bar' or 'line'
+        table: Aggregated values indexed by category
+        x_title: X axis title
+        y_title: Y axis title
+
+    Returns:
+        Dict[str, Any]: Vega-Lite spec with the data inlined
+    """
+    if kind not in CHART_KINDS:
+        raise ValueError(f"Unknown chart kind: {kind}")
+    frame = table.to_frame() if isinstance(table, pd.Series) else table
+    categories = np.asarray(frame.index.astype(str))
+    values = [
+        {'category': category, 'series': str(column), 'value': float(value)}
+        for column in frame.columns
+        for category, value in zip(categories, frame[column].to_numpy(dtype=np.float64, na_value=np.nan))
+        if not np.isnan(value)
+    ]
+
+    encoding = {
+        'x': {'field': 'category', 'type': 'ordinal', 'sort': list(categories), 'title': x_title,
+              'axis': {'labelAngle': 0}},
+        'y': {'field': 'value', 'type': 'quantitative', 'title': y_title},
+        'tooltip': [{'field': 'category', 'title': x_title or 'Category'},
+                    {'field': 'value', 'type': 'quantitative', 'title': y_title or 'Value', 'format': ',.2f'}],
+    }
+    if len(frame.columns) > 1:
+        encoding['color'] = {'field': 'series', 'type': 'nominal', 'title': None}
+        if kind == 'bar':
+            encoding['xOffset'] = {'field': 'series'}
+    mark = {'type': kind, 'point': True} if kind == 'line' else {'type': kind}
+    return {'data': {'values': values}, 'mark': mark, 'encoding': encoding}
+
+
+def cached_chart_spec(kind: str, table: Union[pd.Series, pd.DataFrame], **options: str) -> Dict[str, Any]:
+    """
+    Chart spec for a table, reused while the table's values and the options are unchanged.
+
+    Args:
+        kind: 'bar' or 'line'
+        table: Aggregated values indexed by category
+        **options: x_title / y_title passed to chart_spec
+
+    Returns:
+        Dict[str, Any]: Vega-Lite spec
+    """
+    frame = table.to_frame() if isinstance(table, pd.Series) else table
+    key = (kind, dataset_key(frame.reset_index(names='category')), tuple(sorted(options.items())))
+    with _spec_cache_lock:
+        spec = _spec_cache.get(key)
+        if spec is not None:
+            _spec_cache.move_to_end(key)
+            return spec
+    spec = chart_spec(kind, table, **options)
+    with _spec_cache_lock:
+        # Another session may have built the same spec meanwhile; keep the first one
+        spec = _spec_cache.setdefault(key, spec)
+        _spec_cache.move_to_end(key)
+        if len(_spec_cache) > SPEC_CACHE_SIZE:
+            _spec_cache.popitem(last=False)
+    return spec
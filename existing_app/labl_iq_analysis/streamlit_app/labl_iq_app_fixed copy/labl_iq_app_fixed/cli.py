@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Command Line Module
+
+This module rates shipment files without the Streamlit UI or the API, for
+large backfills: the input is streamed in chunks through shipment
+normalization and the batch rating engine, optionally across worker
+processes, and the rated rows are written as they are produced.
+It provides functionality for:
+1. Reading CSV, Excel and Parquet inputs in chunks of the mapped columns
+2. Suggesting a column mapping from the header (DataProcessor rules) or loading a saved one
+3. Rating chunks in-process or on worker processes, keeping input order
+4. Writing Parquet or CSV results, a JSON summary and rows/sec progress
+
+Usage:
+    python cli.py rate shipments.csv -o rated.parquet --origin-zip 46307 --workers 4
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from batch_engine import ERROR_MESSAGES, BatchRateEngine, build_shipment_frame
+from data_processing import DataProcessor
+from summary_accumulator import RateSummaryAccumulator
+from upload_reader import TEXT_FIELDS
+
+logger = logging.getLogger('labl_iq.cli')
+
+# Fields the rating pipeline reads from an input file
+RATE_FIELDS = ['shipment_id', 'origin_zip', 'destination_zip', 'weight', 'length', 'width', 'height',
+               'carrier_rate', 'service_level', 'package_type']
+REQUIRED_RATE_FIELDS = ['destination_zip', 'weight']
+
+DEFAULT_CHUNK_SIZE = 100000
+DEFAULT_TEMPLATE = "2025 Amazon Quote Tool Template.xlsx"
+
+# Weight units converted to pounds by dividing
+WEIGHT_UNITS = {'lb': 1.0, 'oz': 16.0, 'g': 453.592}
+
+# Rating engine of a worker process, built once by _init_worker
+_worker_engine: Optional[BatchRateEngine] = None
+_worker_criteria: Dict[str, Any] = {}
+
+
+def input_columns(path: str) -> List[str]:
+    """Column names of a CSV, Excel or Parquet file."""
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    if path.lower().endswith(('.xlsx', '.xls')):
+        return list(pd.read_excel(path, nrows=0).columns)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def suggest_mapping(columns: List[str]) -> Dict[str, str]:
+    """
+    Map rating fields to input columns with the DataProcessor header rules.
+
+    Args:
+        columns: Input column names
+
+    Returns:
+        Dict[str, str]: Field name -> input column for the fields that matched
+    """
+    processor = DataProcessor()
+    processor.csv_headers = columns
+    return {field: column for field, column in processor.suggest_column_mapping().items() if field in RATE_FIELDS}
+
+
+def read_chunks(path: str, mapping: Dict[str, str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream the mapped columns of an input file, renamed to their fields.
+
+    Text fields (ZIPs, IDs, labels) are read as strings; numbers are parsed by
+    the reader and coerced later by build_shipment_frame.
+
+    Args:
+        path: CSV, Excel or Parquet file
+        mapping: Field name -> input column
+        chunk_size: Rows per chunk
+
+    Yields:
+        pd.DataFrame: One column per mapped field
+    """
+    columns = list(dict.fromkeys(mapping.values()))
+    text = {mapping[field]: str for field in TEXT_FIELDS if field in mapping}
+    lower = path.lower()
+    if lower.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        batches = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns))
+    elif lower.endswith(('.xlsx', '.xls')):
+        # Excel has no streaming reader; the sheet is read once and then chunked
+        sheet = pd.read_excel(path, usecols=columns, dtype=text)
+        batches = (sheet.iloc[start:start + chunk_size] for start in range(0, len(sheet), chunk_size))
+    else:
+        batches = pd.read_csv(path, usecols=columns, dtype=text, chunksize=chunk_size)
+
+    for batch in batches:
+        yield pd.DataFrame({field: batch[column] for field, column in mapping.items()}).reset_index(drop=True)
+
+
+def rate_chunk(engine: BatchRateEngine, mapped: pd.DataFrame, criteria: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Normalize and rate one chunk of mapped shipments.
+
+    Args:
+        engine: Batch rating engine
+        mapped: Mapped input columns
+        criteria: Calculation criteria (origin_zip, dim_divisor, weight_divisor, ...)
+
+    Returns:
+        pd.DataFrame: Rated shipments
+    """
+    divisor = criteria.get('weight_divisor', 1.0)
+    if divisor != 1.0:
+        # Unreadable weights are kept as read so build_shipment_frame skips their rows
+        weight = pd.to_numeric(mapped['weight'], errors='coerce')
+        mapped = mapped.assign(weight=(weight / divisor).where(weight.notna(), mapped['weight']))
+    return engine.rate_frame(build_shipment_frame(mapped, criteria))
+
+
+def load_engine(template: str, criteria: Dict[str, Any]) -> BatchRateEngine:
+    """Build the rating engine from a rate template and criteria."""
+    from calc_engine import AmazonRateCalculator
+    calculator = AmazonRateCalculator(template)
+    calculator.update_criteria(criteria)
+    return calculator.batch_engine
+
+
+def _init_worker(engine_loader: Callable[[str, Dict[str, Any]], BatchRateEngine], template: str,
+                 criteria: Dict[str, Any]) -> None:
+    global _worker_engine, _worker_criteria
+    _worker_engine = engine_loader(template, criteria)
+    _worker_criteria = criteria
+
+
+def _rate_in_worker(mapped: pd.DataFrame) -> pd.DataFrame:
+    return rate_chunk(_worker_engine, mapped, _worker_criteria)
+
+
+class ResultWriter:
+    """Appends rated chunks to a Parquet or CSV file."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the writer; the file is created with the first chunk.
+
+        Args:
+            path: Output file (.parquet for Parquet, anything else for CSV)
+        """
+        self.path = path
+        self.parquet = path.lower().endswith('.parquet')
+        self._writer = None
+        self._schema = None
+        self._started = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Append a chunk of rated shipments."""
+        if not self.parquet:
+            chunk.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                # Columns that are all missing in the first chunk are typed as strings
+                self._schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                          for f in table.schema])
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            if not table.schema.equals(self._schema):
+                # Later chunks may type a column differently (all missing, or values in a string column)
+                table = pa.Table.from_arrays([table.column(f.name).cast(f.type) for f in self._schema],
+                                             schema=self._schema)
+            self._writer.write_table(table)
+        self._started = True
+
+    def close(self) -> None:
+        """Finish the output file."""
+        if self._writer is not None:
+            self._writer.close()
+        elif not self._started and not self.parquet:
+            open(self.path, 'w').close()
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def rate_file(input_path: str, output_path: str, mapping: Dict[str, str], criteria: Dict[str, Any],
+              engine: Optional[BatchRateEngine] = None, template: str = DEFAULT_TEMPLATE,
+              chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1,
+              progress: Optional[Callable[[int, float], None]] = None,
+              engine_loader: Callable[[str, Dict[str, Any]], BatchRateEngine] = load_engine) -> Dict[str, Any]:
+    """
+    Rate every shipment of an input file and write the results.
+
+    With one worker the chunks are rated in this process by engine (loaded
+    from the template when not given); with more, each worker process loads
+    its own engine and at most two chunks per worker are in flight. Input rows
+    that can't be turned into a shipment (e.g. an unreadable weight) are
+    counted as skipped rather than written.
+
+    Args:
+        input_path: CSV, Excel or Parquet input
+        output_path: Parquet or CSV output
+        mapping: Field name -> input column
+        criteria: Calculation criteria; origin_zip is required
+        engine: Rating engine for in-process rating
+        template: Rate template loaded by worker processes (and when engine is None)
+        chunk_size: Rows per chunk
+        workers: Number of rating processes
+        progress: Called after each chunk with the rows written and rows per second
+        engine_loader: Builds an engine from the template and criteria (must be importable by workers)
+
+    Returns:
+        Dict[str, Any]: Run summary (input, written and skipped rows, timing, errors and rate statistics)
+    """
+    missing = [field for field in REQUIRED_RATE_FIELDS if field not in mapping]
+    if missing:
+        raise ValueError(f"Missing column mappings for: {', '.join(missing)}")
+    if not criteria.get('origin_zip') and 'origin_zip' not in mapping:
+        raise ValueError("An origin ZIP is required when origin_zip is not mapped")
+
+    started = time.perf_counter()
+    summary = RateSummaryAccumulator()
+    error_counts = np.zeros(len(ERROR_MESSAGES), dtype=np.int64)
+    writer = ResultWriter(output_path)
+    input_rows = rows = chunks = 0
+
+    def collect(rated: pd.DataFrame) -> None:
+        nonlocal rows, chunks
+        writer.write(rated)
+        summary.update(rated)
+        error_counts[:] += np.bincount(rated['error_code'].to_numpy(dtype=np.intp), minlength=len(ERROR_MESSAGES))
+        rows += len(rated)
+        chunks += 1
+        rate = rows / max(time.perf_counter() - started, 1e-9)
+        logger.info(f"Rated {rows:,} rows ({rate:,.0f} rows/sec)")
+        if progress is not None:
+            progress(rows, rate)
+
+    def counted(batches: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        nonlocal input_rows
+        for mapped in batches:
+            input_rows += len(mapped)
+            yield mapped
+
+    source = counted(read_chunks(input_path, mapping, chunk_size))
+    try:
+        if workers <= 1:
+            engine = engine or engine_loader(template, criteria)
+            for mapped in source:
+                collect(rate_chunk(engine, mapped, criteria))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(engine_loader, template, criteria)) as executor:
+                pending = deque()
+                for mapped in source:
+                    pending.append(executor.submit(_rate_in_worker, mapped))
+                    if len(pending) >= 2 * workers:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    stats = {key: _json_value(value) for key, value in summary.stats().items()}
+    return {
+        'input': input_path,
+        'output': output_path,
+        'input_rows': input_rows,
+        'rows': rows,
+        'skipped_rows': input_rows - rows,
+        'chunks': chunks,
+        'chunk_size': chunk_size,
+        'workers': workers,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None,
+        'errors': {ERROR_MESSAGES[code]: int(error_counts[code]) for code in np.flatnonzero(error_counts[1:]) + 1},
+        **stats,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser for the labl-iq command."""
+    parser = argparse.ArgumentParser(prog='labl-iq', description="Labl IQ Rate Analyzer batch tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rate = commands.add_parser('rate', help="Rate a shipment file and write the results")
+    rate.add_argument('input', help="Shipment file (.csv, .xlsx or .parquet)")
+    rate.add_argument('-o', '--output', help="Results file (.parquet or .csv; default: <input>_rated.csv)")
+    rate.add_argument('--summary', help="JSON summary file (default: <output>.summary.json)")
+    rate.add_argument('--mapping', help="JSON column mapping (field -> column); suggested from the header when omitted")
+    rate.add_argument('--criteria', help="JSON file of calculation criteria, e.g. "
+                                         "{\"markup_percentage\": 12, \"dim_divisor\": 139}")
+    rate.add_argument('--origin-zip', help="Client origin ZIP for rows without a mapped origin")
+    rate.add_argument('--weight-unit', choices=sorted(WEIGHT_UNITS), default='lb', help="Unit of the weight column")
+    rate.add_argument('--template', default=DEFAULT_TEMPLATE, help="Amazon rate template")
+    rate.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows rated per chunk")
+    rate.add_argument('--workers', type=int, default=1, help="Rating processes")
+    return parser
+
+
+def run_rate(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the rate command."""
+    output = args.output or f"{os.path.splitext(args.input)[0]}_rated.csv"
+    if args.mapping:
+        with open(args.mapping, 'r') as f:
+            mapping = {field: column for field, column in json.load(f).items() if field in RATE_FIELDS and column}
+    else:
+        mapping = suggest_mapping(input_columns(args.input))
+        logger.info(f"Suggested column mapping: {mapping}")
+
+    criteria: Dict[str, Any] = {}
+    if args.criteria:
+        with open(args.criteria, 'r') as f:
+            criteria = json.load(f)
+    if args.origin_zip:
+        criteria['origin_zip'] = args.origin_zip
+    criteria['weight_divisor'] = WEIGHT_UNITS[args.weight_unit]
+
+    result = rate_file(args.input, output, mapping, criteria, template=args.template,
+                       chunk_size=args.chunk_size, workers=args.workers)
+    with open(args.summary or f"{output}.summary.json", 'w') as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the labl-iq command."""
+    args = build_parser().parse_args(argv)
+    try:
+        result = run_rate(args)
+    except (ValueError, OSError) as e:
+        logger.error(str(e))
+        return 1
+    print(f"Rated {result['rows']:,} rows ({result['skipped_rows']:,} skipped) in {result['elapsed_seconds']:,.1f}s "
+          f"({result['rows_per_second'] or 0:,.0f} rows/sec) -> {result['output']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
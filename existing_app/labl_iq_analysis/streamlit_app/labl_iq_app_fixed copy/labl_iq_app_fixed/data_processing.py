@@ -20,6 +20,8 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple, Union, Set
 
+from summary_accumulator import SummaryAccumulator
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -509,39 +511,24 @@ class DataProcessor:
         if not self.processed_data:
             self.prepare_data_for_calculation()
             
+        summary = SummaryAccumulator(
+            value_columns=['weight', 'billable_weight'],
+            category_columns=['package_type', 'service_level'],
+            zip_columns=['origin_zip', 'destination_zip']
+        ).update(self.processed_data)
+        
         stats = {
-            'total_shipments': len(self.processed_data),
-            'total_weight': sum(row['weight'] for row in self.processed_data),
-            'total_billable_weight': sum(row['billable_weight'] for row in self.processed_data),
-            'avg_weight': sum(row['weight'] for row in self.processed_data) / len(self.processed_data) if self.processed_data else 0,
-            'avg_billable_weight': sum(row['billable_weight'] for row in self.processed_data) / len(self.processed_data) if self.processed_data else 0,
-            'package_types': {},
-            'service_levels': {},
-            'origin_zips': set(),
-            'destination_zips': set()
+            'total_shipments': summary.rows,
+            'total_weight': summary.total('weight'),
+            'total_billable_weight': summary.total('billable_weight'),
+            'avg_weight': summary.total('weight') / summary.rows if summary.rows else 0,
+            'avg_billable_weight': summary.total('billable_weight') / summary.rows if summary.rows else 0,
+            'package_types': summary.category_counts('package_type'),
+            'service_levels': summary.category_counts('service_level'),
+            'unique_origin_zips': summary.distinct_zips('origin_zip'),
+            'unique_destination_zips': summary.distinct_zips('destination_zip')
         }
         
-        for row in self.processed_data:
-            # Count package types
-            package_type = row.get('package_type', 'unknown')
-            stats['package_types'][package_type] = stats['package_types'].get(package_type, 0) + 1
-            
-            # Count service levels
-            service_level = row.get('service_level', 'unknown')
-            stats['service_levels'][service_level] = stats['service_levels'].get(service_level, 0) + 1
-            
-            # Collect unique ZIP codes
-            if 'origin_zip' in row:
-                stats['origin_zips'].add(row['origin_zip'])
-            if 'destination_zip' in row:
-                stats['destination_zips'].add(row['destination_zip'])
-        
-        # Convert sets to counts
-        stats['unique_origin_zips'] = len(stats['origin_zips'])
-        stats['unique_destination_zips'] = len(stats['destination_zips'])
-        del stats['origin_zips']
-        del stats['destination_zips']
-        
         return stats
 
 
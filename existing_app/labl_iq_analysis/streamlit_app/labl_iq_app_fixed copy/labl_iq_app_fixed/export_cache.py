@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Export Cache Module
+
+This module produces download payloads only when an export is requested and
+keeps them for reuse, keyed by the dataset they were built from and the
+export format.
+It provides functionality for:
+1. Fingerprinting a dataset so exports are reused until the data changes
+2. Writing CSV and Excel exports straight to a temporary file
+3. Keeping small payloads in memory and large ones in their temp file, out of
+   session state (the download button still reads a payload when it is rendered)
+4. Discarding payloads of replaced datasets and removing their files, and the
+   temporary directory once the cache is cleared or garbage collected
+"""
+
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+from typing import BinaryIO, Callable, Dict, Hashable, Optional, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger('labl_iq.export_cache')
+
+# Export formats: MIME type and file extension
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+}
+
+# Payloads above this size stay on disk instead of in session state
+LARGE_EXPORT_BYTES = 20 * 1024 * 1024
+
+
+def dataset_key(frame: pd.DataFrame) -> str:
+    """
+    Fingerprint of a frame's columns and values.
+
+    Args:
+        frame: Dataset an export is built from
+
+    Returns:
+        str: Hex digest that changes whenever the data changes
+    """
+    digest = hashlib.sha1(','.join(map(str, frame.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def write_export(frame: pd.DataFrame, export_format: str, path: str,
+                 sheet_name: str = 'Sheet1', index: bool = False) -> None:
+    """
+    Write a frame to a file in an export format.
+
+    Args:
+        frame: Data to export
+        export_format: 'csv' or 'xlsx'
+        path: Destination file
+        sheet_name: Worksheet name for Excel exports
+        index: Whether to write the frame index
+    """
+    if export_format == 'csv':
+        frame.to_csv(path, index=index)
+    elif export_format == 'xlsx':
+        frame.to_excel(path, sheet_name=sheet_name, index=index, engine='openpyxl')
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+
+class ExportCache:
+    """
+    Export payloads keyed by (dataset key, export name, format).
+
+    Payloads are built on request; small ones are kept as bytes, large ones
+    stay in a temporary directory owned by the cache. The directory is removed
+    by clear, when the cache is garbage collected or at interpreter exit.
+    """
+
+    def __init__(self, large_bytes: int = LARGE_EXPORT_BYTES):
+        """
+        Initialize an empty cache.
+
+        Args:
+            large_bytes: Payload size above which the file is kept on disk
+        """
+        self.large_bytes = large_bytes
+        self.directory: Optional[str] = None
+        self._cleanup: Optional[weakref.finalize] = None
+        self._payloads: Dict[Tuple[str, Hashable, str], Union[bytes, str]] = {}
+
+    def __contains__(self, key: Tuple[str, Hashable, str]) -> bool:
+        return key in self._payloads
+
+    def build(self, key: Tuple[str, Hashable, str], write: Callable[[str], None]) -> None:
+        """
+        Build and store a payload.
+
+        Args:
+            key: (dataset key, export name, format)
+            write: Writes the export to the path it is given
+        """
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='labl_iq_exports_')
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+        fd, path = tempfile.mkstemp(suffix=EXPORT_FORMATS[key[2]][1], dir=self.directory)
+        os.close(fd)
+        try:
+            write(path)
+            size = os.path.getsize(path)
+            if size > self.large_bytes:
+                self._payloads[key] = path
+                path = None
+            else:
+                with open(path, 'rb') as f:
+                    self._payloads[key] = f.read()
+        finally:
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+        logger.info(f"Built {key[1]} export ({key[2]}, {size} bytes)")
+
+    def open(self, key: Tuple[str, Hashable, str]) -> BinaryIO:
+        """Open a stored payload for reading (use as a context manager)."""
+        payload = self._payloads[key]
+        if isinstance(payload, bytes):
+            return io.BytesIO(payload)
+        return open(payload, 'rb')
+
+    def retain(self, dataset: str) -> None:
+        """Discard the payloads of every dataset but one."""
+        for key in [key for key in self._payloads if key[0] != dataset]:
+            self._discard(key)
+
+    def clear(self) -> None:
+        """Discard every payload and remove the temporary directory."""
+        self._payloads.clear()
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+        self.directory = None
+
+    def _discard(self, key: Tuple[str, Hashable, str]) -> None:
+        payload = self._payloads.pop(key)
+        if isinstance(payload, str) and os.path.exists(payload):
+            os.remove(payload)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Markup Optimizer Module
+
+This module solves for the markup that meets a pricing target on a rated
+shipment file, instead of adjusting the markup by hand and re-rating.
+It provides functionality for:
+1. Extracting the pre-markup invariants (Amazon cost with surcharges, carrier rate) once
+2. Repricing every shipment for a candidate markup with vectorized NumPy operations
+3. Bisecting the markup (global or for one service level) to hit a target
+   savings percentage or a minimum average margin per package
+4. Summarizing the repriced results for the solution
+5. Turning a solution into the criteria the rate engines apply
+"""
+
+import logging
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('labl_iq.markup_optimizer')
+
+# Supported targets
+TARGET_SAVINGS_PERCENT = 'savings_percent'
+TARGET_MARGIN_PER_PACKAGE = 'margin_per_package'
+
+# Markup search range (%) and precision (percentage points)
+DEFAULT_MARKUP_BOUNDS = (0.0, 100.0)
+DEFAULT_TOLERANCE = 0.01
+
+
+class MarkupInvariants(NamedTuple):
+    """Per-shipment values that do not change with the markup."""
+    cost: np.ndarray                 # base rate plus surcharges (before markup), rated rows only
+    carrier_rates: np.ndarray        # current carrier rate (0 when unknown)
+    markups: np.ndarray              # markup percentage the shipments were rated with
+    service_levels: np.ndarray       # service level per row
+
+
+class MarkupSolution(NamedTuple):
+    """Result of a markup search."""
+    markup_percentage: float
+    service_level: Optional[str]     # None for a global markup
+    target: str
+    target_value: float
+    achieved: float
+    feasible: bool                   # False when the target can't be met within the bounds
+    iterations: int
+    summary: Dict[str, Any]
+
+
+def markup_invariants(results: pd.DataFrame) -> MarkupInvariants:
+    """
+    Extract the pre-markup invariants from rated shipments.
+
+    Args:
+        results: Output of AmazonRateCalculator.calculate_rates_frame
+
+    Returns:
+        MarkupInvariants: Arrays for the successfully rated shipments
+    """
+    rated = results['final_rate'].notna().to_numpy()
+    cost = (results['base_rate'] + results['total_surcharges']).to_numpy(dtype=np.float64)[rated]
+    carrier_rates = pd.to_numeric(results['carrier_rate'], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)[rated]
+    markups = results['markup_percentage'].fillna(0.0).to_numpy(dtype=np.float64)[rated]
+    service_levels = results['service_level'].to_numpy()[rated] if 'service_level' in results.columns \
+        else np.full(int(rated.sum()), 'standard', dtype=object)
+    return MarkupInvariants(cost, carrier_rates, markups, service_levels)
+
+
+def reprice(invariants: MarkupInvariants, markups: np.ndarray) -> np.ndarray:
+    """Final rates for per-row markup percentages (same rounding as the batch engine)."""
+    return np.round(invariants.cost + invariants.cost * (markups / 100.0), 2)
+
+
+def summarize_pricing(invariants: MarkupInvariants, final_rates: np.ndarray) -> Dict[str, Any]:
+    """
+    Summarize repriced shipments.
+
+    Savings are measured on shipments with a known carrier rate; margin is the
+    Labl IQ rate minus the Amazon cost (base rate plus surcharges).
+
+    Returns:
+        Dict with shipment count, costs, savings, savings percentage and margins
+    """
+    known = invariants.carrier_rates > 0
+    current_cost = float(invariants.carrier_rates[known].sum())
+    compared_cost = float(final_rates[known].sum())
+    savings = current_cost - compared_cost
+    margin = final_rates - invariants.cost
+    shipments = len(final_rates)
+    return {
+        'total_shipments': shipments,
+        'total_current_cost': current_cost,
+        'total_amazon_cost': float(final_rates.sum()),
+        'total_savings': savings,
+        'savings_percent': savings / current_cost * 100 if current_cost > 0 else 0.0,
+        'total_margin': float(margin.sum()),
+        'avg_margin_per_package': float(margin.mean()) if shipments else 0.0,
+    }
+
+
+def _target_value(invariants: MarkupInvariants, final_rates: np.ndarray, target: str) -> float:
+    """Evaluate the target metric for repriced shipments."""
+    if target == TARGET_SAVINGS_PERCENT:
+        known = invariants.carrier_rates > 0
+        current_cost = invariants.carrier_rates[known].sum()
+        return float((current_cost - final_rates[known].sum()) / current_cost * 100) if current_cost > 0 else 0.0
+    return float((final_rates - invariants.cost).mean()) if len(final_rates) else 0.0
+
+
+def optimize_markup(invariants: MarkupInvariants,
+                    target: str,
+                    target_value: float,
+                    service_level: Optional[str] = None,
+                    bounds: Tuple[float, float] = DEFAULT_MARKUP_BOUNDS,
+                    tolerance: float = DEFAULT_TOLERANCE) -> MarkupSolution:
+    """
+    Find the markup that meets a target.
+
+    Savings fall and margins rise as the markup goes up, so the search
+    returns the highest markup that still delivers the target savings
+    percentage, or the lowest markup that reaches the target average margin.
+
+    Args:
+        invariants: Output of markup_invariants
+        target: TARGET_SAVINGS_PERCENT or TARGET_MARGIN_PER_PACKAGE
+        target_value: Savings percentage or dollars of margin per package
+        service_level: Only change the markup of this service level (others keep theirs)
+        bounds: Markup search range in percent
+        tolerance: Markup precision in percentage points
+
+    Returns:
+        MarkupSolution: The markup, the achieved target value and the repriced summary
+    """
+    if target not in (TARGET_SAVINGS_PERCENT, TARGET_MARGIN_PER_PACKAGE):
+        raise ValueError(f"Unknown markup target: {target}")
+
+    selected = invariants.service_levels == service_level if service_level is not None \
+        else np.ones(len(invariants.cost), dtype=bool)
+    if not selected.any():
+        raise ValueError(f"No rated shipments for service level: {service_level}")
+
+    def evaluate(markup: float) -> Tuple[float, np.ndarray]:
+        final_rates = reprice(invariants, np.where(selected, markup, invariants.markups))
+        return _target_value(invariants, final_rates, target), final_rates
+
+    # Margin targets are met above the solution, savings targets below it
+    rising = target == TARGET_MARGIN_PER_PACKAGE
+
+    low, high = bounds
+    iterations = 0
+    low_value, _ = evaluate(low)
+    high_value, _ = evaluate(high)
+    if rising and high_value < target_value:
+        markup, feasible = high, False
+    elif not rising and low_value < target_value:
+        markup, feasible = low, False
+    elif rising and low_value >= target_value:
+        markup, feasible = low, True
+    elif not rising and high_value >= target_value:
+        markup, feasible = high, True
+    else:
+        # Invariant: the target is met at one end and missed at the other
+        while high - low > tolerance:
+            iterations += 1
+            middle = (low + high) / 2
+            middle_value, _ = evaluate(middle)
+            if (middle_value >= target_value) == rising:
+                high = middle
+            else:
+                low = middle
+        markup, feasible = (high if rising else low), True
+
+    # Round towards the side that meets the target
+    markup = float(np.ceil(markup * 100) / 100 if rising else np.floor(markup * 100) / 100)
+    achieved, final_rates = evaluate(markup)
+    if not feasible:
+        logger.warning(f"Markup target {target}={target_value} not reachable within {bounds}; using {markup}%")
+    logger.info(f"Markup {markup}% gives {target}={achieved:.2f} after {iterations} iterations")
+    return MarkupSolution(
+        markup_percentage=markup,
+        service_level=service_level,
+        target=target,
+        target_value=target_value,
+        achieved=achieved,
+        feasible=feasible,
+        iterations=iterations,
+        summary=summarize_pricing(invariants, final_rates),
+    )
+
+
+def solution_criteria(solution: MarkupSolution, criteria: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Criteria updates that make the rate engines apply a solved markup.
+
+    The engines use the global markup whenever one is set and fall back to
+    the service level markups otherwise, so a service level solution only
+    takes effect without a global markup.
+
+    Args:
+        solution: Output of optimize_markup
+        criteria: Current rating criteria
+
+    Returns:
+        Dict of criteria keys to update
+
+    Raises:
+        ValueError: If a service level solution is applied while a global markup is set
+    """
+    markup = solution.markup_percentage
+    if solution.service_level is None:
+        return {'markup_percentage': markup}
+    if criteria.get('markup_percentage') is not None:
+        raise ValueError("Service level markups are ignored while a global markup is set")
+    service_level = solution.service_level
+    return {
+        'service_level_markups': {**(criteria.get('service_level_markups') or {}), service_level: markup},
+        f'{service_level}_markup': markup,
+    }
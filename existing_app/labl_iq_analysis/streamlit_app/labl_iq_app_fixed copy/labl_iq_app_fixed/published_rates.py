@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Published Rate Card Module
+
+This module generates the customer-facing rate card straight from the
+compiled Amazon rate tables and calculation criteria, so every cell has a
+rate regardless of which shipments were uploaded.
+It provides functionality for:
+1. Defining the published weight tiers (1-15 oz, then 1-150 lb) and zones 2-8
+2. Rating every service level, package type, weight tier and zone in one pass
+3. Applying the card markup, minimum margin and rounding to the nearest $0.05
+4. Shaping one service level and package type into a printable table
+5. Counting rated shipments per card cell in one grouped aggregation
+6. Writing the complete card set as a multi-sheet workbook with a streaming writer
+"""
+
+import io
+import logging
+from typing import Any, List, Optional
+
+import xlsxwriter
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('labl_iq.published_rates')
+
+# Weight tiers: <= 1oz ... <= 15oz, then <= 1lb ... <= 150lb
+WEIGHT_TIER_LABELS = [f"<= {oz}oz" for oz in range(1, 16)] + [f"<= {lb}lb" for lb in range(1, 151)]
+WEIGHT_TIER_WEIGHTS = np.array([oz / 16 for oz in range(1, 16)] + list(range(1, 151)), dtype=np.float64)
+
+# Zones shown on the published card
+PUBLISHED_ZONES = list(range(2, 9))
+
+SERVICE_LEVELS = ['standard', 'expedited', 'priority', 'next_day']
+PACKAGE_TYPES = ['box', 'envelope']
+
+# Published rates are rounded to the nearest $0.05
+ROUNDING_INCREMENT = 0.05
+
+
+def published_rate_card(engine: Any,
+                        markup_pct: float = 10.0,
+                        min_margin: float = 0.5,
+                        service_levels: List[str] = SERVICE_LEVELS,
+                        package_types: List[str] = PACKAGE_TYPES) -> pd.DataFrame:
+    """
+    Generate the full published rate card.
+
+    Each cell is priced at the tier's maximum weight: the Amazon rate (base,
+    fuel and criteria markup) plus the larger of the card markup and the
+    minimum margin, rounded to the nearest $0.05.
+
+    Args:
+        engine: BatchRateEngine compiled from the loaded template
+        markup_pct: Markup percentage applied to every cell
+        min_margin: Minimum dollar margin per cell
+        service_levels: Service levels to include
+        package_types: Package types to include
+
+    Returns:
+        pd.DataFrame: Index (service_level, package_type, weight_tier), one
+        column per zone; NaN where the template has no rate
+    """
+    costs = engine.rate_grid(WEIGHT_TIER_WEIGHTS, np.array(PUBLISHED_ZONES), package_types, service_levels)
+    rates = np.maximum(costs * (1 + markup_pct / 100), costs + min_margin)
+    rates = np.round(np.round(rates / ROUNDING_INCREMENT) * ROUNDING_INCREMENT, 2)
+
+    index = pd.MultiIndex.from_product(
+        [service_levels, package_types, WEIGHT_TIER_LABELS],
+        names=['service_level', 'package_type', 'weight_tier']
+    )
+    card = pd.DataFrame(rates.reshape(-1, len(PUBLISHED_ZONES)), index=index, columns=PUBLISHED_ZONES)
+
+    missing = int(np.isnan(rates).sum())
+    logger.info(f"Generated published rate card with {rates.size} cells ({missing} without a template rate)")
+    return card
+
+
+def rate_card_table(card: pd.DataFrame, service_level: str, package_type: str) -> pd.DataFrame:
+    """
+    Select one service level and package type from a published rate card.
+
+    Args:
+        card: Output of published_rate_card
+        service_level: Service level to show
+        package_type: Package type to show
+
+    Returns:
+        pd.DataFrame: 'Billable Weight' column followed by one column per zone;
+        tiers the template can't rate are dropped
+    """
+    selected = (card.index.get_level_values('service_level') == service_level) & \
+        (card.index.get_level_values('package_type') == package_type)
+    table = card[selected].droplevel(['service_level', 'package_type']).dropna(how='all')
+    table.index.name = 'Billable Weight'
+    return table.reset_index()
+
+
+def weight_tiers(weights: pd.Series) -> pd.Categorical:
+    """
+    Assign billable weights to published weight tiers (the first tier at or above the weight).
+
+    Args:
+        weights: Billable weights in lbs
+
+    Returns:
+        pd.Categorical: Tier label per row; NaN above 150 lb or for missing weights
+    """
+    weights = pd.to_numeric(weights, errors='coerce').to_numpy(dtype=np.float64)
+    codes = np.searchsorted(WEIGHT_TIER_WEIGHTS, weights, side='left')
+    codes[~(weights > 0) | (codes >= len(WEIGHT_TIER_WEIGHTS))] = -1
+    return pd.Categorical.from_codes(codes, categories=WEIGHT_TIER_LABELS)
+
+
+def shipment_mix(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count rated shipments and their average Amazon rate per card cell.
+
+    All service level x package type x zone x weight tier cells are
+    aggregated in a single groupby.
+
+    Args:
+        results: Rated shipments (service_level, package_type, zone, billable_weight, final_rate)
+
+    Returns:
+        pd.DataFrame: service_level, package_type, weight_tier, zone, shipments and avg_final_rate
+    """
+    rated = results[results['final_rate'].notna()]
+    weights = rated['billable_weight'] if 'billable_weight' in rated.columns else rated['weight']
+    package_types = rated['package_type'] if 'package_type' in rated.columns else pd.Series('box', index=rated.index)
+    keys = pd.DataFrame({
+        'service_level': rated['service_level'] if 'service_level' in rated.columns else 'standard',
+        'package_type': np.where(package_types.astype(str).str.lower().str.strip() == 'envelope', 'envelope', 'box'),
+        'weight_tier': weight_tiers(weights),
+        'zone': rated['zone'],
+        'final_rate': rated['final_rate'],
+    })
+    return keys.groupby(['service_level', 'package_type', 'weight_tier', 'zone'], observed=True).agg(
+        shipments=('final_rate', 'size'),
+        avg_final_rate=('final_rate', 'mean'),
+    ).reset_index()
+
+
+def rate_card_workbook(card: pd.DataFrame, results: Optional[pd.DataFrame] = None) -> bytes:
+    """
+    Write every service level and package type of a published card to one workbook.
+
+    Rows are streamed with xlsxwriter's constant memory mode, one sheet per
+    service level and package type, plus a shipment mix sheet when rated
+    shipments are given.
+
+    Args:
+        card: Output of published_rate_card
+        results: Optional rated shipments for the 'Shipment Mix' sheet
+
+    Returns:
+        bytes: The .xlsx file
+    """
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {'constant_memory': True, 'nan_inf_to_errors': True})
+    header = workbook.add_format({'bold': True})
+    currency = workbook.add_format({'num_format': '$#,##0.00'})
+
+    service_levels = card.index.get_level_values('service_level').unique()
+    package_types = card.index.get_level_values('package_type').unique()
+    for service_level in service_levels:
+        for package_type in package_types:
+            table = rate_card_table(card, service_level, package_type)
+            if table.empty:
+                continue
+            sheet = workbook.add_worksheet(f"{service_level.replace('_', ' ').title()} - {package_type.title()}"[:31])
+            sheet.write_row(0, 0, ['Billable Weight'] + [f"Zone {zone}" for zone in PUBLISHED_ZONES], header)
+            sheet.set_column(0, 0, 16)
+            for row, (label, *rates) in enumerate(table.itertuples(index=False), start=1):
+                sheet.write_string(row, 0, label)
+                for col, rate in enumerate(rates, start=1):
+                    if not np.isnan(rate):
+                        sheet.write_number(row, col, rate, currency)
+
+    if results is not None:
+        mix = shipment_mix(results)
+        sheet = workbook.add_worksheet('Shipment Mix')
+        sheet.write_row(0, 0, ['Service Level', 'Package Type', 'Billable Weight', 'Zone',
+                               'Shipments', 'Avg Amazon Rate'], header)
+        for row, record in enumerate(mix.itertuples(index=False), start=1):
+            sheet.write_row(row, 0, [record.service_level, record.package_type, record.weight_tier,
+                                     int(record.zone), int(record.shipments)])
+            sheet.write_number(row, 5, record.avg_final_rate, currency)
+
+    workbook.close()
+    logger.info(f"Wrote rate card workbook with {len(workbook.worksheets())} sheets")
+    return buffer.getvalue()
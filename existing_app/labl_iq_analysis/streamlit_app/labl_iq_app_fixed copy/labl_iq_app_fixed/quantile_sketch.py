@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Quantile Sketch Module
+
+This module provides a mergeable t-digest for estimating percentiles (median,
+p90, ...) of savings and rate distributions in constant memory.
+It provides functionality for:
+1. Adding chunks of values to a digest with vectorized NumPy compression
+2. Merging digests built from separate chunks or worker processes
+3. Estimating quantiles from the compressed centroids
+4. Serializing digests to plain dictionaries for storage
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Union
+
+import numpy as np
+
+logger = logging.getLogger('labl_iq.quantile_sketch')
+
+# Number of centroids kept is about compression / 2
+DEFAULT_COMPRESSION = 200.0
+
+
+class TDigest:
+    """
+    Mergeable t-digest quantile sketch.
+
+    Values are kept as weighted centroids. Centroids are sized with the k1
+    scale function, so the tails stay precise and the sketch never grows
+    beyond about compression / 2 centroids regardless of the number of values.
+    """
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        """Initialize an empty digest."""
+        self.compression = float(compression)
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        """Total weight (number of values) added to the digest."""
+        return float(self.weights.sum())
+
+    def update(self, values: Iterable[float]) -> 'TDigest':
+        """
+        Add values to the digest (NaN values are ignored).
+
+        Args:
+            values: Array-like of numbers
+
+        Returns:
+            TDigest: self, to allow chaining
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """
+        Merge another digest into this one.
+
+        Args:
+            other: Digest built from other values
+
+        Returns:
+            TDigest: self, to allow chaining
+        """
+        if len(other.means) == 0:
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        """Sort the centroids and merge neighbours that fall in the same k1 bin."""
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        bins = np.floor(k).astype(np.int64)
+
+        starts = np.flatnonzero(np.diff(bins, prepend=bins[0] - 1))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q: Union[float, Iterable[float]]) -> Union[float, np.ndarray]:
+        """
+        Estimate one or more quantiles.
+
+        Args:
+            q: Quantile(s) between 0 and 1
+
+        Returns:
+            float or np.ndarray: Estimated value(s); NaN for an empty digest
+        """
+        scalar = np.isscalar(q)
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if len(self.means) == 0:
+            result = np.full(len(q), np.nan)
+        else:
+            total = self.weights.sum()
+            # Interpolate between centroid centres, anchored at the exact min and max
+            centres = np.cumsum(self.weights) - self.weights / 2
+            positions = np.concatenate([[0.0], centres, [total]])
+            values = np.concatenate([[self.min], self.means, [self.max]])
+            result = np.interp(np.clip(q, 0, 1) * total, positions, values)
+        return float(result[0]) if scalar else result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the digest to a JSON-compatible dictionary."""
+        return {
+            'compression': self.compression,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+            'min': self.min if len(self.means) else None,
+            'max': self.max if len(self.means) else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'TDigest':
+        """Restore a digest serialized with to_dict."""
+        digest = cls(state.get('compression', DEFAULT_COMPRESSION))
+        digest.means = np.asarray(state.get('means', []), dtype=np.float64)
+        digest.weights = np.asarray(state.get('weights', []), dtype=np.float64)
+        if len(digest.means):
+            digest.min = float(state['min'])
+            digest.max = float(state['max'])
+        return digest
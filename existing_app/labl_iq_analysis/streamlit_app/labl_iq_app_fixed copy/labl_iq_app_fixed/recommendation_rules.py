@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Carrier Recommendation Rules Module
+
+This module decides which shipments should stay with the current carrier
+and which are better sent with an alternative carrier, from a declarative
+list of rules evaluated over all rated shipments at once.
+It provides functionality for:
+1. Declaring rules by surcharge type and threshold, zone, weight band and savings sign
+2. Building the default rules from the EDAS/Remote thresholds in the criteria
+3. Compiling the rules into vectorized masks that emit recommendation and reason codes
+4. Rendering reason text only for the rows that are displayed or exported
+"""
+
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('labl_iq.recommendation_rules')
+
+# Recommendation codes stored in 'recommendation_code'
+RECOMMEND_CURRENT = 0
+RECOMMEND_ALTERNATIVE = 1
+
+RECOMMENDATION_LABELS = ['Current Carrier', 'Alternative Carrier']
+
+# Reason code 0 means no rule matched; rule i has reason code i + 1
+REASON_NONE = 0
+
+# Savings sign conditions
+SAVINGS_POSITIVE = 'positive'
+SAVINGS_NEGATIVE = 'negative'
+
+
+class RecommendationRule(NamedTuple):
+    """
+    One recommendation rule; a shipment matches when every condition that is set holds.
+
+    The first matching rule decides the recommendation and reason.
+    """
+    label: str                               # reason text (the surcharge amount is appended)
+    recommendation: int = RECOMMEND_ALTERNATIVE
+    surcharge: Optional[str] = None          # 'das', 'edas', 'remote' or 'fuel'; must be > 0
+    min_surcharge: float = 0.0               # surcharge amount threshold
+    zones: Optional[Tuple[int, ...]] = None
+    min_weight: Optional[float] = None       # billable weight band, lower bound (exclusive)
+    max_weight: Optional[float] = None       # billable weight band, upper bound (inclusive)
+    savings: Optional[str] = None            # SAVINGS_POSITIVE or SAVINGS_NEGATIVE
+
+
+def default_rules(criteria: Dict[str, Any]) -> List[RecommendationRule]:
+    """
+    Build the recommendation rules from calculation criteria.
+
+    Custom rules can be given as a list of dicts under 'recommendation_rules';
+    otherwise Remote and EDAS shipments above their thresholds go to an
+    alternative carrier (Remote first, as it is the costlier surcharge).
+
+    Args:
+        criteria: Calculation criteria (edas_threshold, remote_threshold, recommendation_rules)
+
+    Returns:
+        List[RecommendationRule]: Rules in priority order
+    """
+    if criteria.get('recommendation_rules'):
+        return [RecommendationRule(**rule) for rule in criteria['recommendation_rules']]
+    return [
+        RecommendationRule('Remote surcharge', surcharge='remote',
+                           min_surcharge=float(criteria.get('remote_threshold', 14.15))),
+        RecommendationRule('EDAS surcharge', surcharge='edas',
+                           min_surcharge=float(criteria.get('edas_threshold', 3.92))),
+    ]
+
+
+def _rule_mask(results: pd.DataFrame, rule: RecommendationRule) -> np.ndarray:
+    """Compile one rule into a boolean mask over the results."""
+    mask = np.ones(len(results), dtype=bool)
+    if rule.surcharge is not None:
+        amounts = results[f'{rule.surcharge}_surcharge'].to_numpy(dtype=np.float64, na_value=0.0)
+        mask &= (amounts > 0) & (amounts >= rule.min_surcharge)
+    if rule.zones is not None:
+        mask &= results['zone'].isin(rule.zones).to_numpy(dtype=bool, na_value=False)
+    if rule.min_weight is not None or rule.max_weight is not None:
+        weights = results['billable_weight'] if 'billable_weight' in results.columns else results['weight']
+        weights = pd.to_numeric(weights, errors='coerce').to_numpy(dtype=np.float64)
+        if rule.min_weight is not None:
+            mask &= weights > rule.min_weight
+        if rule.max_weight is not None:
+            mask &= weights <= rule.max_weight
+    if rule.savings is not None:
+        savings = results['savings'].to_numpy(dtype=np.float64, na_value=np.nan)
+        mask &= savings > 0 if rule.savings == SAVINGS_POSITIVE else savings < 0
+    return mask
+
+
+def evaluate_rules(results: pd.DataFrame, rules: List[RecommendationRule]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate all rules over the results in one pass.
+
+    Args:
+        results: Rated shipments
+        rules: Rules in priority order
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: uint8 recommendation code and reason code per row
+    """
+    if not rules:
+        zeros = np.zeros(len(results), dtype=np.uint8)
+        return zeros, zeros.copy()
+    reason_codes = np.select(
+        [_rule_mask(results, rule) for rule in rules],
+        np.arange(1, len(rules) + 1),
+        default=REASON_NONE
+    ).astype(np.uint8)
+    recommendations = np.array([RECOMMEND_CURRENT] + [rule.recommendation for rule in rules], dtype=np.uint8)
+    return recommendations[reason_codes], reason_codes
+
+
+def add_recommendations(results: pd.DataFrame, rules: List[RecommendationRule]) -> pd.DataFrame:
+    """
+    Add carrier recommendation columns to rated shipments (in place).
+
+    Adds 'recommendation_code', 'recommendation_reason_code' and
+    'carrier_recommendation' (a Categorical of RECOMMENDATION_LABELS).
+    Reason text is not stored; see with_recommendation_reasons.
+
+    Args:
+        results: Rated shipments
+        rules: Rules in priority order
+
+    Returns:
+        pd.DataFrame: results, for chaining
+    """
+    recommendations, reason_codes = evaluate_rules(results, rules)
+    results['recommendation_code'] = recommendations
+    results['recommendation_reason_code'] = reason_codes
+    results['carrier_recommendation'] = pd.Categorical.from_codes(recommendations, categories=RECOMMENDATION_LABELS)
+    logger.info(f"Recommended an alternative carrier for {int((recommendations == RECOMMEND_ALTERNATIVE).sum())} "
+                f"of {len(results)} shipments")
+    return results
+
+
+def recommendation_reasons(results: pd.DataFrame, rules: List[RecommendationRule]) -> pd.Series:
+    """
+    Render reason text for rows that carry a reason code.
+
+    Call this on the rows being displayed or exported; text is built per
+    rule for the matching rows only.
+
+    Args:
+        results: Rows with a 'recommendation_reason_code' column
+        rules: The rules the codes were evaluated with
+
+    Returns:
+        pd.Series: Reason text per row ('' when no rule matched)
+    """
+    reasons = pd.Series('', index=results.index, dtype=object)
+    codes = results['recommendation_reason_code'].to_numpy()
+    for code in np.unique(codes[codes != REASON_NONE]):
+        rule = rules[code - 1]
+        rows = codes == code
+        if rule.surcharge is not None:
+            amounts = results.loc[rows, f'{rule.surcharge}_surcharge'].to_numpy(dtype=np.float64)
+            reasons[rows] = np.char.add(f'{rule.label}: $', np.char.mod('%.2f', amounts))
+        else:
+            reasons[rows] = rule.label
+    return reasons
+
+
+def with_recommendation_reasons(results: pd.DataFrame, rules: List[RecommendationRule]) -> pd.DataFrame:
+    """Return the rows with a rendered 'recommendation_reason' column."""
+    if 'recommendation_reason_code' not in results.columns:
+        return results
+    return results.assign(recommendation_reason=recommendation_reasons(results, rules))
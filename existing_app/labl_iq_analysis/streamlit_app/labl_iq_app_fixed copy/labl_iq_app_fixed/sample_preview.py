@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Sample Preview Module
+
+This module gives a fast first look at large uploads by rating a stratified
+sample of shipments and projecting the results to the full file.
+It provides functionality for:
+1. Stratifying shipments by zone proxy (destination ZIP region), weight band and service level
+2. Drawing a proportional stratified sample of about 10k rows
+3. Projecting totals and savings to the full upload with confidence intervals
+"""
+
+import logging
+from statistics import NormalDist
+from typing import Any, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from summary_accumulator import weight_brackets
+from zip_normalization import ZIP_DOMESTIC, normalize_zips
+
+logger = logging.getLogger('labl_iq.sample_preview')
+
+# Number of shipments rated for a preview
+PREVIEW_SAMPLE_SIZE = 10000
+
+# Uploads with more rows than this get a preview before the full run
+PREVIEW_THRESHOLD = 50000
+
+
+class StratifiedSample(NamedTuple):
+    """Sampled shipments plus the stratum bookkeeping needed for projection."""
+    rows: pd.DataFrame               # sampled shipments
+    strata: np.ndarray               # stratum code of each sampled row
+    population_sizes: np.ndarray     # shipments per stratum in the full upload
+    sample_sizes: np.ndarray         # sampled shipments per stratum
+
+
+def stratum_codes(shipments: pd.DataFrame) -> np.ndarray:
+    """
+    Assign each shipment to a stratum of zone proxy x weight band x service level.
+
+    The zone proxy is the first digit of the destination ZIP (zones follow
+    ZIP regions), with international and invalid destinations in their own group.
+
+    Args:
+        shipments: Shipment DataFrame (destination_zip, weight/billable_weight, service_level)
+
+    Returns:
+        np.ndarray: Integer stratum code per row
+    """
+    dest = normalize_zips(shipments['destination_zip'])
+    region = np.where(dest.flag == ZIP_DOMESTIC, dest.prefix // 100, 10 + dest.flag)
+
+    weights = shipments['billable_weight'] if 'billable_weight' in shipments.columns else shipments['weight']
+    weight_band = weight_brackets(pd.to_numeric(weights, errors='coerce')).cat.codes.to_numpy()
+
+    if 'service_level' in shipments.columns:
+        service_level = pd.factorize(shipments['service_level'])[0]
+    else:
+        service_level = np.zeros(len(shipments), dtype=np.int64)
+
+    keys = pd.DataFrame({'region': region, 'weight_band': weight_band, 'service_level': service_level})
+    return keys.groupby(list(keys.columns), sort=False).ngroup().to_numpy()
+
+
+def stratified_sample(shipments: pd.DataFrame,
+                      sample_size: int = PREVIEW_SAMPLE_SIZE,
+                      seed: Optional[int] = None) -> StratifiedSample:
+    """
+    Draw a proportional stratified sample of shipments.
+
+    Every stratum with at least two shipments gets at least two sampled rows
+    so its variance can be estimated.
+
+    Args:
+        shipments: Shipment DataFrame
+        sample_size: Approximate number of rows to sample
+        seed: Optional random seed for reproducible previews
+
+    Returns:
+        StratifiedSample: Sampled rows and stratum sizes
+    """
+    strata = stratum_codes(shipments)
+    population_sizes = np.bincount(strata)
+    total = len(shipments)
+
+    if total <= sample_size:
+        sample_sizes = population_sizes.copy()
+    else:
+        sample_sizes = np.round(population_sizes * (sample_size / total)).astype(np.int64)
+        sample_sizes = np.clip(sample_sizes, np.minimum(population_sizes, 2), population_sizes)
+
+    # Shuffle within strata, then keep the first n_h rows of each stratum
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(total), strata))
+    sorted_strata = strata[order]
+    stratum_starts = np.concatenate([[0], np.cumsum(population_sizes)[:-1]])
+    position = np.arange(total) - stratum_starts[sorted_strata]
+    selected = np.sort(order[position < sample_sizes[sorted_strata]])
+
+    logger.info(f"Drew stratified sample of {len(selected)} from {total} shipments ({len(population_sizes)} strata)")
+    return StratifiedSample(
+        rows=shipments.iloc[selected],
+        strata=strata[selected],
+        population_sizes=population_sizes,
+        sample_sizes=sample_sizes
+    )
+
+
+def _stratified_total(values: np.ndarray, sample: StratifiedSample) -> Tuple[float, float]:
+    """Estimate a population total and its variance from sampled values."""
+    n_strata = len(sample.population_sizes)
+    n = sample.sample_sizes.astype(np.float64)
+    N = sample.population_sizes.astype(np.float64)
+
+    sums = np.bincount(sample.strata, weights=values, minlength=n_strata)
+    squares = np.bincount(sample.strata, weights=values ** 2, minlength=n_strata)
+    means = np.divide(sums, n, out=np.zeros(n_strata), where=n > 0)
+    variances = np.divide(squares - n * means ** 2, n - 1, out=np.zeros(n_strata), where=n > 1)
+
+    total = float((N * means).sum())
+    variance = float(np.sum(np.divide(N ** 2 * (1 - n / np.maximum(N, 1)) * np.maximum(variances, 0), n,
+                                      out=np.zeros(n_strata), where=n > 0)))
+    return total, variance
+
+
+def project_totals(rated_sample: pd.DataFrame, sample: StratifiedSample,
+                   confidence: float = 0.95) -> pd.DataFrame:
+    """
+    Project rated sample results to the full upload.
+
+    Args:
+        rated_sample: Rating results for sample.rows (same row order)
+        sample: The stratified sample that was rated
+        confidence: Confidence level of the intervals
+
+    Returns:
+        pd.DataFrame: metric, estimate, lower and upper for shipment counts,
+        costs, savings and savings percentage
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rated = rated_sample['final_rate'].notna().to_numpy()
+    with_savings = rated_sample['savings'].notna().to_numpy()
+
+    final_rate = rated_sample['final_rate'].fillna(0.0).to_numpy(dtype=np.float64)
+    savings = rated_sample['savings'].fillna(0.0).to_numpy(dtype=np.float64)
+    carrier_rate = np.where(with_savings, pd.to_numeric(rated_sample['carrier_rate'], errors='coerce'), 0.0)
+    carrier_rate = np.nan_to_num(carrier_rate)
+
+    rows = []
+    for metric, values in (('Failed Shipments', (~rated).astype(np.float64)),
+                           ('Total Current Cost', carrier_rate),
+                           ('Total Labl IQ Cost', final_rate),
+                           ('Total Savings', savings)):
+        total, variance = _stratified_total(values, sample)
+        margin = z * np.sqrt(variance)
+        rows.append({'metric': metric, 'estimate': total, 'lower': total - margin, 'upper': total + margin})
+
+    # Savings percentage is a ratio estimate; linearize around it for the interval
+    carrier_total, _ = _stratified_total(carrier_rate, sample)
+    savings_total = rows[3]['estimate']
+    ratio = savings_total / carrier_total if carrier_total else 0.0
+    _, residual_variance = _stratified_total(savings - ratio * carrier_rate, sample)
+    margin = z * np.sqrt(residual_variance) / carrier_total * 100 if carrier_total else 0.0
+    rows.append({'metric': 'Savings %', 'estimate': ratio * 100,
+                 'lower': ratio * 100 - margin, 'upper': ratio * 100 + margin})
+
+    return pd.DataFrame(rows, columns=['metric', 'estimate', 'lower', 'upper'])
+
+
+def preview_rates(calculator: Any, shipments: pd.DataFrame,
+                  sample_size: int = PREVIEW_SAMPLE_SIZE,
+                  seed: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Rate a stratified sample and project the results to all shipments.
+
+    Args:
+        calculator: AmazonRateCalculator (anything with calculate_rates_frame)
+        shipments: Shipment DataFrame for the full upload
+        sample_size: Approximate number of rows to rate
+        seed: Optional random seed
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Rated sample and projected totals
+    """
+    sample = stratified_sample(shipments, sample_size, seed)
+    rated_sample = calculator.calculate_rates_frame(sample.rows)
+    return rated_sample, project_totals(rated_sample, sample)
@@ -7,6 +7,8 @@ Uses basic geographic logic based on ZIP code ranges.
 import re
 from typing import Tuple, Optional
 
+import numpy as np
+
 class SimpleZoneCalculator:
     """
     A simple zone calculator that uses basic geographic logic.
@@ -47,6 +49,11 @@ class SimpleZoneCalculator:
         for zone, zip_ranges in self.zone_ranges.items():
             for zip_prefix in zip_ranges:
                 self.zip_to_zone[zip_prefix] = zone
+        
+        # Array lookup indexed by integer 3-digit prefix for bulk zoning
+        self.prefix_zones = np.full(1000, 8, dtype=np.int8)
+        for zip_prefix, zone in self.zip_to_zone.items():
+            self.prefix_zones[int(zip_prefix)] = zone
     
     def get_zone(self, origin_zip: str, destination_zip: str) -> int:
         """
@@ -67,6 +74,23 @@ class SimpleZoneCalculator:
         # Return the destination zone directly
         return dest_zone
     
+    def get_zones(self, origin_prefixes, dest_prefixes) -> np.ndarray:
+        """
+        Calculate zones for arrays of integer 3-digit ZIP prefixes.
+        Same rules as get_zone; negative (missing) prefixes get zone 8.
+        The arrays broadcast, so a column of origins against all 1000
+        destination prefixes gives one zone row per origin.
+        Returns an int8 array of zone numbers 1-8.
+        """
+        origin_prefixes = np.asarray(origin_prefixes)
+        dest_prefixes = np.asarray(dest_prefixes)
+        
+        valid = (dest_prefixes >= 0) & (dest_prefixes < 1000)
+        zones = self.prefix_zones[np.where(valid, dest_prefixes, 999)]
+        
+        # Same 3-digit prefix, zone 1
+        return np.where(valid & (origin_prefixes == dest_prefixes), 1, zones).astype(np.int8)
+    
     def _standardize_zip(self, zip_code: str) -> str:
         """
         Standardize ZIP code to 3-digit prefix.
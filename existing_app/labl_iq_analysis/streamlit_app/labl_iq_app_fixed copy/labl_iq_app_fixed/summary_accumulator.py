@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Summary Accumulator Module
+
+This module collects summary statistics in a single pass per chunk of
+shipments. Accumulators from separate chunks or worker processes can be
+merged into the same result as one pass over all rows.
+It provides functionality for:
+1. Counts, sums, means and min/max of numeric columns (NaN values skipped)
+2. Value counts of categorical columns (package type, service level, ...)
+3. Distinct ZIP counts using a ZIP5 bitmap (exact and cheap to merge)
+4. Rate summaries of calculation results (RateSummaryAccumulator), including
+   percentile sketches per zone, weight bracket and service level
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import TDigest
+from zip_normalization import ZIP_DOMESTIC, ZIP5_DOMAIN, normalize_zips
+
+logger = logging.getLogger('labl_iq.summary_accumulator')
+
+# Weight brackets (billable lbs) used for rate analysis
+WEIGHT_BRACKET_BINS = [0, 1, 5, 10, 20, 50, 100, float('inf')]
+WEIGHT_BRACKET_LABELS = ['0-1 lbs', '1-5 lbs', '5-10 lbs', '10-20 lbs', '20-50 lbs', '50-100 lbs', '100+ lbs']
+
+# Distributions sketched by RateSummaryAccumulator and the groupings they are kept for
+QUANTILE_METRICS = ['savings', 'savings_percent', 'final_rate', 'surcharge_burden']
+QUANTILE_DIMENSIONS = ['all', 'zone', 'weight_bracket', 'service_level']
+
+
+def weight_brackets(weights: pd.Series) -> pd.Series:
+    """Assign weights (lbs) to the standard weight brackets."""
+    return pd.cut(weights, bins=WEIGHT_BRACKET_BINS, labels=WEIGHT_BRACKET_LABELS)
+
+
+class SummaryAccumulator:
+    """
+    Mergeable single-pass summary of shipment rows.
+
+    Columns missing from a chunk are skipped for that chunk, so the same
+    accumulator can be fed partial frames.
+    """
+
+    def __init__(self,
+                 value_columns: Iterable[str] = (),
+                 category_columns: Iterable[str] = (),
+                 zip_columns: Iterable[str] = ()):
+        """
+        Initialize an empty accumulator.
+
+        Args:
+            value_columns: Numeric columns to count, sum and track min/max for
+            category_columns: Columns to keep value counts for
+            zip_columns: ZIP code columns to count distinct values for
+        """
+        self.value_columns = list(value_columns)
+        self.category_columns = list(category_columns)
+        self.zip_columns = list(zip_columns)
+
+        self.rows = 0
+        self.counts = {column: 0 for column in self.value_columns}
+        self.sums = {column: 0.0 for column in self.value_columns}
+        self.minimums = {column: np.inf for column in self.value_columns}
+        self.maximums = {column: -np.inf for column in self.value_columns}
+        self.categories = {column: Counter() for column in self.category_columns}
+        # Domestic ZIPs go into a ZIP5 bitmap; anything else (international) into a set
+        self.zip_bitmaps = {column: np.zeros(ZIP5_DOMAIN, dtype=bool) for column in self.zip_columns}
+        self.other_zips = {column: set() for column in self.zip_columns}
+
+    def update(self, chunk: Union[pd.DataFrame, List[Dict[str, Any]]]) -> 'SummaryAccumulator':
+        """
+        Add a chunk of shipments to the summary.
+
+        Args:
+            chunk: DataFrame or list of row dictionaries
+
+        Returns:
+            SummaryAccumulator: self, to allow chaining
+        """
+        if not isinstance(chunk, pd.DataFrame):
+            chunk = pd.DataFrame(chunk)
+        self.rows += len(chunk)
+
+        for column in self.value_columns:
+            if column not in chunk.columns:
+                continue
+            values = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            self.counts[column] += len(values)
+            self.sums[column] += float(values.sum())
+            self.minimums[column] = min(self.minimums[column], float(values.min()))
+            self.maximums[column] = max(self.maximums[column], float(values.max()))
+
+        for column in self.category_columns:
+            if column in chunk.columns:
+                self.categories[column].update(chunk[column].value_counts(dropna=False).to_dict())
+
+        for column in self.zip_columns:
+            if column not in chunk.columns:
+                continue
+            zips = normalize_zips(chunk[column])
+            domestic = zips.flag == ZIP_DOMESTIC
+            self.zip_bitmaps[column][zips.zip5[domestic]] = True
+            if not domestic.all():
+                self.other_zips[column].update(chunk[column][~domestic].dropna().astype(str).str.strip())
+
+        return self
+
+    def merge(self, other: 'SummaryAccumulator') -> 'SummaryAccumulator':
+        """
+        Merge another accumulator (e.g., from another chunk or worker) into this one.
+
+        Args:
+            other: Accumulator with the same column configuration
+
+        Returns:
+            SummaryAccumulator: self, to allow chaining
+        """
+        self.rows += other.rows
+        for column in self.value_columns:
+            self.counts[column] += other.counts[column]
+            self.sums[column] += other.sums[column]
+            self.minimums[column] = min(self.minimums[column], other.minimums[column])
+            self.maximums[column] = max(self.maximums[column], other.maximums[column])
+        for column in self.category_columns:
+            self.categories[column].update(other.categories[column])
+        for column in self.zip_columns:
+            self.zip_bitmaps[column] |= other.zip_bitmaps[column]
+            self.other_zips[column] |= other.other_zips[column]
+        return self
+
+    @classmethod
+    def merge_all(cls, accumulators: Iterable['SummaryAccumulator']) -> 'SummaryAccumulator':
+        """Merge a sequence of accumulators into a new one (empty when there are none)."""
+        accumulators = list(accumulators)
+        if not accumulators:
+            return cls()
+        merged = cls(accumulators[0].value_columns, accumulators[0].category_columns, accumulators[0].zip_columns)
+        for accumulator in accumulators:
+            merged.merge(accumulator)
+        return merged
+
+    def count(self, column: str) -> int:
+        """Number of non-missing values seen for a numeric column."""
+        return self.counts[column]
+
+    def total(self, column: str) -> float:
+        """Sum of a numeric column."""
+        return self.sums[column]
+
+    def mean(self, column: str) -> float:
+        """Mean of a numeric column (0 when no values were seen)."""
+        return self.sums[column] / self.counts[column] if self.counts[column] else 0.0
+
+    def minimum(self, column: str) -> float:
+        """Minimum of a numeric column (NaN when no values were seen)."""
+        return self.minimums[column] if self.counts[column] else np.nan
+
+    def maximum(self, column: str) -> float:
+        """Maximum of a numeric column (NaN when no values were seen)."""
+        return self.maximums[column] if self.counts[column] else np.nan
+
+    def category_counts(self, column: str) -> Dict[Any, int]:
+        """Value counts of a categorical column."""
+        return dict(self.categories[column])
+
+    def distinct_zips(self, column: str) -> int:
+        """Number of distinct ZIP codes seen in a ZIP column."""
+        return int(self.zip_bitmaps[column].sum()) + len(self.other_zips[column])
+
+
+class RateSummaryAccumulator(SummaryAccumulator):
+    """
+    Summary of rated shipments (output of the calculation engine).
+
+    Rows without a final rate are counted as failed and left out of the
+    statistics; savings are only summarized for rows with a carrier rate.
+    A t-digest per metric and group (zone, weight bracket, service level and
+    overall) gives percentiles of savings, final rate and surcharge burden
+    (surcharges as a percentage of the final rate).
+    """
+
+    def __init__(self):
+        """Initialize an empty rate summary."""
+        super().__init__(
+            value_columns=['base_rate', 'total_surcharges', 'final_rate', 'savings', 'savings_percent'],
+            category_columns=['zone', 'service_level'],
+            zip_columns=['origin_zip', 'destination_zip']
+        )
+        self.failed = 0
+        self.sketches: Dict[tuple, TDigest] = {}
+
+    def update(self, chunk: Union[pd.DataFrame, List[Dict[str, Any]]]) -> 'RateSummaryAccumulator':
+        """Add a chunk of rated shipments to the summary."""
+        if not isinstance(chunk, pd.DataFrame):
+            chunk = pd.DataFrame(chunk)
+        if len(chunk) == 0:
+            return self
+
+        rated = pd.to_numeric(chunk['final_rate'], errors='coerce').notna()
+        self.failed += int((~rated).sum())
+        chunk = chunk[rated]
+
+        if 'carrier_rate' in chunk.columns:
+            carrier_rate = pd.to_numeric(chunk['carrier_rate'], errors='coerce')
+            has_carrier_rate = carrier_rate.notna() & (carrier_rate != 0)
+        else:
+            has_carrier_rate = pd.Series(False, index=chunk.index)
+        # Results without carrier rates have no savings columns
+        missing = pd.Series(np.nan, index=chunk.index)
+        chunk = chunk.assign(
+            savings=chunk.get('savings', missing).where(has_carrier_rate),
+            savings_percent=chunk.get('savings_percent', missing).where(has_carrier_rate)
+        )
+        super().update(chunk)
+        self._update_sketches(chunk)
+        return self
+
+    def _update_sketches(self, chunk: pd.DataFrame) -> None:
+        """Feed each metric into the sketch of every group it belongs to."""
+        final_rate = pd.to_numeric(chunk['final_rate'], errors='coerce')
+        metrics = {
+            'savings': chunk['savings'],
+            'savings_percent': chunk['savings_percent'],
+            'final_rate': final_rate,
+            'surcharge_burden': pd.to_numeric(chunk.get('total_surcharges'), errors='coerce') / final_rate * 100
+            if 'total_surcharges' in chunk.columns else None,
+        }
+        weights = chunk['billable_weight'] if 'billable_weight' in chunk.columns else chunk.get('weight')
+        groupings = {
+            'all': pd.Series('All', index=chunk.index),
+            'zone': chunk.get('zone'),
+            'weight_bracket': weight_brackets(pd.to_numeric(weights, errors='coerce')) if weights is not None else None,
+            'service_level': chunk.get('service_level'),
+        }
+
+        for dimension, keys in groupings.items():
+            if keys is None:
+                continue
+            codes, uniques = pd.factorize(keys)
+            # Sort rows by group once, then slice each group's values
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            for metric, values in metrics.items():
+                if values is None:
+                    continue
+                values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)[order]
+                for i, key in enumerate(uniques):
+                    group_values = values[bounds[i]:bounds[i + 1]]
+                    group_values = group_values[~np.isnan(group_values)]
+                    if len(group_values):
+                        self.sketches.setdefault((metric, dimension, _sketch_key(key)), TDigest()).update(group_values)
+
+    def percentiles(self, metric: str, dimension: str = 'all',
+                    quantiles: Iterable[float] = (0.5, 0.9)) -> pd.DataFrame:
+        """
+        Estimated percentiles of a metric per group.
+
+        Args:
+            metric: One of QUANTILE_METRICS
+            dimension: One of QUANTILE_DIMENSIONS
+            quantiles: Quantiles between 0 and 1
+
+        Returns:
+            pd.DataFrame: One row per group with a count column and a pNN column per quantile
+        """
+        quantiles = list(quantiles)
+        columns = [f"p{round(q * 100):g}" for q in quantiles]
+        rows = {}
+        for (sketch_metric, sketch_dimension, key), digest in self.sketches.items():
+            if sketch_metric == metric and sketch_dimension == dimension:
+                rows[key] = [digest.count] + list(digest.quantile(quantiles))
+        table = pd.DataFrame.from_dict(rows, orient='index', columns=['count'] + columns)
+        table.index.name = dimension
+        if dimension == 'weight_bracket':
+            return table.reindex([label for label in WEIGHT_BRACKET_LABELS if label in table.index])
+        return table.sort_index()
+
+    def merge(self, other: 'RateSummaryAccumulator') -> 'RateSummaryAccumulator':
+        """Merge another rate summary into this one."""
+        super().merge(other)
+        self.failed += other.failed
+        for key, digest in other.sketches.items():
+            self.sketches.setdefault(key, TDigest(digest.compression)).merge(digest)
+        return self
+
+    @classmethod
+    def merge_all(cls, accumulators: Iterable['RateSummaryAccumulator']) -> 'RateSummaryAccumulator':
+        """Merge a sequence of rate summaries into a new one."""
+        merged = cls()
+        for accumulator in accumulators:
+            merged.merge(accumulator)
+        return merged
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Summary statistics in the format of AmazonRateCalculator.get_summary_stats.
+
+        Returns:
+            Dict[str, Any]: Totals and averages plus failed and distinct ZIP counts
+        """
+        return {
+            'total_shipments': self.rows,
+            'total_base_rate': self.total('base_rate'),
+            'total_surcharges': self.total('total_surcharges'),
+            'total_final_rate': self.total('final_rate'),
+            'total_savings': self.total('savings'),
+            'avg_base_rate': self.mean('base_rate'),
+            'avg_final_rate': self.mean('final_rate'),
+            'avg_savings_percent': self.mean('savings_percent'),
+            'min_final_rate': self.minimum('final_rate'),
+            'max_final_rate': self.maximum('final_rate'),
+            'median_final_rate': self._overall_quantile('final_rate', 0.5),
+            'median_savings': self._overall_quantile('savings', 0.5),
+            'p90_savings': self._overall_quantile('savings', 0.9),
+            'median_surcharge_burden': self._overall_quantile('surcharge_burden', 0.5),
+            'failed_shipments': self.failed,
+            'unique_origin_zips': self.distinct_zips('origin_zip'),
+            'unique_destination_zips': self.distinct_zips('destination_zip'),
+        }
+
+    def _overall_quantile(self, metric: str, q: float) -> float:
+        """Quantile of a metric over all rated shipments (NaN when not available)."""
+        digest = self.sketches.get((metric, 'all', 'All'))
+        return digest.quantile(q) if digest is not None else np.nan
+
+
+def _sketch_key(key: Any) -> Any:
+    """Use plain Python values as group keys so sketches from different chunks line up."""
+    return key.item() if isinstance(key, np.generic) else key
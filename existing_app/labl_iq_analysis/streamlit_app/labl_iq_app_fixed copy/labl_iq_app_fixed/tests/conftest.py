@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class FakeCalculator:
+    """Minimal stand-in for AmazonRateCalculator reference data."""
+
+    def __init__(self):
+        rows = []
+        for lbs, base in ((0.5, 3.0), (1, 4.0), (2, 5.0), (5, 8.0), (10, 12.0)):
+            rows.append(['Pkg', 'Base', lbs] + [base + zone for zone in range(1, 9)])
+        rows.append(['Letters', 'Base', 0.5] + [2.0 + zone for zone in range(1, 9)])
+        rows.append(['Letters', 'Base', 1] + [2.5 + zone for zone in range(1, 9)])
+        self.rate_table = pd.DataFrame(rows, columns=['Cntr', 'Rate Type', 'lbs'] + [str(z) for z in range(1, 9)])
+        self.das_zips_dict = {'10001': True, '02134': True}
+        self.edas_zips_dict = {'02134': True}
+        self.remote_zips_dict = {'99501': True}
+        self.criteria_values = {
+            'origin_zip': '46307',
+            'markup_percentage': 10.0,
+            'fuel_surcharge_percentage': 16.0,
+        }
+
+
+@pytest.fixture
+def fake_calculator():
+    return FakeCalculator()
+
+
+def fake_engine(template, criteria):
+    """Engine loader for worker processes, rating with the FakeCalculator reference data."""
+    from batch_engine import BatchRateEngine
+    return BatchRateEngine(FakeCalculator())
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from aggregate_cube import (
+    build_aggregate_cube,
+    clean_mask,
+    clean_slice,
+    rate_components,
+    rates_by,
+    savings_percent_by,
+    shipments_by,
+    source_file_metrics,
+    summary_metrics,
+    surcharge_classes,
+    surcharge_summary,
+    zone_export,
+    zone_metrics,
+)
+from summary_accumulator import weight_brackets
+
+
+def rated_shipments():
+    rng = np.random.default_rng(7)
+    rows = 400
+    results = pd.DataFrame({
+        'shipment_id': np.arange(rows),
+        'zone': rng.integers(2, 9, rows),
+        'billable_weight': rng.uniform(0.1, 120.0, rows),
+        'service_level': rng.choice(['standard', 'expedited', 'priority'], rows),
+        'base_rate': rng.uniform(5.0, 40.0, rows),
+        'fuel_surcharge': rng.uniform(0.5, 4.0, rows),
+        'das_surcharge': rng.choice([0.0, 2.0], rows),
+        'edas_surcharge': rng.choice([0.0, 0.0, 0.0, 3.92], rows),
+        'remote_surcharge': rng.choice([0.0, 0.0, 0.0, 14.15], rows),
+        'carrier_rate': rng.choice([np.nan, 20.0, 35.0], rows),
+    })
+    results['final_rate'] = results['base_rate'] + results['fuel_surcharge']
+    results['savings'] = results['carrier_rate'] - results['final_rate']
+    results['savings_percent'] = results['savings'] / results['carrier_rate'] * 100
+    # Failed rows have no rate or surcharges
+    failed = rng.random(rows) < 0.05
+    results.loc[failed, ['base_rate', 'fuel_surcharge', 'das_surcharge', 'edas_surcharge',
+                         'remote_surcharge', 'final_rate', 'savings', 'savings_percent']] = np.nan
+    return results
+
+
+def test_cube_tables_match_full_frame_groupbys():
+    """Test the tables derived from the cube match grouping the full frame."""
+    results = rated_shipments()
+    cube = build_aggregate_cube(results)
+    filled = results.fillna({'savings': 0, 'savings_percent': 0})
+
+    expected = filled.groupby('zone').agg({
+        'shipment_id': 'count', 'final_rate': 'mean', 'carrier_rate': 'mean',
+        'savings': 'sum', 'savings_percent': 'mean'
+    }).round(2)
+    expected.columns = ['Shipments', 'Avg Labl IQ Rate', 'Avg Carrier Rate', 'Total Savings', 'Avg Savings %']
+    pd.testing.assert_frame_equal(zone_metrics(cube), expected, check_dtype=False, check_names=False)
+
+    expected_export = filled.groupby('zone').agg({
+        'shipment_id': 'count', 'final_rate': ['mean', 'sum'], 'carrier_rate': ['mean', 'sum'],
+        'savings': ['mean', 'sum'], 'savings_percent': 'mean'
+    }).round(2)
+    pd.testing.assert_frame_equal(zone_export(cube), expected_export, check_dtype=False, check_names=False)
+
+    by_service = filled.groupby('service_level')['savings_percent'].mean()
+    pd.testing.assert_series_equal(savings_percent_by(cube, 'service_level'), by_service, check_names=False)
+    brackets = weight_brackets(results['billable_weight'])
+    by_weight = filled.groupby(brackets, observed=False)['savings_percent'].mean()
+    np.testing.assert_allclose(savings_percent_by(cube, 'weight_bracket'), by_weight)
+    assert shipments_by(cube, 'weight_bracket').tolist() == brackets.value_counts(sort=False).tolist()
+
+    components = rate_components(cube)[0]
+    assert np.isclose(components['Base Rate'], results['base_rate'].mean())
+    assert np.isclose(components['Remote'], results['remote_surcharge'].mean())
+
+    summary = surcharge_summary(cube)
+    assert np.isclose(summary.loc['EDAS', 'Frequency'], (results['edas_surcharge'] > 0).mean() * 100)
+    assert np.isclose(summary.loc['Fuel', 'Total Amount'], results['fuel_surcharge'].sum())
+    assert np.isclose(summary.loc['DAS', 'Average Amount'], results['das_surcharge'].mean())
+
+
+def test_clean_slice_matches_edas_remote_filter():
+    """Test the clean classes select the shipments without EDAS or Remote surcharges."""
+    results = rated_shipments()
+    clean = results[(results['edas_surcharge'] == 0) & (results['remote_surcharge'] == 0)]
+    assert (surcharge_classes(results).isin(['none', 'das']) == results.index.isin(clean.index)).all()
+    pd.testing.assert_frame_equal(results[clean_mask(results)], clean)
+
+    metrics = summary_metrics(clean_slice(build_aggregate_cube(results)))
+    assert metrics['total_shipments'] == len(clean)
+    assert np.isclose(metrics['total_savings'], clean['savings'].fillna(0).sum())
+    assert np.isclose(metrics['avg_savings_percent'], clean['savings_percent'].mean())
+
+
+def test_rates_by_weight_bracket():
+    """Test average rates per weight bracket for the rate comparison chart."""
+    results = rated_shipments()
+    rates = rates_by(build_aggregate_cube(results), 'weight_bracket')
+    brackets = weight_brackets(results['billable_weight'])
+
+    assert list(rates.columns) == ['Labl IQ Rate', 'Carrier Rate']
+    np.testing.assert_allclose(rates['Labl IQ Rate'], results.groupby(brackets, observed=False)['final_rate'].mean())
+    np.testing.assert_allclose(rates['Carrier Rate'], results.groupby(brackets, observed=False)['carrier_rate'].mean())
+
+
+def test_source_file_metrics_keep_upload_order():
+    """Test per-file metrics roll up the source file dimension in upload order."""
+    results = rated_shipments()
+    results['source_file'] = pd.Categorical.from_codes(np.arange(len(results)) % 3, ['store_b.csv', 'store_a.csv', 'jan.csv'])
+    cube = build_aggregate_cube(results)
+    by_file = source_file_metrics(cube)
+
+    assert list(by_file.index) == ['store_b.csv', 'store_a.csv', 'jan.csv']
+    assert list(by_file['Shipments']) == list(results.groupby('source_file', observed=True).size())
+    pd.testing.assert_frame_equal(zone_metrics(cube), zone_metrics(build_aggregate_cube(results.drop(columns='source_file'))))
+    assert source_file_metrics(build_aggregate_cube(results.drop(columns='source_file'))).empty
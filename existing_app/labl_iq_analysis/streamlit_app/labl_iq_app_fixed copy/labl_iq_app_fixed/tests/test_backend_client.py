@@ -0,0 +1,121 @@
+import io
+import json
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from backend_client import (
+    CURRENT_CARRIER,
+    BackendClient,
+    BackendError,
+    backend_upload,
+    multipart_body,
+    result_tables,
+)
+
+
+class ScriptedClient(BackendClient):
+    """Client that answers status polls from a fixed list of job states."""
+
+    def __init__(self, states):
+        super().__init__('http://backend.test/')
+        self.states = iter(states)
+
+    def status(self, upload_id):
+        return next(self.states)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Record requests sent by urlopen and answer them with queued response payloads."""
+    requests, responses = [], []
+
+    def urlopen(request, timeout):
+        requests.append(request)
+        return io.BytesIO(json.dumps(responses.pop(0)).encode())
+
+    monkeypatch.setattr(urllib.request, 'urlopen', urlopen)
+    return requests, responses
+
+
+def test_upload_uses_backend_columns():
+    """Test mapped shipments are renamed, given an origin and converted to pounds."""
+    mapped = pd.DataFrame({
+        'destination_zip': ['02134', '90210'],
+        'weight': [16.0, 40.0],
+        'carrier_rate': [9.5, 31.0],
+        'package_type': ['box', 'box'],
+    })
+    upload = pd.read_csv(io.BytesIO(backend_upload(mapped, '46307', weight_divisor=16.0)), dtype={'destination_zip': str})
+
+    assert list(upload.columns) == ['origin_zip', 'destination_zip', 'weight', 'actual_cost', 'carrier']
+    assert list(upload['destination_zip']) == ['02134', '90210']
+    assert list(upload['weight']) == [1.0, 2.5]
+    assert set(upload['carrier']) == {CURRENT_CARRIER}
+
+    body, content_type = multipart_body('file', 'shipments.csv', b'a,b\n1,2\n')
+    boundary = content_type.split('boundary=')[1]
+    assert body.startswith(f'--{boundary}\r\n'.encode()) and body.endswith(f'--{boundary}--\r\n'.encode())
+    assert b'filename="shipments.csv"' in body and b'a,b\n1,2\n' in body
+
+
+def test_wait_polls_until_the_job_finishes():
+    """Test progress is reported on every poll and failures raise."""
+    done = {'status': 'completed', 'processedRows': 3, 'zoneAnalysis': [
+        {'zone': 'Zone 10', 'shipments': 1, 'avgCost': 12.0, 'savings': 1.0},
+        {'zone': 'Zone 2', 'shipments': 2, 'avgCost': 9.0, 'savings': 3.0},
+    ]}
+    client = ScriptedClient([{'status': 'processing', 'processedRows': 1}, done])
+    rows, sleeps = [], []
+
+    assert client.wait('u1', on_progress=rows.append, sleep=sleeps.append) is done
+    assert rows == [1, 3] and len(sleeps) == 1
+    assert client.base_url == 'http://backend.test'
+    assert list(result_tables(done)['zones'].index) == ['Zone 2', 'Zone 10']
+    assert result_tables(done)['carriers'].empty
+    opportunity = {'carrier': 'UPS', 'recommendedCarrier': 'USPS', 'service': 'Priority',
+                   'currentCost': 15.0, 'recommendedCost': 12.0, 'savings': 3.0}
+    assert result_tables({'topSavingsOpportunities': [opportunity]})['opportunities'].iloc[0].to_dict() == opportunity
+
+    with pytest.raises(BackendError, match='bad file'):
+        ScriptedClient([{'status': 'failed', 'errorMessage': 'bad file'}]).wait('u2', sleep=sleeps.append)
+    with pytest.raises(BackendError, match='still running'):
+        ScriptedClient([{'status': 'processing'}] * 3).wait('u3', interval=1.0, timeout=1.0, sleep=sleeps.append)
+
+
+def test_requests_use_the_backend_routes(backend):
+    """Test login, submit and status hit the routes the backend mounts under /api."""
+    requests, responses = backend
+    responses.extend([
+        {'success': True, 'data': {'token': 't0k'}},
+        {'success': True, 'data': {'uploadId': 'u1', 'message': 'ok'}},
+        {'success': True, 'data': {'status': 'processing', 'processedRows': 10}},
+    ])
+    client = BackendClient('http://backend.test/')
+
+    assert client.login('ops@labl.com', 'secret') == 't0k'
+    assert client.submit('shipments.csv', b'a\n1\n') == 'u1'
+    assert client.status('u1')['processedRows'] == 10
+
+    assert [(r.get_method(), r.full_url) for r in requests] == [
+        ('POST', 'http://backend.test/api/auth/login'),
+        ('POST', 'http://backend.test/api/shipping/upload'),
+        ('GET', 'http://backend.test/api/shipping/analysis/u1'),
+    ]
+    assert requests[1].get_header('Authorization') == 'Bearer t0k'
+
+
+def test_unsuccessful_responses_raise(backend):
+    """Test responses without data or marked unsuccessful raise BackendError."""
+    _, responses = backend
+    responses.extend([
+        {'success': False, 'data': None, 'message': 'Invalid credentials'},
+        {'success': True},
+    ])
+    client = BackendClient('http://backend.test')
+
+    with pytest.raises(BackendError, match='Invalid credentials'):
+        client.login('ops@labl.com', 'wrong')
+    with pytest.raises(BackendError, match='no data'):
+        client.status('u1')
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_engine import (
+    BatchRateEngine,
+    ERROR_INVALID_RATE,
+    ERROR_INVALID_WEIGHT,
+    ERROR_MESSAGES,
+    ERROR_MISSING_DESTINATION,
+    ERROR_NONE,
+    build_shipment_frame,
+    compare_templates,
+    summarize_by_origin,
+    summarize_errors,
+    summarize_template_deltas,
+)
+from conftest import FakeCalculator
+
+
+@pytest.fixture
+def shipments():
+    return pd.DataFrame({
+        'shipment_id': ['A', 'B', 'C', 'D', 'E', 'F'],
+        'destination_zip': ['10001', '02134', '99501', 'E3G7P6', '', '46399'],
+        'weight': [3.0, 0.5, 20.0, 1.0, 2.0, 0.7],
+        'package_type': ['box', 'box', 'box', 'box', 'box', 'envelope'],
+        'service_level': ['standard'] * 6,
+        'carrier_rate': [15.0, 10.0, 40.0, 30.0, 10.0, 0.0],
+    })
+
+
+def test_rate_frame_matches_per_shipment_rules(fake_calculator, shipments):
+    """Test base rate, surcharge priority, markup and savings for a batch."""
+    result = BatchRateEngine(fake_calculator).rate_frame(shipments)
+
+    # 46307 -> 10001 is zone 2; weight 3 uses the 2 lb break (5.0 + zone)
+    first = result.iloc[0]
+    assert first['zone'] == 2
+    assert first['base_rate'] == 7.0
+    assert first['fuel_surcharge'] == 1.12
+    assert first['das_surcharge'] == 1.98
+    assert first['total_surcharges'] == 3.10
+    assert first['final_rate'] == 11.11
+    assert first['savings'] == pytest.approx(3.89)
+
+    # EDAS takes priority over DAS, Remote over both
+    assert result.loc[1, 'edas_surcharge'] == 3.92 and result.loc[1, 'das_surcharge'] == 0
+    assert result.loc[2, 'remote_surcharge'] == 14.15 and result.loc[2, 'zone'] == 8
+
+    # International destinations are zone 8 with the remote surcharge
+    assert result.loc[3, 'zone'] == 8
+    assert result.loc[3, 'remote_surcharge'] == 14.15
+
+    # Same 3-digit prefix is zone 1, rated as zone 2 from the Letters section
+    assert result.loc[5, 'zone'] == 1
+    assert result.loc[5, 'base_rate'] == 4.0
+    assert result.loc[5, 'savings'] == 0.0
+
+    assert result['error_code'].tolist()[:4] == [ERROR_NONE] * 4
+    assert result['errors'].tolist()[:4] == ['', '', '', '']
+
+
+def test_rate_frame_flags_missing_details(fake_calculator, shipments):
+    """Test that rows without a usable destination or weight get NaN outputs."""
+    shipments.loc[0, 'weight'] = np.nan
+    result = BatchRateEngine(fake_calculator).rate_frame(shipments)
+
+    for row, code in ((0, ERROR_INVALID_WEIGHT), (4, ERROR_MISSING_DESTINATION)):
+        assert pd.isna(result.loc[row, 'zone'])
+        assert np.isnan(result.loc[row, 'final_rate'])
+        assert np.isnan(result.loc[row, 'savings'])
+        assert result.loc[row, 'error_code'] == code
+        assert result.loc[row, 'errors'] == ERROR_MESSAGES[code]
+
+    errors = summarize_errors(result)
+    assert errors['error_code'].tolist() == [ERROR_MISSING_DESTINATION, ERROR_INVALID_WEIGHT]
+    assert errors['shipments'].tolist() == [1, 1]
+
+
+def test_rate_frame_flags_invalid_rates(fake_calculator, shipments):
+    """Test that a non-positive table rate is reported as a rate error."""
+    fake_calculator.rate_table.loc[fake_calculator.rate_table['lbs'] == 2, '2'] = 0.0
+    result = BatchRateEngine(fake_calculator).rate_frame(shipments)
+    assert result.loc[0, 'error_code'] == ERROR_INVALID_RATE
+    assert result.loc[0, 'zone'] == 2
+    assert np.isnan(result.loc[0, 'final_rate'])
+
+
+def test_build_shipment_frame():
+    """Test billable weight, service level mapping and skipping unreadable rows."""
+    mapped = pd.DataFrame({
+        'destination_zip': [10001, 2134, 30301],
+        'weight': [1.0, 10.0, 'abc'],
+        'length': [20, 2, 1],
+        'width': [10, 2, 1],
+        'height': [10, 2, 1],
+        'carrier_rate': [9.5, 12.0, 3.0],
+        'service_level': ['UPS Ground', 'Next Day Air', 'Other'],
+    })
+    frame = build_shipment_frame(mapped, {'origin_zip': '46307', 'dim_divisor': 139})
+
+    assert len(frame) == 2
+    assert frame['billable_weight'].tolist() == pytest.approx([2000 / 139, 10.0])
+    assert frame['service_level'].tolist() == ['standard', 'next_day']
+    assert frame['destination_zip'].tolist() == ['10001', '2134']
+    assert (frame['origin_zip'] == '46307').all()
+
+
+def test_rate_frame_multi_origin(fake_calculator):
+    """Test that each row is zoned from its own origin and rolled up per origin."""
+    shipments = pd.DataFrame({
+        'origin_zip': ['46307', '10001', '46307', '99501'],
+        'destination_zip': ['10005', '10005', '46301', '10005'],
+        'weight': [1.0, 1.0, 1.0, 1.0],
+        'carrier_rate': [20.0, 20.0, 20.0, 20.0],
+    })
+    result = BatchRateEngine(fake_calculator).rate_frame(shipments)
+    assert result['zone'].tolist() == [2, 1, 1, 2]
+
+    rollup = summarize_by_origin(result).set_index('origin_zip')
+    assert rollup.loc['46307', 'shipments'] == 2
+    assert rollup.loc['46307', 'carrier_cost'] == 40.0
+    assert rollup.loc['46307', 'savings'] == pytest.approx(40.0 - result.loc[[0, 2], 'final_rate'].sum())
+
+
+def test_build_shipment_frame_origin_column():
+    """Test that blank mapped origins fall back to the client origin ZIP."""
+    mapped = pd.DataFrame({
+        'origin_zip': ['10001', None, 'nan'],
+        'destination_zip': ['30301'] * 3,
+        'weight': [1.0] * 3,
+        'carrier_rate': [5.0] * 3,
+    })
+    frame = build_shipment_frame(mapped, {'origin_zip': '46307'})
+    assert frame['origin_zip'].tolist() == ['10001', '46307', '46307']
+
+
+def test_compare_templates_rates_each_card_with_deltas(fake_calculator, shipments):
+    """Test one-pass rating against two rate cards matches separate runs."""
+    new_card = FakeCalculator()
+    rate_columns = [str(zone) for zone in range(1, 9)]
+    new_card.rate_table[rate_columns] = new_card.rate_table[rate_columns] + 1.0
+    engines = {'2024': BatchRateEngine(fake_calculator), '2025': BatchRateEngine(new_card)}
+
+    comparison = compare_templates(engines, shipments)
+    for name, engine in engines.items():
+        expected = engine.rate_frame(shipments)
+        np.testing.assert_array_equal(comparison[f'final_rate_{name}'], expected['final_rate'])
+        np.testing.assert_array_equal(comparison[f'error_code_{name}'], expected['error_code'])
+
+    # One dollar more base rate, plus fuel and markup on top of it
+    assert comparison.loc[0, 'delta_2025'] == pytest.approx(1.28, abs=0.01)
+    assert 'delta_2024' not in comparison.columns
+
+    summary = summarize_template_deltas(comparison, ['2024', '2025'])
+    assert summary.loc[0, 'delta'] == 0
+    assert summary.loc[1, 'delta'] == pytest.approx(comparison['delta_2025'].sum())
+
+
+def test_build_shipment_frame_keeps_source_file():
+    """Test multi-file uploads keep each shipment's source file."""
+    mapped = pd.DataFrame({
+        'destination_zip': ['10001', '90210'],
+        'weight': [2.0, 5.0],
+        'carrier_rate': [10.0, 'n/a'],
+        'source_file': pd.Categorical(['jan.csv', 'feb.csv']),
+    })
+    frame = build_shipment_frame(mapped, {'origin_zip': '46307'})
+    assert list(frame['source_file']) == ['jan.csv']
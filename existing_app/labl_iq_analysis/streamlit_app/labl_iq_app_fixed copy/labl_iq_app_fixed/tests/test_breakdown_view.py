@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from breakdown_view import (
+    BreakdownFilters,
+    breakdown_page,
+    filter_mask,
+    format_breakdown,
+    page_count,
+    sort_positions,
+)
+
+
+def rated_shipments():
+    return pd.DataFrame({
+        'shipment_id': ['A1', 'A2', 'B1', 'B2', 'C1'],
+        'destination_zip': ['10001', '90210', '10002', '60601', '10003'],
+        'zone': pd.array([2, 8, 2, 5, pd.NA], dtype='Int8'),
+        'service_level': ['standard', 'standard', 'expedited', 'standard', 'standard'],
+        'weight': [1.0, 12.5, 3.25, 40.0, np.nan],
+        'final_rate': [9.5, 31.0, 12.25, 55.125, np.nan],
+        'savings': [2.0, -1.5, 0.0, 7.0, np.nan],
+        'savings_percent': [17.39, -5.08, 0.0, 11.27, np.nan],
+    })
+
+
+def test_filters_and_sorting():
+    """Test filters combine and sorting keeps missing values last."""
+    results = rated_shipments()
+
+    assert list(filter_mask(results, BreakdownFilters())) == [True] * 5
+    assert list(filter_mask(results, BreakdownFilters(zones=(2,)))) == [True, False, True, False, False]
+    assert list(filter_mask(results, BreakdownFilters(service_levels=('standard',), min_savings=0.0))) == \
+        [True, False, False, True, False]
+    assert list(filter_mask(results, BreakdownFilters(search='1000'))) == [True, False, True, False, True]
+
+    everything = filter_mask(results, BreakdownFilters())
+    assert list(sort_positions(results, everything, 'savings', ascending=False)) == [3, 0, 2, 1, 4]
+    assert list(sort_positions(results, everything, 'savings')) == [1, 2, 0, 3, 4]
+    assert list(sort_positions(results, filter_mask(results, BreakdownFilters(zones=(2,))), 'weight', False)) == [2, 0]
+
+
+def test_only_the_page_is_formatted():
+    """Test paging and vectorized formatting match the display formats."""
+    results = rated_shipments()
+    positions = sort_positions(results, filter_mask(results, BreakdownFilters()), 'final_rate')
+
+    assert page_count(len(positions), 2) == 3
+    assert page_count(0, 50) == 1
+    page = breakdown_page(results, positions, 2, 2)
+    assert list(page['shipment_id']) == ['A2', 'B2']
+
+    formatted = format_breakdown(page)
+    assert list(formatted['final_rate']) == ['$31.00', '$55.12']
+    assert list(formatted['weight']) == ['12.50', '40.00']
+    assert list(formatted['savings_percent']) == ['-5.1%', '11.3%']
+    # The numeric results are left untouched
+    assert results['final_rate'].dtype == np.float64
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_specs
+from chart_specs import cached_chart_spec, chart_spec
+
+
+def test_spec_inlines_aggregated_values():
+    """Test specs keep category order, one series per column and skip missing values."""
+    rates = pd.DataFrame({
+        'Labl IQ Rate': [9.5, 12.0, np.nan],
+        'Carrier Rate': [11.0, 14.5, 20.0],
+    }, index=['0-1 lbs', '1-5 lbs', '5-10 lbs'])
+    spec = chart_spec('line', rates, y_title='Average Rate ($)')
+
+    assert spec['encoding']['x']['sort'] == ['0-1 lbs', '1-5 lbs', '5-10 lbs']
+    assert spec['encoding']['color']['field'] == 'series'
+    assert len(spec['data']['values']) == 5
+    assert {'category': '5-10 lbs', 'series': 'Carrier Rate', 'value': 20.0} in spec['data']['values']
+
+    bars = chart_spec('bar', pd.Series([3, 1], index=['standard', 'priority'], name='shipments'))
+    assert 'color' not in bars['encoding']
+    with pytest.raises(ValueError):
+        chart_spec('pie', rates)
+
+
+def test_specs_are_cached_by_values_and_options():
+    """Test equal tables and options reuse the spec and any change rebuilds it."""
+    chart_specs._spec_cache.clear()
+    counts = pd.Series([3, 1], index=['standard', 'priority'])
+
+    first = cached_chart_spec('bar', counts, y_title='Shipments')
+    assert cached_chart_spec('bar', counts.copy(), y_title='Shipments') is first
+    assert cached_chart_spec('bar', counts, y_title='Count') is not first
+    assert cached_chart_spec('bar', counts.rename({'priority': 'next_day'}), y_title='Shipments') is not first
+    assert cached_chart_spec('bar', counts * 2, y_title='Shipments') is not first
+    assert len(chart_specs._spec_cache) == 4
+
+
+def test_spec_cache_is_safe_across_threads(monkeypatch):
+    """Test concurrent sessions sharing the cache never exceed its size or fail on eviction."""
+    chart_specs._spec_cache.clear()
+    monkeypatch.setattr(chart_specs, 'SPEC_CACHE_SIZE', 4)
+    tables = [pd.Series([i, i + 1], index=['standard', 'priority']) for i in range(8)]
+
+    def render(offset):
+        for i in range(200):
+            cached_chart_spec('bar', tables[(i + offset) % len(tables)], y_title='Shipments')
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(render, range(4)))
+    assert len(chart_specs._spec_cache) == 4
@@ -0,0 +1,103 @@
+import json
+
+import pandas as pd
+import pytest
+
+from batch_engine import BatchRateEngine
+from cli import ResultWriter, build_parser, main, rate_chunk, rate_file, read_chunks, suggest_mapping
+from conftest import fake_engine
+
+MAPPING = {'shipment_id': 'Shipment ID', 'destination_zip': 'Destination Zip', 'weight': 'Weight',
+           'carrier_rate': 'Postage Cost'}
+CRITERIA = {'origin_zip': '46307', 'weight_divisor': 16.0}
+
+
+@pytest.fixture
+def shipment_file(tmp_path):
+    path = tmp_path / 'shipments.csv'
+    pd.DataFrame({
+        'Shipment ID': [f'S{i}' for i in range(7)],
+        'Destination Zip': ['02134', '10001', '90210', '60601', '', '99501', '30301'],
+        'Weight': [16, 32, 8, 80, 16, 40, 'heavy'],
+        'Postage Cost': [9.5, 12.0, 7.25, 20.0, 9.0, 30.0, 11.0],
+        'Notes': ['x'] * 7,
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_rate_file_streams_chunks_and_summarizes(fake_calculator, shipment_file, tmp_path):
+    """Test chunked rating writes every readable row once and summarizes the run."""
+    output = tmp_path / 'rated.csv'
+    progress = []
+
+    summary = rate_file(str(shipment_file), str(output), MAPPING, CRITERIA,
+                        engine=BatchRateEngine(fake_calculator), chunk_size=3,
+                        progress=lambda rows, rate: progress.append(rows))
+
+    rated = pd.read_csv(output, dtype={'destination_zip': str})
+    whole = next(read_chunks(str(shipment_file), MAPPING, chunk_size=100))
+    expected = rate_chunk(BatchRateEngine(fake_calculator), whole, CRITERIA)
+    assert list(rated['shipment_id']) == ['S0', 'S1', 'S2', 'S3', 'S4', 'S5']
+    assert list(rated['destination_zip'][:3]) == ['02134', '10001', '90210']
+    assert list(rated['billable_weight']) == [1.0, 2.0, 0.5, 5.0, 1.0, 2.5]
+    assert rated['final_rate'].tolist() == pytest.approx(expected['final_rate'].tolist(), nan_ok=True)
+    assert progress == [3, 6, 6]
+    assert summary['rows'] == 6 and summary['chunks'] == 3
+    assert (summary['input_rows'], summary['skipped_rows']) == (7, 1)
+    assert summary['failed_shipments'] == sum(summary['errors'].values()) == 1
+    json.dumps(summary)
+
+    with pytest.raises(ValueError, match='weight'):
+        rate_file(str(shipment_file), str(output), {'destination_zip': 'Destination Zip'}, {'origin_zip': '46307'},
+                  engine=BatchRateEngine(fake_calculator))
+
+
+def test_command_line(shipment_file, tmp_path):
+    """Test the header-based mapping and the labl-iq rate arguments."""
+    assert suggest_mapping(['Shipment ID', 'Destination Zip', 'Weight', 'Postage Cost', 'Notes']) == {
+        'shipment_id': 'Shipment ID', 'destination_zip': 'Destination Zip', 'weight': 'Weight', 'carrier_rate': 'Postage Cost'
+    }
+    args = build_parser().parse_args(['rate', 'in.parquet', '-o', 'out.parquet', '--workers', '4',
+                                      '--chunk-size', '500000', '--weight-unit', 'oz'])
+    assert (args.command, args.workers, args.chunk_size, args.weight_unit) == ('rate', 4, 500000, 'oz')
+
+    # A mapping without the required fields fails before any rating starts
+    mapping = tmp_path / 'mapping.json'
+    mapping.write_text(json.dumps({'weight': 'Weight'}))
+    assert main(['rate', str(shipment_file), '--mapping', str(mapping), '--origin-zip', '46307']) == 1
+
+
+def test_worker_processes_keep_input_order(shipment_file, tmp_path):
+    """Test rating on worker processes writes the same rows, in order, as rating in-process."""
+    single, pooled = tmp_path / 'single.csv', tmp_path / 'pooled.csv'
+    rate_file(str(shipment_file), str(single), MAPPING, CRITERIA, engine_loader=fake_engine, chunk_size=2)
+    summary = rate_file(str(shipment_file), str(pooled), MAPPING, CRITERIA, engine_loader=fake_engine,
+                        chunk_size=2, workers=2)
+
+    pd.testing.assert_frame_equal(pd.read_csv(pooled), pd.read_csv(single))
+    assert (summary['workers'], summary['chunks'], summary['rows'], summary['skipped_rows']) == (2, 4, 6, 1)
+
+
+def test_parquet_round_trip(shipment_file, tmp_path):
+    """Test Parquet input and output, including columns typed differently in later chunks."""
+    pytest.importorskip('pyarrow')
+    source = tmp_path / 'shipments.parquet'
+    pd.read_csv(shipment_file, dtype={'Destination Zip': str, 'Weight': str}).to_parquet(source, index=False)
+    output = tmp_path / 'rated.parquet'
+
+    summary = rate_file(str(source), str(output), MAPPING, CRITERIA, engine_loader=fake_engine, chunk_size=3)
+    rated = pd.read_parquet(output)
+    assert list(rated['shipment_id']) == ['S0', 'S1', 'S2', 'S3', 'S4', 'S5']
+    assert list(rated['destination_zip'][:3]) == ['02134', '10001', '90210']
+    assert summary['rows'] == len(rated) == 6
+
+    mixed = tmp_path / 'mixed.parquet'
+    writer = ResultWriter(str(mixed))
+    writer.write(pd.DataFrame({'rate': [1.5, 2.0], 'note': [None, None]}))
+    writer.write(pd.DataFrame({'rate': [3.0], 'note': [4.5]}))
+    writer.write(pd.DataFrame({'rate': [4], 'note': ['remote']}))
+    writer.close()
+    written = pd.read_parquet(mixed)
+    assert written['note'].isna().tolist() == [True, True, False, False]
+    assert written['note'].tolist()[2:] == ['4.5', 'remote']
+    assert written['rate'].tolist() == [1.5, 2.0, 3.0, 4.0]
@@ -0,0 +1,70 @@
+import gc
+import os
+
+import pandas as pd
+
+from export_cache import ExportCache, dataset_key, write_export
+
+
+def results():
+    return pd.DataFrame({
+        'shipment_id': ['A1', 'A2', 'A3'],
+        'final_rate': [9.5, 31.0, 12.25],
+    })
+
+
+def test_dataset_key_tracks_the_data():
+    """Test the dataset key changes with values and columns but not the index."""
+    base = results()
+    assert dataset_key(base) == dataset_key(results())
+    assert dataset_key(base) == dataset_key(base.set_axis([10, 11, 12]))
+    assert dataset_key(base) != dataset_key(base.assign(final_rate=[9.5, 31.0, 12.5]))
+    assert dataset_key(base) != dataset_key(base.rename(columns={'final_rate': 'rate'}))
+
+
+def test_payloads_are_built_once_and_large_ones_stay_on_disk():
+    """Test payloads are cached by key, kept in memory or on disk by size, and cleaned up."""
+    cache = ExportCache(large_bytes=1000)
+    frame = results()
+    calls = []
+
+    def write(export_format):
+        def writer(path):
+            calls.append(export_format)
+            write_export(frame, export_format, path)
+        return writer
+
+    small = ('data', 'summary', 'csv')
+    cache.build(small, write('csv'))
+    assert small in cache
+    with cache.open(small) as payload:
+        assert pd.read_csv(payload).equals(frame)
+
+    large = ('data', 'full', 'xlsx')
+    cache.build(large, write('xlsx'))
+    with cache.open(large) as payload:
+        assert pd.read_excel(payload).equals(frame)
+    assert len(os.listdir(cache.directory)) == 1
+    assert calls == ['csv', 'xlsx']
+
+    # A new dataset drops the payloads of the old one
+    cache.build(('other', 'summary', 'csv'), write('csv'))
+    cache.retain('other')
+    assert small not in cache and large not in cache
+    assert os.listdir(cache.directory) == []
+
+    directory = cache.directory
+    cache.clear()
+    assert not os.path.exists(directory)
+
+
+def test_temp_directory_removed_with_the_cache():
+    """Test the temporary directory is removed when the cache is garbage collected."""
+    cache = ExportCache(large_bytes=0)
+    cache.build(('data', 'full', 'csv'), lambda path: write_export(results(), 'csv', path))
+    directory = cache.directory
+    assert os.listdir(directory)
+
+    del cache
+    gc.collect()
+    assert not os.path.exists(directory)
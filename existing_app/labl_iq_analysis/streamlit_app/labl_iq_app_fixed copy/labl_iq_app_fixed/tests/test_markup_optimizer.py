@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_engine import BatchRateEngine
+from markup_optimizer import (
+    TARGET_MARGIN_PER_PACKAGE,
+    TARGET_SAVINGS_PERCENT,
+    markup_invariants,
+    optimize_markup,
+    reprice,
+    solution_criteria,
+    summarize_pricing,
+)
+
+
+@pytest.fixture
+def shipments():
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        'destination_zip': ['10002', '60601', '90210', '02134'] * 50,
+        'weight': rng.uniform(0.2, 9.0, 200),
+        'package_type': 'box',
+        'service_level': ['standard', 'expedited'] * 100,
+        'carrier_rate': rng.uniform(10.0, 25.0, 200),
+    })
+
+
+@pytest.fixture
+def rated(fake_calculator, shipments):
+    return BatchRateEngine(fake_calculator).rate_frame(shipments)
+
+
+def test_reprice_matches_batch_engine(rated):
+    """Test repricing at the rated markup reproduces the engine's final rates."""
+    invariants = markup_invariants(rated)
+    np.testing.assert_allclose(reprice(invariants, invariants.markups), rated['final_rate'].dropna())
+
+
+def test_optimize_markup_hits_savings_target(rated):
+    """Test the solution is the highest markup that still delivers the target savings."""
+    invariants = markup_invariants(rated)
+    solution = optimize_markup(invariants, TARGET_SAVINGS_PERCENT, 12.0)
+
+    assert solution.feasible
+    assert solution.achieved >= 12.0
+    assert solution.summary['savings_percent'] == pytest.approx(solution.achieved)
+    # A slightly higher markup misses the target
+    higher = optimize_markup(invariants, TARGET_SAVINGS_PERCENT, 12.0,
+                             bounds=(solution.markup_percentage + 0.05, 100.0))
+    assert not higher.feasible
+
+
+def test_optimize_markup_margin_target_per_service_level(rated):
+    """Test a margin target solved for one service level keeps the other markups."""
+    invariants = markup_invariants(rated)
+    solution = optimize_markup(invariants, TARGET_MARGIN_PER_PACKAGE, 2.0, service_level='expedited')
+
+    assert solution.feasible
+    assert solution.summary['avg_margin_per_package'] >= 2.0
+    lower = optimize_markup(invariants, TARGET_MARGIN_PER_PACKAGE, 2.0, service_level='expedited',
+                            bounds=(0.0, solution.markup_percentage - 0.05))
+    assert not lower.feasible
+
+    with pytest.raises(ValueError):
+        optimize_markup(invariants, TARGET_MARGIN_PER_PACKAGE, 2.0, service_level='next_day')
+
+
+def _rerate_target(calculator, shipments, target):
+    """Rate shipments with the calculator's criteria and evaluate a markup target."""
+    rerated = BatchRateEngine(calculator).rate_frame(shipments)
+    summary = summarize_pricing(markup_invariants(rerated), rerated['final_rate'].dropna().to_numpy())
+    return summary['savings_percent'] if target == TARGET_SAVINGS_PERCENT else summary['avg_margin_per_package']
+
+
+def test_applied_global_solution_achieves_target(fake_calculator, shipments):
+    """Test rating with the applied global markup reproduces the solution's achieved value."""
+    rated = BatchRateEngine(fake_calculator).rate_frame(shipments)
+    solution = optimize_markup(markup_invariants(rated), TARGET_SAVINGS_PERCENT, 12.0)
+
+    fake_calculator.criteria_values.update(solution_criteria(solution, fake_calculator.criteria_values))
+    assert _rerate_target(fake_calculator, shipments, TARGET_SAVINGS_PERCENT) == pytest.approx(solution.achieved)
+
+
+def test_applied_service_level_solution_achieves_target(fake_calculator, shipments):
+    """Test a service level markup only applies, and meets its target, without a global markup."""
+    rated = BatchRateEngine(fake_calculator).rate_frame(shipments)
+    solution = optimize_markup(markup_invariants(rated), TARGET_MARGIN_PER_PACKAGE, 2.0, service_level='expedited')
+    # The engines would keep rating at the global markup
+    with pytest.raises(ValueError):
+        solution_criteria(solution, fake_calculator.criteria_values)
+
+    fake_calculator.criteria_values.update(
+        markup_percentage=None, standard_markup=5.0, expedited_markup=10.0
+    )
+    rated = BatchRateEngine(fake_calculator).rate_frame(shipments)
+    solution = optimize_markup(markup_invariants(rated), TARGET_MARGIN_PER_PACKAGE, 2.0, service_level='expedited')
+    fake_calculator.criteria_values.update(solution_criteria(solution, fake_calculator.criteria_values))
+
+    assert fake_calculator.criteria_values['service_level_markups'] == {'expedited': solution.markup_percentage}
+    assert _rerate_target(fake_calculator, shipments, TARGET_MARGIN_PER_PACKAGE) == pytest.approx(solution.achieved)
+    rerated = BatchRateEngine(fake_calculator).rate_frame(shipments)
+    assert (rerated.loc[rerated['service_level'] == 'standard', 'markup_percentage'] == 5.0).all()
@@ -0,0 +1,66 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from batch_engine import BatchRateEngine
+from published_rates import (
+    PUBLISHED_ZONES,
+    WEIGHT_TIER_LABELS,
+    published_rate_card,
+    rate_card_table,
+    rate_card_workbook,
+)
+
+
+def test_published_rate_card_covers_every_cell(fake_calculator):
+    """Test the card rates every tier from the rate table with markup, margin and $0.05 rounding."""
+    engine = BatchRateEngine(fake_calculator)
+    card = published_rate_card(engine, markup_pct=10.0, min_margin=1.0)
+
+    table = rate_card_table(card, 'standard', 'box')
+    assert list(table.columns) == ['Billable Weight'] + PUBLISHED_ZONES
+    # The fake rate table stops at 10 lb; heavier tiers are dropped
+    assert list(table['Billable Weight']) == WEIGHT_TIER_LABELS[:25]
+    assert not table[PUBLISHED_ZONES].isna().any().any()
+
+    # <= 1lb, zone 2: base 6.00 + fuel 0.96 + 10% criteria markup = 7.66;
+    # max(7.66 * 1.1, 7.66 + 1.00) = 8.66, rounded to 8.65
+    one_lb = table.set_index('Billable Weight').loc['<= 1lb']
+    assert one_lb[2] == 8.65
+    cents = np.round(table[PUBLISHED_ZONES].to_numpy() * 100).astype(int)
+    assert (cents % 5 == 0).all()
+
+
+def test_published_rate_card_matches_batch_rates(fake_calculator):
+    """Test card costs match rating a shipment at the tier weight."""
+    engine = BatchRateEngine(fake_calculator)
+    card = published_rate_card(engine, markup_pct=0.0, min_margin=0.0)
+    envelope = rate_card_table(card, 'standard', 'envelope').set_index('Billable Weight')
+
+    shipment = pd.DataFrame({'destination_zip': ['10002'], 'weight': [0.5], 'package_type': ['envelope']})
+    rated = engine.rate_frame(shipment)
+    assert rated.loc[0, 'zone'] == 2
+    assert envelope.loc['<= 8oz', 2] == round(round(rated.loc[0, 'final_rate'] * 20) / 20, 2)
+    assert len(envelope) == 16
+
+
+def test_rate_card_workbook_has_a_sheet_per_card(fake_calculator):
+    """Test the workbook holds every service level and package type plus the shipment mix."""
+    engine = BatchRateEngine(fake_calculator)
+    card = published_rate_card(engine)
+    shipments = pd.DataFrame({
+        'destination_zip': ['10002', '10002', '10002'],
+        'weight': [3.0, 2.5, 0.2],
+        'package_type': ['box', 'box', 'envelope'],
+        'service_level': ['standard'] * 3,
+    })
+    results = engine.rate_frame(shipments)
+
+    sheets = pd.read_excel(io.BytesIO(rate_card_workbook(card, results)), sheet_name=None)
+    assert len(sheets) == 9
+    assert sheets['Standard - Box'].iloc[15, 1] == card.loc[('standard', 'box', '<= 1lb'), 2]
+
+    mix = sheets['Shipment Mix']
+    assert list(mix['Billable Weight']) == ['<= 3lb', '<= 4oz']
+    assert list(mix['Shipments']) == [2, 1]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from quantile_sketch import TDigest
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).lognormal(1.0, 0.8, 200000)
+
+
+def test_quantiles_close_to_exact(values):
+    """Test that estimated percentiles are within 1% of the exact values."""
+    digest = TDigest().update(values)
+    quantiles = [0.01, 0.1, 0.5, 0.9, 0.99]
+    assert digest.quantile(quantiles) == pytest.approx(np.quantile(values, quantiles), rel=0.01)
+    assert digest.quantile(0.0) == values.min()
+    assert digest.quantile(1.0) == values.max()
+    assert len(digest.means) <= digest.compression / 2 + 1
+
+
+def test_merged_digests_match_single_digest(values):
+    """Test that merging chunk digests gives the same percentiles as one digest."""
+    chunks = [TDigest().update(chunk) for chunk in np.array_split(values, 10)]
+    merged = chunks[0]
+    for digest in chunks[1:]:
+        merged.merge(digest)
+    assert merged.count == len(values)
+    assert merged.quantile(0.5) == pytest.approx(np.median(values), rel=0.01)
+
+
+def test_round_trip_and_empty():
+    """Test serialization and that empty digests return NaN."""
+    assert np.isnan(TDigest().quantile(0.5))
+    digest = TDigest().update([1.0, 2.0, np.nan, 3.0])
+    restored = TDigest.from_dict(digest.to_dict())
+    assert restored.count == 3
+    assert restored.quantile(0.5) == digest.quantile(0.5)
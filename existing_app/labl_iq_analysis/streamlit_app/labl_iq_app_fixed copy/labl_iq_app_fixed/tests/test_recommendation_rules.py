@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from recommendation_rules import (
+    RECOMMEND_ALTERNATIVE,
+    RECOMMEND_CURRENT,
+    RecommendationRule,
+    SAVINGS_NEGATIVE,
+    add_recommendations,
+    default_rules,
+    evaluate_rules,
+    with_recommendation_reasons,
+)
+
+
+def rated_shipments():
+    return pd.DataFrame({
+        'zone': pd.array([2, 5, 8, 3, pd.NA], dtype='Int8'),
+        'billable_weight': [1.0, 4.0, 30.0, 2.0, 1.0],
+        'edas_surcharge': [0.0, 3.92, 0.0, 0.0, np.nan],
+        'remote_surcharge': [0.0, 0.0, 14.15, 0.0, np.nan],
+        'savings': [2.0, -1.0, -3.0, -0.5, np.nan],
+    })
+
+
+def test_default_rules_flag_edas_and_remote():
+    """Test the default rules reproduce the EDAS/Remote threshold recommendations."""
+    results = add_recommendations(rated_shipments(), default_rules({}))
+
+    assert list(results['carrier_recommendation']) == [
+        'Current Carrier', 'Alternative Carrier', 'Alternative Carrier', 'Current Carrier', 'Current Carrier'
+    ]
+    reasons = with_recommendation_reasons(results, default_rules({}))['recommendation_reason']
+    assert list(reasons) == ['', 'EDAS surcharge: $3.92', 'Remote surcharge: $14.15', '', '']
+
+    # A higher threshold stops flagging the EDAS shipment
+    recommendations, _ = evaluate_rules(rated_shipments(), default_rules({'edas_threshold': 5.0}))
+    assert list(recommendations) == [RECOMMEND_CURRENT, RECOMMEND_CURRENT, RECOMMEND_ALTERNATIVE,
+                                     RECOMMEND_CURRENT, RECOMMEND_CURRENT]
+
+
+def test_first_matching_rule_wins():
+    """Test zone, weight band and savings conditions with rule priority."""
+    rules = [
+        RecommendationRule('Heavy long-zone loss', zones=(7, 8), min_weight=20.0, savings=SAVINGS_NEGATIVE),
+        RecommendationRule('Short-zone', recommendation=RECOMMEND_CURRENT, zones=(2, 3)),
+        RecommendationRule('Any loss', savings=SAVINGS_NEGATIVE),
+    ]
+    recommendations, reasons = evaluate_rules(rated_shipments(), rules)
+
+    assert list(reasons) == [2, 3, 1, 2, 0]
+    assert list(recommendations) == [RECOMMEND_CURRENT, RECOMMEND_ALTERNATIVE, RECOMMEND_ALTERNATIVE,
+                                     RECOMMEND_CURRENT, RECOMMEND_CURRENT]
+
+    rendered = with_recommendation_reasons(add_recommendations(rated_shipments(), rules).iloc[[2]], rules)
+    assert rendered['recommendation_reason'].iloc[0] == 'Heavy long-zone loss'
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_engine import BatchRateEngine
+from sample_preview import project_totals, stratified_sample
+
+
+@pytest.fixture
+def shipments():
+    rng = np.random.default_rng(7)
+    n = 60000
+    return pd.DataFrame({
+        'destination_zip': rng.integers(1000, 99999, n).astype(str),
+        'weight': rng.gamma(2.0, 2.0, n).round(2) + 0.1,
+        'service_level': rng.choice(['standard', 'expedited'], n),
+        'carrier_rate': rng.uniform(8, 40, n).round(2),
+    })
+
+
+def test_stratified_sample_sizes(shipments):
+    """Test proportional allocation with at least two rows per stratum."""
+    sample = stratified_sample(shipments, sample_size=5000, seed=1)
+    assert abs(len(sample.rows) - 5000) < 200
+    assert sample.sample_sizes.sum() == len(sample.rows)
+    assert (sample.sample_sizes >= np.minimum(sample.population_sizes, 2)).all()
+    assert np.bincount(sample.strata, minlength=len(sample.sample_sizes)).tolist() == sample.sample_sizes.tolist()
+
+
+def test_projection_covers_full_run(fake_calculator, shipments):
+    """Test that projected totals are close to the full run and inside the intervals."""
+    engine = BatchRateEngine(fake_calculator)
+    full = engine.rate_frame(shipments)
+    sample = stratified_sample(shipments, sample_size=10000, seed=3)
+    projection = project_totals(engine.rate_frame(sample.rows), sample).set_index('metric')
+
+    actual = {
+        'Total Labl IQ Cost': full['final_rate'].sum(),
+        'Total Savings': full['savings'].sum(),
+        'Savings %': full['savings'].sum() / full['carrier_rate'].sum() * 100,
+    }
+    for metric, value in actual.items():
+        row = projection.loc[metric]
+        assert row['lower'] <= value <= row['upper']
+        assert row['estimate'] == pytest.approx(value, rel=0.02)
+
+
+def test_small_upload_is_rated_exactly(fake_calculator, shipments):
+    """Test that uploads smaller than the sample size give exact totals."""
+    small = shipments.iloc[:500]
+    engine = BatchRateEngine(fake_calculator)
+    sample = stratified_sample(small, sample_size=10000)
+    projection = project_totals(engine.rate_frame(sample.rows), sample).set_index('metric')
+    total = projection.loc['Total Labl IQ Cost']
+    assert total['estimate'] == pytest.approx(engine.rate_frame(small)['final_rate'].sum())
+    assert total['lower'] == pytest.approx(total['upper'])
@@ -0,0 +1,20 @@
+import numpy as np
+
+from simple_zone_calculator import zone_calculator
+
+
+def test_get_zones_matches_get_zone():
+    """Test that bulk zoning agrees with the per-shipment lookup for every prefix."""
+    dest_prefixes = np.arange(1000, dtype=np.int16)
+    for origin in (463, 100, 995, 0):
+        origin_prefixes = np.full(1000, origin, dtype=np.int16)
+        zones = zone_calculator.get_zones(origin_prefixes, dest_prefixes)
+        expected = [zone_calculator.get_zone(f"{origin:03d}00", f"{dest:03d}00") for dest in range(1000)]
+        assert zones.dtype == np.int8
+        assert zones.tolist() == expected
+
+
+def test_get_zones_missing_prefix():
+    """Test that missing prefixes fall back to zone 8."""
+    zones = zone_calculator.get_zones(np.array([463, -1]), np.array([-1, -1]))
+    assert zones.tolist() == [8, 8]
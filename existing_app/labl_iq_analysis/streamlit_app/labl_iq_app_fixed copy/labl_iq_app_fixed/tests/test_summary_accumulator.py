@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from summary_accumulator import RateSummaryAccumulator, SummaryAccumulator
+
+
+@pytest.fixture
+def rows():
+    return pd.DataFrame({
+        'origin_zip': ['46307'] * 6,
+        'destination_zip': ['10001', '02134', '2134', 'E3G7P6', '10001', '99501'],
+        'weight': [1.0, 2.0, np.nan, 4.0, 5.0, 6.0],
+        'package_type': ['box', 'box', 'envelope', 'box', 'box', 'box'],
+        'base_rate': [7.0, 5.0, 4.0, 6.0, np.nan, 9.0],
+        'total_surcharges': [3.1, 4.0, 0.6, 15.1, np.nan, 15.6],
+        'final_rate': [11.11, 9.9, 5.06, 23.2, np.nan, 26.8],
+        'carrier_rate': [15.0, 10.0, 0.0, 30.0, 10.0, np.nan],
+        'savings': [3.89, 0.1, 0.0, 6.8, np.nan, np.nan],
+        'savings_percent': [25.9, 1.0, 0.0, 22.7, np.nan, np.nan],
+    })
+
+
+def test_single_pass_statistics(rows):
+    """Test counts, sums, means, min/max, categories and distinct ZIPs."""
+    summary = SummaryAccumulator(['weight'], ['package_type'], ['destination_zip']).update(rows)
+    assert summary.rows == 6
+    assert summary.count('weight') == 5
+    assert summary.total('weight') == 18.0
+    assert summary.mean('weight') == 3.6
+    assert summary.minimum('weight') == 1.0
+    assert summary.maximum('weight') == 6.0
+    assert summary.category_counts('package_type') == {'box': 5, 'envelope': 1}
+    # 02134 and 2134 are the same ZIP; the Canadian postal code counts once
+    assert summary.distinct_zips('destination_zip') == 4
+
+
+def test_merged_chunks_match_single_pass(rows):
+    """Test that merging chunk accumulators gives the same result as one pass."""
+    columns = (['weight'], ['package_type'], ['destination_zip'])
+    whole = SummaryAccumulator(*columns).update(rows)
+    chunks = [SummaryAccumulator(*columns).update(rows.iloc[i:i + 2]) for i in range(0, len(rows), 2)]
+    merged = SummaryAccumulator.merge_all(chunks)
+
+    assert merged.rows == whole.rows
+    assert merged.total('weight') == pytest.approx(whole.total('weight'))
+    assert merged.minimum('weight') == whole.minimum('weight')
+    assert merged.category_counts('package_type') == whole.category_counts('package_type')
+    assert merged.distinct_zips('destination_zip') == whole.distinct_zips('destination_zip')
+
+
+def test_rate_summary_stats(rows):
+    """Test that failed rows are excluded and savings use rows with a carrier rate."""
+    chunks = [RateSummaryAccumulator().update(rows.iloc[:3]), RateSummaryAccumulator().update(rows.iloc[3:])]
+    stats = RateSummaryAccumulator.merge_all(chunks).stats()
+
+    assert stats['total_shipments'] == 5
+    assert stats['failed_shipments'] == 1
+    assert stats['total_base_rate'] == pytest.approx(31.0)
+    assert stats['total_savings'] == pytest.approx(10.79)
+    assert stats['avg_savings_percent'] == pytest.approx((25.9 + 1.0 + 22.7) / 3)
+    assert stats['max_final_rate'] == 26.8
+
+
+def test_rate_summary_percentiles(rows):
+    """Test percentile tables per group from the rate summary sketches."""
+    rows['zone'] = [2, 2, 1, 8, None, 8]
+    rows['billable_weight'] = [0.5, 3.0, 0.5, 4.0, 5.0, 60.0]
+    summary = RateSummaryAccumulator().update(rows)
+
+    by_zone = summary.percentiles('final_rate', 'zone', (0.5,))
+    assert by_zone['count'].to_dict() == {1: 1, 2: 2, 8: 2}
+    assert by_zone.loc[1, 'p50'] == 5.06
+
+    by_bracket = summary.percentiles('savings', 'weight_bracket')
+    assert list(by_bracket.index) == ['0-1 lbs', '1-5 lbs']
+    assert summary.stats()['median_final_rate'] == pytest.approx(11.11)
+
+
+def test_empty_merges_and_results_without_savings(rows):
+    """Test merging no accumulators and rating results that have no savings columns."""
+    assert SummaryAccumulator.merge_all([]).rows == 0
+    assert RateSummaryAccumulator.merge_all([]).stats()['total_shipments'] == 0
+
+    stats = RateSummaryAccumulator().update(rows.drop(columns=['savings', 'savings_percent'])).stats()
+    assert stats['total_shipments'] == 5
+    assert stats['total_savings'] == 0
@@ -0,0 +1,81 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from upload_reader import (
+    expand_uploads,
+    mapped_dtypes,
+    read_mapped_columns,
+    read_mapped_sources,
+    sniff_upload,
+)
+
+UPLOAD = (
+    "Shipment ID,Order Notes,Ship Postal Code,Weight Oz,Package Length,Carrier Fee,Shipping Service\n"
+    "A1,gift,02134,12,10,9.50,Ground\n"
+    "A2,,07001-1234,40.5,,31,Priority\n"
+    "A3,fragile,90210,8,6,12.25,Ground\n"
+).encode()
+
+MAPPING = {
+    'destination_zip': 'Ship Postal Code',
+    'weight': 'Weight Oz',
+    'length': 'Package Length',
+    'carrier_rate': 'Carrier Fee',
+    'shipment_id': 'Shipment ID',
+    'service_level': 'Shipping Service',
+}
+
+
+def test_sniff_reads_a_sample_of_every_column():
+    """Test the mapping sniff keeps all columns but only the first rows."""
+    sample = sniff_upload(UPLOAD, rows=2)
+    assert len(sample) == 2
+    assert 'Order Notes' in sample.columns
+
+
+def test_mapped_columns_are_projected_and_typed():
+    """Test the re-read keeps mapped columns only, ZIPs as text and measures as float."""
+    mapped = read_mapped_columns(UPLOAD, MAPPING)
+
+    assert list(mapped.columns) == list(MAPPING)
+    assert list(mapped['destination_zip']) == ['02134', '07001-1234', '90210']
+    assert mapped['weight'].dtype == np.float64
+    assert mapped['length'].isna().tolist() == [False, True, False]
+    assert mapped['carrier_rate'].tolist() == [9.5, 31.0, 12.25]
+
+
+def test_unparseable_and_shared_columns_fall_back_to_text():
+    """Test rates with symbols are coerced and a column mapped twice is read once as text."""
+    upload = "Id,Fee\n1,$9.50\n2,31\n".encode()
+    mapped = read_mapped_columns(upload, {'carrier_rate': 'Fee', 'shipment_id': 'Id', 'weight': 'Id'})
+
+    assert mapped_dtypes({'shipment_id': 'Id', 'weight': 'Id'}) == {'Id': str}
+    assert pd.isna(mapped['carrier_rate'][0]) and mapped['carrier_rate'][1] == 31.0
+    assert list(mapped['shipment_id']) == ['1', '2']
+    assert mapped['weight'].tolist() == [1.0, 2.0]
+
+
+def test_multi_file_and_zip_uploads_read_as_one_dataset():
+    """Test archives are expanded and every file is read with the shared mapping and tagged."""
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('exports/february.csv', UPLOAD)
+        zf.writestr('__MACOSX/exports/._february.csv', b'junk')
+        zf.writestr('exports/readme.txt', b'notes')
+    sources = expand_uploads([('january.csv', UPLOAD), ('stores.zip', archive.getvalue())])
+    assert [name for name, _ in sources] == ['january.csv', 'february.csv']
+
+    combined = read_mapped_sources(sources + [('january.csv', UPLOAD)], MAPPING, max_workers=2)
+    assert len(combined) == 9
+    assert list(combined['source_file'].cat.categories) == ['january.csv', 'february.csv', 'january.csv (2)']
+    assert list(combined['source_file'][:4]) == ['january.csv'] * 3 + ['february.csv']
+    assert list(combined['destination_zip'][3:6]) == ['02134', '07001-1234', '90210']
+
+    with pytest.raises(ValueError, match='other.csv'):
+        read_mapped_sources([('other.csv', b'Order,Zip\n1,02134\n')], MAPPING)
+    with pytest.raises(ValueError, match='no CSV files'):
+        expand_uploads([('empty.zip', io.BytesIO(b'PK\x05\x06' + b'\x00' * 18).getvalue())])
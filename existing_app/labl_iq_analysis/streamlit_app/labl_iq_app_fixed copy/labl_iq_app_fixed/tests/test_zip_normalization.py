@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from zip_normalization import (
+    ZIP_DOMESTIC,
+    ZIP_INTERNATIONAL,
+    ZIP_INVALID,
+    ZIP_MISSING,
+    SURCHARGE_DAS,
+    SURCHARGE_EDAS,
+    SURCHARGE_REMOTE,
+    build_surcharge_table,
+    lookup_surcharge_flags,
+    normalize_zips,
+)
+
+
+def test_normalize_string_zips():
+    """Test that string ZIPs are zero-padded and ZIP+4 codes are truncated."""
+    zips = normalize_zips(pd.Series(['10001', '2134', '02134-1234', ' 46307 ', '501.0']))
+    assert zips.zip5.tolist() == [10001, 2134, 2134, 46307, 501]
+    assert zips.prefix.tolist() == [100, 21, 21, 463, 5]
+    assert (zips.flag == ZIP_DOMESTIC).all()
+    assert zips.zip5.dtype == np.int32
+    assert zips.prefix.dtype == np.int16
+
+
+def test_normalize_numeric_zips():
+    """Test that numeric columns (leading zeros lost) are normalized."""
+    zips = normalize_zips(pd.Series([2134, 10001.0, 21341234, np.nan]))
+    assert zips.zip5.tolist() == [2134, 10001, 2134, ZIP_MISSING]
+    assert zips.flag.tolist() == [ZIP_DOMESTIC, ZIP_DOMESTIC, ZIP_DOMESTIC, ZIP_INVALID]
+
+
+def test_normalize_international_and_invalid_zips():
+    """Test that postal codes with letters are international and blanks are invalid."""
+    zips = normalize_zips(pd.Series(['E3G7P6', '', None, 'N/A', '99501']))
+    assert zips.flag.tolist() == [ZIP_INTERNATIONAL, ZIP_INVALID, ZIP_INVALID, ZIP_INTERNATIONAL, ZIP_DOMESTIC]
+    assert zips.zip5.tolist() == [ZIP_MISSING] * 4 + [99501]
+    assert zips.prefix.tolist() == [ZIP_MISSING] * 4 + [995]
+
+
+def test_surcharge_table_lookup():
+    """Test that surcharge bits are looked up by ZIP5."""
+    table = build_surcharge_table({'10001': True, '02134': True, '30301': False},
+                                  {'02134': True},
+                                  {'99501': True})
+    zips = normalize_zips(['10001', '2134', '99501', '30301', 'E3G7P6'])
+    flags = lookup_surcharge_flags(table, zips)
+    assert flags.tolist() == [SURCHARGE_DAS, SURCHARGE_DAS | SURCHARGE_EDAS, SURCHARGE_REMOTE, 0, 0]
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - Upload Reader Module
+
+This module reads shipment uploads in two passes so the wide export (often
+60+ columns) is never held in memory: a small sample for the mapping step,
+then a re-read of only the mapped columns with explicit dtypes.
+It provides functionality for:
+1. Sniffing the header and first rows of an upload for column mapping
+2. Choosing dtypes per mapped field (ZIPs and labels as text, weights, dimensions and rates as float)
+3. Re-reading an upload restricted to the mapped columns, named by field
+4. Expanding multi-file and .zip uploads into CSV sources read concurrently
+   with one shared mapping, tagged by source file
+"""
+
+import io
+import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('labl_iq.upload_reader')
+
+# Rows read for the mapping preview and column suggestions
+SNIFF_ROWS = 200
+
+# Mapped fields kept as text (ZIPs keep their leading zeros)
+TEXT_FIELDS = ['destination_zip', 'origin_zip', 'shipment_id', 'service_level', 'package_type']
+
+# Mapped fields read as float
+NUMERIC_FIELDS = ['weight', 'length', 'width', 'height', 'carrier_rate']
+
+# Column added to multi-file uploads naming each row's file
+SOURCE_FILE_FIELD = 'source_file'
+
+Source = Union[bytes, str]
+
+
+def _buffer(source: Source) -> Union[io.BytesIO, str]:
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def sniff_upload(source: Source, rows: int = SNIFF_ROWS) -> pd.DataFrame:
+    """
+    Read the header and first rows of an upload.
+
+    Args:
+        source: Uploaded file contents or a path to the CSV
+        rows: Number of data rows to read
+
+    Returns:
+        pd.DataFrame: Sample with every column of the upload
+    """
+    return pd.read_csv(_buffer(source), nrows=rows)
+
+
+def mapped_dtypes(mapping: Dict[str, str]) -> Dict[str, object]:
+    """
+    Dtype for each mapped upload column.
+
+    A column mapped to both a text and a numeric field is read as text; the
+    numeric field is converted after the read.
+
+    Args:
+        mapping: Field name -> upload column
+
+    Returns:
+        Dict[str, object]: Upload column -> dtype
+    """
+    dtypes = {}
+    for field, column in mapping.items():
+        dtype = np.float64 if field in NUMERIC_FIELDS else str
+        dtypes[column] = str if dtypes.get(column, dtype) is not dtype else dtype
+    return dtypes
+
+
+def read_mapped_columns(source: Source, mapping: Dict[str, str]) -> pd.DataFrame:
+    """
+    Re-read an upload keeping only the mapped columns, renamed to their fields.
+
+    Numeric columns that don't parse as float (e.g. "$12.50") are read as text
+    and coerced, leaving unparseable values missing.
+
+    Args:
+        source: Uploaded file contents or a path to the CSV
+        mapping: Field name -> upload column
+
+    Returns:
+        pd.DataFrame: One column per mapped field, in mapping order
+    """
+    dtypes = mapped_dtypes(mapping)
+    try:
+        frame = pd.read_csv(_buffer(source), usecols=list(dtypes), dtype=dtypes)
+    except ValueError as e:
+        logger.warning(f"Numeric columns did not parse as float, coercing: {e}")
+        frame = pd.read_csv(_buffer(source), usecols=list(dtypes), dtype=str)
+
+    mapped = pd.DataFrame({field: frame[column] for field, column in mapping.items()})
+    for field in mapped.columns.intersection(NUMERIC_FIELDS):
+        if mapped[field].dtype != np.float64:
+            mapped[field] = pd.to_numeric(mapped[field], errors='coerce').astype(np.float64)
+    logger.info(f"Read {len(mapped)} rows from {len(dtypes)} mapped columns")
+    return mapped
+
+
+def expand_uploads(files: List[Tuple[str, bytes]]) -> List[Tuple[str, bytes]]:
+    """
+    CSV sources of an upload, with .zip archives replaced by their CSV members.
+
+    Args:
+        files: (file name, contents) of each uploaded file
+
+    Returns:
+        List[Tuple[str, bytes]]: (file name, contents) of each CSV, in upload order
+    """
+    sources = []
+    for name, content in files:
+        if not name.lower().endswith('.zip'):
+            sources.append((name, content))
+            continue
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            for member in archive.infolist():
+                member_name = os.path.basename(member.filename)
+                if member.is_dir() or member.filename.startswith('__MACOSX/') or member_name.startswith('.') \
+                        or not member_name.lower().endswith('.csv'):
+                    continue
+                sources.append((member_name, archive.read(member)))
+    if not sources:
+        raise ValueError("The upload contains no CSV files")
+    return sources
+
+
+def read_mapped_sources(sources: List[Tuple[str, bytes]], mapping: Dict[str, str],
+                        max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Read the mapped columns of several CSV sources as one dataset.
+
+    Sources are parsed concurrently (the CSV parser releases the GIL) with the
+    same mapping, and each row is tagged with its file in SOURCE_FILE_FIELD.
+
+    Args:
+        sources: (file name, contents) of each CSV
+        mapping: Field name -> upload column, shared by every source
+        max_workers: Parser threads (defaults to one per source, up to the CPU count)
+
+    Returns:
+        pd.DataFrame: Mapped fields plus SOURCE_FILE_FIELD, in source order
+    """
+    names = [name for name, _ in sources]
+
+    def read(source: Tuple[str, bytes]) -> pd.DataFrame:
+        name, content = source
+        try:
+            return read_mapped_columns(content, mapping)
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from e
+
+    workers = max_workers or min(len(sources), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        frames = list(executor.map(read, sources))
+
+    combined = pd.concat(frames, ignore_index=True)
+    combined[SOURCE_FILE_FIELD] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(frames)), [len(frame) for frame in frames]),
+        categories=_unique_names(names)
+    )
+    logger.info(f"Read {len(combined)} rows from {len(sources)} files")
+    return combined
+
+
+def _unique_names(names: List[str]) -> List[str]:
+    """File names made unique by numbering repeats (the same name in two archives)."""
+    seen: Dict[str, int] = {}
+    unique = []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        unique.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return unique
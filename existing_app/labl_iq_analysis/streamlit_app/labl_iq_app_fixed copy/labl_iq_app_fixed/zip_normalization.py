@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Labl IQ Rate Analyzer - ZIP Normalization Module
+
+This module converts raw ZIP code columns into compact integer arrays once per
+batch so that zone and surcharge lookups never have to re-parse strings.
+It provides functionality for:
+1. Normalizing a ZIP column into int32 ZIP5, int16 ZIP3 prefix and a status flag
+2. Compiling the DAS/EDAS/Remote ZIP dictionaries into a ZIP5-indexed bitmask table
+"""
+
+import logging
+from typing import Dict, Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('labl_iq.zip_normalization')
+
+# ZIP status flags
+ZIP_DOMESTIC = 0
+ZIP_INTERNATIONAL = 1
+ZIP_INVALID = 2
+
+# Sentinel stored in the ZIP5/prefix arrays for non-domestic rows
+ZIP_MISSING = -1
+
+# Number of possible 5-digit ZIP codes (size of the surcharge lookup table)
+ZIP5_DOMAIN = 100000
+
+# Surcharge bits stored in the surcharge lookup table
+SURCHARGE_DAS = 1
+SURCHARGE_EDAS = 2
+SURCHARGE_REMOTE = 4
+
+
+class NormalizedZips(NamedTuple):
+    """Integer representation of a ZIP column."""
+    zip5: np.ndarray    # int32, ZIP_MISSING where the ZIP is not domestic
+    prefix: np.ndarray  # int16, ZIP_MISSING where the ZIP is not domestic
+    flag: np.ndarray    # uint8, one of ZIP_DOMESTIC / ZIP_INTERNATIONAL / ZIP_INVALID
+
+
+def _normalize_numeric(values: np.ndarray) -> np.ndarray:
+    """Convert numeric ZIP values (leading zeros already lost) to ZIP5 integers."""
+    values = values.astype(np.float64)
+    valid = np.isfinite(values) & (values >= 0) & (values == np.floor(values)) & (values < 1e9)
+    values = np.where(valid, values, 0)
+    # 9-digit values are ZIP+4 codes with the hyphen removed
+    zip5 = np.where(values < ZIP5_DOMAIN, values, values // 10000)
+    return np.where(valid, zip5, ZIP_MISSING).astype(np.int32)
+
+
+def _normalize_unique(uniques: pd.Index) -> tuple:
+    """Normalize the distinct ZIP values of a column."""
+    if pd.api.types.is_numeric_dtype(uniques.dtype) and not pd.api.types.is_bool_dtype(uniques.dtype):
+        zip5 = _normalize_numeric(np.asarray(uniques))
+        flag = np.where(zip5 == ZIP_MISSING, ZIP_INVALID, ZIP_DOMESTIC).astype(np.uint8)
+        return zip5, flag
+
+    text = pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+    # Floats that went through an object column keep a trailing ".0"
+    text = text.str.strip().str.replace(r'\.0+$', '', regex=True)
+    text = text.str.replace(r'[\s-]', '', regex=True)
+
+    # Canadian postal codes (e.g., E3G7P6) or other international formats
+    is_international = text.str.contains(r'[A-Za-z]', regex=True).to_numpy(dtype=bool)
+
+    digits = text.str.replace(r'\D', '', regex=True)
+    has_digits = (digits.str.len() > 0).to_numpy(dtype=bool)
+
+    zip5_text = digits.str.zfill(5).str[:5]
+    domestic = has_digits & ~is_international
+    zip5 = np.full(len(text), ZIP_MISSING, dtype=np.int32)
+    if domestic.any():
+        zip5[domestic] = zip5_text[domestic].astype(np.int64).to_numpy()
+
+    flag = np.where(
+        is_international, ZIP_INTERNATIONAL,
+        np.where(domestic, ZIP_DOMESTIC, ZIP_INVALID)
+    ).astype(np.uint8)
+    return zip5, flag
+
+
+def normalize_zips(values: Iterable) -> NormalizedZips:
+    """
+    Normalize a column of ZIP codes into integer arrays.
+
+    Each distinct value is parsed once; the result is broadcast back to the rows.
+    Digits are zero-padded to five places (ZIP+4 codes keep their first five
+    digits), values containing letters are flagged international and values
+    without any digits are flagged invalid.
+
+    Args:
+        values: ZIP codes as strings or numbers (Series, array or list)
+
+    Returns:
+        NormalizedZips: ZIP5, ZIP3 prefix and status flag arrays
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+
+    zip5_unique, flag_unique = _normalize_unique(pd.Index(uniques))
+
+    # Missing values map to the extra trailing slot (factorize uses -1 for NA)
+    zip5_unique = np.append(zip5_unique, np.int32(ZIP_MISSING))
+    flag_unique = np.append(flag_unique, np.uint8(ZIP_INVALID))
+
+    zip5 = zip5_unique[codes]
+    flag = flag_unique[codes]
+    prefix = np.where(zip5 >= 0, zip5 // 100, ZIP_MISSING).astype(np.int16)
+    return NormalizedZips(zip5=zip5, prefix=prefix, flag=flag)
+
+
+def build_surcharge_table(das_zips: Dict[str, bool],
+                          edas_zips: Dict[str, bool],
+                          remote_zips: Dict[str, bool]) -> np.ndarray:
+    """
+    Compile the surcharge ZIP dictionaries into a ZIP5-indexed bitmask table.
+
+    Args:
+        das_zips: Mapping of 5-digit ZIP to DAS eligibility
+        edas_zips: Mapping of 5-digit ZIP to EDAS eligibility
+        remote_zips: Mapping of 5-digit ZIP to Remote Area eligibility
+
+    Returns:
+        np.ndarray: uint8 array of length 100000 holding SURCHARGE_* bits
+    """
+    table = np.zeros(ZIP5_DOMAIN, dtype=np.uint8)
+    for zips, bit in ((das_zips, SURCHARGE_DAS),
+                      (edas_zips, SURCHARGE_EDAS),
+                      (remote_zips, SURCHARGE_REMOTE)):
+        eligible = [zip_code for zip_code, applies in (zips or {}).items() if applies]
+        if not eligible:
+            continue
+        normalized = normalize_zips(eligible)
+        domestic = normalized.zip5[normalized.flag == ZIP_DOMESTIC]
+        table[domestic] |= bit
+
+    logger.info(
+        f"Compiled surcharge table: DAS={int((table & SURCHARGE_DAS).astype(bool).sum())}, "
+        f"EDAS={int((table & SURCHARGE_EDAS).astype(bool).sum())}, "
+        f"Remote={int((table & SURCHARGE_REMOTE).astype(bool).sum())}"
+    )
+    return table
+
+
+def lookup_surcharge_flags(table: np.ndarray, zips: NormalizedZips) -> np.ndarray:
+    """
+    Look up the surcharge bits for normalized destination ZIPs.
+
+    Args:
+        table: Table produced by build_surcharge_table
+        zips: Normalized destination ZIPs
+
+    Returns:
+        np.ndarray: uint8 SURCHARGE_* bits per row (0 for non-domestic rows)
+    """
+    domestic = zips.flag == ZIP_DOMESTIC
+    return np.where(domestic, table[np.where(domestic, zips.zip5, 0)], 0).astype(np.uint8)